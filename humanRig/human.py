@@ -6,6 +6,8 @@ from maya import cmds
 
 from rigLib.base import module
 from rigLib.base import control
+from rigLib.base import build_graph
+from rigLib.base import checkpoint
 
 from rigLib.rig import spine
 from rigLib.rig import neck
@@ -24,240 +26,280 @@ scene_scale = project.scene_scale
 project_path = project.project_path
 model_file_path = '%s/%s/model/%s_model.ma'
 builders_scene_file_path = '%s/%s/builder/%s_builder.ma'
+checkpoints_dir_path = '%s/%s/checkpoints'
 
 
-def build(character_name):
+def build(character_name, disabled=(), incremental=False, verbose=False):
     """
     Main function to build character Rig
     :type character_name: object
     :param character_name:
-    :return:
+    :param disabled: list(str), optional control steps to leave out, like tail or tongue
+    :param incremental: bool, start from the last scene checkpoint that is still up to date and save
+            checkpoints on the way, in the checkpoints folder of the character
+    :param verbose: bool, print the time and state of each step, see BuildGraph.report()
+    :return: BuildGraph, with the result, time and state of each step
     """
+    character_graph = make_build_graph(character_name)
 
-    # new Scene
-    cmds.file(new=True, f=True)
+    checkpoints = None
+    if incremental:
+        checkpoints = checkpoint.CheckpointStore(checkpoints_dir_path % (project_path, character_name))
 
-    # import builders scene
-    model_builder_file = builders_scene_file_path % (project_path, character_name, character_name)
-    cmds.file(model_builder_file, i=1)
+    character_graph.run(disabled=disabled, checkpoints=checkpoints)
+    if verbose:
+        print(character_graph.report())
+
+    return character_graph
 
-    head_joint = cmds.ls('*head*', type='joint')[0]
-    # make base class
-    base_rig = module.Base(character_name=character_name, scale=scene_scale, main_control_attach_obj=head_joint)
 
-    # import models
+def make_build_graph(character_name):
+    """
+    declare the scene setup, the deformation and the control setup of the character as build graph
+    steps. Each step is hashed with the source of its function and its inputs, so an incremental
+    build reruns from the first step whose code, files or parameters changed
+    :param character_name: str, character name
+    :return: BuildGraph
+    """
+    character_graph = build_graph.BuildGraph()
+
+    model_builder_file = builders_scene_file_path % (project_path, character_name, character_name)
     model_file = model_file_path % (project_path, character_name, character_name)
-    cmds.file(model_file, i=1)
 
-    # parent model
-    model_grp = '%s_model_grp' % character_name
-    cmds.parent(model_grp, base_rig.modelGrp)
+    def build_scene(results):
+        # new Scene
+        cmds.file(new=True, f=True)
+
+        # import builders scene
+        cmds.file(model_builder_file, i=1)
+
+        head_joint = cmds.ls('*head*', type='joint')[0]
+        # make base class
+        base_rig = module.Base(character_name=character_name, scale=scene_scale, main_control_attach_obj=head_joint)
 
-    root_joint = cmds.ls('*root*', type='joint')
-    # parent root to base
-    cmds.parent(root_joint, base_rig.jointsGrp)
+        # import models
+        cmds.file(model_file, i=1)
+
+        # parent model
+        model_grp = '%s_model_grp' % character_name
+        cmds.parent(model_grp, base_rig.modelGrp)
+
+        root_joint = cmds.ls('*root*', type='joint')
+        # parent root to base
+        cmds.parent(root_joint, base_rig.jointsGrp)
+
+        return base_rig
+
+    character_graph.add('scene', build_scene,
+                        inputs=[build_graph.FileInput(model_builder_file),
+                                build_graph.FileInput(model_file),
+                                character_name,
+                                scene_scale,
+                                build_graph.SourceInput(module),
+                                build_graph.SourceInput(control),
+                                build_graph.SourceInput(joint)],
+                        checkpoint=True)
 
     # deform setup
-    human_deform.build(base_rig, character_name)
+    def build_deform(results):
+        human_deform.build(results['scene'], character_name)
 
-    # control setup
-    make_control_setup(base_rig)
+    character_graph.add('deform', build_deform, requires=['scene'],
+                        inputs=[build_graph.SourceInput(human_deform)],
+                        checkpoint=True)
+
+    # control setup, on the deformed model
+    add_control_steps(character_graph, base_steps=['scene', 'deform'])
 
     # delete builder group
-    builder_group = 'builder_group'
-    cmds.delete(builder_group)
+    def delete_builders(results):
+        builder_group = 'builder_group'
+        cmds.delete(builder_group)
+
+    character_graph.add('cleanup', delete_builders, requires=['scene'])
+
+    return character_graph
 
 
-def make_control_setup(base_rig):
+def make_control_setup(base_rig, disabled=(), verbose=False):
     """
     make control setup
     :param base_rig:
-    :return:
+    :param disabled: list(str), optional steps to leave out, like tail or tongue
+    :param verbose: bool, print the time and state of each step, see BuildGraph.report()
+    :return: BuildGraph, with the result, time and state of each step
     """
-    # extracting some joint information
-    spine_joints = cmds.ls('spine*', type='joint')
-    root_joint = cmds.ls('*root*', type='joint')[0]
-    head_joint = cmds.ls('*head*', type='joint')[0]
-    neck_joints = cmds.ls('*neck*', type='joint')
-    if cmds.objExists('tail'):
-        tail_joints = joint.list_hierarchy('tail')
-    pelvis_joint = cmds.ls('*pelvis*', type='joint')
-    tongue_joints = joint.list_hierarchy('tongue')
-    jaw_joint = 'jaw'
+    control_graph = build_graph.BuildGraph()
+    control_graph.add('scene', lambda results: base_rig)
+    add_control_steps(control_graph, base_steps=['scene'])
 
+    control_graph.run(disabled=disabled)
+    if verbose:
+        print(control_graph.report())
+
+    return control_graph
+
+
+def add_control_steps(control_graph, base_steps):
+    """
+    add the rig modules and the constraints attaching them to each other as steps of a build graph.
+    The steps take the base rig from the result of the scene step and find their joints when they run
+    :param control_graph: BuildGraph, with a scene step that returns the base rig
+    :param base_steps: list(str), steps every rig module requires, the scene step and the deformation
+            if it is part of the graph
+    :return: None
+    """
     # spine
-    spine_curve = 'spine_curve'
-    body_locator = 'spine_locator'
-    chest_locator = 'chest_locator'
-    pelvis_locator = 'hip_locator'
-    prefix = 'spine'
-
-    spine_rig = spine.build(spine_joints=spine_joints,
-                            root_joints=root_joint,
-                            spine_curve=spine_curve,
-                            body_locator=body_locator,
-                            chest_locator=chest_locator,
-                            pelvis_locator=pelvis_locator,
-                            prefix=prefix,
-                            rig_scale=scene_scale,
-                            base_rig=base_rig
-                            )
+    def build_spine(results):
+        return spine.build(spine_joints=cmds.ls('spine*', type='joint'),
+                           root_joints=cmds.ls('*root*', type='joint')[0],
+                           spine_curve='spine_curve',
+                           body_locator='spine_locator',
+                           chest_locator='chest_locator',
+                           pelvis_locator='hip_locator',
+                           prefix='spine',
+                           rig_scale=scene_scale,
+                           base_rig=results['scene']
+                           )
+
+    control_graph.add('spine', build_spine, requires=base_steps,
+                      inputs=[build_graph.SourceInput(spine)],
+                      checkpoint=True)
 
     # neck setup
-    neck_curve = 'neck_curve'
-
-    neck_rig = neck.build(neck_joints=neck_joints,
-                          head_joint=head_joint,
-                          neck_curve=neck_curve,
+    def build_neck(results):
+        return neck.build(neck_joints=cmds.ls('*neck*', type='joint'),
+                          head_joint=cmds.ls('*head*', type='joint')[0],
+                          neck_curve='neck_curve',
                           prefix='neck',
                           rig_scale=scene_scale,
-                          base_rig=base_rig
+                          base_rig=results['scene']
                           )
 
-    cmds.parentConstraint(spine_joints[-1], neck_rig['base_attach_grp'], mo=1)
-    cmds.parentConstraint(spine_rig['chest_control'].C, neck_rig['body_attach_grp'], mo=1)
-    cmds.parentConstraint(spine_joints[-1], neck_rig['body_attach_grp'], mo=1)
-    cmds.parentConstraint('global1_ctrl', neck_rig['body_attach_grp'], mo=1)
+    def attach_neck(results):
+        spine_joints = cmds.ls('spine*', type='joint')
+        neck_rig = results['neck']
+        cmds.parentConstraint(spine_joints[-1], neck_rig['base_attach_grp'], mo=1)
+        cmds.parentConstraint(results['spine']['chest_control'].C, neck_rig['body_attach_grp'], mo=1)
+        cmds.parentConstraint(spine_joints[-1], neck_rig['body_attach_grp'], mo=1)
+        cmds.parentConstraint('global1_ctrl', neck_rig['body_attach_grp'], mo=1)
+
+    control_graph.add('neck', build_neck, requires=base_steps,
+                      inputs=[build_graph.SourceInput(neck)])
+    control_graph.add('neck_attach', attach_neck, requires=['spine', 'neck'], checkpoint=True)
 
     # tail
-    if cmds.objExists('tail'):
-        chain_curve = 'tail_curve'
+    def build_tail(results):
+        return ikChain.build(chain_joints=joint.list_hierarchy('tail'),
+                             chain_curve='tail_curve',
+                             prefix='tail',
+                             rig_scale=scene_scale,
+                             smallest_scale_precentage=0.4,
+                             fk_parenting=True,
+                             base_rig=results['scene']
+                             )
 
-        tail_rig = ikChain.build(chain_joints=tail_joints,
-                                 chain_curve=chain_curve,
-                                 prefix='tail',
-                                 rig_scale=scene_scale,
-                                 smallest_scale_precentage=0.4,
-                                 fk_parenting=True,
-                                 base_rig=base_rig
-                                 )
+    def attach_tail(results):
+        pelvis_joint = cmds.ls('*pelvis*', type='joint')
+        cmds.parentConstraint(pelvis_joint, results['tail']['base_attach_grp'], mo=1)
 
-        cmds.parentConstraint(pelvis_joint, tail_rig['base_attach_grp'], mo=1)
+    control_graph.add('tail', build_tail, requires=base_steps, optional=True,
+                      condition=lambda: cmds.objExists('tail'),
+                      inputs=[build_graph.SourceInput(ikChain)])
+    control_graph.add('tail_attach', attach_tail, requires=['tail'], checkpoint=True)
 
     # tongue
-    if cmds.objExists('tongue'):
-        chain_curve = 'tongue_curve'
-
-        tongue_rig = ikChain.build(chain_joints=tongue_joints,
-                                   chain_curve=chain_curve,
-                                   prefix='tongue',
-                                   rig_scale=scene_scale * 0.2,
-                                   smallest_scale_precentage=0.3,
-                                   fk_parenting=True,
-                                   base_rig=base_rig
-                                   )
-
-        cmds.parentConstraint(jaw_joint, tongue_rig['base_attach_grp'], mo=1)
-
-    # left Arm
-    left_arm_joints = ['l_shoulder1',
-                       'l_arm',
-                       'l_foreArm',
-                       'l_hand']
-    left_top_finger_joints = ['l_handPinky1',
-                              'l_handRing1',
-                              'l_handMiddle1',
-                              'l_handIndex1',
-                              'l_handThumb1']
-    left_hand_pv_locator = 'l_elbow_poleVector'
-
-    left_arm_rig = hand.build(hand_joints=left_arm_joints,
-                              top_finger_joints=left_top_finger_joints,
-                              pv_locator=left_hand_pv_locator,
-                              clavicle_joint='l_clavicle',
-                              prefix='l_arm',
+    def build_tongue(results):
+        return ikChain.build(chain_joints=joint.list_hierarchy('tongue'),
+                             chain_curve='tongue_curve',
+                             prefix='tongue',
+                             rig_scale=scene_scale * 0.2,
+                             smallest_scale_precentage=0.3,
+                             fk_parenting=True,
+                             base_rig=results['scene']
+                             )
+
+    def attach_tongue(results):
+        jaw_joint = 'jaw'
+        cmds.parentConstraint(jaw_joint, results['tongue']['base_attach_grp'], mo=1)
+
+    control_graph.add('tongue', build_tongue, requires=base_steps, optional=True,
+                      condition=lambda: cmds.objExists('tongue'),
+                      inputs=[build_graph.SourceInput(ikChain)])
+    control_graph.add('tongue_attach', attach_tongue, requires=['tongue'], checkpoint=True)
+
+    # arms
+    for side in ['l', 'r']:
+        def build_arm(results, side=side):
+            return hand.build(hand_joints=['%s_shoulder1' % side,
+                                           '%s_arm' % side,
+                                           '%s_foreArm' % side,
+                                           '%s_hand' % side],
+                              top_finger_joints=['%s_handPinky1' % side,
+                                                 '%s_handRing1' % side,
+                                                 '%s_handMiddle1' % side,
+                                                 '%s_handIndex1' % side,
+                                                 '%s_handThumb1' % side],
+                              pv_locator='%s_elbow_poleVector' % side,
+                              clavicle_joint='%s_clavicle' % side,
+                              prefix='%s_arm' % side,
                               rig_scale=scene_scale,
-                              base_rig=base_rig
+                              base_rig=results['scene']
                               )
 
-    cmds.parentConstraint(spine_joints[-1], left_arm_rig['base_attach_grp'], mo=1)
-    cmds.parentConstraint(spine_rig['body_control'].C, left_arm_rig['body_attach_grp'], mo=1)
-    cmds.parentConstraint(spine_rig['body_control'].C, left_arm_rig['hand_ctrl'].Off, mo=1)
-
-    # right Arm
-    right_arm_joints = ['r_shoulder1',
-                        'r_arm',
-                        'r_foreArm',
-                        'r_hand']
-    right_top_finger_joints = ['r_handPinky1',
-                               'r_handRing1',
-                               'r_handMiddle1',
-                               'r_handIndex1',
-                               'r_handThumb1']
-    right_hand_pv_locator = 'r_elbow_poleVector'
-
-    right_arm_rig = hand.build(hand_joints=right_arm_joints,
-                               top_finger_joints=right_top_finger_joints,
-                               pv_locator=right_hand_pv_locator,
-                               clavicle_joint='r_clavicle',
-                               prefix='r_arm',
-                               rig_scale=scene_scale,
-                               base_rig=base_rig
-                               )
-
-    cmds.parentConstraint(spine_joints[-1], right_arm_rig['base_attach_grp'], mo=1)
-    cmds.parentConstraint(spine_rig['body_control'].C, right_arm_rig['body_attach_grp'], mo=1)
-    cmds.parentConstraint(spine_rig['body_control'].C, right_arm_rig['hand_ctrl'].Off, mo=1)
-
-    # left leg
-    left_leg_joints = ['l_hip',
-                       'l_leg',
-                       'l_foot',
-                       'l_toeBase']
-    left_top_finger_joints = ['l_legThumb1',
-                              'l_legIndex1',
-                              'l_legMiddle1',
-                              'l_legRing1',
-                              'l_legPinky1']
-    left_hand_pv_locator = 'l_leg_poleVector'
-
-    left_leg_rig = leg.build(leg_joints=left_leg_joints,
-                             top_toe_joints=left_top_finger_joints,
-                             pv_locator=left_hand_pv_locator,
+        def attach_arm(results, side=side):
+            spine_joints = cmds.ls('spine*', type='joint')
+            arm_rig = results['%s_arm' % side]
+            body_control = results['spine']['body_control']
+            cmds.parentConstraint(spine_joints[-1], arm_rig['base_attach_grp'], mo=1)
+            cmds.parentConstraint(body_control.C, arm_rig['body_attach_grp'], mo=1)
+            cmds.parentConstraint(body_control.C, arm_rig['hand_ctrl'].Off, mo=1)
+
+        control_graph.add('%s_arm' % side, build_arm, requires=base_steps,
+                          inputs=[build_graph.SourceInput(hand)])
+        control_graph.add('%s_arm_attach' % side, attach_arm, requires=['spine', '%s_arm' % side], checkpoint=True)
+
+    # legs
+    for side in ['l', 'r']:
+        def build_leg(results, side=side):
+            return leg.build(leg_joints=['%s_hip' % side,
+                                         '%s_leg' % side,
+                                         '%s_foot' % side,
+                                         '%s_toeBase' % side],
+                             top_toe_joints=['%s_legThumb1' % side,
+                                             '%s_legIndex1' % side,
+                                             '%s_legMiddle1' % side,
+                                             '%s_legRing1' % side,
+                                             '%s_legPinky1' % side],
+                             pv_locator='%s_leg_poleVector' % side,
                              clavicle_joint='',
-                             prefix='l_leg',
+                             prefix='%s_leg' % side,
                              rig_scale=scene_scale,
-                             base_rig=base_rig
+                             base_rig=results['scene']
                              )
 
-    cmds.parentConstraint(spine_joints[-1], left_leg_rig['base_attach_grp'], mo=1)
-    cmds.parentConstraint(spine_rig['body_control'].C, left_leg_rig['body_attach_grp'], mo=1)
-
-    # right leg
-    right_leg_joints = ['r_hip',
-                        'r_leg',
-                        'r_foot',
-                        'r_toeBase']
-    right_top_finger_joints = ['r_legThumb1',
-                               'r_legIndex1',
-                               'r_legMiddle1',
-                               'r_legRing1',
-                               'r_legPinky1']
-    right_hand_pv_locator = 'r_leg_poleVector'
-
-    right_leg_rig = leg.build(leg_joints=right_leg_joints,
-                              top_toe_joints=right_top_finger_joints,
-                              pv_locator=right_hand_pv_locator,
-                              clavicle_joint='',
-                              prefix='r_leg',
-                              rig_scale=scene_scale,
-                              base_rig=base_rig
-                              )
-
-    cmds.parentConstraint(spine_joints[-1], right_leg_rig['base_attach_grp'], mo=1)
-    cmds.parentConstraint(spine_rig['body_control'].C, right_leg_rig['body_attach_grp'], mo=1)
-
-    # head parts
-    left_eye = 'l_eye'
-    right_eye = 'r_eye'
-    muzzle_joint = []
-
-    head_parts_rig = head_parts.build(head_joint=head_joint,
-                                      jaw_joint=jaw_joint,
-                                      muzzle_joint=muzzle_joint,
-                                      left_eye=left_eye,
-                                      right_eye=right_eye,
-                                      prefix='headParts',
-                                      rig_scale=scene_scale,
-                                      base_rig=base_rig
-                                      )
+        def attach_leg(results, side=side):
+            spine_joints = cmds.ls('spine*', type='joint')
+            leg_rig = results['%s_leg' % side]
+            cmds.parentConstraint(spine_joints[-1], leg_rig['base_attach_grp'], mo=1)
+            cmds.parentConstraint(results['spine']['body_control'].C, leg_rig['body_attach_grp'], mo=1)
+
+        control_graph.add('%s_leg' % side, build_leg, requires=base_steps,
+                          inputs=[build_graph.SourceInput(leg)])
+        control_graph.add('%s_leg_attach' % side, attach_leg, requires=['spine', '%s_leg' % side], checkpoint=True)
+
+    # head parts, without muzzle joints
+    def build_head_parts(results):
+        return head_parts.build(head_joint=cmds.ls('*head*', type='joint')[0],
+                                jaw_joint='jaw',
+                                muzzle_joint=[],
+                                left_eye='l_eye',
+                                right_eye='r_eye',
+                                prefix='headParts',
+                                rig_scale=scene_scale,
+                                base_rig=results['scene']
+                                )
+
+    control_graph.add('head_parts', build_head_parts, requires=base_steps,
+                      inputs=[build_graph.SourceInput(head_parts)],
+                      checkpoint=True)
@@ -33,4 +33,7 @@ reload(rigLib.rig.head_parts)
 # Build 
 character_name = 'human'
 humanRig.human.build(character_name)
+
+# Build many characters in parallel, from a shell
+# mayapy rigTools/rigBatchBuild.py human elf troll -o D:/builds/nightly
 """
\ No newline at end of file
@@ -1,2 +1,4 @@
 import module
-import control
\ No newline at end of file
+import control
+import build_graph
+import checkpoint
\ No newline at end of file
@@ -0,0 +1,329 @@
+"""
+Build graph for running rig modules and their attachments in dependency order
+"""
+
+import hashlib
+import heapq
+import inspect
+import json
+import time
+
+# clock for the node timings, time.perf_counter isn't there in python 2
+_clock = getattr(time, 'perf_counter', time.time)
+
+BUILT = 'built'
+RESTORED = 'restored'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+
+class FileInput(object):
+    """
+    input of a step that is hashed by the contents of a file, like the builder scene
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+
+class SourceInput(object):
+    """
+    input of a step that is hashed by its python source, the whole file of a module or the lines of a
+    class or function
+    """
+
+    def __init__(self, source_object):
+        self.source_object = source_object
+
+
+def input_digest(inputs):
+    """
+    :param inputs: list, FileInput, SourceInput or values that json can write, like parameters
+    :return: str, sha1 hex digest of the inputs
+    """
+    digest = hashlib.sha1()
+    for value in inputs:
+        if isinstance(value, FileInput):
+            digest.update(b'file\n')
+            try:
+                with open(value.path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(chunk)
+            except (IOError, OSError):
+                digest.update(b'missing')
+        elif isinstance(value, SourceInput):
+            digest.update(b'source\n')
+            try:
+                source = inspect.getsource(value.source_object)
+                digest.update(source if isinstance(source, bytes) else source.encode('utf-8'))
+            except (IOError, TypeError):
+                # no source to read, like a builtin, its name has to do
+                digest.update(repr(getattr(value.source_object, '__name__', '')).encode('utf-8'))
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=repr).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class Node(object):
+    """
+    class for one step of the build, a rig module or an attachment between modules
+    """
+
+    def __init__(self,
+                 name,
+                 function,
+                 requires=(),
+                 optional=False,
+                 condition=None,
+                 inputs=(),
+                 checkpoint=False
+                 ):
+        """
+        :param name: str, unique name of the step
+        :param function: function, takes the dict of results of the steps built so far and returns
+                the result of this step
+        :param requires: list(str), names of the steps that have to be built before this one
+        :param optional: bool, the build goes on without this step if it is disabled
+        :param condition: function, takes no arguments, the step is skipped when it returns False
+        :param inputs: list, what the step depends on besides the steps before it and the source of
+                function, see input_digest()
+        :param checkpoint: bool, save the scene after this step so a rebuild can start from it
+        @return: None
+        """
+        self.name = name
+        self.function = function
+        self.requires = tuple(requires)
+        self.optional = optional
+        self.condition = condition
+        self.inputs = tuple(inputs)
+        self.checkpoint = checkpoint
+
+        self.key = None
+        self.state = None
+        self.seconds = 0.0
+        self.reason = ''
+
+
+class BuildGraph(object):
+    """
+    class for declaring the steps of a build and running them in topological order
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.results = {}
+        self.seconds = 0.0
+        self.checkpoint_seconds = 0.0
+        self._by_name = {}
+
+    def add(self, name, function, requires=(), optional=False, condition=None, inputs=(), checkpoint=False):
+        """
+        add a step, see Node for the parameters
+        :return: Node
+        """
+        if name in self._by_name:
+            raise ValueError('build graph already has a step named %s' % name)
+
+        node = Node(name, function, requires=requires, optional=optional, condition=condition, inputs=inputs,
+                    checkpoint=checkpoint)
+        self.nodes.append(node)
+        self._by_name[name] = node
+        return node
+
+    def node(self, name):
+        if name not in self._by_name:
+            raise KeyError('build graph has no step named %s' % name)
+        return self._by_name[name]
+
+    def order(self, targets=None):
+        """
+        :param targets: list(str), build only these steps and what they require, None builds all
+        :return: list(Node), steps in the order they run, steps that are ready at the same time in
+                 the order they were added
+        """
+        for node in self.nodes:
+            for name in node.requires:
+                if name not in self._by_name:
+                    raise ValueError('step %s requires %s, which isn\'t in the build graph' % (node.name, name))
+
+        included = set(node.name for node in self.nodes)
+        if targets is not None:
+            included = set()
+            pending = [self.node(name) for name in targets]
+            while pending:
+                node = pending.pop()
+                if node.name not in included:
+                    included.add(node.name)
+                    pending.extend(self._by_name[name] for name in node.requires)
+
+        index = dict((node.name, i) for i, node in enumerate(self.nodes))
+        waiting = {}
+        dependents = dict((name, []) for name in included)
+        ready = []
+        for node in self.nodes:
+            if node.name not in included:
+                continue
+            waiting[node.name] = len(set(node.requires))
+            for name in set(node.requires):
+                dependents[name].append(node.name)
+            if not node.requires:
+                heapq.heappush(ready, index[node.name])
+
+        ordered = []
+        while ready:
+            node = self.nodes[heapq.heappop(ready)]
+            ordered.append(node)
+            for name in dependents[node.name]:
+                waiting[name] -= 1
+                if not waiting[name]:
+                    heapq.heappush(ready, index[name])
+
+        if len(ordered) != len(included):
+            cycle = sorted(name for name in included if waiting[name])
+            raise ValueError('build graph has a cycle between %s' % ', '.join(cycle))
+        return ordered
+
+    def run(self, disabled=(), targets=None, checkpoints=None):
+        """
+        run the steps in order, skipping disabled steps, steps whose condition is False and steps
+        that require a skipped one
+        :param disabled: list(str), names of optional steps to leave out, like tail or tongue
+        :param targets: list(str), see order()
+        :param checkpoints: CheckpointStore, start from the last checkpoint whose key is still the
+                same and save checkpoints after the steps that ask for one, None builds everything
+        :return: dict, result of each built step by name
+        """
+        disabled = set(disabled)
+        for name in disabled:
+            if not self.node(name).optional:
+                raise ValueError('step %s isn\'t optional and can\'t be disabled' % name)
+
+        ordered = self.order(targets)
+        for node in self.nodes:
+            node.key = None
+            node.state = None
+            node.seconds = 0.0
+            node.reason = ''
+        self.results = {}
+        self.seconds = 0.0
+        self.checkpoint_seconds = 0.0
+
+        # each key covers the step and every step before it, as the scene builds up step by step
+        key = ''
+        for node in ordered:
+            key = input_digest([key, node.name, node.name in disabled, SourceInput(node.function),
+                                input_digest(node.inputs)])
+            node.key = key
+
+        start = _clock()
+        try:
+            first = self._restore(ordered, checkpoints) if checkpoints is not None else 0
+            for node in ordered[first:]:
+                skipped = [name for name in node.requires if self._by_name[name].state not in (BUILT, RESTORED)]
+                if node.name in disabled:
+                    node.state, node.reason = SKIPPED, 'disabled'
+                elif skipped:
+                    node.state, node.reason = SKIPPED, 'requires %s' % ', '.join(skipped)
+                elif node.condition is not None and not node.condition():
+                    node.state, node.reason = SKIPPED, 'condition'
+                else:
+                    self._run_node(node)
+
+                # a skipped step changed nothing, the checkpoint of the step before it still holds
+                if checkpoints is not None and node.checkpoint and node.state == BUILT:
+                    checkpoint_start = _clock()
+                    checkpoints.save(node.name, node.key, self._checkpoint_data())
+                    self.checkpoint_seconds += _clock() - checkpoint_start
+        finally:
+            self.seconds = _clock() - start
+
+        return self.results
+
+    def _restore(self, ordered, checkpoints):
+        # open the last checkpoint that is still valid, return the index of the step after it
+        checkpoint_start = _clock()
+        try:
+            for i in range(len(ordered) - 1, -1, -1):
+                node = ordered[i]
+                if not node.checkpoint:
+                    continue
+                data = checkpoints.load(node.name, node.key)
+                if data is None:
+                    continue
+
+                self.results = data['results']
+                for name, (state, reason) in data['states'].items():
+                    restored = self._by_name[name]
+                    restored.state = RESTORED if state in (BUILT, RESTORED) else state
+                    restored.reason = reason
+                return i + 1
+            return 0
+        finally:
+            self.checkpoint_seconds += _clock() - checkpoint_start
+
+    def _checkpoint_data(self):
+        states = dict((node.name, (node.state, node.reason)) for node in self.nodes if node.state is not None)
+        return {'results': self.results, 'states': states}
+
+    def _run_node(self, node):
+        start = _clock()
+        try:
+            self.results[node.name] = node.function(self.results)
+        except Exception as error:
+            node.state, node.reason = FAILED, '%s: %s' % (type(error).__name__, error)
+            raise
+        finally:
+            node.seconds = _clock() - start
+        node.state = BUILT
+
+    def critical_path(self):
+        """
+        :return: tuple, list(str) of the built steps on the longest chain of requirements and the
+                 seconds they took together
+        """
+        finish = {}
+        previous = {}
+        for node in self.order():
+            if node.state != BUILT:
+                continue
+            before = [name for name in node.requires if name in finish]
+            slowest = max(before, key=lambda name: finish[name]) if before else None
+            finish[node.name] = node.seconds + (finish[slowest] if slowest else 0.0)
+            previous[node.name] = slowest
+
+        if not finish:
+            return [], 0.0
+
+        name = max(finish, key=lambda name: finish[name])
+        seconds = finish[name]
+        path = []
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return list(reversed(path)), seconds
+
+    def report(self):
+        """
+        :return: str, seconds of each step, the skipped steps and the critical path
+        """
+        ran = [node for node in self.nodes if node.state is not None]
+        built = [node for node in ran if node.state in (BUILT, FAILED)]
+        restored = [node for node in ran if node.state == RESTORED]
+        lines = ['build graph: %d steps run, %d restored from a checkpoint, %d skipped, %.3fs' %
+                 (len(built), len(restored), len(ran) - len(built) - len(restored), self.seconds)]
+        if self.checkpoint_seconds:
+            lines.append('%.3fs of it saving and opening checkpoints' % self.checkpoint_seconds)
+
+        for node in sorted(built, key=lambda node: -node.seconds):
+            lines.append('%10.3fs  %s%s' % (node.seconds, node.name, ' (failed)' if node.state == FAILED else ''))
+
+        for node in ran:
+            if node.state == RESTORED:
+                lines.append('  restored  %s' % node.name)
+            elif node.state == SKIPPED:
+                lines.append('   skipped  %s (%s)' % (node.name, node.reason))
+
+        path, seconds = self.critical_path()
+        lines.append('critical path %.3fs: %s' % (seconds, ' -> '.join(path)))
+        return '\n'.join(lines)
@@ -0,0 +1,112 @@
+"""
+Scene checkpoints of build graph steps for incremental rebuilds
+"""
+
+import os
+import re
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from maya import cmds
+
+scene_extensions = {'mayaBinary': '.mb', 'mayaAscii': '.ma'}
+
+
+class CheckpointStore(object):
+    """
+    class for saving the scene and the step results after build graph steps and opening them again.
+    The scene keeps the name of the last checkpoint it was saved as or opened from, saving over that
+    file makes the checkpoint invalid
+    """
+
+    def __init__(self,
+                 directory,
+                 scene_type='mayaBinary'
+                 ):
+        """
+        :param directory: str, folder for the checkpoint files, made when the first one is saved
+        :param scene_type: str, mayaBinary or mayaAscii
+        @return: None
+        """
+        self.directory = directory
+        self.scene_type = scene_type
+
+    def _paths(self, name, key):
+        base = os.path.join(self.directory, '%s_%s' % (name, key[:16]))
+        return base + scene_extensions[self.scene_type], base + '.checkpoint'
+
+    def save(self, name, key, data):
+        """
+        save the scene and data as the checkpoint of a step, replacing its older checkpoints
+        :param name: str, step name
+        :param key: str, hex digest of everything the scene depends on up to this step
+        :param data: object that pickles, like the results of the steps so far
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        scene_path, data_path = self._paths(name, key)
+        cmds.file(rename=scene_path)
+        cmds.file(save=True, force=True, type=self.scene_type)
+
+        # the scene size and time tell if someone saved over the scene since
+        record = {'key': key,
+                  'scene_size': os.path.getsize(scene_path),
+                  'scene_time': os.path.getmtime(scene_path),
+                  'data': data}
+
+        # written last and renamed into place, so a checkpoint with a data file is complete
+        temp_path = data_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump(record, f, pickle.HIGHEST_PROTOCOL)
+        if os.path.exists(data_path):
+            os.remove(data_path)
+        os.rename(temp_path, data_path)
+
+        self._remove(name, keep=os.path.basename(data_path)[:-len('.checkpoint')])
+
+    def load(self, name, key):
+        """
+        open the checkpoint scene of a step
+        :param name: str, step name
+        :param key: str, hex digest the checkpoint has to have been saved with
+        :return: object, the data saved with the checkpoint, None if there is no valid checkpoint
+        """
+        scene_path, data_path = self._paths(name, key)
+        if not os.path.isfile(data_path) or not os.path.isfile(scene_path):
+            return None
+
+        try:
+            with open(data_path, 'rb') as f:
+                record = pickle.load(f)
+        except Exception as error:
+            print('checkpoint %s can\'t be read, rebuilding: %s' % (data_path, error))
+            return None
+
+        if (record['key'] != key or record['scene_size'] != os.path.getsize(scene_path) or
+                record['scene_time'] != os.path.getmtime(scene_path)):
+            print('checkpoint scene %s changed since it was saved, rebuilding' % scene_path)
+            return None
+
+        cmds.file(scene_path, open=True, force=True)
+        return record['data']
+
+    def clear(self):
+        """
+        remove all checkpoints
+        """
+        self._remove()
+
+    def _remove(self, name=None, keep=None):
+        # checkpoint files of one step, or of all steps, except the ones starting with keep
+        if not os.path.isdir(self.directory):
+            return
+
+        pattern = re.compile(r'^(%s_[0-9a-f]{16})\.' % (re.escape(name) if name else r'.+'))
+        for file_name in os.listdir(self.directory):
+            match = pattern.match(file_name)
+            if match and match.group(1) != keep:
+                os.remove(os.path.join(self.directory, file_name))
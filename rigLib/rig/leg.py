@@ -148,7 +148,7 @@ def build(leg_joints,
 
     if clavicle_joint:
         cmds.parent(clavicle_ik, clavicle_ctrl.C)
-        cmds.pointConstrint(clavicle_ctrl.C, clavicle_joint)
+        cmds.pointConstraint(clavicle_ctrl.C, clavicle_joint)
 
     # make pole vector connection line
     pv_line_pose1 = cmds.xform(leg_joints[1], q=1, t=1, ws=1)
@@ -213,6 +213,7 @@ def build(leg_joints,
 
         toe_ik_control.append(toe_ik_ctrl)
 
+    toe_ikh = []
     for i, top_toe_joint in enumerate(top_toe_joints):
         toe_prefix = prefix + top_toe_joint
         toe_joints = joint.list_hierarchy(top_toe_joint)
@@ -225,6 +226,7 @@ def build(leg_joints,
 
         cmds.hide(toe_ik)
         cmds.parent(toe_ik, toe_ik_control[i].C)
+        toe_ikh.append(toe_ik)
 
     # creating some fk constraint
     fk_hip_ctrl_constraint = cmds.orientConstraint(fk_hip_ctrl.L, leg_joints[0], mo=1)
@@ -266,45 +268,47 @@ def build(leg_joints,
     cmds.parent(ik_fk_switch_shape, ankle_ctrl.C, add=True, shape=True)
     cmds.parent(ik_fk_switch_shape, fk_ankle_ctrl.C, add=True, shape=True)
 
-    # connecting FINGER, HAND and CLAVICLE IKH to IK_FK_switch
-    for ikh in toe_ik:
+    # connecting TOE, LEG and CLAVICLE IKH to IK_FK_switch
+    for ikh in toe_ikh:
         cmds.connectAttr(ik_fk_switch_shape[0] + '.Toe_ik_fk_switch',
                          ikh + '.ikBlend')
     cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
                      leg_ik + '.ikBlend')
-    cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     clavicle_ik + '.ikBlend')
+    if clavicle_joint:
+        cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
+                         clavicle_ik + '.ikBlend')
     for i, constraint in enumerate(toe_fk_constraint_weights):
         cmds.connectAttr(ik_fk_switch_shape[0] + '.Toe_ik_fk_switch',
                          str(toe_fk_constraints[i][0]) + '.' + str(constraint[0]))
 
     # connecting CLAVICLE Constraint to IK_FK switch
-    fk_clavicle_reverse_constraint = cmds.createNode('reverse', name='fk_clavicle_reverse_constraint')
-    cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     fk_clavicle_reverse_constraint + '.input.inputX')
-    cmds.connectAttr(fk_clavicle_reverse_constraint + '.output.outputX',
-                     fk_clavicle_ctrl_constraint[0] + '.' + fk_clavicle_ctrl_constraint_weight[0])
+    if clavicle_joint:
+        fk_clavicle_reverse_constraint = cmds.createNode('reverse', name='fk_clavicle_reverse_constraint')
+        cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
+                         fk_clavicle_reverse_constraint + '.input.inputX')
+        cmds.connectAttr(fk_clavicle_reverse_constraint + '.output.outputX',
+                         fk_clavicle_ctrl_constraint[0] + '.' + fk_clavicle_ctrl_constraint_weight[0])
 
-    cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     clavicle_ctrl_constraint[0] + '.' + clavicle_ctrl_constraint_weight[1])
+        cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
+                         clavicle_ctrl_constraint[0] + '.' + clavicle_ctrl_constraint_weight[1])
 
-    # connecting SHOULDER Constraint to IK_FK switch
-    shoulder_reverse_node = cmds.createNode('reverse', name='shoulder_reverse')
+    # connecting HIP Constraint to IK_FK switch
+    hip_reverse_node = cmds.createNode('reverse', name='hip_reverse')
     cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     shoulder_reverse_node + '.input.inputX')
+                     hip_reverse_node + '.input.inputX')
 
-    # connecting ELBOW Constraint to IK_FK switch
-    elbow_reverse_node = cmds.createNode('reverse', name='elbow_reverse')
+    # connecting KNEE Constraint to IK_FK switch
+    knee_reverse_node = cmds.createNode('reverse', name='knee_reverse')
     cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     elbow_reverse_node + '.input.inputX')
-    cmds.connectAttr(elbow_reverse_node + '.output.outputX',
-                     fk_elbow_ctrl_constraint[0] + '.' + fk_elbow_ctrl_constraint_weight[0])
+                     knee_reverse_node + '.input.inputX')
+    cmds.connectAttr(knee_reverse_node + '.output.outputX',
+                     fk_knee_ctrl_constraint[0] + '.' + fk_knee_ctrl_constraint_weight[0])
 
-    # connecting HAND Constraint to IK_FK switch
-    fk_hand_reverse_constraint = cmds.createNode('reverse', name='fk_hand_reverse_constraint')
+    # connecting ANKLE Constraint to IK_FK switch
+    fk_ankle_reverse_constraint = cmds.createNode('reverse', name='fk_ankle_reverse_constraint')
     cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     fk_hand_reverse_constraint + '.input.inputX')
-    cmds.connectAttr(fk_hand_reverse_constraint + '.output.outputX',
+                     fk_ankle_reverse_constraint + '.input.inputX')
+    cmds.connectAttr(fk_ankle_reverse_constraint + '.output.outputX',
                      fk_ankle_ctrl_constraint[0] + '.' + fk_ankle_ctrl_constraint_weight[0])
 
     cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
@@ -312,45 +316,47 @@ def build(leg_joints,
 
     # connecting control VISIBILITY
     # connecting FK visibility
-    hand_visibility_reverse_node = cmds.createNode('reverse', name='hand_visibility_reverse_node')
+    ankle_visibility_reverse_node = cmds.createNode('reverse', name='ankle_visibility_reverse_node')
     cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     hand_visibility_reverse_node + '.input.inputX')
-    cmds.connectAttr(hand_visibility_reverse_node + '.output.outputX',
-                     fk_hand_ctrl.C + '.v')
+                     ankle_visibility_reverse_node + '.input.inputX')
+    cmds.connectAttr(ankle_visibility_reverse_node + '.output.outputX',
+                     fk_ankle_ctrl.C + '.v')
 
-    elbow_visibility_reverse_node = cmds.createNode('reverse', name='elbow_visibility_reverse_node')
+    knee_visibility_reverse_node = cmds.createNode('reverse', name='knee_visibility_reverse_node')
     cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     elbow_visibility_reverse_node + '.input.inputX')
-    cmds.connectAttr(elbow_visibility_reverse_node + '.output.outputX',
-                     fk_elbow_ctrl.L + '.v')
+                     knee_visibility_reverse_node + '.input.inputX')
+    cmds.connectAttr(knee_visibility_reverse_node + '.output.outputX',
+                     fk_knee_ctrl.L + '.v')
 
-    shoulder_visibility_reverse_node = cmds.createNode('reverse', name='shoulder_visibility_reverse_node')
+    hip_visibility_reverse_node = cmds.createNode('reverse', name='hip_visibility_reverse_node')
     cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     shoulder_visibility_reverse_node + '.input.inputX')
-    cmds.connectAttr(shoulder_visibility_reverse_node + '.output.outputX',
-                     fk_shoulder_ctrl.L + '.v')
+                     hip_visibility_reverse_node + '.input.inputX')
+    cmds.connectAttr(hip_visibility_reverse_node + '.output.outputX',
+                     fk_hip_ctrl.L + '.v')
 
-    clavicle_visibility_reverse_node = cmds.createNode('reverse', name='clavicle_visibility_reverse_node')
-    cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     clavicle_visibility_reverse_node + '.input.inputX')
-    cmds.connectAttr(clavicle_visibility_reverse_node + '.output.outputX',
-                     fk_clavicle_ctrl.L + '.v')
+    if clavicle_joint:
+        clavicle_visibility_reverse_node = cmds.createNode('reverse', name='clavicle_visibility_reverse_node')
+        cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
+                         clavicle_visibility_reverse_node + '.input.inputX')
+        cmds.connectAttr(clavicle_visibility_reverse_node + '.output.outputX',
+                         fk_clavicle_ctrl.L + '.v')
 
     # connecting IK visibility
     cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     hand_ctrl.C + '.v')
-    cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
-                     clavicle_ctrl.C + '.v')
+                     ankle_ctrl.C + '.v')
+    if clavicle_joint:
+        cmds.connectAttr(ik_fk_switch_shape[0] + '.Leg_ik_fk_switch',
+                         clavicle_ctrl.C + '.v')
 
-    # connecting finger visibility
-    for finger_ik in finger_ik_control:
+    # connecting toe visibility
+    for toe_ik_ctrl in toe_ik_control:
         cmds.connectAttr(ik_fk_switch_shape[0] + '.Toe_ik_fk_switch',
-                         finger_ik.C + '.v')
-    fk_finger_reverse_node = cmds.createNode('reverse', name='finger_fk_reverse')
+                         toe_ik_ctrl.C + '.v')
+    fk_toe_reverse_node = cmds.createNode('reverse', name='toe_fk_reverse')
     cmds.connectAttr(ik_fk_switch_shape[0] + '.Toe_ik_fk_switch',
-                     fk_finger_reverse_node + '.input.inputX')
-    for fk_loc in fk_finger_locators:
-        cmds.connectAttr(fk_finger_reverse_node + '.output.outputX',
+                     fk_toe_reverse_node + '.input.inputX')
+    for fk_loc in fk_toe_locators:
+        cmds.connectAttr(fk_toe_reverse_node + '.output.outputX',
                          fk_loc.L + '.v')
 
     return {'module': rig_module,
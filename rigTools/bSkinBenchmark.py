@@ -0,0 +1,515 @@
+"""
+=====================================================================
+    Benchmarks for bSkinSaver
+
+    Runs bSaveSkinValues, bLoadSkinValues, bSaveVertexSkinValues and
+    bLoadVertexSkinValues on synthetic skinned meshes in the Maya
+    stand-in (bSkinFakeMaya), from 1k to 500k vertices and 8 to 256
+    influences, with dense weights or a few influences per vertex,
+    into text and binary files, through the API 1.0 and API 2.0
+    backends of bSkinSaver. Each run is split into stages:
+
+        parse       reading and decoding the weight file
+        map         scene lookups and converting between numpy and
+                    the Maya arrays and components
+        normalize   weight math (merging, normalizing, pruning)
+        write       encoding and writing the weight file
+        maya        inside getWeights / setWeights, what Maya spends
+        other       the rest of the entry point
+
+    Each case runs in its own process so its peak memory can be read.
+    The results are written as json that can be compared with the
+    results of another version:
+
+        python bSkinBenchmark.py -o before.json
+        python bSkinBenchmark.py -o after.json --compare before.json
+        python bSkinBenchmark.py --suite full --operations load loadVertex
+        python bSkinBenchmark.py --backend api1 api2
+
+    The full suite skips cases with more than MAX_WEIGHTS weights, set
+    --max-weights to run them anyway. Needs the python bSkinSaver runs
+    in (python 2), not Maya.
+
+=====================================================================
+"""
+
+from __future__ import print_function
+
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy
+
+try:
+    import resource
+except ImportError:
+    # windows
+    resource = None
+
+import bSkinFakeMaya
+import bSkinFile
+import bSkinMath
+
+
+OPERATIONS = ('save', 'load', 'saveVertex', 'loadVertex')
+STAGES = ('parse', 'map', 'normalize', 'write', 'maya', 'other')
+DENSE = 'dense'
+SPARSE = 'sparse'
+DENSITIES = (DENSE, SPARSE)
+
+SUITES = {
+    'quick': {'vertices': [1000, 10000], 'influences': [8, 64]},
+    'full': {'vertices': [1000, 10000, 100000, 500000], 'influences': [8, 32, 64, 256]},
+}
+
+# non zero weights per vertex of sparse cases
+SPARSE_INFLUENCES = 4
+# every VERTEX_STEP-th vertex is selected for the vertex operations
+VERTEX_STEP = 2
+MAX_WEIGHTS = 2 ** 25
+DEFAULT_REPEAT = 3
+
+MESH_NAME = 'benchMesh'
+
+if hasattr(time, 'perf_counter'):
+    _clock = time.perf_counter
+else:
+    _clock = time.clock if sys.platform == 'win32' else time.time
+
+
+def syntheticWeights(vertexCount, influenceCount, density=DENSE, seed=0):
+    """
+    random weights that sum up to 1 per vertex
+    :param vertexCount: int, rows
+    :param influenceCount: int, columns
+    :param density: str, DENSE for weights on all influences, SPARSE for SPARSE_INFLUENCES per vertex
+    :param seed: int, random seed, the same seed gives the same weights
+    :return: numpy.ndarray, (vertexCount x influenceCount) float64 weights
+    """
+    random = numpy.random.RandomState(seed)
+    weights = random.random_sample((vertexCount, influenceCount))
+    if density == SPARSE and influenceCount > SPARSE_INFLUENCES:
+        dropped = numpy.argpartition(random.random_sample((vertexCount, influenceCount)),
+                                     influenceCount - SPARSE_INFLUENCES, axis=1)
+        weights[numpy.arange(vertexCount)[:, numpy.newaxis], dropped[:, :influenceCount - SPARSE_INFLUENCES]] = 0.0
+    weights /= weights.sum(axis=1)[:, numpy.newaxis]
+    return weights
+
+
+def _bSkinSaver():
+    # bSkinSaver running on the Maya stand-in
+    bSkinFakeMaya.install()
+    import bSkinSaver
+    return bSkinSaver
+
+
+def benchmarkCases(suite='quick', vertices=None, influences=None, densities=DENSITIES, fileFormats=None,
+                   maxWeights=MAX_WEIGHTS, backends=None):
+    """
+    :param suite: str, key of SUITES for the vertex and influence counts
+    :param vertices: list(int), vertex counts instead of the suite's
+    :param influences: list(int), influence counts instead of the suite's
+    :param densities: list(str), DENSE and / or SPARSE
+    :param fileFormats: list(str), bSkinFile.FORMAT_TEXT and / or FORMAT_BINARY, None for both
+    :param maxWeights: int, leave out cases with more vertices x influences, None keeps all
+    :param backends: list(str), bSkinSaver.BACKENDS to run the cases with, None for BACKEND_API1
+    :return: list(dict), cases with vertices, influences, density, format and backend
+    """
+    if fileFormats is None:
+        fileFormats = (bSkinFile.FORMAT_TEXT, bSkinFile.FORMAT_BINARY)
+    if backends is None:
+        backends = (_bSkinSaver().BACKEND_API1,)
+    cases = []
+    for vertexCount, influenceCount, density, fileFormat, backend in itertools.product(
+            vertices or SUITES[suite]['vertices'], influences or SUITES[suite]['influences'], densities, fileFormats,
+            backends):
+        if maxWeights is None or vertexCount * influenceCount <= maxWeights:
+            cases.append({'vertices': vertexCount, 'influences': influenceCount, 'density': density,
+                          'format': fileFormat, 'backend': backend})
+    return cases
+
+
+class _StageTimer(object):
+    # time spent in each stage, without the time of stages called from inside it.
+    # Only calls on the thread that created the timer count, the worker threads of the
+    # writers report their own timings
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.calls = dict.fromkeys(STAGES, 0)
+        self._stack = []
+        self._thread = threading.current_thread()
+
+    def wrap(self, stage, function):
+        def timed(*args, **kwargs):
+            if threading.current_thread() is not self._thread:
+                return function(*args, **kwargs)
+            self._enter(stage)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._exit()
+        return timed
+
+    def wrapGenerator(self, stage, function):
+        # each step of the generator counts, not the time the caller spends between the steps
+        done = object()
+
+        def timed(*args, **kwargs):
+            generator = function(*args, **kwargs)
+            step = self.wrap(stage, lambda: next(generator, done))
+            while True:
+                item = step()
+                if item is done:
+                    return
+                yield item
+        return timed
+
+    def _enter(self, stage):
+        now = _clock()
+        if self._stack:
+            outer = self._stack[-1]
+            self.seconds[outer[0]] += now - outer[1]
+        self._stack.append([stage, now])
+
+    def _exit(self):
+        now = _clock()
+        stage, start = self._stack.pop()
+        self.seconds[stage] += now - start
+        self.calls[stage] += 1
+        if self._stack:
+            self._stack[-1][1] = now
+
+
+def _stageFunctions():
+    # (stage, module or class, attribute, is a generator) of everything that gets timed
+    bSkinSaver = _bSkinSaver()
+
+    functions = []
+    for stage, owner, names in [
+            ('parse', bSkinFile, ['readVertexFile']),
+            ('parse', bSkinFile.WeightStream, ['read', 'toBlock']),
+            ('map', bSkinSaver, ['bInfluenceIndex', 'bNameIndex', 'bFindSkinCluster', 'bToNumpy', 'bToMDoubleArray',
+                                 'bToMIntArray', 'bVertexComponent', 'bSelectedVertices', 'bMeshPositions',
+                                 'bMeshTriangles']),
+            ('map', bSkinSaver.bApi1Backend, ['getWeights', 'setWeights']),
+            ('map', bSkinSaver.bApi2Backend, ['getWeights', 'setWeights']),
+            ('map', bSkinMath, ['expandColumns']),
+            ('normalize', bSkinMath, ['mergeWeights', 'normalizeWeights', 'blendWeights', 'pruneWeights',
+                                      'quantizeWeights']),
+            ('write', bSkinFile, ['openWeightWriter', 'writeVertexFile']),
+            ('write', bSkinFile._WeightWriter, ['writeBlock', 'close']),
+            ('maya', bSkinFakeMaya.MFnSkinCluster, ['getWeights', 'setWeights']),
+            ('maya', bSkinFakeMaya._SkinCluster2, ['getWeights', 'setWeights'])]:
+        functions.extend((stage, owner, name, False) for name in names)
+    functions.append(('parse', bSkinFile, 'iterWeightFile', True))
+    functions.append(('parse', bSkinFile.WeightStream, 'chunks', True))
+    return functions
+
+
+@contextlib.contextmanager
+def _timedStages(timer, writerTimings):
+    originals = []
+    try:
+        for stage, owner, name, isGenerator in _stageFunctions():
+            function = owner.__dict__[name]
+            originals.append((owner, name, function))
+            wrap = timer.wrapGenerator if isGenerator else timer.wrap
+            setattr(owner, name, wrap(stage, function))
+
+        # keep the worker timings of the writers
+        timedClose = bSkinFile._WeightWriter.__dict__['close']
+
+        def close(self):
+            timedClose(self)
+            writerTimings.append(dict(self.timings, workers=self.workers))
+        bSkinFile._WeightWriter.close = close
+        yield
+    finally:
+        for owner, name, function in reversed(originals):
+            setattr(owner, name, function)
+
+
+@contextlib.contextmanager
+def _quiet():
+    # bSkinSaver prints its progress
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+
+
+def _peakMemory():
+    # peak resident memory of this process in MB, None where it can't be read
+    if resource is None:
+        return None
+    maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maxRss / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0), 1)
+
+
+def _buildScene(weights, influences, skinWeights=None):
+    # joints, the mesh and its skinCluster with skinWeights, or all weight on the first joint
+    bSkinFakeMaya.newScene()
+    for influence in influences:
+        bSkinFakeMaya.createJoint(influence)
+    bSkinFakeMaya.createMesh(MESH_NAME, len(weights))
+    bSkinFakeMaya.createSkinCluster(MESH_NAME, influences, skinWeights)
+
+
+def _vertexSelection(vertexCount):
+    # selected vertices and their soft selection weights, falling off along the selection
+    vertexIds = numpy.arange(0, vertexCount, VERTEX_STEP)
+    return vertexIds, numpy.linspace(1.0, 0.0, len(vertexIds))
+
+
+def _prepare(operation, case, weights, influences, path):
+    # set up the scene and files for one run, returns the call to time
+    bSkinSaver = _bSkinSaver()
+    backend = case['backend']
+
+    sparse = case['density'] == SPARSE and case['format'] == bSkinFile.FORMAT_BINARY
+    vertexIds, softWeights = _vertexSelection(len(weights))
+
+    if operation == 'save':
+        _buildScene(weights, influences, weights)
+        bSkinFakeMaya.select(MESH_NAME)
+        return lambda: bSkinSaver.bSaveSkinValues(path, case['format'], sparse=sparse, backend=backend)
+
+    if operation == 'saveVertex':
+        _buildScene(weights, influences, weights)
+        bSkinFakeMaya.selectVertices(MESH_NAME, vertexIds, softWeights)
+        return lambda: bSkinSaver.bSaveVertexSkinValues(path, False, case['format'], sparse=sparse,
+                                                        backend=backend)
+
+    if operation == 'load':
+        with bSkinFile.openWeightWriter(path, case['format'], sparse=sparse) as output:
+            output.writeBlock(bSkinFile.WeightBlock(MESH_NAME, influences, weights.astype(numpy.float32)))
+        _buildScene(weights, influences)
+        return lambda: bSkinSaver.bLoadSkinValues(False, path, backend=backend)
+
+    if operation == 'loadVertex':
+        bSkinFile.writeVertexFile(path, bSkinFile.WeightBlock(MESH_NAME + 'Shape', influences,
+                                                              weights[vertexIds].astype(numpy.float32),
+                                                              vertexIds=vertexIds, softWeights=softWeights,
+                                                              meshVertexCount=len(weights)),
+                                  case['format'], sparse=sparse)
+        _buildScene(weights, influences)
+        bSkinFakeMaya.select(MESH_NAME)
+        return lambda: bSkinSaver.bLoadVertexSkinValues(path, False, backend=backend)
+
+    raise ValueError('unknown operation: %s' % operation)
+
+
+def runCase(case, operation, repeat=DEFAULT_REPEAT, seed=0):
+    """
+    time one operation on one case in this process, the fastest of repeat runs
+    :param case: dict, vertices, influences, density, format and backend, see benchmarkCases()
+    :param operation: str, one of OPERATIONS
+    :param repeat: int, number of runs
+    :param seed: int, random seed of the weights
+    :return: dict, the case, operation, seconds, stages (seconds per stage), calls (timed calls per
+             stage), writer (encode, wait and write timings of the file writer), fileBytes and
+             baseMemoryMB / peakMemoryMB, the peak memory of the process before and after the runs
+    """
+    bSkinFakeMaya.install()
+
+    weights = syntheticWeights(case['vertices'], case['influences'], case['density'], seed)
+    influences = ['joint%d' % i for i in range(case['influences'])]
+    extension = bSkinFile.BINARY_EXTENSION if case['format'] == bSkinFile.FORMAT_BINARY else '.weights'
+    directory = tempfile.mkdtemp(prefix='bSkinBenchmark')
+    path = os.path.join(directory, 'bench%s' % extension)
+
+    best = None
+    baseMemory = None
+    try:
+        for i in range(repeat):
+            function = _prepare(operation, case, weights, influences, path)
+            if baseMemory is None:
+                baseMemory = _peakMemory()
+
+            timer = _StageTimer()
+            writerTimings = []
+            with _quiet(), _timedStages(timer, writerTimings):
+                start = _clock()
+                function()
+                seconds = _clock() - start
+
+            if best is None or seconds < best['seconds']:
+                timer.seconds['other'] = max(seconds - sum(timer.seconds.values()), 0.0)
+                best = dict(case, operation=operation, seconds=seconds, stages=timer.seconds, calls=timer.calls,
+                            writer=writerTimings[0] if writerTimings else None,
+                            fileBytes=os.path.getsize(path))
+    finally:
+        for fileName in os.listdir(directory):
+            os.remove(os.path.join(directory, fileName))
+        os.rmdir(directory)
+
+    best['baseMemoryMB'] = baseMemory
+    best['peakMemoryMB'] = _peakMemory()
+    return best
+
+
+def _runIsolated(case, operation, repeat, seed):
+    # runCase() in a new python process, so the peak memory is the case's own
+    handle, resultFile = tempfile.mkstemp(suffix='.json')
+    os.close(handle)
+    try:
+        script = os.path.splitext(os.path.abspath(__file__))[0] + '.py'
+        task = json.dumps({'case': case, 'operation': operation, 'repeat': repeat, 'seed': seed})
+        subprocess.check_call([sys.executable, script, '--worker', task, '--result', resultFile])
+        with open(resultFile) as f:
+            return json.load(f)
+    finally:
+        os.remove(resultFile)
+
+
+def _gitRevision():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=devnull,
+                                           cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def runBenchmarks(cases, operations=OPERATIONS, repeat=DEFAULT_REPEAT, seed=0, isolate=True, log=sys.stderr):
+    """
+    :param cases: list(dict), see benchmarkCases()
+    :param operations: list(str), OPERATIONS to run on each case
+    :param repeat: int, runs per case and operation, the fastest one counts
+    :param seed: int, random seed of the weights
+    :param isolate: bool, run each case in its own process. Without it the peak memory is the
+                    peak of all cases so far
+    :param log: file, gets a line per case, None for no output
+    :return: dict, the environment (python, numpy, platform, cpus, revision) and the results, see runCase()
+    """
+    results = []
+    for case in cases:
+        for operation in operations:
+            if isolate:
+                result = _runIsolated(case, operation, repeat, seed)
+            else:
+                result = runCase(case, operation, repeat, seed)
+            results.append(result)
+
+            if log is not None:
+                log.write('%-10s %7d x %-3d %-6s %-6s %-4s %8.3fs  %s MB\n' % (
+                    operation, case['vertices'], case['influences'], case['density'], case['format'],
+                    case['backend'], result['seconds'], result['peakMemoryMB']))
+
+    return {'python': platform.python_version(), 'numpy': numpy.__version__, 'platform': platform.platform(),
+            'cpus': multiprocessing.cpu_count(), 'revision': _gitRevision(), 'repeat': repeat, 'seed': seed,
+            'results': results}
+
+
+def _caseKey(result):
+    return result['operation'], result['vertices'], result['influences'], result['density'], result['format']
+
+
+def _resultKey(result):
+    # results from before there were backends ran on API 1.0
+    return _caseKey(result) + (result.get('backend', 'api1'),)
+
+
+def _compareRow(result, oldResult):
+    return _resultKey(result) + (oldResult['seconds'], result['seconds'],
+                                 oldResult['peakMemoryMB'], result['peakMemoryMB'])
+
+
+def compareResults(baseline, report):
+    """
+    :param baseline: dict, earlier runBenchmarks() results
+    :param report: dict, new runBenchmarks() results
+    :return: list(tuple), (operation, vertices, influences, density, format, backend, old seconds,
+             new seconds, old peak MB, new peak MB) of each result that is in both
+    """
+    old = dict((_resultKey(result), result) for result in baseline['results'])
+    return [_compareRow(result, old[_resultKey(result)]) for result in report['results']
+            if _resultKey(result) in old]
+
+
+def compareBackends(report, baseline='api1'):
+    """
+    :param report: dict, runBenchmarks() results with several backends
+    :param baseline: str, backend to compare the others with
+    :return: list(tuple), like compareResults(), with the baseline backend as the old result and
+             the backend of the new result in the row
+    """
+    old = dict((_caseKey(result), result) for result in report['results'] if _resultKey(result)[-1] == baseline)
+    return [_compareRow(result, old[_caseKey(result)]) for result in report['results']
+            if _resultKey(result)[-1] != baseline and _caseKey(result) in old]
+
+
+def _writeRows(rows, log=sys.stderr):
+    for row in rows:
+        log.write('%-10s %7d x %-3d %-6s %-6s %-4s %8.3fs -> %8.3fs (%5.2fx)  %s -> %s MB\n' % (
+            row[:8] + (row[7] / row[6] if row[6] else float('nan'),) + row[8:]))
+
+
+def main(argv=None):
+    bSkinSaver = _bSkinSaver()
+
+    parser = argparse.ArgumentParser(description='benchmark bSkinSaver on synthetic meshes')
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick')
+    parser.add_argument('--vertices', type=int, nargs='+', help='vertex counts instead of the suite\'s')
+    parser.add_argument('--influences', type=int, nargs='+', help='influence counts instead of the suite\'s')
+    parser.add_argument('--density', nargs='+', choices=DENSITIES, default=list(DENSITIES))
+    parser.add_argument('--format', dest='fileFormats', nargs='+',
+                        choices=(bSkinFile.FORMAT_TEXT, bSkinFile.FORMAT_BINARY))
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--backend', dest='backends', nargs='+', choices=bSkinSaver.BACKENDS,
+                        default=[bSkinSaver.BACKEND_API1], help='several backends get compared with the first one')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-weights', dest='maxWeights', type=int, default=MAX_WEIGHTS)
+    parser.add_argument('--no-isolate', dest='isolate', action='store_false',
+                        help='run all cases in this process, peak memory is then the peak so far')
+    parser.add_argument('-o', '--output', help='json file for the results, default prints them')
+    parser.add_argument('--compare', help='results of an earlier run to compare with')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        task = json.loads(args.worker)
+        result = runCase(task['case'], task['operation'], task['repeat'], task['seed'])
+        with open(args.result, 'w') as f:
+            json.dump(result, f)
+        return 0
+
+    cases = benchmarkCases(args.suite, args.vertices, args.influences, args.density, args.fileFormats,
+                           args.maxWeights, args.backends)
+    report = runBenchmarks(cases, args.operations, args.repeat, args.seed, args.isolate)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if len(args.backends) > 1:
+        sys.stderr.write('\n%s compared with %s\n' % (', '.join(args.backends[1:]), args.backends[0]))
+        _writeRows(compareBackends(report, args.backends[0]))
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.stderr.write('\ncompared with %s\n' % args.compare)
+        _writeRows(compareResults(baseline, report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
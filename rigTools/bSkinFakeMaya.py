@@ -0,0 +1,1189 @@
+"""
+=====================================================================
+    Maya API stand-in for running bSkinSaver outside of Maya
+
+    Just enough of maya.OpenMaya (API 1.0), OpenMayaAnim, maya.api
+    (API 2.0), mel, utils, OpenMayaUI, OpenMayaMPx, PySide and
+    shiboken for bSkinSaver's save and load functions, on the scene
+    of rigFakeMaya. maya.cmds has the commands of rigFakeMaya and the
+    few bSkinSaver adds, so the weights of a rig built on the
+    stand-in can be saved and loaded in the same run. Only plugin
+    commands go on the undo queue, the other edits can't be undone. The arrays behave like the real ones
+    where it matters for speed: they are C arrays that turn into
+    python lists when sliced or iterated, and MScriptUtil.createFromList
+    copies a python list.
+
+        import bSkinFakeMaya
+        bSkinFakeMaya.install()     # before importing bSkinSaver
+        import bSkinSaver
+
+        bSkinFakeMaya.newScene()
+        joints = [bSkinFakeMaya.createJoint('joint%d' % i) for i in range(4)]
+        mesh = bSkinFakeMaya.createMesh('body', positions)
+        bSkinFakeMaya.createSkinCluster(mesh, joints, weights)
+        bSkinFakeMaya.select(mesh)
+
+    This module doesn't need Maya.
+
+=====================================================================
+"""
+
+import importlib
+import itertools
+import os
+import sys
+import types
+
+import numpy
+
+import rigFakeMaya
+
+
+class MFn(object):
+    kInvalid = 0
+    kDependencyNode = 4
+    kDagNode = 107
+    kTransform = 110
+    kJoint = 121
+    kShape = 248
+    kMesh = 296
+    kCurve = 266
+    kNurbsCurve = 267
+    kNurbsSurface = 294
+    kGeometryFilt = 334
+    kSkinClusterFilter = 673
+    kComponent = 524
+    kSingleIndexedComponent = 525
+    kDoubleIndexedComponent = 526
+    kMeshVertComponent = 550
+    kCurveCVComponent = 531
+    kSurfaceCVComponent = 535
+
+
+# rigFakeMaya node type -> the function sets it adds to those of the type it derives from, the first is its api type
+_API_TYPES = {
+    'dependNode': (MFn.kDependencyNode,),
+    'dagNode': (MFn.kDagNode,),
+    'transform': (MFn.kTransform,),
+    'joint': (MFn.kJoint,),
+    'shape': (MFn.kShape,),
+    'mesh': (MFn.kMesh,),
+    'nurbsCurve': (MFn.kNurbsCurve, MFn.kCurve),
+    'geometryFilter': (MFn.kGeometryFilt,),
+    'skinCluster': (MFn.kSkinClusterFilter,),
+}
+
+_COMPONENT_TYPES = (MFn.kComponent, MFn.kSingleIndexedComponent, MFn.kMeshVertComponent)
+
+
+def _baseTypes(node):
+    # the node type and the ones it derives from, most derived first
+    nodeType = node.nodeType
+    while nodeType is not None:
+        yield nodeType
+        nodeType = rigFakeMaya._NODE_TYPES[nodeType]
+
+
+def _apiType(node):
+    for nodeType in _baseTypes(node):
+        if nodeType in _API_TYPES:
+            return _API_TYPES[nodeType][0]
+    return MFn.kInvalid
+
+
+def _hasFn(node, fnType):
+    return any(fnType in _API_TYPES.get(nodeType, ()) for nodeType in _baseTypes(node))
+
+
+class _Component(object):
+    # the vertices of a component MObject, with soft selection weights
+    def __init__(self, apiType=MFn.kMeshVertComponent):
+        self.apiType = apiType
+        self.elements = []
+        self.weights = None
+
+
+def _node(name):
+    try:
+        return rigFakeMaya.scene.node(name)
+    except ValueError as error:
+        raise RuntimeError(str(error))
+
+
+def _isIntermediate(node):
+    return bool(rigFakeMaya._value(node, 'intermediateObject'))
+
+
+def _shape(name):
+    # the mesh of a transform, or the mesh itself
+    node = _node(name)
+    if node.nodeType == 'mesh':
+        return node
+    for child in node.children:
+        if child.nodeType == 'mesh' and not _isIntermediate(child):
+            return child
+    raise RuntimeError('%s has no mesh' % name)
+
+
+def _skinCluster(name):
+    for deformer in _shape(name).history:
+        if deformer.nodeType == 'skinCluster':
+            return deformer
+    return None
+
+
+def _selectionItems():
+    # (node, _Component or None) of the active selection, the form the selection lists keep
+    items = []
+    for node in rigFakeMaya.scene.selection:
+        component = None
+        if node in rigFakeMaya.scene.selectedComponents:
+            vertexIds, softWeights = rigFakeMaya.scene.selectedComponents[node]
+            component = _Component()
+            component.elements = list(vertexIds)
+            component.weights = None if softWeights is None else list(softWeights)
+        items.append((node, component))
+    return items
+
+
+def _setSelectionItems(items):
+    rigFakeMaya.scene.selection = [node for node, component in items]
+    rigFakeMaya.scene.selectedComponents = dict(
+        (node, ([int(i) for i in component.elements], None if component.weights is None else list(component.weights)))
+        for node, component in items if component is not None)
+
+
+def _points(shape, space):
+    # (vertices x 3) positions of a shape
+    if space == MSpace.kWorld:
+        return rigFakeMaya._worldPoints(shape)
+    return shape.points
+
+
+# ------------------------------------------------------------------
+# scene setup, not part of Maya
+# ------------------------------------------------------------------
+
+def newScene():
+    """
+    empty the scene, like cmds.file(new=True, force=True)
+    """
+    rigFakeMaya.newScene()
+
+
+def createJoint(name, parent=None):
+    """
+    :param name: str, joint name
+    :param parent: str, parent joint, None for a root joint
+    :return: str, name
+    """
+    return rigFakeMaya.createJoint(name, parent)
+
+
+def createMesh(name, positions, triangles=None, origShape=False):
+    """
+    transform name with the mesh nameShape below it
+    :param name: str, transform name
+    :param positions: numpy.ndarray, (vertices x 3) positions, or the vertex count for all zero positions
+    :param triangles: numpy.ndarray, (triangles x 3) vertex ids
+    :param origShape: bool, put the intermediate mesh nameShapeOrig before nameShape, as deformers do
+    :return: str, name
+    """
+    if isinstance(positions, int):
+        positions = numpy.zeros((positions, 3))
+    name = rigFakeMaya.createMesh(name, positions, triangles)
+    if origShape:
+        transform = rigFakeMaya.scene.node(name)
+        shape = transform.children[0]
+        orig = rigFakeMaya.scene.add(shape.name + 'Orig', 'mesh', transform)
+        orig.attribute('intermediateObject').value = True
+        orig.points, orig.triangles = shape.points.copy(), shape.triangles
+        transform.children.insert(0, transform.children.pop())
+    return name
+
+
+def createSkinCluster(geometry, joints, weights=None, name=None):
+    """
+    :param geometry: str, mesh or its transform
+    :param joints: list(str), influences
+    :param weights: numpy.ndarray, (vertices x influences) weights, None puts all weight on the first joint
+    :param name: str, skinCluster name, None picks a free skinClusterN
+    :return: str, skinCluster name
+    """
+    name = rigFakeMaya.skinCluster(list(joints) + [geometry], name=name)[0]
+    if weights is not None:
+        shape = _shape(geometry)
+        rigFakeMaya.scene.node(name).weights[shape] = \
+            numpy.array(weights, dtype=numpy.float64).reshape(len(shape.points), len(joints))
+    return name
+
+
+def skinWeights(geometry):
+    """
+    :param geometry: str, skinned mesh or its transform
+    :return: numpy.ndarray, (vertices x influences) weights of its skinCluster, not a copy
+    """
+    return _skinCluster(geometry).weights[_shape(geometry)]
+
+
+def select(*names):
+    """
+    replace the selection with whole objects
+    :param names: str, node names
+    """
+    rigFakeMaya.select(list(names))
+
+
+def selectVertices(geometry, vertexIds, softWeights=None):
+    """
+    replace the selection with vertices of a mesh
+    :param geometry: str, mesh or its transform
+    :param vertexIds: list(int), selected vertices
+    :param softWeights: list(float), soft selection weight of each vertex, None for no soft selection
+    """
+    component = _Component()
+    component.elements = [int(i) for i in vertexIds]
+    if softWeights is not None:
+        component.weights = [float(w) for w in softWeights]
+    _setSelectionItems([(_shape(geometry), component)])
+
+
+# ------------------------------------------------------------------
+# callbacks
+# ------------------------------------------------------------------
+
+_callbacks = {}
+_callbackIds = itertools.count(1)
+
+
+def _addCallback(message, function, nodeType=None):
+    callbackId = next(_callbackIds)
+    _callbacks[callbackId] = (message, function, nodeType)
+    return callbackId
+
+
+def _fireCallbacks(message, node=None, nodeType=None):
+    for callbackId in sorted(_callbacks):
+        callbackMessage, function, callbackNodeType = _callbacks.get(callbackId, (None, None, None))
+        if callbackMessage != message or (callbackNodeType not in (None, 'dependNode', nodeType)):
+            continue
+        if node is None:
+            function(None)
+        else:
+            function(node, None)
+
+
+def _sceneChanged(message, node):
+    # rigFakeMaya listener, a new or opened scene starts a new undo queue like in Maya
+    if node is None:
+        _undo.queue, _undo.redoQueue = [], []
+        _fireCallbacks(message)
+    else:
+        _fireCallbacks(message, MObject._of(node), node.nodeType)
+
+
+class MMessage(object):
+    @staticmethod
+    def removeCallback(callbackId):
+        _callbacks.pop(callbackId, None)
+
+
+class MDGMessage(MMessage):
+    @staticmethod
+    def addNodeAddedCallback(function, nodeType='dependNode', clientData=None):
+        return _addCallback('nodeAdded', function, nodeType)
+
+    @staticmethod
+    def addNodeRemovedCallback(function, nodeType='dependNode', clientData=None):
+        return _addCallback('nodeRemoved', function, nodeType)
+
+
+class MSceneMessage(MMessage):
+    kAfterNew = 'afterNew'
+    kAfterOpen = 'afterOpen'
+
+    @staticmethod
+    def addCallback(message, function, clientData=None):
+        return _addCallback(message, function)
+
+
+# ------------------------------------------------------------------
+# maya.OpenMaya
+# ------------------------------------------------------------------
+
+class MObject(object):
+    def __init__(self, other=None):
+        self._node = None
+        self._component = None
+        if other is not None:
+            self._assign(other)
+
+    @classmethod
+    def _of(cls, node=None, component=None):
+        mObject = cls()
+        mObject._node = node
+        mObject._component = component
+        return mObject
+
+    def _assign(self, other):
+        self._node = other._node
+        self._component = other._component
+
+    def isNull(self):
+        return self._node is None and self._component is None
+
+    def apiType(self):
+        if self._component is not None:
+            return self._component.apiType
+        return MFn.kInvalid if self._node is None else _apiType(self._node)
+
+    def hasFn(self, fnType):
+        if self._component is not None:
+            return fnType in _COMPONENT_TYPES
+        return self._node is not None and _hasFn(self._node, fnType)
+
+
+class MObjectHandle(object):
+    def __init__(self, mObject):
+        self._object = MObject(mObject)
+
+    def isValid(self):
+        node = self._object._node
+        return node is not None and node.alive and rigFakeMaya.scene.nodes.get(node.name) is node
+
+    def object(self):
+        return MObject(self._object)
+
+
+class MDagPath(object):
+    def __init__(self, other=None):
+        self._node = None if other is None else other._node
+
+    def set(self, other):
+        self._node = other._node
+
+    def node(self):
+        return MObject._of(self._node)
+
+    def transform(self):
+        node = self._node
+        return MObject._of(node.parent if node.isType('shape') else node)
+
+    def hasFn(self, fnType):
+        return self._node is not None and _hasFn(self._node, fnType)
+
+    def apiType(self):
+        return _apiType(self._node)
+
+    def isValid(self):
+        return self._node is not None
+
+    def length(self):
+        return self._node.path().count('|') if self._node is not None else 0
+
+    def pop(self, num=1):
+        for i in range(num):
+            self._node = self._node.parent
+
+    def push(self, child):
+        if child._node.parent is not self._node:
+            raise RuntimeError('(kInvalidParameter): Object is not a child')
+        self._node = child._node
+
+    def extendToShape(self):
+        if self._node.nodeType == 'mesh':
+            return
+        shapes = [child for child in self._node.children if child.nodeType == 'mesh']
+        if len(shapes) != 1:
+            raise RuntimeError('(kFailure): Object not found')
+        self._node = shapes[0]
+
+    def fullPathName(self):
+        return self._node.path()
+
+    def partialPathName(self):
+        return self._node.name
+
+    @staticmethod
+    def getAPathTo(mObject, dagPath):
+        dagPath._node = mObject._node
+
+
+class _MArray(object):
+    # a C array: indexing gives python values, slicing gives python lists
+    _dtype = numpy.float64
+
+    def __init__(self, *args):
+        if not args:
+            values = []
+        elif isinstance(args[0], _Pointer):
+            values = args[0].values[:args[1]]
+        elif isinstance(args[0], int):
+            values = numpy.full(args[0], args[1] if len(args) > 1 else 0)
+        elif isinstance(args[0], _MArray):
+            values = args[0]._values
+        else:
+            values = args[0]
+        self._values = numpy.array(values, dtype=self._dtype)
+
+    def length(self):
+        return len(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._values[index].tolist()
+        return self._values[index].item()
+
+    def __setitem__(self, index, value):
+        self._values[index] = value
+
+    def __iter__(self):
+        return iter(self._values.tolist())
+
+    def append(self, value):
+        self._values = numpy.append(self._values, numpy.array([value], dtype=self._dtype))
+
+    def setLength(self, length):
+        values = numpy.zeros(length, dtype=self._dtype)
+        values[:min(length, len(self._values))] = self._values[:length]
+        self._values = values
+
+    def clear(self):
+        self._values = numpy.zeros(0, dtype=self._dtype)
+
+
+class MDoubleArray(_MArray):
+    _dtype = numpy.float64
+
+
+class MFloatArray(_MArray):
+    _dtype = numpy.float32
+
+
+class MIntArray(_MArray):
+    _dtype = numpy.int32
+
+
+class MDagPathArray(object):
+    def __init__(self):
+        self._paths = []
+
+    def length(self):
+        return len(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __getitem__(self, index):
+        return self._paths[index]
+
+    def append(self, dagPath):
+        self._paths.append(MDagPath(dagPath))
+
+    def clear(self):
+        self._paths = []
+
+
+class _Pointer(object):
+    def __init__(self, values):
+        self.values = values
+
+
+class MScriptUtil(object):
+    def __init__(self, *args):
+        self._values = []
+
+    def createFromList(self, values, count):
+        self._values = list(values[:count])
+
+    def createFromInt(self, *values):
+        self._values = list(values)
+
+    def asDoublePtr(self):
+        return _Pointer(numpy.array(self._values, dtype=numpy.float64))
+
+    def asFloatPtr(self):
+        return _Pointer(numpy.array(self._values, dtype=numpy.float32))
+
+    def asIntPtr(self):
+        return _Pointer(numpy.array(self._values, dtype=numpy.int32))
+
+    def asUintPtr(self):
+        return _Pointer(numpy.zeros(1, dtype=numpy.uint32))
+
+    @staticmethod
+    def getUint(pointer):
+        return int(pointer.values[0])
+
+    @staticmethod
+    def setUint(pointer, value):
+        pointer.values[0] = value
+
+
+class MSelectionList(object):
+    def __init__(self, other=None):
+        self._items = [] if other is None else list(other._items)
+
+    def add(self, item, component=None, mergeWithExisting=True):
+        if isinstance(item, MDagPath):
+            node = item._node
+        elif isinstance(item, MObject):
+            node = item._node
+        else:
+            node = _node(item)
+        self._items.append((node, None if component is None else component._component))
+
+    def length(self):
+        return len(self._items)
+
+    def isEmpty(self):
+        return not self._items
+
+    def clear(self):
+        self._items = []
+
+    def getDagPath(self, index, dagPath, component=None):
+        node, componentData = self._items[index]
+        dagPath._node = node
+        if component is not None:
+            component._assign(MObject._of(component=componentData))
+
+    def getDependNode(self, index, mObject):
+        mObject._assign(MObject._of(self._items[index][0]))
+
+
+class MRichSelection(object):
+    def __init__(self):
+        self._items = []
+
+    def getSelection(self, selection):
+        selection._items = list(self._items)
+
+
+class MGlobal(object):
+    @staticmethod
+    def getActiveSelectionList(selection, orderedSelectionIfAvailable=False):
+        selection._items = _selectionItems()
+
+    @staticmethod
+    def setActiveSelectionList(selection, listAdjustment=0):
+        _setSelectionItems(selection._items)
+
+    @staticmethod
+    def getRichSelection(richSelection, defaultToActiveSelection=True):
+        richSelection._items = [item for item in _selectionItems() if item[1] is not None]
+
+    @staticmethod
+    def displayInfo(message):
+        sys.stdout.write('%s\n' % message)
+
+    @staticmethod
+    def displayWarning(message):
+        sys.stdout.write('Warning: %s\n' % message)
+
+
+class MItSelectionList(object):
+    def __init__(self, selection, filterType=MFn.kInvalid):
+        self._items = [(node, component) for node, component in selection._items
+                       if filterType == MFn.kInvalid or (component is not None and component.apiType == filterType) or
+                       (component is None and _hasFn(node, filterType))]
+        self._index = 0
+
+    def isDone(self):
+        return self._index >= len(self._items)
+
+    def next(self):
+        self._index += 1
+
+    def getDagPath(self, dagPath, component=None):
+        node, componentData = self._items[self._index]
+        dagPath._node = node
+        if component is not None:
+            component._assign(MObject._of(component=componentData))
+
+    def getDependNode(self, mObject):
+        mObject._assign(MObject._of(self._items[self._index][0]))
+
+
+class MItDependencyNodes(object):
+    def __init__(self, filterType=MFn.kInvalid):
+        filterType = MFn.kDependencyNode if filterType == MFn.kInvalid else filterType
+        self._nodes = [node for node in rigFakeMaya.scene.nodes.values() if _hasFn(node, filterType)]
+        self._index = 0
+
+    def isDone(self):
+        return self._index >= len(self._nodes)
+
+    def next(self):
+        self._index += 1
+
+    def item(self):
+        return MObject._of(self._nodes[self._index])
+
+    def thisNode(self):
+        return self.item()
+
+
+def _nodeOf(item):
+    # node of an MObject or MDagPath
+    return item._node
+
+
+class MFnDependencyNode(object):
+    def __init__(self, item=None):
+        self._node = None if item is None else _nodeOf(item)
+
+    def setObject(self, item):
+        self._node = _nodeOf(item)
+
+    def object(self):
+        return MObject._of(self._node)
+
+    def name(self):
+        return self._node.name
+
+
+class MFnDagNode(MFnDependencyNode):
+    def partialPathName(self):
+        return self._node.name
+
+    def fullPathName(self):
+        return self._node.path()
+
+    def dagPath(self):
+        dagPath = MDagPath()
+        dagPath._node = self._node
+        return dagPath
+
+    def getPath(self, dagPath):
+        dagPath._node = self._node
+
+    def parentCount(self):
+        return int(self._node.parent is not None)
+
+    def parent(self, index=0):
+        return MObject._of(self._node.parent)
+
+    def childCount(self):
+        return len(self._node.children)
+
+    def child(self, index):
+        return MObject._of(self._node.children[index])
+
+    def isIntermediateObject(self):
+        return _isIntermediate(self._node)
+
+
+class MFnTransform(MFnDagNode):
+    pass
+
+
+class MFnMesh(MFnDagNode):
+    def __init__(self, item=None):
+        MFnDagNode.__init__(self, item)
+        if self._node is not None and self._node.nodeType != 'mesh':
+            self._node = _shape(self._node.name)
+
+    def numVertices(self):
+        return len(self._node.points)
+
+    def numPolygons(self):
+        return len(self._node.triangles)
+
+    def getTriangles(self, triangleCounts, triangleVertices):
+        triangleCounts._values = numpy.ones(len(self._node.triangles), dtype=numpy.int32)
+        triangleVertices._values = self._node.triangles.ravel().astype(numpy.int32)
+
+    def getPoints(self, points, space=None):
+        points._points = [MPoint(*point) for point in _points(self._node, space).tolist()]
+
+
+class MSpace(object):
+    kObject = 2
+    kWorld = 4
+
+
+class MPoint(object):
+    def __init__(self, x=0.0, y=0.0, z=0.0, w=1.0):
+        self.x, self.y, self.z, self.w = x, y, z, w
+
+
+class MPointArray(object):
+    def __init__(self):
+        self._points = []
+
+    def length(self):
+        return len(self._points)
+
+    def __getitem__(self, index):
+        return self._points[index]
+
+
+class MItGeometry(object):
+    def __init__(self, item, component=None):
+        node = _nodeOf(item)
+        self._shape = node if node.nodeType == 'mesh' else _shape(node.name)
+        self._component = None if component is None else component._component
+
+    def count(self):
+        if self._component is not None:
+            return len(self._component.elements)
+        return len(self._shape.points)
+
+
+class MWeight(object):
+    def __init__(self, influence=1.0, seam=0.0):
+        self._influence = influence
+        self._seam = seam
+
+    def influence(self):
+        return self._influence
+
+    def seam(self):
+        return self._seam
+
+
+class MFnComponent(object):
+    def __init__(self, component=None):
+        self._component = None if component is None else component._component
+
+    def create(self, componentType):
+        self._component = _Component(componentType)
+        return MObject._of(component=self._component)
+
+    def object(self):
+        return MObject._of(component=self._component)
+
+    def elementCount(self):
+        return len(self._component.elements)
+
+    def isEmpty(self):
+        return not self._component.elements
+
+    def hasWeights(self):
+        return self._component.weights is not None
+
+    def weight(self, index):
+        return MWeight(self._component.weights[index])
+
+
+class MFnSingleIndexedComponent(MFnComponent):
+    def addElement(self, element):
+        self._component.elements.append(int(element))
+
+    def addElements(self, elements):
+        self._component.elements.extend(elements[0:elements.length()])
+
+    def element(self, index):
+        return self._component.elements[index]
+
+    def getElements(self, elements):
+        elements._values = numpy.array(self._component.elements, dtype=numpy.int32)
+
+
+class MFnDoubleIndexedComponent(MFnComponent):
+    def addElement(self, u, v):
+        self._component.elements.append((int(u), int(v)))
+
+
+_OPEN_MAYA = [
+    'MFn', 'MObject', 'MObjectHandle', 'MDagPath', 'MDoubleArray', 'MFloatArray', 'MIntArray', 'MDagPathArray',
+    'MScriptUtil', 'MSelectionList', 'MSpace', 'MPoint', 'MPointArray', 'MRichSelection', 'MGlobal', 'MItSelectionList', 'MItDependencyNodes',
+    'MFnDependencyNode', 'MFnDagNode', 'MFnTransform', 'MFnMesh', 'MItGeometry', 'MWeight', 'MFnComponent',
+    'MFnSingleIndexedComponent', 'MFnDoubleIndexedComponent', 'MMessage', 'MDGMessage', 'MSceneMessage']
+
+
+# ------------------------------------------------------------------
+# maya.OpenMayaAnim
+# ------------------------------------------------------------------
+
+class MFnSkinCluster(MFnDependencyNode):
+    def influenceObjects(self, paths):
+        paths.clear()
+        for joint in self._node.influences:
+            dagPath = MDagPath()
+            dagPath._node = joint
+            paths.append(dagPath)
+        return len(self._node.influences)
+
+    def numOutputConnections(self):
+        return len(self._node.geometry)
+
+    def indexForOutputConnection(self, connection):
+        return connection
+
+    def getPathAtIndex(self, index, dagPath):
+        dagPath._node = self._node.geometry[index]
+
+    def _elements(self, components):
+        return numpy.array(components._component.elements, dtype=numpy.int64)
+
+    def _weights(self, dagPath):
+        # (vertices x influences) weights of one of the deformed shapes
+        return self._node.weights[dagPath._node]
+
+    def getWeights(self, dagPath, components, weights, influenceCount):
+        weights._values = self._weights(dagPath)[self._elements(components)].astype(weights._dtype).ravel()
+        influenceCount.values[0] = len(self._node.influences)
+
+    def setWeights(self, dagPath, components, influenceIndices, values, normalize=True, oldValues=None):
+        skinWeights = self._weights(dagPath)
+        elements = self._elements(components)
+        columns = numpy.array(influenceIndices._values, dtype=numpy.int64)
+        if oldValues is not None:
+            oldValues._values = skinWeights[numpy.ix_(elements, columns)].ravel()
+        skinWeights[numpy.ix_(elements, columns)] = values._values.reshape(len(elements), len(columns))
+
+
+_OPEN_MAYA_ANIM = ['MFnSkinCluster']
+
+
+# ------------------------------------------------------------------
+# maya.api.OpenMaya and maya.api.OpenMayaAnim, the API 2.0 calls of bApi2Backend.
+# Objects and paths are shared with API 1.0
+# ------------------------------------------------------------------
+
+class _Array2(object):
+    # built from any python sequence, reads as one
+    _dtype = numpy.float64
+
+    def __init__(self, values=()):
+        self._values = numpy.array(values, dtype=self._dtype)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._values[index].tolist()
+        return self._values[index].item()
+
+    def __iter__(self):
+        return iter(self._values.tolist())
+
+
+class _DoubleArray2(_Array2):
+    _dtype = numpy.float64
+
+
+class _IntArray2(_Array2):
+    _dtype = numpy.int32
+
+
+class _SelectionList2(object):
+    def __init__(self):
+        # (node, component data) like MSelectionList
+        self._items = []
+
+    def add(self, name):
+        self._items.append((_node(name), None))
+        return self
+
+    def length(self):
+        return len(self._items)
+
+    def getDependNode(self, index):
+        return MObject._of(self._items[index][0])
+
+    def getDagPath(self, index):
+        dagPath = MDagPath()
+        dagPath._node = self._items[index][0]
+        return dagPath
+
+
+class _SingleIndexedComponent2(object):
+    def __init__(self, component=None):
+        self._component = None if component is None else component._component
+
+    def create(self, componentType):
+        self._component = _Component(componentType)
+        return MObject._of(component=self._component)
+
+    @property
+    def elementCount(self):
+        return len(self._component.elements)
+
+    def addElements(self, elements):
+        self._component.elements = numpy.concatenate([numpy.asarray(self._component.elements, dtype=numpy.int64),
+                                                      numpy.array(elements, dtype=numpy.int64)])
+        return self
+
+    def setCompleteData(self, count):
+        self._component.elements = numpy.arange(count)
+        return self
+
+    def getElements(self):
+        return _IntArray2(self._component.elements)
+
+    @property
+    def hasWeights(self):
+        return self._component.weights is not None
+
+    def weight(self, index):
+        return _Weight2(self._component.weights[index])
+
+
+class _Weight2(object):
+    def __init__(self, influence=1.0, seam=0.0):
+        self.influence = influence
+        self.seam = seam
+
+
+class _RichSelection2(object):
+    def __init__(self, items):
+        self._items = items
+
+    def getSelection(self):
+        selection = _SelectionList2()
+        selection._items = list(self._items)
+        return selection
+
+
+class _Global2(object):
+    @staticmethod
+    def getRichSelection(defaultToActiveSelection=True):
+        return _RichSelection2([item for item in _selectionItems() if item[1] is not None])
+
+
+class _ItSelectionList2(MItSelectionList):
+    def next(self):
+        self._index += 1
+        return self
+
+    def getComponent(self):
+        dagPath = MDagPath()
+        node, component = self._items[self._index]
+        dagPath._node = node
+        return dagPath, MObject._of(component=component)
+
+
+class _SkinCluster2(object):
+    def __init__(self, mObject):
+        self._skinCluster = MFnSkinCluster(mObject)
+
+    def getWeights(self, dagPath, components):
+        weights = _DoubleArray2()
+        weights._values = self._skinCluster._weights(dagPath)[self._skinCluster._elements(components)].ravel()
+        return weights, len(self._skinCluster._node.influences)
+
+    def setWeights(self, dagPath, components, influenceIndices, values, normalize=True, returnOldWeights=False):
+        oldValues = _DoubleArray2() if returnOldWeights else None
+        self._skinCluster.setWeights(dagPath, components, influenceIndices, values, oldValues=oldValues)
+        return oldValues
+
+
+class _Mesh2(object):
+    def __init__(self, dagPath):
+        self._mesh = MFnMesh(dagPath)
+
+    def getPoints(self, space=MSpace.kObject):
+        # a sequence of (x, y, z, w) per point, like the MPointArray of API 2.0
+        return [tuple(point) + (1.0,) for point in _points(self._mesh._node, space).tolist()]
+
+
+_OPEN_MAYA2 = {'MFn': MFn, 'MObject': MObject, 'MDagPath': MDagPath, 'MItGeometry': MItGeometry,
+               'MSelectionList': _SelectionList2, 'MIntArray': _IntArray2, 'MDoubleArray': _DoubleArray2,
+               'MFnSingleIndexedComponent': _SingleIndexedComponent2, 'MGlobal': _Global2,
+               'MItSelectionList': _ItSelectionList2, 'MFnMesh': _Mesh2, 'MSpace': MSpace}
+_OPEN_MAYA_ANIM2 = {'MFnSkinCluster': _SkinCluster2}
+
+
+# ------------------------------------------------------------------
+# maya.cmds and maya.mel
+# ------------------------------------------------------------------
+
+class _UndoQueue(object):
+    # chunks of undoable commands, the chunk being filled and how many chunks are open
+    def __init__(self):
+        self.queue = []
+        self.redoQueue = []
+        self.chunk = []
+        self.openChunks = 0
+
+
+_undo = _UndoQueue()
+
+
+def undoInfo(*args, **kwargs):
+    if kwargs.get('query', kwargs.get('q')):
+        return True
+    if kwargs.get('openChunk', kwargs.get('ock')):
+        _undo.openChunks += 1
+    elif kwargs.get('closeChunk', kwargs.get('cck')):
+        _undo.openChunks -= 1
+        if not _undo.openChunks and _undo.chunk:
+            _undo.queue.append(_undo.chunk)
+            _undo.chunk = []
+    return None
+
+
+def _pushUndo(command):
+    # only the commands of plugins go on the undo queue
+    _undo.redoQueue = []
+    if _undo.openChunks:
+        _undo.chunk.append(command)
+    else:
+        _undo.queue.append([command])
+
+
+def undo(*args, **kwargs):
+    if _undo.queue:
+        chunk = _undo.queue.pop()
+        for command in reversed(chunk):
+            command.undoIt()
+        _undo.redoQueue.append(chunk)
+
+
+def redo(*args, **kwargs):
+    if _undo.redoQueue:
+        chunk = _undo.redoQueue.pop()
+        for command in chunk:
+            command.redoIt()
+        _undo.queue.append(chunk)
+
+
+_plugins = {}
+
+
+def loadPlugin(path, **kwargs):
+    name = os.path.splitext(os.path.basename(path))[0]
+    if name not in _plugins:
+        directory = os.path.dirname(os.path.abspath(path))
+        if directory not in sys.path:
+            sys.path.append(directory)
+        _plugins[name] = importlib.import_module(name)
+        _plugins[name].initializePlugin(MObject())
+
+
+def pluginInfo(name, **kwargs):
+    return name in _plugins
+
+
+def refresh(*args, **kwargs):
+    return None
+
+
+def fileDialog2(*args, **kwargs):
+    return None
+
+
+# the commands next to those of rigFakeMaya
+_CMDS = ['undoInfo', 'undo', 'redo', 'loadPlugin', 'pluginInfo', 'refresh', 'fileDialog2']
+
+
+# ------------------------------------------------------------------
+# maya.OpenMayaMPx, enough for a plugin with commands
+# ------------------------------------------------------------------
+
+class MPxCommand(object):
+    def isUndoable(self):
+        return False
+
+    def doIt(self, args):
+        pass
+
+    def undoIt(self):
+        pass
+
+    def redoIt(self):
+        pass
+
+
+def asMPxPtr(command):
+    return command
+
+
+class MFnPlugin(object):
+    def __init__(self, plugin, vendor='', version='', apiVersion='Any'):
+        pass
+
+    def registerCommand(self, name, creator):
+        def command(*args, **kwargs):
+            instance = creator()
+            instance.doIt(args)
+            if instance.isUndoable():
+                _pushUndo(instance)
+        setattr(sys.modules['maya.cmds'], name, command)
+
+    def deregisterCommand(self, name):
+        delattr(sys.modules['maya.cmds'], name)
+
+
+_OPEN_MAYA_MPX = ['MPxCommand', 'MFnPlugin', 'asMPxPtr']
+
+
+# ------------------------------------------------------------------
+# user interface modules, enough to import bSkinSaver
+# ------------------------------------------------------------------
+
+class MQtUtil(object):
+    @staticmethod
+    def mainWindow():
+        return 0
+
+
+def wrapInstance(pointer, baseClass):
+    return None
+
+
+class _QtModule(types.ModuleType):
+    # any Qt class is a class that does nothing
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        value = type(name, (object,), {'__init__': lambda self, *args, **kwargs: None})
+        setattr(self, name, value)
+        return value
+
+
+def executeDeferred(function, *args, **kwargs):
+    # there is no idle queue, like in maya batch mode it runs right away
+    function(*args, **kwargs)
+
+
+def _module(name, names=(), moduleType=types.ModuleType, **attributes):
+    module = moduleType(name)
+    for attribute in names:
+        setattr(module, attribute, globals()[attribute])
+    for attribute, value in attributes.items():
+        setattr(module, attribute, value)
+    return module
+
+
+def install():
+    """
+    register the stand-ins as maya, PySide and shiboken in sys.modules, so bSkinSaver, rigLib and humanRig
+    can be imported
+    """
+    existing = sys.modules.get('maya')
+    if existing is not None:
+        if not getattr(existing, '_bSkinFakeMaya', False):
+            raise RuntimeError('the real maya modules are loaded already')
+        # installed already, modules that imported them keep using the same ones
+        return
+
+    rigFakeMaya.addListener(_sceneChanged)
+    cmds = _module('maya.cmds', _CMDS, **dict((name, getattr(rigFakeMaya, name)) for name in rigFakeMaya._CMDS))
+    mel = _module('maya.mel', eval=rigFakeMaya._melEval)
+    utils = _module('maya.utils', ['executeDeferred'])
+    openMaya = _module('maya.OpenMaya', _OPEN_MAYA)
+    openMayaAnim = _module('maya.OpenMayaAnim', _OPEN_MAYA_ANIM)
+    openMayaUI = _module('maya.OpenMayaUI', ['MQtUtil'])
+    openMayaMPx = _module('maya.OpenMayaMPx', _OPEN_MAYA_MPX)
+    openMaya2 = _module('maya.api.OpenMaya', **_OPEN_MAYA2)
+    openMayaAnim2 = _module('maya.api.OpenMayaAnim', **_OPEN_MAYA_ANIM2)
+    api = _module('maya.api', OpenMaya=openMaya2, OpenMayaAnim=openMayaAnim2)
+    maya = _module('maya', _bSkinFakeMaya=True, cmds=cmds, mel=mel, utils=utils, OpenMaya=openMaya, OpenMayaAnim=openMayaAnim,
+                   OpenMayaUI=openMayaUI, OpenMayaMPx=openMayaMPx, api=api)
+
+    qtCore = _module('PySide.QtCore', moduleType=_QtModule, SIGNAL=lambda signal: signal)
+    qtGui = _module('PySide.QtGui', moduleType=_QtModule)
+    pySide = _module('PySide', QtCore=qtCore, QtGui=qtGui)
+    shiboken = _module('shiboken', ['wrapInstance'])
+
+    for module in (maya, cmds, mel, utils, openMaya, openMayaAnim, openMayaUI, openMayaMPx, api, openMaya2, openMayaAnim2,
+                   pySide, qtCore, qtGui, shiboken):
+        sys.modules[module.__name__] = module
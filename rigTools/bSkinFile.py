@@ -0,0 +1,1223 @@
+"""
+=====================================================================
+    Weight file formats for bSkinSaver
+
+    text format (the original bSkinSaver layout), one block per object:
+
+        objectName
+        influence1
+        influence2
+        ============
+        w w w ...       (one line per vertex)
+        <empty line>
+
+    text vertex format (bSaveVertexSkinValues), one object per file:
+
+        vertexCount of the mesh
+        influence1
+        ============
+        vertexId:[softWeight:]w w w ...
+
+    binary format: a file header followed by one block per object.
+    Each block is a json header (name, influences, vertexCount, layout
+    and the name, dtype, shape and offset of its arrays) followed by
+    the arrays as raw little endian data, so they can be read straight
+    into numpy with frombuffer, or compressed as a whole with zlib or
+    lzma. Weights are stored either dense as a (vertices x influences)
+    matrix or sparse as csr arrays (indptr, indices, data), as float32,
+    float16 or 16 bit fixed point (QUANTIZED) that sums up to exactly 1
+    per vertex. Blocks can carry the vertex positions and triangles of
+    the mesh, so the weights can be transferred to other topology
+    (bSkinTransfer).
+
+    Each block also stores a hash per 256 vertices, so a delta file can
+    store only the vertices that changed against a baseline file, and a
+    reference to it. After the last block the writer appends an index of
+    all blocks (name, byte offset, vertex count, influences), so a single
+    object can be read or memory mapped without scanning the blocks
+    before it. Text files have no index, reading an object out of one
+    scans the lines before it.
+
+    Files are written to a temporary file next to the target and renamed
+    over it once complete, so a failed or cancelled write leaves the old
+    file as it was. WeightFileExport writes on a background thread from
+    weights that were already queried.
+
+    This module doesn't need Maya.
+
+=====================================================================
+"""
+
+import collections
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from multiprocessing.pool import ThreadPool
+
+try:
+    import lzma
+except ImportError:
+    # python 2 doesn't have it
+    lzma = None
+
+import numpy
+
+import bSkinMath
+
+
+FORMAT_TEXT = 'text'
+FORMAT_BINARY = 'binary'
+
+LAYOUT_DENSE = 'dense'
+LAYOUT_CSR = 'csr'
+LAYOUT_DELTA = 'delta'
+
+BINARY_MAGIC = b'bSkinBin'
+BINARY_VERSION = 2
+BINARY_EXTENSION = '.bweights'
+TEXT_SEPARATOR = '============'
+
+COMPRESSION_ZLIB = 'zlib'
+COMPRESSION_LZMA = 'lzma'
+COMPRESSIONS = (COMPRESSION_ZLIB, COMPRESSION_LZMA) if lzma else (COMPRESSION_ZLIB,)
+
+# dtype for 16 bit fixed point weights, see bSkinMath.quantizeWeights()
+QUANTIZED = numpy.dtype('<u2')
+
+INDEX_MAGIC = b'bSkinIdx'
+
+_fileHeader = struct.Struct('<8sI')
+_blockHeader = struct.Struct('<I')
+_indexTrailer = struct.Struct('<Q8s')
+_ALIGNMENT = 16
+
+DEFAULT_CHUNK_SIZE = 4096
+HASH_CHUNK_SIZE = 256
+
+# compression name -> (compress, decompress)
+_compressors = {COMPRESSION_ZLIB: (zlib.compress, zlib.decompress)}
+if lzma:
+    _compressors[COMPRESSION_LZMA] = (lzma.compress, lzma.decompress)
+
+
+class WeightBlock(object):
+    """
+    weights of one skinned object
+    """
+
+    def __init__(self, name, influences, weights, vertexIds=None, softWeights=None, meshVertexCount=None,
+                 positions=None, triangles=None):
+        """
+        :param name: str, object name
+        :param influences: list(str), influence names, one per weights column
+        :param weights: numpy.ndarray, (vertices x influences) weight matrix
+        :param vertexIds: numpy.ndarray, mesh vertex id of each row, None if the rows are all vertices in order
+        :param softWeights: numpy.ndarray, soft selection weight of each row, None without soft selection
+        :param meshVertexCount: int, vertex count of the whole mesh, for vertex files
+        :param positions: numpy.ndarray, (vertices x 3) world position of each row, to transfer the
+                          weights to other topology. Binary files only
+        :param triangles: numpy.ndarray, (triangles x 3) row indices of the mesh triangles, for
+                          interpolating between positions. Binary files only
+        """
+        self.name = name
+        self.influences = list(influences)
+        self.weights = weights
+        self.vertexIds = vertexIds
+        self.softWeights = softWeights
+        self.meshVertexCount = meshVertexCount
+        self.positions = positions
+        self.triangles = triangles
+
+    @property
+    def vertexCount(self):
+        return self.weights.shape[0]
+
+
+def detectFormat(inputFile):
+    """
+    detect the format of an existing weight file from its first bytes
+    :param inputFile: str, path of the weight file
+    :return: str, FORMAT_BINARY or FORMAT_TEXT
+    """
+    with io.open(inputFile, 'rb') as f:
+        magic = f.read(len(BINARY_MAGIC))
+
+    if magic == BINARY_MAGIC:
+        return FORMAT_BINARY
+    return FORMAT_TEXT
+
+
+def formatFromPath(outputFile):
+    """
+    pick the format for a new weight file from its extension
+    :param outputFile: str, path of the weight file
+    :return: str, FORMAT_BINARY or FORMAT_TEXT
+    """
+    if os.path.splitext(outputFile)[1].lower() == BINARY_EXTENSION:
+        return FORMAT_BINARY
+    return FORMAT_TEXT
+
+
+class WeightStream(object):
+    """
+    one object of a weight file, read in chunks of vertices
+
+    The chunks share one preallocated array, so memory stays the same no matter
+    how many vertices the object has. Chunks have to be used up before the
+    next object of the file is read, whatever is left over gets skipped.
+    """
+
+    def __init__(self, name, influences, vertexCount, chunks, header=None, arrayReader=None):
+        """
+        :param name: str, object name
+        :param influences: list(str), influence names, one per weights column
+        :param vertexCount: int, vertex count, None if it's only known once the chunks are read
+        :param chunks: generator((int, numpy.ndarray)), see chunks()
+        :param header: dict, block header of binary files
+        :param arrayReader: function, reads an array of the block by name, for binary files
+        """
+        self.name = name
+        self.influences = list(influences)
+        self.vertexCount = vertexCount
+        self.header = header or {}
+        self.layout = self.header.get('layout', LAYOUT_DENSE)
+        self._chunks = chunks
+        self._arrayReader = arrayReader
+
+    def chunks(self):
+        """
+        :return: generator((int, numpy.ndarray)), index of the first vertex and the
+                 (vertices x influences) weights of each chunk. The array gets
+                 overwritten by the next chunk, copy it to keep it
+        """
+        return self._chunks
+
+    def read(self):
+        """
+        read the remaining chunks into one array
+        :return: numpy.ndarray, (vertices x influences) weight matrix
+        """
+        parts = [weights.copy() for start, weights in self._chunks]
+        if not parts:
+            return numpy.zeros((0, len(self.influences)))
+        return numpy.concatenate(parts)
+
+    def readArray(self, arrayName):
+        """
+        read one of the arrays stored with the block, like 'vertexIds', 'softWeights' or 'positions'
+        :param arrayName: str, array name
+        :return: numpy.ndarray, None if the block doesn't have it
+        """
+        if not self._arrayReader:
+            return None
+        return self._arrayReader(arrayName)
+
+    def csr(self):
+        """
+        read the weights as csr arrays, without densifying them for sparse blocks
+        :return: tuple(numpy.ndarray), indptr, indices and data
+        """
+        if self.layout == LAYOUT_CSR:
+            data = self.readArray('data')
+            if 'quantization' in self.header:
+                data = bSkinMath.dequantizeWeights(data, self.header['quantization']['scale'])
+            return self.readArray('indptr'), self.readArray('indices'), data
+        return bSkinMath.toCsr(self.read())
+
+    def toBlock(self):
+        """
+        read the whole object
+        :return: WeightBlock
+        """
+        return WeightBlock(self.name, self.influences, self.read(),
+                           vertexIds=self.readArray('vertexIds'),
+                           softWeights=self.readArray('softWeights'),
+                           meshVertexCount=self.header.get('meshVertexCount'),
+                           positions=self.readArray('positions'),
+                           triangles=self.readArray('triangles'))
+
+    def skip(self):
+        for chunk in self._chunks:
+            pass
+
+
+def iterWeightFile(inputFile, chunkSize=DEFAULT_CHUNK_SIZE, objectNames=None):
+    """
+    stream the objects of a weight file of any format
+    :param inputFile: str, path of the weight file
+    :param chunkSize: int, max number of vertices per chunk
+    :param objectNames: list(str), only stream these objects, in this order. They are
+                        looked up in the file index, so the other blocks are never read.
+                        Names that aren't in the file are skipped. None streams all objects
+    :return: generator(WeightStream), one stream per object, in file order
+    """
+    if objectNames is not None:
+        return _iterIndexedFile(inputFile, chunkSize, objectNames)
+    if detectFormat(inputFile) == FORMAT_BINARY:
+        return _iterBinaryFile(inputFile, chunkSize)
+    return _iterTextFile(inputFile, chunkSize)
+
+
+def readWeightFile(inputFile):
+    """
+    read a weight file of any format, one whole object at a time
+    :param inputFile: str, path of the weight file
+    :return: generator(WeightBlock), one block per object, in file order
+    """
+    for stream in iterWeightFile(inputFile):
+        yield stream.toBlock()
+
+
+def readIndex(inputFile):
+    """
+    the object index of a weight file. Binary files store it after the last block, files
+    written before that are scanned block header by block header, text files line by line
+    :param inputFile: str, path of the weight file
+    :return: list(dict), one entry per object in file order, with name, offset (byte offset of
+             the block), vertexCount, influences and layout
+    """
+    if detectFormat(inputFile) == FORMAT_BINARY:
+        return _readBinaryIndex(inputFile)
+    return _scanTextFile(inputFile)
+
+
+def readObject(inputFile, objectName):
+    """
+    read one object of a weight file without reading the objects before it
+    :param inputFile: str, path of the weight file
+    :param objectName: str, object name in the file
+    :return: WeightBlock, None if the file doesn't have the object
+    """
+    for stream in _iterIndexedFile(inputFile, DEFAULT_CHUNK_SIZE, [objectName]):
+        return stream.toBlock()
+    return None
+
+
+def mapObject(inputFile, objectName):
+    """
+    memory map the arrays of one object of a binary weight file. Nothing is read until
+    the arrays are used, so slicing a few vertices out of a huge file stays cheap
+    :param inputFile: str, path of a binary weight file
+    :param objectName: str, object name in the file
+    :return: dict(str: numpy.ndarray), read only arrays by name, 'weights' for dense blocks or
+             'indptr', 'indices' and 'data' for csr blocks, plus 'vertexIds' and 'softWeights'
+             if the block has them. Quantized weights are mapped as they are stored, as uint16
+             with a weight of 1.0 being bSkinMath.QUANTIZE_SCALE
+    """
+    if detectFormat(inputFile) != FORMAT_BINARY:
+        raise ValueError('%s is a text weight file, only binary files can be memory mapped' % inputFile)
+
+    entry = _findEntry(inputFile, objectName)
+    with _openBinaryFile(inputFile) as f:
+        f.seek(entry['offset'])
+        header = _readBlockHeader(f)
+        arrays = _arrayTable(header, f.tell())[0]
+    if header.get('compression'):
+        raise ValueError('%s is compressed and can\'t be memory mapped' % objectName)
+    if header.get('layout') == LAYOUT_DELTA:
+        raise ValueError('%s is a delta, read it with readObject()' % objectName)
+
+    mapped = {}
+    for arrayName, (dtype, shape, offset) in arrays.items():
+        if not numpy.prod(shape):
+            # numpy can't map empty arrays
+            mapped[arrayName] = numpy.zeros(shape, dtype=dtype)
+            continue
+        mapped[arrayName] = numpy.memmap(inputFile, dtype=dtype, mode='r', offset=offset, shape=shape)
+    return mapped
+
+
+def _findEntry(inputFile, objectName):
+    for entry in readIndex(inputFile):
+        if entry['name'] == objectName:
+            return entry
+    raise KeyError('%s has no object %s' % (inputFile, objectName))
+
+
+def _iterIndexedFile(inputFile, chunkSize, objectNames):
+    entries = dict((entry['name'], entry) for entry in reversed(readIndex(inputFile)))
+    entries = [entries[objectName] for objectName in objectNames if objectName in entries]
+
+    if detectFormat(inputFile) == FORMAT_BINARY:
+        with _openBinaryFile(inputFile) as f:
+            for entry in entries:
+                f.seek(entry['offset'])
+                stream = _binaryStream(f, _readBlockHeader(f), chunkSize, inputFile)[0]
+                yield stream
+        return
+
+    with open(inputFile, 'r') as f:
+        for entry in entries:
+            f.seek(entry['offset'])
+            yield _textStream((line.strip() for line in f), chunkSize, entry['vertexCount'])
+
+
+def _readBinaryIndex(inputFile):
+    with _openBinaryFile(inputFile) as f:
+        f.seek(0, os.SEEK_END)
+        fileSize = f.tell()
+        if fileSize >= _fileHeader.size + _indexTrailer.size:
+            f.seek(fileSize - _indexTrailer.size)
+            indexOffset, magic = _indexTrailer.unpack(f.read(_indexTrailer.size))
+            if magic == INDEX_MAGIC:
+                f.seek(indexOffset)
+                return json.loads(f.read(fileSize - _indexTrailer.size - indexOffset).decode('utf-8'))
+
+        # no index yet, hop from block header to block header
+        f.seek(_fileHeader.size)
+        entries = []
+        while True:
+            offset = f.tell()
+            header = _readBlockHeader(f)
+            if header is None:
+                return entries
+            entries.append(_indexEntry(header, offset))
+            f.seek(_arrayTable(header, f.tell())[1])
+
+
+def _indexEntry(header, offset):
+    return {'name': header['name'],
+            'offset': offset,
+            'vertexCount': header['vertexCount'],
+            'influences': header['influences'],
+            'layout': header.get('layout', LAYOUT_DENSE)}
+
+
+def _scanTextFile(inputFile):
+    # byte offset of every block, counted on the raw lines so they can be seeked to
+    entries = []
+    entry = None
+    inWeights = False
+    offset = 0
+    with io.open(inputFile, 'rb') as f:
+        for rawLine in f:
+            line = rawLine.strip().decode('utf-8')
+            if entry is None:
+                if line:
+                    entry = {'name': line, 'offset': offset, 'vertexCount': 0, 'influences': [], 'layout': LAYOUT_DENSE}
+                    entries.append(entry)
+            elif not inWeights:
+                if line.startswith(TEXT_SEPARATOR):
+                    inWeights = True
+                else:
+                    entry['influences'].append(line)
+            elif line:
+                entry['vertexCount'] += 1
+            else:
+                entry = None
+                inWeights = False
+            offset += len(rawLine)
+    return entries
+
+
+def readVertexFile(inputFile):
+    """
+    read a vertex weight file of any format, as saved by bSaveVertexSkinValues
+    :param inputFile: str, path of the weight file
+    :return: WeightBlock, with vertexIds, softWeights (if saved with soft selection) and meshVertexCount
+    """
+    if detectFormat(inputFile) == FORMAT_BINARY:
+        for stream in _iterBinaryFile(inputFile, DEFAULT_CHUNK_SIZE):
+            return stream.toBlock()
+        raise IOError('%s has no weights' % inputFile)
+
+    with open(inputFile, 'r') as f:
+        lines = (line.strip() for line in f)
+        meshVertexCount = int(next(lines))
+
+        influences = []
+        for line in lines:
+            if line.startswith(TEXT_SEPARATOR):
+                break
+            influences.append(line)
+
+        vertexIds = []
+        softWeights = []
+        rows = []
+        for line in lines:
+            if not line:
+                break
+            splittedStrings = line.split(':')
+            vertexIds.append(int(splittedStrings[0]))
+            if len(splittedStrings) == 3:
+                softWeights.append(float(splittedStrings[1]))
+            rows.append(splittedStrings[-1])
+
+    weights = numpy.empty((len(rows), len(influences)))
+    _fillRows(weights, rows)
+    return WeightBlock(None, influences, weights,
+                       vertexIds=numpy.array(vertexIds, dtype=numpy.int32),
+                       softWeights=numpy.array(softWeights) if softWeights else None,
+                       meshVertexCount=meshVertexCount)
+
+
+def _iterTextFile(inputFile, chunkSize):
+    # the row count of a block is only known once its rows are read
+    with open(inputFile, 'r') as f:
+        lines = (line.strip() for line in f)
+        while True:
+            stream = _textStream(lines, chunkSize, None)
+            if stream is None:
+                break
+            yield stream
+            stream.skip()
+
+
+def _textStream(lines, chunkSize, vertexCount):
+    # stream of the next block, None at the end of the file
+    for line in lines:
+        if not line:
+            continue
+
+        name = line
+        influences = []
+        for line in lines:
+            if line.startswith(TEXT_SEPARATOR):
+                break
+            influences.append(line)
+
+        return WeightStream(name, influences, vertexCount, _textChunks(lines, len(influences), chunkSize))
+    return None
+
+
+def _textChunks(lines, influenceCount, chunkSize):
+    # weight lines until the empty line that closes the object
+    weights = numpy.empty((chunkSize, influenceCount))
+    start = 0
+    rows = []
+    for line in lines:
+        if not line:
+            break
+        rows.append(line)
+        if len(rows) == chunkSize:
+            _fillRows(weights, rows)
+            yield start, weights
+            start += chunkSize
+            rows = []
+
+    if rows:
+        _fillRows(weights, rows)
+        yield start, weights[:len(rows)]
+
+
+def _fillRows(weights, rows):
+    values = numpy.fromstring(' '.join(rows), dtype=weights.dtype, sep=' ')
+    if values.size != len(rows) * weights.shape[1]:
+        raise ValueError('weight lines don\'t match the influence count of %d' % weights.shape[1])
+    weights[:len(rows)] = values.reshape(len(rows), weights.shape[1])
+
+
+def _openBinaryFile(inputFile):
+    f = io.open(inputFile, 'rb')
+    magic, version = _fileHeader.unpack(f.read(_fileHeader.size))
+    if magic != BINARY_MAGIC:
+        f.close()
+        raise IOError('%s is not a binary weight file' % inputFile)
+    if version > BINARY_VERSION:
+        f.close()
+        raise IOError('%s has unsupported binary version %d' % (inputFile, version))
+    return f
+
+
+def _readBlockHeader(f):
+    # json header of the block at the current position, None after the last block
+    data = f.read(_blockHeader.size)
+    if len(data) < _blockHeader.size:
+        return None
+    headerLength = _blockHeader.unpack(data)[0]
+    if not headerLength:
+        return None
+    return json.loads(f.read(headerLength).decode('utf-8'))
+
+
+def _binaryStream(f, header, chunkSize, inputFile):
+    # stream of a block whose header was just read, and where the block ends
+    arrays, dataEnd = _arrayTable(header, f.tell())
+    if header.get('compression'):
+        # compressed blocks are read whole, the arrays are then read from memory
+        f = io.BytesIO(_compressors[header['compression']][1](f.read(header['dataLength'])))
+        arrays = _arrayTable(header, 0)[0]
+
+    quantization = header.get('quantization')
+    if header.get('layout') == LAYOUT_DELTA:
+        changedWeights = _readArray(f, arrays['weights'])
+        if quantization:
+            changedWeights = bSkinMath.dequantizeWeights(changedWeights, quantization['scale'])
+        chunks = _deltaChunks(inputFile, header, _readArray(f, arrays['chunks']), changedWeights, chunkSize)
+    else:
+        if header.get('layout') == LAYOUT_CSR:
+            chunks = _csrChunks(f, arrays, header['vertexCount'], len(header['influences']), chunkSize)
+        else:
+            chunks = _denseChunks(f, arrays['weights'], chunkSize)
+        if quantization:
+            chunks = _dequantizedChunks(chunks, quantization['scale'])
+
+    stream = WeightStream(header['name'], header['influences'], header['vertexCount'], chunks,
+                          header=header, arrayReader=lambda arrayName: _readArray(f, arrays.get(arrayName)))
+    return stream, dataEnd
+
+
+def _iterBinaryFile(inputFile, chunkSize):
+    with _openBinaryFile(inputFile) as f:
+        while True:
+            header = _readBlockHeader(f)
+            if header is None:
+                break
+
+            stream, dataEnd = _binaryStream(f, header, chunkSize, inputFile)
+            yield stream
+            f.seek(dataEnd)
+
+
+def _arrayTable(header, dataStart):
+    # name -> (dtype, shape, file offset) of the arrays of a block, and where the block ends
+    if 'arrays' not in header:
+        # version 1 blocks only have the dense weights
+        dtype = numpy.dtype(header['dtype'])
+        shape = (header['vertexCount'], len(header['influences']))
+        return {'weights': (dtype, shape, dataStart)}, dataStart + shape[0] * shape[1] * dtype.itemsize
+
+    arrays = {}
+    for array in header['arrays']:
+        arrays[array['name']] = (numpy.dtype(array['dtype']), tuple(array['shape']), dataStart + array['offset'])
+    return arrays, dataStart + header['dataLength']
+
+
+def _readArray(f, array, start=0, count=None, out=None):
+    # read rows start .. start+count of an array from the table in _arrayTable
+    if array is None:
+        return None
+    dtype, shape, offset = array
+    rowSize = int(numpy.prod(shape[1:])) * dtype.itemsize
+    if count is None:
+        count = shape[0] - start
+    if out is None:
+        out = numpy.empty((count,) + shape[1:], dtype=dtype)
+
+    f.seek(offset + start * rowSize)
+    if count and f.readinto(out) != out.nbytes:
+        raise IOError('unexpected end of weight file')
+    return out
+
+
+def _denseChunks(f, array, chunkSize):
+    dtype, shape, offset = array
+    weights = numpy.empty((min(chunkSize, shape[0]),) + shape[1:], dtype=dtype)
+    for start in range(0, shape[0], chunkSize):
+        chunk = weights[:min(chunkSize, shape[0] - start)]
+        _readArray(f, array, start, len(chunk), chunk)
+        yield start, chunk
+
+
+def _csrChunks(f, arrays, vertexCount, influenceCount, chunkSize):
+    indptr = _readArray(f, arrays['indptr']).astype(numpy.int64)
+    starts = range(0, vertexCount, chunkSize)
+    chunkEnds = [min(start + chunkSize, vertexCount) for start in starts]
+    maxCount = max([indptr[end] - indptr[start] for start, end in zip(starts, chunkEnds)] or [0])
+
+    indices = numpy.empty(maxCount, dtype=arrays['indices'][0])
+    data = numpy.empty(maxCount, dtype=arrays['data'][0])
+    weights = numpy.empty((min(chunkSize, vertexCount), influenceCount), dtype=data.dtype)
+
+    for start, end in zip(starts, chunkEnds):
+        first, count = indptr[start], indptr[end] - indptr[start]
+        _readArray(f, arrays['indices'], first, count, indices[:count])
+        _readArray(f, arrays['data'], first, count, data[:count])
+
+        chunk = weights[:end - start]
+        bSkinMath.fromCsr(indptr[start:end + 1] - first, indices[:count], data[:count], out=chunk)
+        yield start, chunk
+
+
+def _dequantizedChunks(chunks, scale):
+    # float32 chunks of quantized ones, in a buffer of their own
+    weights = None
+    for start, quantized in chunks:
+        if weights is None:
+            weights = numpy.empty(quantized.shape, dtype=numpy.float32)
+        chunk = weights[:len(quantized)]
+        bSkinMath.dequantizeWeights(quantized, scale, out=chunk)
+        yield start, chunk
+
+
+def _deltaChunks(inputFile, header, changedChunks, changedWeights, chunkSize):
+    # the chunks of the baseline object with the changed vertices put in
+    baseline = header['baseline']
+    baselineFile = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(inputFile)), baseline['file']))
+    changedRows = _chunkRows(changedChunks, header['hashes']['chunkSize'], header['vertexCount'])
+
+    streams = _iterIndexedFile(baselineFile, chunkSize, [baseline['name']])
+    for stream in streams:
+        if stream.influences != header['influences'] or stream.vertexCount not in (None, header['vertexCount']):
+            raise IOError('%s changed since %s was saved against it' % (baselineFile, inputFile))
+        # baselines stored in another dtype had their hashes computed from the weights, those can't be checked
+        baselineHashes = stream.header.get('hashes')
+        if (baselineHashes and baselineHashes['dtype'] == header['hashes']['dtype'] and
+                _hashDigest(baselineHashes['chunks']) != baseline['hash']):
+            raise IOError('%s changed since %s was saved against it' % (baselineFile, inputFile))
+
+        for start, weights in stream.chunks():
+            first, last = numpy.searchsorted(changedRows, [start, start + len(weights)])
+            weights[changedRows[first:last] - start] = changedWeights[first:last]
+            yield start, weights
+        return
+    raise IOError('%s has no object %s, the baseline of %s' % (baselineFile, baseline['name'], inputFile))
+
+
+def _chunkRows(chunks, hashChunkSize, vertexCount):
+    # sorted vertex ids of the hash chunks
+    if not len(chunks):
+        return numpy.zeros(0, dtype=numpy.int64)
+    rows = (numpy.asarray(chunks, dtype=numpy.int64)[:, numpy.newaxis] * hashChunkSize +
+            numpy.arange(hashChunkSize)).ravel()
+    return rows[rows < vertexCount]
+
+
+def _chunkHashes(weights, hashChunkSize):
+    # weights have to be contiguous in the stored dtype, so equal files give equal hashes
+    return [hashlib.sha1(weights[start:start + hashChunkSize].tobytes()).hexdigest()[:16]
+            for start in range(0, len(weights), hashChunkSize)]
+
+
+def _hashDigest(chunkHashes):
+    return hashlib.sha1(''.join(chunkHashes).encode('ascii')).hexdigest()[:16]
+
+
+def _baselineHashes(baselineFile, entry, dtype):
+    # chunk hashes of an object of the baseline, from its header if they were stored with the same dtype
+    if detectFormat(baselineFile) == FORMAT_BINARY:
+        with _openBinaryFile(baselineFile) as f:
+            f.seek(entry['offset'])
+            hashes = _readBlockHeader(f).get('hashes')
+        if hashes and hashes['chunkSize'] == HASH_CHUNK_SIZE and hashes['dtype'] == dtype.str:
+            return hashes['chunks']
+
+    block = readObject(baselineFile, entry['name'])
+    return _chunkHashes(_storedWeights(block.weights, dtype)[0], HASH_CHUNK_SIZE)
+
+
+def _storedWeights(weights, dtype):
+    # weights as they get written, and the max error of quantizing them, None if they aren't quantized
+    if dtype == QUANTIZED:
+        return bSkinMath.quantizeWeights(weights)
+    return numpy.ascontiguousarray(weights, dtype=dtype), None
+
+
+def _textBlockHeader(firstLine, influences):
+    return '%s\n%s%s\n' % (firstLine, ''.join(influence + '\n' for influence in influences), TEXT_SEPARATOR)
+
+
+def _rowFormat(influenceCount):
+    # %.9g keeps float32 weights exact and writes zeros as '0'
+    return ' '.join(['%.9g'] * influenceCount)
+
+
+def _encodeTextBlock(block, maxInfluences):
+    # the text of a whole block, runs in the writer's worker pool
+    weights = bSkinMath.pruneWeights(block.weights, maxInfluences)
+    rowFormat = _rowFormat(len(block.influences)) + '\n'
+    rows = [rowFormat % tuple(row) for row in weights.tolist()]
+    return _textBlockHeader(block.name, block.influences) + ''.join(rows) + '\n'
+
+
+def _encodeBinaryBlock(block, dtype, sparse, maxInfluences, compression, baseline=None):
+    # header and data of a whole block, runs in the writer's worker pool.
+    # The array offsets are relative to the start of the (uncompressed) data.
+    # baseline is (baseline file, its path relative to the new file, index entry of the object) for delta saves
+    weights, quantizationError = _storedWeights(bSkinMath.pruneWeights(block.weights, maxInfluences), dtype)
+    hashes = _chunkHashes(weights, HASH_CHUNK_SIZE)
+    header = {'name': block.name,
+              'influences': list(block.influences),
+              'vertexCount': len(weights),
+              'hashes': {'chunkSize': HASH_CHUNK_SIZE, 'dtype': weights.dtype.str, 'chunks': hashes}}
+    if block.meshVertexCount is not None:
+        header['meshVertexCount'] = block.meshVertexCount
+    if quantizationError is not None:
+        header['quantization'] = {'scale': bSkinMath.QUANTIZE_SCALE, 'maxError': quantizationError}
+
+    baselineHashes = None
+    if baseline is not None and block.vertexIds is None and block.softWeights is None:
+        baselineFile, relativeFile, entry = baseline
+        if entry['influences'] == header['influences'] and entry['vertexCount'] == len(weights):
+            baselineHashes = _baselineHashes(baselineFile, entry, weights.dtype)
+            header['baseline'] = {'file': relativeFile, 'name': entry['name'], 'hash': _hashDigest(baselineHashes)}
+
+    if baselineHashes is not None:
+        changedChunks = [i for i, (chunkHash, baselineHash) in enumerate(zip(hashes, baselineHashes))
+                         if chunkHash != baselineHash]
+        header['layout'] = LAYOUT_DELTA
+        arrays = [('chunks', numpy.array(changedChunks, dtype=numpy.int64), '<i4'),
+                  ('weights', weights[_chunkRows(changedChunks, HASH_CHUNK_SIZE, len(weights))], dtype)]
+    elif sparse:
+        indptr, indices, data = bSkinMath.toCsr(weights)
+        header['layout'] = LAYOUT_CSR
+        arrays = [('indptr', indptr, '<u4' if indptr[-1] < 2 ** 32 else '<u8'),
+                  ('indices', indices, '<u2' if len(block.influences) < 2 ** 16 else '<u4'),
+                  ('data', data, dtype)]
+    else:
+        header['layout'] = LAYOUT_DENSE
+        arrays = [('weights', weights, dtype)]
+
+    if block.vertexIds is not None:
+        arrays.append(('vertexIds', block.vertexIds, '<i4'))
+    if block.softWeights is not None:
+        arrays.append(('softWeights', block.softWeights, '<f4'))
+    if block.positions is not None:
+        arrays.append(('positions', block.positions, '<f4'))
+    if block.triangles is not None:
+        arrays.append(('triangles', block.triangles, '<i4'))
+
+    header['arrays'] = []
+    parts = []
+    offset = 0
+    for arrayName, array, arrayDtype in arrays:
+        array = numpy.ascontiguousarray(array, dtype=arrayDtype)
+        header['arrays'].append({'name': arrayName,
+                                 'dtype': array.dtype.str,
+                                 'shape': list(array.shape),
+                                 'offset': offset})
+        parts.append(array.tobytes())
+        parts.append(b'\0' * (-array.nbytes % _ALIGNMENT))
+        offset += array.nbytes + (-array.nbytes % _ALIGNMENT)
+    data = b''.join(parts)
+
+    if compression:
+        header['compression'] = compression
+        header['rawLength'] = len(data)
+        data = _compressors[compression][0](data)
+    header['dataLength'] = len(data)
+    return header, data
+
+
+def _temporaryPath(outputFile):
+    # next to the target, so renaming it over the target doesn't cross file systems
+    return '%s.%s.tmp' % (outputFile, uuid.uuid4().hex[:8])
+
+
+def _replaceFile(source, target):
+    # os.replace is python 3 only, and os.rename doesn't overwrite on windows
+    if hasattr(os, 'replace'):
+        os.replace(source, target)
+        return
+    if os.name == 'nt' and os.path.exists(target):
+        os.remove(target)
+    os.rename(source, target)
+
+
+def _removeFile(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@contextlib.contextmanager
+def _replacingFile(outputFile, mode='w'):
+    # file that only replaces outputFile if the block finishes without an error
+    temporaryFile = _temporaryPath(outputFile)
+    try:
+        with open(temporaryFile, mode) as f:
+            yield f
+    except BaseException:
+        _removeFile(temporaryFile)
+        raise
+    _replaceFile(temporaryFile, outputFile)
+
+
+def _timed(function, args):
+    # result and run time of function, so the pool workers can report their time
+    timeBefore = time.time()
+    return function(*args), time.time() - timeBefore
+
+
+class _WeightWriter(object):
+    """
+    encodes blocks in a pool of workers and writes them in the order they came in
+
+    With workers > 1 writeBlock() only hands the block to the pool, so the caller can
+    go on querying the next object while the last ones get formatted and compressed.
+    The pool is threads by default, which is what works inside Maya. Processes speed
+    up text formatting too but need a python that can start itself again, like mayapy.
+
+    Everything gets written to a temporary file that replaces outputFile on close(),
+    abort() or an exception inside a with statement deletes it instead.
+    """
+
+    def __init__(self, outputFile, workers=None, processes=False):
+        """
+        :param outputFile: str, path of the weight file
+        :param workers: int, size of the worker pool, None or 1 encodes on the calling thread
+        :param processes: bool, use a process pool instead of threads
+        """
+        self.outputFile = outputFile
+        self.workers = workers or 1
+        self.timings = {'encode': 0.0, 'wait': 0.0, 'write': 0.0}
+        self.writtenBlocks = 0
+        self._temporaryFile = _temporaryPath(outputFile)
+        self._pending = collections.deque()
+        self._pool = None
+        if self.workers > 1:
+            self._pool = (multiprocessing.Pool if processes else ThreadPool)(self.workers)
+
+    def writeBlock(self, block):
+        """
+        :param block: WeightBlock, object weights to append to the file. The block must
+                      not be changed afterwards, it may still be waiting to get encoded
+        """
+        args = self._encodeArgs(block)
+        if self._pool is None:
+            self._writeResult(_timed(self._encoder, args))
+            return
+
+        self._pending.append(self._pool.apply_async(_timed, (self._encoder, args)))
+        # write whatever is done, and don't let more than two blocks per worker pile up
+        self._flush(self.workers * 2)
+
+    def _flush(self, maxPending=0):
+        while self._pending and (len(self._pending) > maxPending or self._pending[0].ready()):
+            timeBefore = time.time()
+            result = self._pending.popleft().get()
+            self.timings['wait'] += time.time() - timeBefore
+            self._writeResult(result)
+
+    def _writeResult(self, result):
+        encoded, encodeTime = result
+        self.timings['encode'] += encodeTime
+        timeBefore = time.time()
+        self._writeEncoded(encoded)
+        self.timings['write'] += time.time() - timeBefore
+        self.writtenBlocks += 1
+
+    def _closePool(self, wait=True):
+        if self._pool is None:
+            return
+        if wait:
+            self._flush()
+            self._pool.close()
+        else:
+            self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+
+    def close(self):
+        """
+        write the blocks that are still being encoded and replace outputFile with the new file
+        """
+        try:
+            self._closePool()
+            self._closeFile()
+        except BaseException:
+            self.abort()
+            raise
+        _replaceFile(self._temporaryFile, self.outputFile)
+
+    def abort(self):
+        """
+        stop without waiting for the pool and delete the unfinished file, outputFile stays as it was
+        """
+        self._closePool(wait=False)
+        self._file.close()
+        _removeFile(self._temporaryFile)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, *args):
+        if excType is not None:
+            # don't wait for the pool to finish a file that won't be complete anyway
+            self.abort()
+        else:
+            self.close()
+
+
+class TextWeightWriter(_WeightWriter):
+    """
+    writes blocks in the text format, positions and triangles of the blocks aren't written
+    """
+
+    def __init__(self, outputFile, maxInfluences=None, workers=None, processes=False):
+        """
+        :param outputFile: str, path of the weight file
+        :param maxInfluences: int, keep only the biggest weights of each vertex and normalize, None keeps all
+        :param workers: int, see _WeightWriter
+        :param processes: bool, see _WeightWriter
+        """
+        _WeightWriter.__init__(self, outputFile, workers, processes)
+        self.maxInfluences = maxInfluences
+        self._encoder = _encodeTextBlock
+        self._file = open(self._temporaryFile, 'w')
+
+    def _encodeArgs(self, block):
+        return block, self.maxInfluences
+
+    def _writeEncoded(self, text):
+        self._file.write(text)
+
+    def _closeFile(self):
+        self._file.close()
+
+
+class BinaryWeightWriter(_WeightWriter):
+    """
+    writes blocks in the binary format
+    """
+
+    def __init__(self, outputFile, dtype=numpy.float32, sparse=False, maxInfluences=None, compression=None,
+                 baseline=None, workers=None, processes=False):
+        """
+        :param outputFile: str, path of the weight file
+        :param dtype: numpy dtype the weights are stored as, float32, float16 or QUANTIZED
+        :param sparse: bool, store only the non zero weights as csr arrays
+        :param maxInfluences: int, keep only the biggest weights of each vertex and normalize, None keeps all
+        :param compression: str, compress the data of each block, one of COMPRESSIONS, None stores it raw.
+                            Compressed blocks are read whole and can't be memory mapped
+        :param baseline: str, weight file of any format to save a delta against. Objects with the same
+                         name, influences and vertex count only store the vertices that changed. The
+                         baseline has to stay where it is, it's needed to load the delta
+        :param workers: int, see _WeightWriter
+        :param processes: bool, see _WeightWriter
+        """
+        if compression is not None and compression not in _compressors:
+            raise ValueError('unknown compression: %s' % compression)
+
+        self._baseline = {}
+        if baseline is not None:
+            baseline = os.path.abspath(baseline)
+            if os.path.normcase(baseline) == os.path.normcase(os.path.abspath(outputFile)):
+                raise ValueError('a delta can\'t overwrite its own baseline %s' % baseline)
+            try:
+                relativeFile = os.path.relpath(baseline, os.path.dirname(os.path.abspath(outputFile)))
+            except ValueError:
+                # other drive on windows
+                relativeFile = baseline
+            for entry in reversed(readIndex(baseline)):
+                self._baseline[entry['name']] = (baseline, relativeFile, entry)
+
+        _WeightWriter.__init__(self, outputFile, workers, processes)
+        self.dtype = numpy.dtype(dtype).newbyteorder('<')
+        self.sparse = sparse
+        self.maxInfluences = maxInfluences
+        self.compression = compression
+        self._encoder = _encodeBinaryBlock
+        self._file = io.open(self._temporaryFile, 'wb')
+        self._file.write(_fileHeader.pack(BINARY_MAGIC, BINARY_VERSION))
+        self._index = []
+
+    def _encodeArgs(self, block):
+        return block, self.dtype, self.sparse, self.maxInfluences, self.compression, self._baseline.get(block.name)
+
+    def _writeEncoded(self, encoded):
+        header, data = encoded
+        self._index.append(_indexEntry(header, self._file.tell()))
+        self._writeHeader(header)
+        self._file.write(data)
+
+    def _writeHeader(self, header):
+        # pad the json with spaces so the data that follows is aligned
+        headerBytes = json.dumps(header, sort_keys=True).encode('utf-8')
+        dataStart = self._file.tell() + _blockHeader.size + len(headerBytes)
+        headerBytes += b' ' * (-dataStart % _ALIGNMENT)
+
+        self._file.write(_blockHeader.pack(len(headerBytes)))
+        self._file.write(headerBytes)
+
+    def _closeFile(self):
+        self._file.write(_blockHeader.pack(0))
+
+        # the index goes after the end marker, readers that don't know it stop before
+        indexOffset = self._file.tell()
+        self._file.write(json.dumps(self._index, sort_keys=True).encode('utf-8'))
+        self._file.write(_indexTrailer.pack(indexOffset, INDEX_MAGIC))
+        self._file.close()
+
+
+def openWeightWriter(outputFile, fileFormat=None, dtype=numpy.float32, sparse=False, maxInfluences=None,
+                     compression=None, baseline=None, workers=None, processes=False):
+    """
+    open a writer for a new weight file
+    :param outputFile: str, path of the weight file
+    :param fileFormat: str, FORMAT_TEXT or FORMAT_BINARY, None picks it from the extension
+    :param dtype: numpy dtype of the binary weights, QUANTIZED needs the binary format
+    :param sparse: bool, store csr arrays instead of dense rows, binary files only
+    :param maxInfluences: int, keep only the biggest weights of each vertex and normalize, None keeps all
+    :param compression: str, one of COMPRESSIONS, binary files only
+    :param baseline: str, weight file to save a delta against, binary files only
+    :param workers: int, number of blocks encoded in parallel, see _WeightWriter
+    :param processes: bool, encode in processes instead of threads
+    :return: TextWeightWriter or BinaryWeightWriter
+    """
+    if fileFormat is None:
+        fileFormat = formatFromPath(outputFile)
+
+    if fileFormat == FORMAT_BINARY:
+        return BinaryWeightWriter(outputFile, dtype=dtype, sparse=sparse, maxInfluences=maxInfluences,
+                                  compression=compression, baseline=baseline, workers=workers, processes=processes)
+    if fileFormat == FORMAT_TEXT:
+        if sparse:
+            raise ValueError('sparse weights need the binary format (%s)' % BINARY_EXTENSION)
+        if compression:
+            raise ValueError('compressed weights need the binary format (%s)' % BINARY_EXTENSION)
+        if baseline:
+            raise ValueError('delta saves need the binary format (%s)' % BINARY_EXTENSION)
+        if numpy.dtype(dtype) == QUANTIZED:
+            raise ValueError('quantized weights need the binary format (%s)' % BINARY_EXTENSION)
+        return TextWeightWriter(outputFile, maxInfluences=maxInfluences, workers=workers, processes=processes)
+    raise ValueError('unknown weight file format: %s' % fileFormat)
+
+
+class WeightFileExport(object):
+    """
+    writes blocks to an open weight writer on a background thread
+
+    The blocks have to be complete copies, queried before, so Maya isn't touched
+    while the file gets encoded, compressed and written. The thread closes the writer,
+    which renames the finished file into place, or aborts it on an error or cancel(),
+    which leaves the old file as it was. It isn't a daemon thread, so quitting python
+    waits for the file to be finished.
+    """
+
+    def __init__(self, writer, blocks, callback=None):
+        """
+        :param writer: TextWeightWriter or BinaryWeightWriter, see openWeightWriter(), the export closes it
+        :param blocks: list(WeightBlock), blocks to write, they must not be changed afterwards
+        :param callback: function, called with the export when it finished, failed or got cancelled.
+                         It runs on the background thread, Maya calls need maya.utils.executeDeferred
+        """
+        self.writer = writer
+        self.outputFile = writer.outputFile
+        self.blockCount = len(blocks)
+        self.error = None
+        self.cancelled = False
+        self._blocks = collections.deque(blocks)
+        self._callback = callback
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='WeightFileExport %s' % self.outputFile)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while self._blocks and not self._cancel.is_set():
+                # let go of each block once it's handed over, so its memory is freed once written
+                self.writer.writeBlock(self._blocks.popleft())
+            if self._cancel.is_set():
+                self.cancelled = True
+                self._blocks.clear()
+                self.writer.abort()
+            else:
+                self.writer.close()
+        except BaseException as error:
+            self.error = error
+            self.writer.abort()
+        finally:
+            self._finished.set()
+            if self._callback is not None:
+                self._callback(self)
+
+    def progress(self):
+        """
+        :return: float, share of the blocks that are written, 0.0 - 1.0
+        """
+        if not self.blockCount:
+            return 1.0 if self.done() else 0.0
+        return float(self.writer.writtenBlocks) / self.blockCount
+
+    def done(self):
+        """
+        :return: bool, the export finished, failed or got cancelled
+        """
+        return self._finished.is_set()
+
+    def succeeded(self):
+        """
+        :return: bool, the file is written completely
+        """
+        return self.done() and self.error is None and not self.cancelled
+
+    def cancel(self):
+        """
+        stop after the block that is being written, the file doesn't get replaced
+        """
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        """
+        :param timeout: float, seconds to wait at most, None waits until the export is done
+        :return: bool, the export is done
+        """
+        # wait in slices, an Event.wait() without a timeout can't be interrupted on python 2
+        timeBefore = time.time()
+        while not self._finished.wait(0.1):
+            if timeout is not None and time.time() - timeBefore >= timeout:
+                break
+        if self.error is not None:
+            raise self.error
+        return self.done()
+
+
+def writeVertexFile(outputFile, block, fileFormat=None, dtype=numpy.float32, sparse=False, maxInfluences=None,
+                    compression=None):
+    """
+    write a vertex weight file, see readVertexFile()
+    :param outputFile: str, path of the weight file
+    :param block: WeightBlock, with vertexIds, meshVertexCount and optional softWeights
+    :param fileFormat: str, FORMAT_TEXT or FORMAT_BINARY, None picks it from the extension
+    :param dtype: numpy dtype of the binary weights, QUANTIZED needs the binary format
+    :param sparse: bool, store csr arrays instead of dense rows, binary files only
+    :param maxInfluences: int, keep only the biggest weights of each vertex and normalize, None keeps all
+    :param compression: str, one of COMPRESSIONS, binary files only
+    """
+    if (fileFormat or formatFromPath(outputFile)) != FORMAT_TEXT:
+        with openWeightWriter(outputFile, fileFormat, dtype, sparse, maxInfluences, compression) as writer:
+            writer.writeBlock(block)
+        return
+
+    if sparse:
+        raise ValueError('sparse weights need the binary format (%s)' % BINARY_EXTENSION)
+    if compression:
+        raise ValueError('compressed weights need the binary format (%s)' % BINARY_EXTENSION)
+    if numpy.dtype(dtype) == QUANTIZED:
+        raise ValueError('quantized weights need the binary format (%s)' % BINARY_EXTENSION)
+
+    weights = bSkinMath.pruneWeights(block.weights, maxInfluences)
+    rowFormat = _rowFormat(len(block.influences))
+    with _replacingFile(outputFile) as output:
+        output.write(_textBlockHeader(block.meshVertexCount, block.influences))
+        for i, row in enumerate(weights.tolist()):
+            softWeight = ''
+            if block.softWeights is not None:
+                softWeight = '%f:' % block.softWeights[i]
+            output.write('%d:%s%s\n' % (block.vertexIds[i], softWeight, rowFormat % tuple(row)))
+
+
+def convertWeightFile(inputFile, outputFile, fileFormat=None, dtype=numpy.float32, sparse=False, maxInfluences=None,
+                      compression=None, baseline=None, workers=None, processes=False):
+    """
+    convert a weight file between the text and binary formats
+    :param inputFile: str, weight file to read, format is detected
+    :param outputFile: str, weight file to write
+    :param fileFormat: str, format of outputFile, None picks it from the extension
+    :param dtype: numpy dtype of the binary weights
+    :param sparse: bool, store csr arrays instead of dense rows, binary files only
+    :param maxInfluences: int, keep only the biggest weights of each vertex and normalize, None keeps all
+    :param compression: str, one of COMPRESSIONS, binary files only
+    :param baseline: str, weight file to save a delta against, binary files only
+    :param workers: int, number of blocks encoded in parallel
+    :param processes: bool, encode in processes instead of threads
+    :return: int, number of converted objects
+    """
+    count = 0
+    with openWeightWriter(outputFile, fileFormat, dtype, sparse, maxInfluences,
+                          compression, baseline, workers, processes) as writer:
+        for block in readWeightFile(inputFile):
+            writer.writeBlock(block)
+            count += 1
+    return count
@@ -0,0 +1,202 @@
+"""
+=====================================================================
+    Weight math for bSkinSaver
+
+    All functions work on (vertices x influences) numpy arrays and
+    don't need Maya.
+
+=====================================================================
+"""
+
+import numpy
+
+
+NORMALIZE_THRESHOLD = 0.0001
+
+# 16 bit fixed point, a weight of 1.0 is stored as QUANTIZE_SCALE
+QUANTIZE_SCALE = 65535
+QUANTIZE_ROWS = 65536
+
+
+def expandColumns(weights, columns, influenceCount):
+    """
+    put the columns of weights into a wider zero matrix
+    :param weights: numpy.ndarray, (vertices x n) weights
+    :param columns: list(int), target column of each of the n columns
+    :param influenceCount: int, column count of the result
+    :return: numpy.ndarray, (vertices x influenceCount) weights
+    """
+    expanded = numpy.zeros((len(weights), influenceCount))
+    expanded[:, columns] = weights
+    return expanded
+
+
+def normalizeWeights(weights, lockMask=None, threshold=NORMALIZE_THRESHOLD):
+    """
+    scale the unlocked weights of each vertex so all weights sum up to 1, in place.
+    Vertices whose unlocked weights sum up to less than threshold are left as they are
+    :param weights: numpy.ndarray, (vertices x influences) float weights
+    :param lockMask: list(bool), True for each locked influence, None if nothing is locked
+    :param threshold: float, min sum of unlocked weights for a vertex to get normalized
+    :return: numpy.ndarray, weights
+    """
+    if lockMask is None:
+        lockMask = numpy.zeros(weights.shape[1], dtype=bool)
+    locked = numpy.asarray(lockMask, dtype=bool)
+
+    # without locks, scale whole rows instead of copying the unlocked columns out and back in
+    anyLocked = locked.any()
+    unlockedSum = weights[:, ~locked].sum(axis=1) if anyLocked else weights.sum(axis=1)
+    lockedSum = weights[:, locked].sum(axis=1) if anyLocked else numpy.zeros(len(weights))
+
+    scale = numpy.ones(len(weights))
+    valid = unlockedSum > threshold
+    scale[valid] = (1.0 - lockedSum[valid]) / unlockedSum[valid]
+
+    if anyLocked:
+        weights[:, ~locked] *= scale[:, numpy.newaxis]
+    else:
+        weights *= scale[:, numpy.newaxis]
+    return weights
+
+
+def blendWeights(weights, oldWeights, softWeights):
+    """
+    blend new weights with the old ones by soft selection weight, in place
+    :param weights: numpy.ndarray, (vertices x influences) new weights
+    :param oldWeights: numpy.ndarray, (vertices x influences) old weights
+    :param softWeights: numpy.ndarray, (vertices) soft selection weight, 1.0 takes the new weights
+    :return: numpy.ndarray, weights
+    """
+    softWeights = numpy.asarray(softWeights, dtype=weights.dtype)[:, numpy.newaxis]
+    weights *= softWeights
+    weights += oldWeights * (1.0 - softWeights)
+    return weights
+
+
+def mergeWeights(fileWeights, oldWeights, lockMask, softWeights=None, threshold=NORMALIZE_THRESHOLD):
+    """
+    merge loaded weights into the current ones: locked influences keep their old weights,
+    the others take the loaded weights and get normalized around the locked ones. With
+    soft selection weights the result is blended with the old weights afterwards
+    :param fileWeights: numpy.ndarray, (vertices x influences) loaded weights, zero for influences not in the file
+    :param oldWeights: numpy.ndarray, (vertices x influences) current weights, same columns as fileWeights
+    :param lockMask: list(bool), True for each locked influence
+    :param softWeights: numpy.ndarray, (vertices) soft selection weights, None for no blending
+    :param threshold: float, see normalizeWeights()
+    :return: numpy.ndarray, new (vertices x influences) float64 weights
+    """
+    locked = numpy.asarray(lockMask, dtype=bool)
+    oldWeights = numpy.asarray(oldWeights, dtype=numpy.float64)
+
+    weights = numpy.array(fileWeights, dtype=numpy.float64)
+    weights[:, locked] = oldWeights[:, locked]
+    normalizeWeights(weights, locked, threshold)
+
+    if softWeights is not None:
+        blendWeights(weights, oldWeights, softWeights)
+    return weights
+
+
+def pruneWeights(weights, maxInfluences, normalize=True):
+    """
+    keep only the biggest weights of each vertex
+    :param weights: numpy.ndarray, (vertices x influences) weights
+    :param maxInfluences: int, max number of non zero weights per vertex, None keeps all
+    :param normalize: bool, normalize the pruned vertices again
+    :return: numpy.ndarray, pruned copy of the weights, or weights itself if nothing needs pruning
+    """
+    influenceCount = weights.shape[1]
+    if maxInfluences is None or maxInfluences >= influenceCount:
+        return weights
+
+    weights = numpy.array(weights, dtype=numpy.float64)
+    dropped = numpy.argpartition(weights, influenceCount - maxInfluences, axis=1)[:, :influenceCount - maxInfluences]
+    weights[numpy.arange(len(weights))[:, numpy.newaxis], dropped] = 0.0
+
+    if normalize:
+        normalizeWeights(weights)
+    return weights
+
+
+def toCsr(weights):
+    """
+    sparse csr arrays of the non zero weights
+    :param weights: numpy.ndarray, (vertices x influences) weights
+    :return: tuple(numpy.ndarray), indptr (vertices + 1), influence indices and weights of the non zero entries
+    """
+    nonZero = weights != 0
+    indptr = numpy.zeros(len(weights) + 1, dtype=numpy.int64)
+    numpy.cumsum(nonZero.sum(axis=1), out=indptr[1:])
+    indices = numpy.nonzero(nonZero)[1]
+    return indptr, indices, weights[nonZero]
+
+
+def fromCsr(indptr, indices, data, influenceCount=None, out=None):
+    """
+    dense weights from csr arrays
+    :param indptr: numpy.ndarray, (vertices + 1) start of each vertex in indices and data
+    :param indices: numpy.ndarray, influence index of each entry
+    :param data: numpy.ndarray, weight of each entry
+    :param influenceCount: int, column count, not needed with out
+    :param out: numpy.ndarray, (vertices x influences) array to fill, None creates a new one
+    :return: numpy.ndarray, (vertices x influences) weights
+    """
+    vertexCount = len(indptr) - 1
+    if out is None:
+        out = numpy.zeros((vertexCount, influenceCount), dtype=data.dtype)
+    else:
+        out[:] = 0
+
+    rows = numpy.repeat(numpy.arange(vertexCount), numpy.diff(indptr))
+    out[rows, indices] = data
+    return out
+
+
+def quantizeWeights(weights, scale=QUANTIZE_SCALE):
+    """
+    16 bit fixed point weights. Each vertex is normalized and its weights get rounded so
+    they sum up to exactly scale: all are rounded down, then the ones with the biggest
+    remainders get rounded up. No weight moves by more than 1 / scale plus what the
+    normalization changes, zero weights stay zero and vertices without weights stay empty
+    :param weights: numpy.ndarray, (vertices x influences) weights
+    :param scale: int, fixed point value of a weight of 1.0, at most 65535
+    :return: tuple(numpy.ndarray, float), uint16 weights and the max difference to weights after dequantizing
+    """
+    quantized = numpy.zeros(weights.shape, dtype=numpy.uint16)
+    maxError = 0.0
+
+    # in slices of vertices, the sort below needs an int64 per weight
+    for start in range(0, len(weights), QUANTIZE_ROWS):
+        rows = numpy.asarray(weights[start:start + QUANTIZE_ROWS], dtype=numpy.float64)
+        rowSum = rows.sum(axis=1)
+        valid = rowSum > 0
+
+        scaled = numpy.zeros_like(rows)
+        scaled[valid] = rows[valid] * (scale / rowSum[valid])[:, numpy.newaxis]
+        rounded = numpy.floor(scaled)
+        missing = scale - rounded.sum(axis=1).astype(numpy.int64)
+        missing[~valid] = 0
+
+        order = numpy.argsort(rounded - scaled, axis=1)
+        roundUp = numpy.arange(rows.shape[1]) < missing[:, numpy.newaxis]
+        rounded[numpy.nonzero(roundUp)[0], order[roundUp]] += 1
+
+        quantized[start:start + len(rows)] = rounded
+        if len(rows):
+            maxError = max(maxError, float(numpy.abs(rounded / scale - rows).max()))
+    return quantized, maxError
+
+
+def dequantizeWeights(quantized, scale=QUANTIZE_SCALE, out=None):
+    """
+    float weights from quantizeWeights()
+    :param quantized: numpy.ndarray, uint16 weights
+    :param scale: int, fixed point value of a weight of 1.0
+    :param out: numpy.ndarray, float array of the same shape to fill, None creates a float32 one
+    :return: numpy.ndarray, float weights
+    """
+    if out is None:
+        out = numpy.empty(quantized.shape, dtype=numpy.float32)
+    numpy.multiply(quantized, 1.0 / scale, out=out)
+    return out
@@ -0,0 +1,186 @@
+"""
+=====================================================================
+    Left / right weight mirroring for bSkinSaver
+
+    Finds the mirrored vertex of every vertex by looking up its
+    position flipped across an axis (bSkinTransfer.PointIndex), and
+    the mirrored influence of every influence by its side prefix,
+    l_arm <-> r_arm like the joints of humanRig. Mirroring is then one
+    lookup of (mirrored vertices x mirrored influences) in the weight
+    matrix.
+
+    Symmetry maps are cached by a hash of the mesh topology, so
+    mirroring the same mesh again, or another mesh with the same
+    topology, skips the point lookup.
+
+    This module doesn't need Maya.
+
+=====================================================================
+"""
+
+import collections
+import hashlib
+
+import numpy
+
+import bSkinTransfer
+
+
+MIRROR_AXES = ('x', 'y', 'z')
+SIDE_PREFIXES = (('l_', 'r_'),)
+
+# how far a flipped vertex may be from its mirror, relative to the size of the mesh
+DEFAULT_TOLERANCE = 0.001
+
+SYMMETRY_CACHE_SIZE = 32
+
+# topology hash, axis, tolerance -> SymmetryMap, the least recently used goes first
+_symmetryCache = collections.OrderedDict()
+
+
+def mirrorName(name, sidePrefixes=SIDE_PREFIXES):
+    """
+    :param name: str, influence name
+    :param sidePrefixes: list(tuple(str, str)), pairs of prefixes that swap
+    :return: str, name with its side prefix swapped, name itself if it has none
+    """
+    for left, right in sidePrefixes:
+        if name.startswith(left):
+            return right + name[len(left):]
+        if name.startswith(right):
+            return left + name[len(right):]
+    return name
+
+
+def influenceMirrorMap(influences, sidePrefixes=SIDE_PREFIXES):
+    """
+    :param influences: list(str), influence names in column order
+    :param sidePrefixes: list(tuple(str, str)), pairs of prefixes that swap
+    :return: tuple, numpy.ndarray column of the mirrored influence of each column and list(str) of the
+             side influences whose mirror isn't an influence, those keep their own column
+    """
+    columns = dict((name, i) for i, name in reversed(list(enumerate(influences))))
+    mirrorColumns = numpy.arange(len(influences))
+    missing = []
+    for i, name in enumerate(influences):
+        mirrored = mirrorName(name, sidePrefixes)
+        if mirrored == name:
+            continue
+        if mirrored in columns:
+            mirrorColumns[i] = columns[mirrored]
+        else:
+            missing.append(name)
+    return mirrorColumns, missing
+
+
+def topologyHash(vertexCount, triangles=None, positions=None):
+    """
+    :param vertexCount: int, number of vertices
+    :param triangles: numpy.ndarray, (triangles x 3) vertex ids
+    :param positions: numpy.ndarray, (vertices x 3) positions, hashed instead if there are no triangles
+    :return: str, hex digest
+    """
+    digest = hashlib.sha1(str(int(vertexCount)).encode('ascii'))
+    if triangles is not None:
+        digest.update(numpy.ascontiguousarray(triangles, dtype='<i4').tobytes())
+    elif positions is not None:
+        digest.update(numpy.ascontiguousarray(positions, dtype='<f8').tobytes())
+    return digest.hexdigest()
+
+
+class SymmetryMap(object):
+    """
+    mirrored vertex of every vertex of a mesh and which side of the mirror plane it is on
+    """
+
+    def __init__(self, mirror, side, distances, axis):
+        """
+        :param mirror: numpy.ndarray, index of the mirrored vertex of each vertex
+        :param side: numpy.ndarray, int8, -1, 0 (on the mirror plane) or 1 for each vertex
+        :param distances: numpy.ndarray, distance of the flipped vertex to its mirror, inf if it has none
+        :param axis: str, one of MIRROR_AXES
+        """
+        self.mirror = mirror
+        self.side = side
+        self.distances = distances
+        self.axis = axis
+
+    @property
+    def matched(self):
+        # vertices that have a mirror within the tolerance
+        return numpy.isfinite(self.distances)
+
+    @property
+    def vertexCount(self):
+        return len(self.mirror)
+
+
+def symmetryMap(positions, triangles=None, axis='x', tolerance=DEFAULT_TOLERANCE, useScipy=True, cache=True):
+    """
+    :param positions: numpy.ndarray, (vertices x 3) positions in a symmetric pose
+    :param triangles: numpy.ndarray, (triangles x 3) vertex ids, used for the cache key
+    :param axis: str, one of MIRROR_AXES, the axis that gets flipped
+    :param tolerance: float, how far a flipped vertex may be from its mirror, relative to the
+                      biggest extent of the mesh
+    :param useScipy: bool, see bSkinTransfer.PointIndex
+    :param cache: bool, use and fill the cache of maps by topology
+    :return: SymmetryMap
+    """
+    if axis not in MIRROR_AXES:
+        raise ValueError('unknown mirror axis: %s, use one of %s' % (axis, ', '.join(MIRROR_AXES)))
+
+    positions = numpy.asarray(positions, dtype=numpy.float64).reshape(-1, 3)
+    key = (topologyHash(len(positions), triangles, positions), axis, tolerance)
+    if cache and key in _symmetryCache:
+        _symmetryCache[key] = _symmetryCache.pop(key)
+        return _symmetryCache[key]
+
+    axisIndex = MIRROR_AXES.index(axis)
+    maxDistance = tolerance * max(float((positions.max(axis=0) - positions.min(axis=0)).max()), 1e-9)
+
+    flipped = positions.copy()
+    flipped[:, axisIndex] *= -1
+    distances, mirror = bSkinTransfer.PointIndex(positions, useScipy).nearest(flipped)
+
+    unmatched = distances > maxDistance
+    distances[unmatched] = numpy.inf
+    mirror[unmatched] = numpy.flatnonzero(unmatched)
+
+    side = numpy.sign(positions[:, axisIndex]).astype(numpy.int8)
+    side[numpy.abs(positions[:, axisIndex]) <= maxDistance] = 0
+
+    result = SymmetryMap(mirror, side, distances, axis)
+    if cache:
+        _symmetryCache[key] = result
+        while len(_symmetryCache) > SYMMETRY_CACHE_SIZE:
+            _symmetryCache.popitem(last=False)
+    return result
+
+
+def clearSymmetryCache():
+    _symmetryCache.clear()
+
+
+def mirrorWeights(weights, symmetry, influenceColumns, positiveToNegative=True):
+    """
+    :param weights: numpy.ndarray, (vertices x influences) weights
+    :param symmetry: SymmetryMap, of the mesh
+    :param influenceColumns: numpy.ndarray, mirrored column of each column, see influenceMirrorMap()
+    :param positiveToNegative: bool, copy the weights of the positive side onto the negative side, or
+                               the other way around
+    :return: numpy.ndarray, new weights. Vertices on the mirror plane get the average of their weights
+             and the mirrored ones, vertices without a mirror keep theirs
+    """
+    if len(weights) != symmetry.vertexCount:
+        raise ValueError('the weights have %d vertices, the symmetry map %d' % (len(weights), symmetry.vertexCount))
+
+    matched = symmetry.matched
+    rows = numpy.flatnonzero(matched & (symmetry.side <= 0 if positiveToNegative else symmetry.side >= 0))
+    mirrored = weights[numpy.ix_(symmetry.mirror[rows], influenceColumns)]
+
+    center = symmetry.side[rows] == 0
+    mirrored[center] = (mirrored[center] + weights[rows[center]]) * 0.5
+
+    result = numpy.array(weights)
+    result[rows] = mirrored
+    return result
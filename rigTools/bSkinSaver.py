@@ -19,6 +19,7 @@ import maya.OpenMayaMPx as OpenMayaMPx
 import maya.OpenMaya as OpenMaya
 import maya.OpenMayaAnim as OpenMayaAnim
 import maya.mel
+import maya.utils
 import sys
 import maya.cmds as cmds
 import maya.OpenMayaUI as mui
@@ -26,6 +27,24 @@ from PySide import QtCore, QtGui
 import shiboken
 import os
 import time
+import itertools
+
+import numpy
+
+try:
+    import maya.api.OpenMaya as OpenMaya2
+    import maya.api.OpenMayaAnim as OpenMayaAnim2
+except ImportError:
+    # older Maya versions don't have the skinCluster function set in API 2.0
+    OpenMaya2 = OpenMayaAnim2 = None
+
+import bSkinFile
+import bSkinMath
+import bSkinMirror
+import bSkinSmooth
+import bSkinStats
+import bSkinTransfer
+import bSkinUndo
 
 def showUI():
     global mainWin
@@ -56,6 +75,7 @@ class bSkinSaverUI(QtGui.QDialog):
         self.saveObjectsButton = QtGui.QPushButton("Save Weights from selected Objects", parent=self)
         self.loadObjectsButton = QtGui.QPushButton("Load", parent=self)
         self.loadObjectsSelectionButton = QtGui.QPushButton("Load to Selected Object", parent=self)
+        self.saveObjectsInBackground = QtGui.QCheckBox("write the File in the Background", parent=self)
 
         objectsLayout = QtGui.QVBoxLayout(objectsTab)
         objectsLayout.setAlignment(QtCore.Qt.AlignTop)
@@ -70,6 +90,7 @@ class bSkinSaverUI(QtGui.QDialog):
         objectsButtonLayout.addWidget(self.saveObjectsButton)
         objectsButtonLayout.addWidget(self.loadObjectsButton)
         objectsButtonLayout.addWidget(self.loadObjectsSelectionButton)
+        objectsButtonLayout.addWidget(self.saveObjectsInBackground)
 
         objectsLayout.addLayout(objectsButtonLayout)
         
@@ -132,7 +153,7 @@ class bSkinSaverUI(QtGui.QDialog):
         bLoadSkinValues (True, str(self.objectsFileLine.text()))
         
     def saveObjects(self):
-        bSaveSkinValues(str(self.objectsFileLine.text()))
+        bSaveSkinValues(str(self.objectsFileLine.text()), background=self.saveObjectsInBackground.isChecked())
          
     def loadVertices(self):
         bLoadVertexSkinValues(str(self.verticesFileLine.text()), self.ignoreJointLocksWhenLoading.isChecked())
@@ -142,30 +163,532 @@ class bSkinSaverUI(QtGui.QDialog):
 
     
 
+class bSkinClusterCache(object):
+    """
+    shape / transform name -> skinCluster and deformed geometry path, built in one pass over
+    all skinClusters and all their output geometries. New skinClusters are added on the next
+    lookup, deleting a skinCluster or a new scene clears the cache. Call invalidate() after
+    changing skinCluster connections or renaming objects
+    """
+
+    def __init__(self):
+        self._entries = None
+        self._pending = []
+        self._callbackIds = []
+
+    def get(self, objectName):
+        """
+        :param objectName: str, partial path of a shape or its transform
+        :return: tuple(MObject, MDagPath), skinCluster and deformed geometry, None if not skinned
+        """
+        if self._entries is None:
+            self.build()
+        elif self._pending:
+            pending, self._pending = self._pending, []
+            for handle in pending:
+                if handle.isValid():
+                    self._add(handle.object())
+
+        entry = self._entries.get(objectName)
+        if entry is None or not entry[0].isValid():
+            return None
+        return entry[0].object(), entry[1]
+
+    def build(self):
+        self._entries = {}
+        self._pending = []
+        it = OpenMaya.MItDependencyNodes(OpenMaya.MFn.kSkinClusterFilter)
+        while not it.isDone():
+            self._add(it.item())
+            it.next()
+
+        if not self._callbackIds:
+            self._addCallbacks()
+
+    def invalidate(self, *args):
+        self._entries = None
+        self._pending = []
+
+    def removeCallbacks(self):
+        for callbackId in self._callbackIds:
+            OpenMaya.MMessage.removeCallback(callbackId)
+        self._callbackIds = []
+
+    def _add(self, skinCluster):
+        handle = OpenMaya.MObjectHandle(skinCluster)
+        fnSkinCluster = OpenMayaAnim.MFnSkinCluster(skinCluster)
+        for i in range(fnSkinCluster.numOutputConnections()):
+            geometryPath = OpenMaya.MDagPath()
+            fnSkinCluster.getPathAtIndex(fnSkinCluster.indexForOutputConnection(i), geometryPath)
+
+            fnGeometry = OpenMaya.MFnDagNode(geometryPath.node())
+            entry = (handle, geometryPath)
+            self._entries.setdefault(fnGeometry.partialPathName(), entry)
+            self._entries.setdefault(OpenMaya.MFnDagNode(fnGeometry.parent(0)).partialPathName(), entry)
+
+    def _nodeAdded(self, node, *args):
+        self._pending.append(OpenMaya.MObjectHandle(node))
+
+    def _addCallbacks(self):
+        self._callbackIds = [
+            OpenMaya.MDGMessage.addNodeAddedCallback(self._nodeAdded, 'skinCluster'),
+            OpenMaya.MDGMessage.addNodeRemovedCallback(self.invalidate, 'skinCluster'),
+            OpenMaya.MSceneMessage.addCallback(OpenMaya.MSceneMessage.kAfterNew, self.invalidate),
+            OpenMaya.MSceneMessage.addCallback(OpenMaya.MSceneMessage.kAfterOpen, self.invalidate)]
+
+
+bSkinClusters = bSkinClusterCache()
+
+
 bSkinPath = OpenMaya.MDagPath()
+@bSkinStats.timed('findSkinCluster')
 def bFindSkinCluster(objectName):    
-    it = OpenMaya.MItDependencyNodes(OpenMaya.MFn.kSkinClusterFilter)
-    while not it.isDone():
-        fnSkinCluster = OpenMayaAnim.MFnSkinCluster(it.item())
-        fnSkinCluster.getPathAtIndex(0,bSkinPath)
-                
-        if OpenMaya.MFnDagNode(bSkinPath.node()).partialPathName() == objectName or OpenMaya.MFnDagNode(OpenMaya.MFnDagNode(bSkinPath.node()).parent(0)).partialPathName() == objectName:
-            return it.item()
-        it.next()
-    return False
+    # the skinCluster of a shape or transform, also sets bSkinPath to the skinned geometry
+    entry = bSkinClusters.get(objectName)
+    if entry is None:
+        return False
+
+    bSkinPath.set(entry[1])
+    return entry[0]
+
+
+class bInfluenceIndex(object):
+    """
+    short name -> MDagPath of every joint in the scene, built once per load
+    so looking up the file joints doesn't walk all scene joints again
+    """
+
+    @bSkinStats.timed('influences')
+    def __init__(self):
+        self.paths = {}
+        it = OpenMaya.MItDependencyNodes(OpenMaya.MFn.kJoint)
+        while not it.isDone():
+            dagPath = OpenMaya.MDagPath()
+            OpenMaya.MDagPath.getAPathTo(it.item(), dagPath)
+            self.paths.setdefault(str(dagPath.fullPathName()).split('|')[-1], dagPath)
+            it.next()
+
+    def __contains__(self, name):
+        return str(name) in self.paths
+
+    def get(self, name):
+        return self.paths.get(str(name))
+
+    def missing(self, names):
+        return [name for name in names if name not in self]
+
+
+def bNameIndex(names):
+    # name -> index of its first appearance
+    indices = {}
+    for i, name in enumerate(names):
+        indices.setdefault(name, i)
+    return indices
+
+
+def bToNumpy(mArray, dtype=numpy.float64):
+    # MFloatArray / MDoubleArray / MIntArray -> flat numpy array
+    return numpy.array(mArray[0:mArray.length()], dtype=dtype)
+
+
+def bToMDoubleArray(values):
+    # numpy array -> MDoubleArray in one call instead of appending per element
+    values = numpy.ascontiguousarray(values, dtype=numpy.float64).ravel()
+    scriptUtil = OpenMaya.MScriptUtil()
+    scriptUtil.createFromList(values.tolist(), len(values))
+    return OpenMaya.MDoubleArray(scriptUtil.asDoublePtr(), len(values))
+
+
+def bToMIntArray(values):
+    values = numpy.asarray(values, dtype=numpy.int32).ravel().tolist()
+    scriptUtil = OpenMaya.MScriptUtil()
+    scriptUtil.createFromList(values, len(values))
+    return OpenMaya.MIntArray(scriptUtil.asIntPtr(), len(values))
+
+
+# memory the old and new weights of one bBatchEdit may take for undo, past it the weights aren't undoable
+UNDO_MAX_BYTES = 256 * 1024 * 1024
+
+
+class bBatchEdit(object):
+    """
+    context for edits on many objects: everything in one undo chunk, the viewport isn't
+    refreshed until the end and the selection is put back as it was. Weights set through
+    the API aren't undoable, so the backends record their old and new weights here, as
+    float32 csr arrays of the non zero weights, and they go into the chunk as one bSkinUndo
+    command. Edits that would take more than UNDO_MAX_BYTES aren't recorded at all
+    """
+
+    # the open context that records weights, None if there is none or undo is off
+    current = None
+
+    def __enter__(self):
+        self._selection = OpenMaya.MSelectionList()
+        OpenMaya.MGlobal.getActiveSelectionList(self._selection)
+        self._edits = []
+        self._bytes = 0
+        self._outer = bBatchEdit.current
+        if cmds.undoInfo(query=True, state=True):
+            bBatchEdit.current = self
+        cmds.undoInfo(openChunk=True)
+        cmds.refresh(suspend=True)
+        return self
+
+    def record(self, backend, skinCluster, skinPath, vertexIds, start, oldIndices, oldWeights, newIndices, newWeights):
+        """
+        keep a setWeights call for undo, see bApi1Backend.setWeights() for the parameters
+        :param oldIndices: list(int), influences of oldWeights
+        :param oldWeights: numpy.ndarray, weights before the call
+        :param newIndices: list(int), influences of newWeights
+        :param newWeights: numpy.ndarray, weights that were set
+        """
+        oldValues = bCompactWeights(oldIndices, oldWeights)
+        newValues = bCompactWeights(newIndices, newWeights)
+        self._bytes += sum(array.nbytes for array in oldValues[1:] + newValues[1:])
+        if vertexIds is not None:
+            vertexIds = numpy.array(vertexIds, dtype=numpy.int32)
+            self._bytes += vertexIds.nbytes
+        if self._bytes > UNDO_MAX_BYTES:
+            print 'the weights take more than', UNDO_MAX_BYTES // (1024 * 1024), 'MB for undo - they can\'t be undone.'
+            self._edits = []
+            bBatchEdit.current = self._outer
+            return
+
+        # by name, undo and redo can give the nodes new MObjects
+        self._edits.append((backend, OpenMaya.MFnDependencyNode(skinCluster).name(), skinPath.fullPathName(),
+                            vertexIds, start, oldValues, newValues))
+
+    def __exit__(self, *args):
+        bBatchEdit.current = self._outer
+        try:
+            if self._edits:
+                edits, self._edits = self._edits, []
+                bSkinUndo.push(lambda: bReplayWeights(reversed(edits), old=True),
+                               lambda: bReplayWeights(edits, old=False))
+        finally:
+            cmds.refresh(suspend=False)
+            cmds.undoInfo(closeChunk=True)
+            OpenMaya.MGlobal.setActiveSelectionList(self._selection)
+            cmds.refresh()
+
+
+def bCompactWeights(influenceIndices, weights):
+    # influences and float32 csr arrays of the non zero weights, what bBatchEdit keeps for undo
+    indptr, indices, data = bSkinMath.toCsr(numpy.asarray(weights))
+    return list(influenceIndices), indptr.astype(numpy.int32), indices.astype(numpy.int32), data.astype(numpy.float32)
+
+
+def bReplayWeights(edits, old):
+    # set the old or the new weights of edits recorded by bBatchEdit again
+    for backend, skinClusterName, skinPathName, vertexIds, start, oldValues, newValues in edits:
+        influenceIndices, indptr, indices, data = oldValues if old else newValues
+        weights = bSkinMath.fromCsr(indptr, indices, data.astype(numpy.float64), len(influenceIndices))
+        selectionList = OpenMaya.MSelectionList()
+        selectionList.add(skinClusterName)
+        selectionList.add(skinPathName)
+        skinCluster = OpenMaya.MObject()
+        selectionList.getDependNode(0, skinCluster)
+        skinPath = OpenMaya.MDagPath()
+        selectionList.getDagPath(1, skinPath)
+        backend.setWeights(skinCluster, skinPath, weights, influenceIndices, vertexIds=vertexIds, start=start)
+
+
+
+@bSkinStats.timed('influences')
+def bInfluenceNames(skinCluster):
+    # influences of a skinCluster in index order, without path and namespace
+    influenceArray = OpenMaya.MDagPathArray()
+    OpenMayaAnim.MFnSkinCluster(skinCluster).influenceObjects(influenceArray)
+    return [str(influenceArray[k].fullPathName()).split('|')[-1].split(':')[-1]
+            for k in range(influenceArray.length())]
+
+
+@bSkinStats.timed('influences')
+def bInfluenceLocks(skinCluster):
+    # lockInfluenceWeights of the influences of a skinCluster in index order
+    influenceArray = OpenMaya.MDagPathArray()
+    OpenMayaAnim.MFnSkinCluster(skinCluster).influenceObjects(influenceArray)
+    return [bool(cmds.getAttr('%s.liw' % influenceArray[k].partialPathName())) for k in range(influenceArray.length())]
+
+
+def bSelectedObjectNames():
+    # partial path names of the selected dag objects
+    selection = OpenMaya.MSelectionList()
+    OpenMaya.MGlobal.getActiveSelectionList(selection)
+    objectNames = []
+    for i in range(selection.length()):
+        node = OpenMaya.MDagPath()
+        selection.getDagPath(i, node)
+        objectNames.append(OpenMaya.MFnDagNode(node).partialPathName())
+    return objectNames
+
+
+@bSkinStats.timed('mesh')
+def bMeshPositions(meshPath):
+    # world space vertex positions of a mesh, (vertices x 3)
+    if OpenMaya2 is not None:
+        # API 2.0 arrays are sequences of 4 doubles per point, numpy reads them without a python loop
+        selection = OpenMaya2.MSelectionList()
+        selection.add(meshPath.fullPathName())
+        points = OpenMaya2.MFnMesh(selection.getDagPath(0)).getPoints(OpenMaya2.MSpace.kWorld)
+        return numpy.array(points, dtype=numpy.float64).reshape(-1, 4)[:, :3]
+
+    points = OpenMaya.MPointArray()
+    OpenMaya.MFnMesh(meshPath).getPoints(points, OpenMaya.MSpace.kWorld)
+    return numpy.array([(points[i].x, points[i].y, points[i].z) for i in range(points.length())]).reshape(-1, 3)
+
+
+@bSkinStats.timed('mesh')
+def bMeshTriangles(meshPath):
+    # vertex ids of the triangles of a mesh, (triangles x 3)
+    triangleCounts = OpenMaya.MIntArray()
+    triangleVertices = OpenMaya.MIntArray()
+    OpenMaya.MFnMesh(meshPath).getTriangles(triangleCounts, triangleVertices)
+    return bToNumpy(triangleVertices, numpy.int32).reshape(-1, 3)
+
+
+@bSkinStats.timed('transfer')
+def bTransferWeights(block, objectName, targetPositions, transferMode):
+    # weights of a block saved with positions, mapped onto the vertices of objectName at targetPositions
+    if block.positions is None:
+        print objectName, ": the file has no vertex positions to transfer from, save it with savePositions - skipping."
+        return None
+
+    weights, distances = bSkinTransfer.transferWeights(block.positions, block.weights, targetPositions,
+                                                       block.triangles, transferMode)
+    print objectName, ': transferred', len(block.weights), 'saved vertices to', len(weights), \
+        'vertices, the furthest one is', distances.max(), 'away from the saved mesh'
+    return weights
+
+
+def bGeometryPath(objectName):
+    # path of the (deformed) shape of a shape or its transform, skinned or not
+    entry = bSkinClusters.get(objectName)
+    if entry is not None:
+        return OpenMaya.MDagPath(entry[1])
+
+    selectionList = OpenMaya.MSelectionList()
+    selectionList.add(objectName)
+    geometryPath = OpenMaya.MDagPath()
+    selectionList.getDagPath(0, geometryPath)
+    if geometryPath.hasFn(OpenMaya.MFn.kShape):
+        return geometryPath
+
+    # the shape that isn't intermediate, a deformed transform also has an orig shape below it
+    fnTransform = OpenMaya.MFnDagNode(geometryPath)
+    for i in range(fnTransform.childCount()):
+        child = fnTransform.child(i)
+        if child.hasFn(OpenMaya.MFn.kShape) and not OpenMaya.MFnDagNode(child).isIntermediateObject():
+            geometryPath.push(child)
+            return geometryPath
+    raise RuntimeError('%s has no shape' % objectName)
+
+
+def bVertexComponent(skinPath, start, count):
+    # component with the vertices (or cvs) start .. start+count-1 of the skinned shape
+    node = skinPath.node()
+    if node.apiType() == OpenMaya.MFn.kNurbsSurface:
+        fnSurface = OpenMaya.MFnNurbsSurface(node)
+        cvsV = fnSurface.numCVsInV()
+        if fnSurface.formInV() == 3:
+            cvsV -= 3
+
+        fnVtxCompDouble = OpenMaya.MFnDoubleIndexedComponent()
+        vtxComponents = fnVtxCompDouble.create( OpenMaya.MFn.kSurfaceCVComponent )
+        for i in range(start, start + count):
+            fnVtxCompDouble.addElement(i // cvsV, i % cvsV)
+        return vtxComponents
+
+    fnVtxComp = OpenMaya.MFnSingleIndexedComponent()
+    if node.apiType() == OpenMaya.MFn.kNurbsCurve:
+        vtxComponents = fnVtxComp.create( OpenMaya.MFn.kCurveCVComponent )
+    else:
+        vtxComponents = fnVtxComp.create( OpenMaya.MFn.kMeshVertComponent )
+    fnVtxComp.addElements(bToMIntArray(range(start, start + count)))
+    return vtxComponents
 
 
+BACKEND_API1 = 'api1'
+BACKEND_API2 = 'api2'
+BACKENDS = (BACKEND_API1, BACKEND_API2)
 
-def bLoadVertexSkinValues(inputFile, ignoreJointLocks):
+
+class bApi1Backend(object):
+    """
+    skinCluster weights as numpy arrays through API 1.0: MScriptUtil pointers and
+    python lists on the way in and out of the Maya arrays
+    """
+    name = BACKEND_API1
+
+    @bSkinStats.timed('getWeights')
+    def getWeights(self, skinCluster, skinPath, vertexIds=None, dtype=numpy.float64, start=0, count=None):
+        """
+        :param skinCluster: MObject, skinCluster
+        :param skinPath: MDagPath, its deformed geometry
+        :param vertexIds: numpy.ndarray, vertices to get, None gets all
+        :param dtype: numpy.dtype, numpy.float32 reads them through an MFloatArray
+        :param start: int, first vertex to get if there are no vertexIds
+        :param count: int, vertices to get from start on, None for the rest of them
+        :return: numpy.ndarray, (vertices x influences) weights
+        """
+        if count is None and start:
+            count = OpenMaya.MItGeometry(skinPath).count() - start
+        vtxComponents, vertexCount = self._components(skinPath, vertexIds, start, count)
+        weightArray = OpenMaya.MFloatArray() if dtype == numpy.float32 else OpenMaya.MDoubleArray()
+        scriptUtil = OpenMaya.MScriptUtil()
+        infCountPtr = scriptUtil.asUintPtr()
+        OpenMayaAnim.MFnSkinCluster(skinCluster).getWeights(skinPath, vtxComponents, weightArray, infCountPtr)
+        return bToNumpy(weightArray, dtype).reshape(vertexCount, OpenMaya.MScriptUtil.getUint(infCountPtr))
+
+    @bSkinStats.timed('setWeights')
+    def setWeights(self, skinCluster, skinPath, weights, influenceIndices, vertexIds=None, start=0):
+        """
+        :param skinCluster: MObject, skinCluster
+        :param skinPath: MDagPath, its deformed geometry
+        :param weights: numpy.ndarray, (vertices x len(influenceIndices)) weights
+        :param influenceIndices: list(int), index of the influence of each column in the skinCluster
+        :param vertexIds: numpy.ndarray, vertex of each row, None for the vertices from start on
+        :param start: int, vertex of the first row if there are no vertexIds
+        """
+        vtxComponents = self._components(skinPath, vertexIds, start, len(weights))[0]
+        fnSkinCluster = OpenMayaAnim.MFnSkinCluster(skinCluster)
+        influenceArray = bToMIntArray(influenceIndices)
+        weightArray = bToMDoubleArray(weights)
+        batchEdit = bBatchEdit.current
+        if batchEdit is None:
+            fnSkinCluster.setWeights(skinPath, vtxComponents, influenceArray, weightArray, 0)
+            return
+
+        oldValues = OpenMaya.MDoubleArray()
+        fnSkinCluster.setWeights(skinPath, vtxComponents, influenceArray, weightArray, 0, oldValues)
+        bRecordWeights(batchEdit, self, skinCluster, skinPath, influenceIndices, vertexIds, start,
+                       bToNumpy(oldValues), weights)
+
+    def _components(self, skinPath, vertexIds, start=0, count=None):
+        if vertexIds is None:
+            if count is None:
+                count = OpenMaya.MItGeometry(skinPath).count()
+            return bVertexComponent(skinPath, start, count), count
+
+        fnVtxComp = OpenMaya.MFnSingleIndexedComponent()
+        vtxComponents = fnVtxComp.create( OpenMaya.MFn.kMeshVertComponent )
+        fnVtxComp.addElements(bToMIntArray(vertexIds))
+        return vtxComponents, len(vertexIds)
+
+
+class bApi2Backend(object):
+    """
+    skinCluster weights as numpy arrays through API 2.0, whose arrays are built from and read
+    as whole python sequences, and whose components take all vertices in one call
+    """
+    name = BACKEND_API2
+
+    def __init__(self):
+        if OpenMayaAnim2 is None:
+            raise ValueError('this Maya has no skinCluster function set in API 2.0, use %s' % BACKEND_API1)
+
+    @bSkinStats.timed('getWeights')
+    def getWeights(self, skinCluster, skinPath, vertexIds=None, dtype=numpy.float64, start=0, count=None):
+        """
+        see bApi1Backend.getWeights()
+        """
+        fnSkinCluster, dagPath = self._api2Objects(skinCluster, skinPath)
+        if count is None and start:
+            count = OpenMaya2.MItGeometry(dagPath).count() - start
+        vtxComponents, vertexCount = self._components(dagPath, vertexIds, start, count)
+        weightArray, infCount = fnSkinCluster.getWeights(dagPath, vtxComponents)
+        return numpy.fromiter(weightArray, dtype, len(weightArray)).reshape(vertexCount, infCount)
+
+    @bSkinStats.timed('setWeights')
+    def setWeights(self, skinCluster, skinPath, weights, influenceIndices, vertexIds=None, start=0):
+        """
+        see bApi1Backend.setWeights()
+        """
+        fnSkinCluster, dagPath = self._api2Objects(skinCluster, skinPath)
+        vtxComponents = self._components(dagPath, vertexIds, start, len(weights))[0]
+        influenceArray = OpenMaya2.MIntArray(numpy.asarray(influenceIndices, dtype=numpy.int32).tolist())
+        weightArray = OpenMaya2.MDoubleArray(numpy.asarray(weights, dtype=numpy.float64).ravel().tolist())
+        batchEdit = bBatchEdit.current
+        oldValues = fnSkinCluster.setWeights(dagPath, vtxComponents, influenceArray, weightArray, False,
+                                             returnOldWeights=batchEdit is not None)
+        if batchEdit is not None:
+            bRecordWeights(batchEdit, self, skinCluster, skinPath, influenceIndices, vertexIds, start,
+                           numpy.fromiter(oldValues, numpy.float64, len(oldValues)), weights)
+
+    def _api2Objects(self, skinCluster, skinPath):
+        # the same skinCluster and geometry in API 2.0
+        selection = OpenMaya2.MSelectionList()
+        selection.add(OpenMaya.MFnDependencyNode(skinCluster).name())
+        selection.add(skinPath.fullPathName())
+        return OpenMayaAnim2.MFnSkinCluster(selection.getDependNode(0)), selection.getDagPath(1)
+
+    def _components(self, dagPath, vertexIds, start=0, count=None):
+        apiType = dagPath.apiType()
+        if vertexIds is None:
+            allVertices = count is None
+            if allVertices:
+                count = OpenMaya2.MItGeometry(dagPath).count()
+            vertexIds = numpy.arange(start, start + count)
+        else:
+            allVertices = False
+            vertexIds = numpy.asarray(vertexIds)
+
+        if apiType == OpenMaya2.MFn.kNurbsSurface:
+            fnSurface = OpenMaya2.MFnNurbsSurface(dagPath)
+            cvsV = fnSurface.numCVsInV
+            if fnSurface.formInV == OpenMaya2.MFnNurbsSurface.kPeriodic:
+                cvsV -= 3
+            fnVtxComp = OpenMaya2.MFnDoubleIndexedComponent()
+            vtxComponents = fnVtxComp.create(OpenMaya2.MFn.kSurfaceCVComponent)
+            fnVtxComp.addElements(numpy.stack([vertexIds // cvsV, vertexIds % cvsV], axis=1).tolist())
+            return vtxComponents, len(vertexIds)
+
+        fnVtxComp = OpenMaya2.MFnSingleIndexedComponent()
+        if apiType == OpenMaya2.MFn.kNurbsCurve:
+            vtxComponents = fnVtxComp.create(OpenMaya2.MFn.kCurveCVComponent)
+        else:
+            vtxComponents = fnVtxComp.create(OpenMaya2.MFn.kMeshVertComponent)
+        if allVertices:
+            fnVtxComp.setCompleteData(count)
+        else:
+            fnVtxComp.addElements(vertexIds.tolist())
+        return vtxComponents, len(vertexIds)
+
+
+def bRecordWeights(batchEdit, backend, skinCluster, skinPath, influenceIndices, vertexIds, start, oldValues, weights):
+    # the old values are of the influences that were set, or of all influences
+    oldWeights = oldValues.reshape(len(weights), -1)
+    oldIndices = influenceIndices if oldWeights.shape[1] == len(influenceIndices) else range(oldWeights.shape[1])
+    batchEdit.record(backend, skinCluster, skinPath, vertexIds, start, oldIndices, oldWeights, influenceIndices, weights)
+
+
+def bGetBackend(backend=None):
+    """
+    :param backend: str, one of BACKENDS, None for BACKEND_API1
+    :return: bApi1Backend or bApi2Backend
+    """
+    if backend is None or backend == BACKEND_API1:
+        return bApi1Backend()
+    if backend == BACKEND_API2:
+        return bApi2Backend()
+    raise ValueError('unknown backend: %s, use one of %s' % (backend, ', '.join(BACKENDS)))
+
+
+
+@bSkinStats.recorded('loadVertex')
+def bLoadVertexSkinValues(inputFile, ignoreJointLocks, transferMode=None, backend=None):
+    """
+    :param inputFile: str, vertex weight file of any format
+    :param ignoreJointLocks: bool, overwrite the weights of locked joints too
+    :param transferMode: str, bSkinTransfer.TRANSFER_NEAREST or TRANSFER_BARYCENTRIC to map the saved
+                         vertices onto the selected vertices (all if none are selected) by position,
+                         for meshes whose topology changed. Needs a file saved with savePositions
+    :param backend: str, one of BACKENDS to get and set the weights with, None for BACKEND_API1
+    """
     timeBefore = time.time()
+    bSkinStats.annotate(file=inputFile, backend=backend or BACKEND_API1)
 
-    line = ''
-    fileJoints = []
-    weights = []
-    splittedStrings = []
-    splittedWeights = []
     selectionList = OpenMaya.MSelectionList()
-    vertexCount = 0;
 
     OpenMaya.MGlobal.getActiveSelectionList( selectionList );
     node = OpenMaya.MDagPath()
@@ -188,71 +711,46 @@ def bLoadVertexSkinValues(inputFile, ignoreJointLocks):
         print 'select a skinned object'
 
     fnSkinCluster = OpenMayaAnim.MFnSkinCluster(skinCluster)
-    input = open(inputFile, 'r')
 
-    fileJoints = []
-    weightLines = []
-    filePosition = 0
-    
-    # getting the weightLines
+    # reading the file
     #
-    fileWeightFloats = []
-    fnVtxComp = OpenMaya.MFnSingleIndexedComponent()
-    vtxComponents = OpenMaya.MObject();
-    vtxComponents = fnVtxComp.create( OpenMaya.MFn.kMeshVertComponent );
+    with bSkinStats.phase('parse'):
+        fileBlock = bSkinFile.readVertexFile(inputFile)
+    bSkinStats.count('bytes', os.path.getsize(inputFile))
+    meshVertexCount = OpenMaya.MItGeometry(node).count()
+    if transferMode is not None:
+        selectedVertices = bSelectedVertices(softSelection=False)
+        vertexIds = selectedVertices[1] if selectedVertices is not None else numpy.arange(meshVertexCount)
+        positions = bMeshPositions(bGeometryPath(objectName))[vertexIds]
+        weights = bTransferWeights(fileBlock, objectName, positions, transferMode)
+        if weights is None:
+            return
+
+        softWeights = None
+        if fileBlock.softWeights is not None:
+            # soft selection goes with the closest saved vertex
+            softWeights = bSkinTransfer.transferWeights(fileBlock.positions, fileBlock.softWeights[:, numpy.newaxis],
+                                                        positions,
+                                                        mode=bSkinTransfer.TRANSFER_NEAREST)[0][:, 0]
+        fileBlock = bSkinFile.WeightBlock(fileBlock.name, fileBlock.influences, weights,
+                                          vertexIds=numpy.array(vertexIds), softWeights=softWeights,
+                                          meshVertexCount=meshVertexCount)
+
+    elif meshVertexCount != fileBlock.meshVertexCount:
+        print "vertex counts don't match!"
+        return
 
-    bindVertCount = 0
-    didCheckSoftSelection = False    
-    while True:
-        line = input.readline().strip()
-        if not line:
-            break
+    fileJoints = fileBlock.influences
+    bindVertCount = fileBlock.vertexCount
+    bSkinStats.count('objects')
+    bSkinStats.count('vertices', bindVertCount)
+    bSkinStats.count('influences', len(fileJoints))
+    doSoftSelection = fileBlock.softWeights is not None
+    softWeights = fileBlock.softWeights
 
-        if filePosition == 0:
-            vertexCount = int(line)
-            if OpenMaya.MItGeometry(node).count() != vertexCount:
-                print "vertex counts don't match!"
-                return
-            filePosition = 1
-            
-        elif filePosition == 1:
-            if not line.startswith("========"):
-                fileJoints.append(line)
-            else:
-                filePosition = 2
-                
-        elif filePosition == 2:
-            splittedStrings = line.split(':')
-
-            # do we have softselection?
-            if not didCheckSoftSelection:
-                if len(splittedStrings) == 3:
-                    weightsIndex = 2
-                    doSoftSelection = True
-                    softWeights = [1.0] * bindVertCount
-                else:
-                    weightsIndex = 1
-                    doSoftSelection=False    
-                didCheckSoftSelection = True
-
-            # vertId
-            vertId = int(splittedStrings[0])
-            fnVtxComp.addElement(vertId)
-
-            #softselection
-            if doSoftSelection:
-                softWeights.append(float(splittedStrings[1]))
-
-            # weights
-            splittedWeights = splittedStrings[weightsIndex].split(' ')
-            fileWeightFloats.append(map(float, splittedWeights) )
-
-            #for k in range(len(fileJoints)):
-            #    fileWeightFloats[bindVertCount].append(float(splittedWeights[k]))
-
-            bindVertCount += 1
-    
-    #print 'fileWeightFloats: ', fileWeightFloats
+    fnVtxComp = OpenMaya.MFnSingleIndexedComponent()
+    vtxComponents = fnVtxComp.create( OpenMaya.MFn.kMeshVertComponent );
+    fnVtxComp.addElements(bToMIntArray(fileBlock.vertexIds))
 
 
     # getting mayaJoints
@@ -267,36 +765,25 @@ def bLoadVertexSkinValues(inputFile, ignoreJointLocks):
 
     # getting old weights
     #
-    oldWeightDoubles = OpenMaya.MDoubleArray()
-    scriptUtil = OpenMaya.MScriptUtil()
-    infCountPtr = scriptUtil.asUintPtr()
-    fnSkinCluster.getWeights(bSkinPath, vtxComponents, oldWeightDoubles, infCountPtr)
+    backend = bGetBackend(backend)
+    oldWeights = backend.getWeights(skinCluster, bSkinPath, fileBlock.vertexIds)
 
 
     # making allJoints
     #
+    mayaJointIndices = bNameIndex(mayaJoints)
+    fileJointSet = set(fileJoints)
     allJoints = list(fileJoints)
     for mayaJoint in mayaJoints:
-        if mayaJoint not in fileJoints:
+        if mayaJoint not in fileJointSet:
             allJoints.append(mayaJoint)
             
         
 
-    # mapping joints and making sure we have all joints in the skinCluster
+    # making sure we have all joints in the skinCluster
     #
-    allInfluencesInScene = True
-    missingInfluencesList = []
-    for i in range(len(fileJoints)):
-        influenceInScene = False
-        for k in range(len(mayaJoints)):
-            if mayaJoints[k] == fileJoints[i]:
-                influenceInScene = True
-
-        if not influenceInScene:
-            allInfluencesInScene = False
-            missingInfluencesList.append(fileJoints[i])
-
-    if not allInfluencesInScene:
+    missingInfluencesList = [joint for joint in fileJoints if joint not in mayaJointIndices]
+    if missingInfluencesList:
         print 'There are influences missing:', missingInfluencesList
         return
 
@@ -304,12 +791,7 @@ def bLoadVertexSkinValues(inputFile, ignoreJointLocks):
     
     # getting allExistInMaya 
     #
-    allExistInMaya = [-1] * len(allJoints)
-    for i in range(len(allJoints)):
-        for k in range(len(mayaJoints)):
-            if allJoints[i] == mayaJoints[k]:
-                allExistInMaya[i] = k
-                break
+    allExistInMaya = [mayaJointIndices.get(joint, -1) for joint in allJoints]
     
     #print 'allExistInMaya: ', allExistInMaya
 
@@ -322,80 +804,21 @@ def bLoadVertexSkinValues(inputFile, ignoreJointLocks):
 
 
 
-    weightDoubles = OpenMaya.MDoubleArray(0)
-
-    # copy weights from fileWeightFloats and oldWeightDoubles into weightDoubles (include joint locks) and softWeights lists
+    # merge the file weights with oldWeights (include joint locks), normalize and blend with softWeights
     #
     print 'bindVertCount: ', bindVertCount
-    for i in range(bindVertCount):
-        for k in range(len(allJoints)):
-
-            # fileJoints:
-            #
-            if k < len(fileJoints):
-                if not allLocks[k]:
-                    weightDoubles.append(fileWeightFloats[i][k])        #weightDoubles[k + len(allJoints) * i] = fileWeightFloats[i][k]
-                else:
-                    if allExistInMaya[k]:
-                        weightDoubles.append(oldWeightDoubles[allExistInMaya[k] + len(mayaJoints) * i])
-                    else:
-                        weightDoubles.append(0)
-                        
-            # mayaJoints       
-            #
-            else: 
-                if not allLocks[k]:
-                    weightDoubles.append(0)     
-                else:   
-                    if allExistInMaya[k]:
-                        weightDoubles.append(oldWeightDoubles[allExistInMaya[k] + len(mayaJoints) * i])
-                    else:
-                        weightDoubles.append(0)
-
-     
-    # normalize
-    #
-    for i in range(bindVertCount):
-        sumA = 0
-        sumB = 0
-        for inf in range(len(allJoints)):
-            if not allLocks[inf]:
-                sumA += weightDoubles[inf + i*len(allJoints)]
-            else:
-                sumB += weightDoubles[inf + i*len(allJoints)]
+    oldWeights = oldWeights[:, allExistInMaya]
+    fileWeights = bSkinMath.expandColumns(fileBlock.weights, range(len(fileJoints)), len(allJoints))
 
-        if sumA > 0.0001:
-            sumADenom = 1 / sumA
-            for inf in range(len(allJoints)):
-                if not allLocks[inf]:
-                    weightDoubles[inf + i*len(allJoints)] *= sumADenom * (1-sumB)
-    
-    
-    # soft selection
-    #
-    if doSoftSelection:
-        for i in range(bindVertCount):
-            for inf in range(len(allExistInMaya)):
-                index = inf + i*len(allExistInMaya)
-                oldWeights = oldWeightDoubles[allExistInMaya[inf] + len(mayaJoints) * i]
-                
-                weightDoubles[index] = weightDoubles[index] * softWeights[i] + oldWeights * (1.0-softWeights[i])
+    with bSkinStats.phase('normalize'):
+        weights = bSkinMath.mergeWeights(fileWeights, oldWeights, allLocks, softWeights)
     
     
 
     #SET WEIGHTS 
     #
-    allJointsIndices = OpenMaya.MIntArray(len(allExistInMaya))
-    for i in range(len(allExistInMaya)):
-        allJointsIndices[i] = allExistInMaya[i]
-    
-    #print 'mayaJoints: ', mayaJoints
-    #print 'allJointsIndices: ', allJointsIndices
-    #print 'allJoints: ', allJoints
-    #print 'weightDoubles before: ', weightDoubles
-    
     print 'setting weights...'
-    fnSkinCluster.setWeights(bSkinPath, vtxComponents, allJointsIndices, weightDoubles, 0)
+    backend.setWeights(skinCluster, bSkinPath, weights, allExistInMaya, vertexIds=fileBlock.vertexIds)
 
     # select the vertices
     #
@@ -408,117 +831,247 @@ def bLoadVertexSkinValues(inputFile, ignoreJointLocks):
     
     
 
-def vertexToId(vertex):
-    return int(vertex.split('[')[1].split(']')[0])
+@bSkinStats.timed('selection')
+def bSelectedVertices(softSelection=True):
+    """
+    the selected vertices of the first mesh in the selection, read from the components as arrays
+    :param softSelection: bool, read the soft selection with its weights instead of the selection
+    :return: tuple(MDagPath, numpy.ndarray, numpy.ndarray), mesh shape, vertex ids and soft selection
+             weights (None without softSelection), None if no vertices are selected
+    """
+    if softSelection and OpenMaya2 is not None:
+        components = bRichSelectionComponents()
+    else:
+        components = bSelectionComponents(softSelection)
+
+    meshName = None
+    vertexIds, softWeights = [], []
+    for pathName, ids, weights in components:
+        if meshName is None:
+            meshName = pathName
+        if pathName == meshName:
+            vertexIds.append(ids)
+            softWeights.append(weights if weights is not None else numpy.ones(len(ids)))
+
+    if meshName is None:
+        return None
+    selection = OpenMaya.MSelectionList()
+    selection.add(meshName)
+    meshPath = OpenMaya.MDagPath()
+    selection.getDagPath(0, meshPath)
+    return meshPath, numpy.concatenate(vertexIds), numpy.concatenate(softWeights) if softSelection else None
+
+
+def bSelectionComponents(softSelection):
+    # full path name, vertex ids and soft selection weights (None if it has none) of each selected vertex component
+    selection = OpenMaya.MSelectionList()
+    if softSelection:
+        richSelection = OpenMaya.MRichSelection()
+        OpenMaya.MGlobal.getRichSelection(richSelection)
+        richSelection.getSelection(selection)
+    else:
+        OpenMaya.MGlobal.getActiveSelectionList(selection)
+
+    iterate = OpenMaya.MItSelectionList(selection, OpenMaya.MFn.kMeshVertComponent)
+    while not iterate.isDone():
+        dagPath = OpenMaya.MDagPath()
+        component = OpenMaya.MObject()
+        iterate.getDagPath(dagPath, component)
+        fnComp = OpenMaya.MFnSingleIndexedComponent(component)
+        elements = OpenMaya.MIntArray()
+        fnComp.getElements(elements)
+        vertexIds = bToNumpy(elements, numpy.int64)
+
+        softWeights = None
+        if softSelection and fnComp.hasWeights():
+            softWeights = numpy.array([fnComp.weight(i).influence() for i in range(len(vertexIds))])
+        yield dagPath.fullPathName(), vertexIds, softWeights
+        iterate.next()
+
 
-def vertexToIdList(verts):
-    vertIds = [0] * len(verts)
-    for i, vert in enumerate(verts):
-        vertIds[i] = vertexToId(vert)
-    return vertIds
+def bRichSelectionComponents():
+    # bSelectionComponents() of the soft selection through API 2.0. Neither API has a call for all the
+    # weights of a component, but API 2.0 gets each one for a fraction of what a wrapped MWeight costs
+    selection = OpenMaya2.MGlobal.getRichSelection().getSelection()
+    iterate = OpenMaya2.MItSelectionList(selection, OpenMaya2.MFn.kMeshVertComponent)
+    while not iterate.isDone():
+        dagPath, component = iterate.getComponent()
+        fnComp = OpenMaya2.MFnSingleIndexedComponent(component)
+        vertexIds = numpy.array(fnComp.getElements(), dtype=numpy.int64)
+
+        softWeights = None
+        if fnComp.hasWeights:
+            weight = fnComp.weight
+            softWeights = numpy.fromiter((weight(i).influence for i in xrange(len(vertexIds))), numpy.float64,
+                                         len(vertexIds))
+        yield dagPath.fullPathName(), vertexIds, softWeights
+        iterate.next()
 
 
-def bSaveVertexSkinValues(inputFile, ignoreSoftSelection):
+@bSkinStats.recorded('saveVertex')
+def bSaveVertexSkinValues(inputFile, ignoreSoftSelection, fileFormat=None, sparse=False, maxInfluences=None,
+                          quantize=False, compression=None, savePositions=False, backend=None):
 
     timeBefore = time.time()
+    bSkinStats.annotate(file=inputFile, backend=backend or BACKEND_API1)
     
     print 'saving Vertex skinWeights.. '
 
 
-    if not ignoreSoftSelection:
-        verts, softWeights = getSoftSelection()
-    else:
-        verts = cmds.ls(selection=True, flatten=True)
-    
-    vertIds = vertexToIdList(verts)
-    selection = OpenMaya.MSelectionList()
-    OpenMaya.MGlobal.getActiveSelectionList( selection );
-
-    iterate = OpenMaya.MItSelectionList(selection);
-    dagPath = OpenMaya.MDagPath()
-    component = OpenMaya.MObject();
-    iterate.getDagPath(dagPath, component);
+    selectedVertices = bSelectedVertices(not ignoreSoftSelection)
+    if selectedVertices is None:
+        print 'select some vertices'
+        return
+    dagPath, vertIds, softWeights = selectedVertices
 
     skinCluster = bFindSkinCluster(OpenMaya.MFnDagNode(dagPath).partialPathName())
-    fnSkinCluster = OpenMayaAnim.MFnSkinCluster(skinCluster)
-
-
-    if not skinCluster.hasFn(OpenMaya.MFn.kSkinClusterFilter):
+    if skinCluster is False or not skinCluster.hasFn(OpenMaya.MFn.kSkinClusterFilter):
         print 'no skinCluster found on selected vertices'
         return
+    fnSkinCluster = OpenMayaAnim.MFnSkinCluster(skinCluster)
 
-    output = open(inputFile, 'w')
-    output.write(str(OpenMaya.MItGeometry(bSkinPath).count()) + '\n')
-
-    fnVtxComp = OpenMaya.MFnSingleIndexedComponent()
-    vtxComponents = OpenMaya.MObject();
-    vtxComponents = fnVtxComp.create( OpenMaya.MFn.kMeshVertComponent );
-
-    WeightArray = OpenMaya.MFloatArray()
-    meshIter = OpenMaya.MItMeshVertex ( dagPath, component)
-    #while not meshIter.isDone():
-    for vertId in vertIds:
-        fnVtxComp.addElement( vertId) 
-        #meshIter.next()
-
-    vertexCount = meshIter.count();
-    scriptUtil = OpenMaya.MScriptUtil()
-    infCountPtr = scriptUtil.asUintPtr()     
-    fnSkinCluster.getWeights(bSkinPath, vtxComponents, WeightArray, infCountPtr)
-    infCount = OpenMaya.MScriptUtil.getUint(infCountPtr)
+    meshVertexCount = OpenMaya.MItGeometry(bSkinPath).count()
 
-    weightCheckArray = []
-    for i in range(infCount):
-        weightCheckArray.append(False)
+    weights = bGetBackend(backend).getWeights(skinCluster, bSkinPath, vertIds, numpy.float32)
+    infCount = weights.shape[1]
 
-    for i in range(vertexCount):
-        for k in range(infCount):
-            if not weightCheckArray[k] and WeightArray[((i * infCount) + k)]:
-                weightCheckArray[k] = True
+    # only the joints that have weights on the vertices
+    #
+    weightCheckArray = weights.any(axis=0)
 
     #joints.. 
     influentsArray = OpenMaya.MDagPathArray()
     fnSkinCluster.influenceObjects(influentsArray);
+    influences = []
     for i in range(infCount):
         if (weightCheckArray[i]):
-            output.write(OpenMaya.MFnDagNode(influentsArray[i]).name() + '\n')
-
-    output.write('============\n')
-
-    counter = 0;
-    weightArrayString = []
-    for i in range(len(vertIds)):
-        vertId = vertIds[i]
-        softWeight = ''
-        if not ignoreSoftSelection:
-            softWeight = '%f:' % softWeights[i]
-         
-        #weightArrayString = '%d:%s' % (vertId, softWeight)
-
-        """
-        for k in range(infCount):
-            if weightCheckArray[k] == True:
-                weightArrayString += str(WeightArray[(counter * infCount) + k]) + ' '
-        """
-        weightsString = ' '.join(['0' if x == 0 else str(x) for n,x in enumerate(WeightArray[i*infCount : (i+1)*infCount]) if weightCheckArray[n]]) 
-        weightArrayString = "%d:%s%s" % (vertId, softWeight, weightsString) 
-
-        output.write(weightArrayString + '\n')
-        counter += 1
-        meshIter.next()
-
-    output.close()
+            influences.append(OpenMaya.MFnDagNode(influentsArray[i]).name())
+
+    positions = None
+    if savePositions:
+        positions = bMeshPositions(bSkinPath)[vertIds]
+
+    fileBlock = bSkinFile.WeightBlock(OpenMaya.MFnDagNode(dagPath).name(), influences, weights[:, weightCheckArray],
+                                      vertexIds=vertIds, softWeights=softWeights,
+                                      meshVertexCount=meshVertexCount, positions=positions)
+    with bSkinStats.phase('write'):
+        bSkinFile.writeVertexFile(inputFile, fileBlock, fileFormat,
+                                  dtype=bSkinFile.QUANTIZED if quantize else numpy.float32,
+                                  sparse=sparse, maxInfluences=maxInfluences, compression=compression)
+    bSkinStats.count('objects')
+    bSkinStats.count('vertices', fileBlock.vertexCount)
+    bSkinStats.count('influences', len(influences))
+    bSkinStats.count('bytes', os.path.getsize(inputFile))
 
     print 'done, it took', (time.time()-timeBefore), ' seconds'
 
 
 
-def bSaveSkinValues(inputFile):
+@bSkinStats.recorded('save')
+def bSaveSkinValues(inputFile, fileFormat=None, sparse=False, maxInfluences=None, compression=None, workers=None,
+                    baseline=None, quantize=False, savePositions=False, backend=None, background=False, callback=None):
+    """
+    :param inputFile: str, weight file to write
+    :param fileFormat: str, bSkinFile.FORMAT_TEXT or FORMAT_BINARY, None picks it from the extension
+    :param sparse: bool, store csr arrays, binary files only
+    :param maxInfluences: int, keep only the biggest weights of each vertex, None keeps all
+    :param compression: str, one of bSkinFile.COMPRESSIONS, binary files only
+    :param workers: int, number of objects formatted and compressed in parallel while the next
+                    ones get queried, None encodes them one after the other on this thread
+    :param baseline: str, earlier weight file to save a delta against, only the vertices that changed
+                     since get written. Binary files only, bLoadSkinValues loads them like any other
+    :param quantize: bool, store the weights as 16 bit fixed point that sums up to exactly 1 per vertex,
+                     binary files only. Best together with compression
+    :param savePositions: bool, store world space vertex positions and triangles of meshes, so the
+                          weights can be loaded onto changed topology with transferMode. Binary files only
+    :param backend: str, one of BACKENDS to get the weights with, None for BACKEND_API1
+    :param background: bool, only query the weights of all objects and write the file on a background
+                       thread, so Maya can be used again while it gets encoded and written. Keeps the
+                       weights of all objects in memory until they are written
+    :param callback: function, called with the bSkinFile.WeightFileExport on the main thread once a
+                     background save is done, failed or got cancelled
+    :return: bSkinFile.WeightFileExport to wait for or cancel a background save, None otherwise
+    """
 
     timeBefore = time.time()
-    
-    output = open(inputFile, 'w')
-
+    queryTime = 0.0
+    blocks = []
+    bSkinStats.annotate(file=inputFile, backend=backend or BACKEND_API1, background=background)
+
+    if savePositions and (fileFormat or bSkinFile.formatFromPath(inputFile)) != bSkinFile.FORMAT_BINARY:
+        raise ValueError('vertex positions need the binary format (%s)' % bSkinFile.BINARY_EXTENSION)
+
+    backend = bGetBackend(backend)
+    output = bSkinFile.openWeightWriter(inputFile, fileFormat, dtype=bSkinFile.QUANTIZED if quantize else numpy.float32,
+                                        sparse=sparse, maxInfluences=maxInfluences,
+                                        compression=compression, baseline=baseline, workers=workers)
+
+    try:
+        for block, seconds in bSkinBlocks(backend, savePositions):
+            queryTime += seconds
+            bSkinStats.count('objects')
+            bSkinStats.count('vertices', block.vertexCount)
+            bSkinStats.count('influences', len(block.influences))
+            if background:
+                blocks.append(block)
+            else:
+                with bSkinStats.phase('write'):
+                    output.writeBlock(block)
+    except BaseException:
+        output.abort()
+        raise
+
+    if not background:
+        with bSkinStats.phase('write'):
+            output.close()
+        bSkinStats.count('bytes', os.path.getsize(inputFile))
+        bPrintSaveTimes(output, time.time() - timeBefore, queryTime)
+        return None
+
+    # the record of the save waits for the background write
+    stats = bSkinStats.hold()
+    exportBefore = time.time()
+
+    def finished(export):
+        if stats is not None:
+            stats.addTime('write', time.time() - exportBefore)
+        maya.utils.executeDeferred(bSaveFinished, export, timeBefore, queryTime, callback, stats)
+
+    print 'weights queried in %.3fs, writing %s in the background..' % (queryTime, inputFile)
+    return bSkinFile.WeightFileExport(output, blocks, finished)
+
+
+def bPrintSaveTimes(output, seconds, queryTime):
+    print 'done saving weights, it took ', seconds, ' seconds.'
+    print '    query %.3fs, encode %.3fs on %d workers, waiting for workers %.3fs, write %.3fs' % (
+        queryTime, output.timings['encode'], output.workers, output.timings['wait'], output.timings['write'])
+
+
+def bSaveFinished(export, timeBefore, queryTime, callback, stats=None):
+    # end of a background save, on the main thread
+    if export.error is not None:
+        print 'saving weights to %s failed: %s' % (export.outputFile, export.error)
+    elif export.cancelled:
+        print 'saving weights to %s cancelled, the file is unchanged' % export.outputFile
+    else:
+        bPrintSaveTimes(export.writer, time.time() - timeBefore, queryTime)
+
+    if stats is not None:
+        if export.succeeded():
+            stats.count('bytes', os.path.getsize(export.outputFile))
+        stats.fields['cancelled'] = export.cancelled
+        stats.finish(export.error)
+    if callback is not None:
+        callback(export)
+
+
+def bSkinBlocks(backend, savePositions=False):
+    """
+    query the weights of the skinned shapes under the selected transforms
+    :param backend: bApi1Backend or bApi2Backend
+    :param savePositions: bool, also get vertex positions and triangles of meshes
+    :return: generator((bSkinFile.WeightBlock, float)), block of each shape and the seconds its query took
+    """
     selection = OpenMaya.MSelectionList()
     OpenMaya.MGlobal.getActiveSelectionList(selection)
 
@@ -536,95 +1089,82 @@ def bSaveSkinValues(inputFile):
             for childIndex in range(newTransform.childCount()):
                 childObject = newTransform.child(childIndex)
                 if childObject.hasFn(OpenMaya.MFn.kMesh) or childObject.hasFn(OpenMaya.MFn.kNurbsSurface) or childObject.hasFn(OpenMaya.MFn.kCurve):
-                    skinCluster = bFindSkinCluster(OpenMaya.MFnDagNode(childObject).partialPathName())
+                    childName = OpenMaya.MFnDagNode(childObject).partialPathName()
+                    queryBefore = time.time()
+                    skinCluster = bFindSkinCluster(childName)
                     if skinCluster is not False:
-                        bSkinPath = OpenMaya.MDagPath()
-                        fnSkinCluster = OpenMayaAnim.MFnSkinCluster(skinCluster)
-                        fnSkinCluster.getPathAtIndex(0,bSkinPath)
-                        influenceArray = OpenMaya.MDagPathArray()
-                        fnSkinCluster.influenceObjects(influenceArray)
-                        influentsCount = influenceArray.length()
-                        output.write(objectName + '\n')
-
-                        for k in range(influentsCount):
-                            jointTokens = str(influenceArray[k].fullPathName()).split('|')
-                            jointTokens = jointTokens[len(jointTokens)-1].split(':')
-                            output.write(jointTokens[len(jointTokens)-1] + '\n')
+                        bSkinPath = OpenMaya.MDagPath(bSkinClusters.get(childName)[1])
+                        influences = bInfluenceNames(skinCluster)
 
-                        output.write('============\n')
+                        weights = backend.getWeights(skinCluster, bSkinPath, dtype=numpy.float32)
 
+                        positions = triangles = None
+                        if savePositions and childObject.hasFn(OpenMaya.MFn.kMesh):
+                            positions = bMeshPositions(bSkinPath)
+                            triangles = bMeshTriangles(bSkinPath)
 
-                        fnVtxComp = OpenMaya.MFnSingleIndexedComponent()
-                        vtxComponents = OpenMaya.MObject()
-                        vtxComponents = fnVtxComp.create( OpenMaya.MFn.kMeshVertComponent )
-                        
-                        vertexCount = OpenMaya.MFnMesh(bSkinPath).numVertices()
-                        for i in range(vertexCount):
-                            fnVtxComp.addElement( i )   
-                            
-                        WeightArray = OpenMaya.MFloatArray()
-                        scriptUtil = OpenMaya.MScriptUtil()    
-                        infCountPtr = scriptUtil.asUintPtr()     
-                        fnSkinCluster.getWeights(bSkinPath, vtxComponents, WeightArray, infCountPtr)   
-                        infCount = OpenMaya.MScriptUtil.getUint(infCountPtr)
-                        
-                        for i in range(vertexCount):
-                            #saveString = ' '.join(map(str,WeightArray[i*infCount : (i+1)*infCount]))
-                            saveString = ' '.join(['0' if x == 0 else str(x) for n,x in enumerate(WeightArray[i*infCount : (i+1)*infCount])]) 
-                            
-                            output.write(saveString + '\n')
-
-                        output.write('\n')
+                        block = bSkinFile.WeightBlock(objectName, influences, weights,
+                                                      positions=positions, triangles=triangles)
+                        yield block, time.time() - queryBefore
 
 
         iterate.next()
 
-    output.close()
-    print 'done saving weights, it took ', (time.time()-timeBefore), ' seconds.'
 
 
 
 
+def bSkinObject(objectName, fileJoints, weights, fileVertexCount=None, influenceIndex=None, backend=None):
 
-def bSkinObject(objectName, fileJoints, weights):
+    # weights are either a (vertices x influences) array or chunks of (firstVertex, array) from bSkinFile.WeightStream
+    if isinstance(weights, numpy.ndarray):
+        fileVertexCount = len(weights)
+        weights = [(0, weights)]
 
     if not cmds.objExists(objectName):
         print objectName, " doesn't exist - skipping. "
         return
-    
 
+    # text files only know their row count once the rows are read. Their first chunk is read ahead, so
+    # a file of one chunk gets checked like the others, and longer ones are checked while they are set
+    chunks = iter(bSkinStats.timedIter('parse', weights))
+    heldChunks = []
+    if fileVertexCount is None:
+        firstChunk = next(chunks, None)
+        if firstChunk is not None:
+            # the copy, as the next chunk gets parsed into the same array
+            heldChunks.append((firstChunk[0], firstChunk[1].copy()))
+            secondChunk = next(chunks, None)
+            if secondChunk is not None:
+                heldChunks.append(secondChunk)
+            else:
+                fileVertexCount = firstChunk[0] + len(firstChunk[1])
+        else:
+            fileVertexCount = 0
+
+    # before the skinCluster gets touched, so a file for other topology leaves the object as it is
+    vertexCount = OpenMaya.MItGeometry(bGeometryPath(objectName)).count()
+    if fileVertexCount is not None and fileVertexCount != vertexCount:
+        print objectName, " has", vertexCount, "vertices, but the file has", fileVertexCount, "- skipping."
+        return
 
-    it = OpenMaya.MItDependencyNodes ( OpenMaya.MFn.kJoint);
+
+    if influenceIndex is None:
+        influenceIndex = bInfluenceIndex()
     
     
     # quick check if all the joints are in scene
     #
-    allInfluencesInScene = True;
-    sceneJointTokens = []
-
-    for jointIndex in range(len(fileJoints)):
-        jointHere = False;
-        it = OpenMaya.MItDependencyNodes ( OpenMaya.MFn.kJoint)
-        while not it.isDone():                
-            sceneJointTokens = str(OpenMaya.MFnDagNode(it.item()).fullPathName()).split('|')
-            if str(fileJoints[jointIndex]) == str(sceneJointTokens[len(sceneJointTokens) - 1]):
-                jointHere = True;
-
-            it.next()
-
-        if not jointHere:
-            allInfluencesInScene = False;
-            print 'missing influence: ', fileJoints[jointIndex]
+    missingInfluences = influenceIndex.missing(fileJoints)
+    for joint in missingInfluences:
+        print 'missing influence: ', joint
 
-    if not allInfluencesInScene:
+    if missingInfluences:
         print objectName, " can't be skinned because of missing influences."
         return
 
 
     
-
-
-    
     # create some arrays
     #    
     allJointsHere = False
@@ -645,23 +1185,23 @@ def bSkinObject(objectName, fileJoints, weights):
         for i in range(infCount):
             influenceStringArray.append(OpenMaya.MFnDagNode(influentsArray[i]).name())      
         
+        influenceStringIndices = bNameIndex(influenceStringArray)
         allJointsHere = True
         for joint in fileJoints:
-            if joint not in influenceStringArray:
+            if joint not in influenceStringIndices:
                 print 'missing a joint (', joint, ', ..)'
                 allJointsHere = False
                 break
 
         if not allJointsHere:
-            maya.mel.eval("DetachSkin " + objectName)
+            cmds.skinCluster(OpenMaya.MFnDependencyNode(skinCluster).name(), edit=True, unbind=True)
         else: 
             objectFoundJointsInFile = [False] * len(influenceStringArray)
             
             for i in range(len(fileJoints)):
-                for k in range(len(influenceStringArray)):
-                    if fileJoints[i] == influenceStringArray[k]:
-                        fileJointsMapArray[i] = k
-                        objectFoundJointsInFile[k] = True
+                k = influenceStringIndices[fileJoints[i]]
+                fileJointsMapArray[i] = k
+                objectFoundJointsInFile[k] = True
                         
             
             for i in range(len(influenceStringArray)):
@@ -673,18 +1213,8 @@ def bSkinObject(objectName, fileJoints, weights):
             
 
     if not allJointsHere:
-        cmd = "select "
-        for i in range(len(fileJoints)):
-            cmd += " " + fileJoints[i]
-
-        cmd += " " + objectName
-        maya.mel.eval(cmd)
-
-        maya.mel.eval("skinCluster -tsb -mi 10");
-        maya.mel.eval("select `listRelatives -p " + objectName + "`");
-        maya.mel.eval("refresh")
-        #maya.mel.eval("undoInfo -st 1")
-
+        # joints and geometry as arguments, so the selection stays as it is
+        cmds.skinCluster(list(fileJoints) + [objectName], toSelectedBones=True, maximumInfluences=10)
         skinCluster = bFindSkinCluster(objectName)
 
 
@@ -693,94 +1223,63 @@ def bSkinObject(objectName, fileJoints, weights):
     influentsArray = OpenMaya.MDagPathArray()
     fnSkinCluster.influenceObjects(influentsArray)
 
-    bSkinPath = OpenMaya.MDagPath()
-    fnSkinCluster.getPathAtIndex(fnSkinCluster.indexForOutputConnection(0),bSkinPath)
-
-    weightStrings = []
-    vertexIter = OpenMaya.MItGeometry (bSkinPath)
-
-    weightDoubles = OpenMaya.MDoubleArray()
-
-
-    singleIndexed = True;
-    vtxComponents = OpenMaya.MObject()
-    fnVtxComp = OpenMaya.MFnSingleIndexedComponent()
-    fnVtxCompDouble = OpenMaya.MFnDoubleIndexedComponent()
-
-    
-    if bSkinPath.node().apiType() == OpenMaya.MFn.kMesh:
-        vtxComponents = fnVtxComp.create( OpenMaya.MFn.kMeshVertComponent )
-    elif bSkinPath.node().apiType() == OpenMaya.MFn.kNurbsSurface:
-        singleIndexed = False
-        vtxComponents = fnVtxCompDouble.create( OpenMaya.MFn.kSurfaceCVComponent )
-    elif bSkinPath.node().apiType() == OpenMaya.MFn.kNurbsCurve:
-        vtxComponents = fnVtxComp.create( OpenMaya.MFn.kCurveCVComponent )
-   
-
-    
-    # nurbs curves..
-    #
-    counterValue = 0;
-    if not singleIndexed:
-        currentU = 0
-        currentV = 0
-
-        cvsU = OpenMaya.MFnNurbsSurface(bSkinPath.node()).numCVsInU()
-        cvsV = OpenMaya.MFnNurbsSurface(bSkinPath.node()).numCVsInV()
-        formU = OpenMaya.MFnNurbsSurface(bSkinPath.node()).formInU()
-        formV = OpenMaya.MFnNurbsSurface(bSkinPath.node()).formInV()
-	
-        if formU == 3:
-            cvsU -= 3
-        if formV == 3:
-            cvsV -= 3
-    
-    # go through all vertices and append to the weightDoubles array
-    #
-    vertexIter = OpenMaya.MItGeometry (bSkinPath)
-    while not vertexIter.isDone():
-        weightStrings = []
-        if singleIndexed:
-            fnVtxComp.addElement(counterValue)
-        else:
-            fnVtxCompDouble.addElement(currentU, currentV)
-            currentV += 1;
-            if currentV >= cvsV:
-                currentV = 0
-                currentU += 1
-
-        weightStrings = weights[counterValue].split(' ');
-        for i in range(len(weightStrings)):
-            weightDoubles.append(float(weightStrings[i]))
-        for i in range(len(objectEmptyJoints)):
-            weightDoubles.append(0)
-            
-        counterValue += 1
-        vertexIter.next()
+    bSkinPath = OpenMaya.MDagPath(bSkinClusters.get(objectName)[1])
 
     # createing the influence Array
     #
-    mayafileJointsMapArray = OpenMaya.MIntArray()
-    for i in range(len(fileJointsMapArray)):
-        mayafileJointsMapArray.append(fileJointsMapArray[i])
-    for i in range(len(objectEmptyJoints)):
-        mayafileJointsMapArray.append(objectEmptyJoints[i])
+    mayafileJointsMapArray = list(fileJointsMapArray) + objectEmptyJoints
         
     
-    # set the weights
+    # set the weights chunk by chunk, with empty columns for the joints that are not in the file.
+    # While the row count isn't known, the weights each chunk replaces are kept to put them back
     #
-    fnSkinCluster.setWeights(bSkinPath, vtxComponents, mayafileJointsMapArray, weightDoubles, 0)
+    backend = bGetBackend(backend)
+    replacedWeights = []
+    rowCount = 0
+    for start, chunkWeights in itertools.chain(heldChunks, chunks):
+        rowCount = start + len(chunkWeights)
+        if rowCount > vertexCount:
+            break
+
+        if objectEmptyJoints:
+            chunkWeights = numpy.hstack((chunkWeights, numpy.zeros((len(chunkWeights), len(objectEmptyJoints)))))
+
+        if fileVertexCount is None:
+            oldWeights = backend.getWeights(skinCluster, bSkinPath, start=start, count=len(chunkWeights))
+            replacedWeights.append((start, bCompactWeights(range(oldWeights.shape[1]), oldWeights)))
+        backend.setWeights(skinCluster, bSkinPath, chunkWeights, mayafileJointsMapArray, start=start)
+
+    if rowCount != vertexCount:
+        fileRows = rowCount if rowCount < vertexCount else 'more'
+        print objectName, " has", vertexCount, "vertices, but the file has", fileRows, "- skipping."
+        for start, (influenceIndices, indptr, indices, data) in reversed(replacedWeights):
+            oldWeights = bSkinMath.fromCsr(indptr, indices, data.astype(numpy.float64), len(influenceIndices))
+            backend.setWeights(skinCluster, bSkinPath, oldWeights, influenceIndices, start=start)
+        return
+    bSkinStats.count('vertices', vertexCount)
     #Maya.mel.eval("skinPercent -normalize true " + fnSkinCluster.name() + " " + objectName)
 
 
 
 
-def bLoadSkinValues(loadOnSelection, inputFile):
+@bSkinStats.recorded('load')
+def bLoadSkinValues(loadOnSelection, inputFile, objectNames=None, transferMode=None, backend=None):
+    """
+    :param loadOnSelection: bool, put the weights of the first object in the file (or of
+                            objectNames[0]) on the selected mesh
+    :param inputFile: str, weight file of any format
+    :param objectNames: list(str), only load these objects of the file. They are looked up
+                        in the file index, the other objects are never read
+    :param transferMode: str, bSkinTransfer.TRANSFER_NEAREST or TRANSFER_BARYCENTRIC to map the weights
+                         onto the meshes by position instead of by vertex id, for meshes whose topology
+                         changed. Needs a file saved with savePositions
+    :param backend: str, one of BACKENDS to set the weights with, None for BACKEND_API1
+    """
 
     timeBefore = time.time()
+    bSkinStats.annotate(file=inputFile, backend=backend or BACKEND_API1)
+    bSkinStats.count('bytes', os.path.getsize(inputFile))
     
-    joints = []
-    weights = []
     PolygonObject = ""
 
 
@@ -803,76 +1302,154 @@ def bLoadSkinValues(loadOnSelection, inputFile):
         print "You need to select a polygon object"
         return
 
-    input = open(inputFile, 'r')
-
-    FilePosition = 0
-    while True:
-        line = input.readline()
-        if not line:
-            break
-
-        line = line.strip()
-
-        if FilePosition is not 0:
-            if not line.startswith("============"):
-                if FilePosition is 1:
-                    joints.append(line) 
-                elif FilePosition is 2:
-                    if len(line) > 0:
-                        weights.append(line)
-                    else:
-                        bSkinObject(PolygonObject, joints, weights)
-                        PolygonObject = ""
-                        joints = []
-                        weights = []
-                        FilePosition = 0
-                        if loadOnSelection == True:
-                            break
-
-            else: # it's ========
-                FilePosition = 2
-
-        else: #FilePosition is 0
+    influenceIndex = bInfluenceIndex()
+    with bBatchEdit():
+        weightStreams = bSkinFile.iterWeightFile(inputFile, objectNames=objectNames)
+        for weightStream in bSkinStats.timedIter('parse', weightStreams):
             if not loadOnSelection:
-                PolygonObject = line
-            FilePosition = 1;
-            
-            if cmds.objExists(PolygonObject):
-                maya.mel.eval("select " + PolygonObject)
-                maya.mel.eval("refresh")
+                PolygonObject = weightStream.name
+            bSkinStats.count('objects')
+            bSkinStats.count('influences', len(weightStream.influences))
+
+            if transferMode is not None:
+                if not cmds.objExists(PolygonObject):
+                    print PolygonObject, " doesn't exist - skipping. "
+                    continue
+                with bSkinStats.phase('parse'):
+                    block = weightStream.toBlock()
+                positions = bMeshPositions(bGeometryPath(PolygonObject))
+                weights = bTransferWeights(block, PolygonObject, positions, transferMode)
+                if weights is not None:
+                    bSkinObject(PolygonObject, weightStream.influences, weights, influenceIndex=influenceIndex,
+                                backend=backend)
+            else:
+                bSkinObject(PolygonObject, weightStream.influences, weightStream.chunks(), weightStream.vertexCount,
+                            influenceIndex, backend)
+            if loadOnSelection == True:
+                break
 
     print 'done loading weights, it took ', (time.time()-timeBefore), ' seconds.'
 
 
 
-def getSoftSelection():
-    #Grab the soft selection
+@bSkinStats.recorded('mirror')
+def bMirrorSkinValues(objectNames=None, axis='x', positiveToNegative=True, sidePrefixes=bSkinMirror.SIDE_PREFIXES,
+                      tolerance=bSkinMirror.DEFAULT_TOLERANCE, backend=None):
+    """
+    mirror the weights of skinned meshes from one side to the other, swapping l_ and r_ influences.
+    The meshes have to be in a symmetric pose, their symmetry maps are cached by topology
+    :param objectNames: list(str), skinned meshes or their transforms, None takes the selection
+    :param axis: str, one of bSkinMirror.MIRROR_AXES, the world axis that gets flipped
+    :param positiveToNegative: bool, copy from the positive side of the axis to the negative side,
+                               or the other way around
+    :param sidePrefixes: list(tuple(str, str)), pairs of influence prefixes that swap
+    :param tolerance: float, how far a mirrored vertex may be off, relative to the size of the mesh
+    :param backend: str, one of BACKENDS to get and set the weights with, None for BACKEND_API1
+    """
 
-    selection = OpenMaya.MSelectionList()
-    softSelection = OpenMaya.MRichSelection()
-    OpenMaya.MGlobal.getRichSelection(softSelection)
-    softSelection.getSelection(selection)
-    
-    dagPath = OpenMaya.MDagPath()
-    component = OpenMaya.MObject()
-    
-    iter = OpenMaya.MItSelectionList( selection,OpenMaya.MFn.kMeshVertComponent )
-    elements, weights = [], []
-    while not iter.isDone(): 
-        iter.getDagPath( dagPath, component )
-        dagPath.pop() #Grab the parent of the shape node
-        node = dagPath.fullPathName()
-        fnComp = OpenMaya.MFnSingleIndexedComponent(component)   
-        getWeight = lambda i: fnComp.weight(i).influence() if fnComp.hasWeights() else 1.0
-        
-        for i in range(fnComp.elementCount()):
-            elements.append('%s.vtx[%i]' % (node, fnComp.element(i)))
-            weights.append(getWeight(i)) 
-        iter.next()
-        
-    return elements, weights
-        
-        
+    timeBefore = time.time()
+    bSkinStats.annotate(backend=backend or BACKEND_API1)
 
+    if objectNames is None:
+        objectNames = bSelectedObjectNames()
 
+    if not objectNames:
+        print 'select some skinned meshes'
+        return
+
+    backend = bGetBackend(backend)
+    with bBatchEdit():
+        for objectName in objectNames:
+            skinCluster = bFindSkinCluster(objectName)
+            if skinCluster is False or not bSkinPath.hasFn(OpenMaya.MFn.kMesh):
+                print objectName, ': no skinned mesh - skipping.'
+                continue
+            skinPath = OpenMaya.MDagPath(bSkinPath)
+
+            influences = bInfluenceNames(skinCluster)
+            influenceColumns, missing = bSkinMirror.influenceMirrorMap(influences, sidePrefixes)
+            if missing:
+                print objectName, ': no mirrored influence for', ', '.join(missing), '- they keep their side.'
+
+            positions = bMeshPositions(skinPath)
+            triangles = bMeshTriangles(skinPath)
+            with bSkinStats.phase('symmetry'):
+                symmetry = bSkinMirror.symmetryMap(positions, triangles, axis, tolerance)
+            unmatched = symmetry.vertexCount - int(symmetry.matched.sum())
+            if unmatched:
+                print objectName, ':', unmatched, 'vertices have no mirrored vertex - they keep their weights.'
+
+            weights = backend.getWeights(skinCluster, skinPath)
+            bSkinStats.count('objects')
+            bSkinStats.count('vertices', len(weights))
+            bSkinStats.count('influences', len(influences))
+            with bSkinStats.phase('mirror'):
+                weights = bSkinMirror.mirrorWeights(weights, symmetry, influenceColumns, positiveToNegative)
+            backend.setWeights(skinCluster, skinPath, weights, range(len(influences)))
+
+    print 'done mirroring weights, it took ', (time.time()-timeBefore), ' seconds.'
+
+
+
+@bSkinStats.recorded('smooth')
+def bSmoothSkinValues(objectNames=None, iterations=bSkinSmooth.DEFAULT_ITERATIONS,
+                      strength=bSkinSmooth.DEFAULT_STRENGTH, ignoreJointLocks=False, backend=None):
+    """
+    relax the weights of skinned meshes towards the average of their neighbour vertices.
+    With vertices selected only they get smoothed, faded out by soft selection
+    :param objectNames: list(str), skinned meshes or their transforms to smooth as a whole, None takes
+                        the selected vertices, or the selected meshes if there are none
+    :param iterations: int, number of smoothing steps
+    :param strength: float, 0.0 - 1.0, how far each step moves towards the average
+    :param ignoreJointLocks: bool, smooth the weights of locked joints too
+    :param backend: str, one of BACKENDS to get and set the weights with, None for BACKEND_API1
+    """
+
+    timeBefore = time.time()
+    bSkinStats.annotate(backend=backend or BACKEND_API1)
+
+    # (object, vertex ids or None for all, soft selection weights or None)
+    targets = []
+    if objectNames is None:
+        selectedVertices = bSelectedVertices()
+        if selectedVertices is not None:
+            dagPath, vertexIds, softWeights = selectedVertices
+            targets.append((OpenMaya.MFnDagNode(dagPath).partialPathName(), vertexIds, softWeights))
+        else:
+            objectNames = bSelectedObjectNames()
+    targets += [(objectName, None, None) for objectName in objectNames or []]
+
+    if not targets:
+        print 'select some skinned meshes or vertices'
+        return
 
+    backend = bGetBackend(backend)
+    with bBatchEdit():
+        for objectName, vertexIds, softWeights in targets:
+            skinCluster = bFindSkinCluster(objectName)
+            if skinCluster is False or not bSkinPath.hasFn(OpenMaya.MFn.kMesh):
+                print objectName, ': no skinned mesh - skipping.'
+                continue
+            skinPath = OpenMaya.MDagPath(bSkinPath)
+
+            weights = backend.getWeights(skinCluster, skinPath)
+            triangles = bMeshTriangles(skinPath)
+            with bSkinStats.phase('adjacency'):
+                adjacency = bSkinSmooth.meshAdjacency(triangles, len(weights))
+            bSkinStats.count('objects')
+            bSkinStats.count('vertices', len(weights) if vertexIds is None else len(vertexIds))
+            bSkinStats.count('influences', weights.shape[1])
+            locks = None if ignoreJointLocks else bInfluenceLocks(skinCluster)
+
+            vertexMask = None
+            if vertexIds is not None:
+                vertexMask = numpy.zeros(len(weights))
+                vertexMask[vertexIds] = 1.0 if softWeights is None else softWeights
+
+            with bSkinStats.phase('smooth'):
+                weights = bSkinSmooth.smoothWeights(weights, adjacency, iterations, strength, locks, vertexMask)
+            if vertexIds is not None:
+                weights = weights[vertexIds]
+            backend.setWeights(skinCluster, skinPath, weights, range(weights.shape[1]), vertexIds=vertexIds)
+
+    print 'done smoothing weights, it took ', (time.time()-timeBefore), ' seconds.'
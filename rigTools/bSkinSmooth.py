@@ -0,0 +1,164 @@
+"""
+=====================================================================
+    Weight smoothing for bSkinSaver
+
+    Builds the vertex adjacency of a mesh from its triangles as a
+    sparse matrix whose rows average the neighbours of each vertex,
+    and relaxes a whole (vertices x influences) weight matrix with a
+    few sparse matrix products. Locked influences keep their weights,
+    a vertex mask limits and fades the smoothing, and the weights are
+    normalized again around the locked ones.
+
+    Uses scipy.sparse when it's there, otherwise the same products on
+    the csr arrays with numpy, limited to the vertices each influence
+    can reach.
+    This module doesn't need Maya.
+
+=====================================================================
+"""
+
+import numpy
+
+try:
+    from scipy.sparse import csr_matrix, diags
+except ImportError:
+    csr_matrix = diags = None
+
+import bSkinMath
+
+
+DEFAULT_ITERATIONS = 4
+DEFAULT_STRENGTH = 0.5
+
+
+class Adjacency(object):
+    """
+    neighbours of each vertex as csr arrays. Vertices without neighbours are their own
+    neighbour, so averaging leaves them as they are
+    """
+
+    def __init__(self, indptr, indices, useScipy=True):
+        """
+        :param indptr: numpy.ndarray, (vertices + 1) start of the neighbours of each vertex in indices
+        :param indices: numpy.ndarray, neighbour vertices, each pair of vertices in both directions
+        :param useScipy: bool, multiply with scipy.sparse if it's installed
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.degrees = numpy.diff(indptr)
+        self.matrix = None
+        if useScipy and csr_matrix is not None:
+            # rows that average the neighbours
+            data = numpy.repeat(1.0 / self.degrees, self.degrees)
+            self.matrix = csr_matrix((data, indices, indptr), shape=(self.vertexCount, self.vertexCount))
+
+    @property
+    def vertexCount(self):
+        return len(self.indptr) - 1
+
+    def neighbours(self, vertices):
+        """
+        :param vertices: numpy.ndarray, vertex ids
+        :return: tuple(numpy.ndarray), the neighbours of all vertices one after the other, and
+                 how many each vertex has
+        """
+        counts = self.degrees[vertices]
+        first = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        return self.indices[numpy.repeat(self.indptr[vertices], counts) + numpy.arange(counts.sum()) - first], counts
+
+
+def meshAdjacency(triangles, vertexCount, useScipy=True):
+    """
+    :param triangles: numpy.ndarray, (triangles x 3) vertex ids
+    :param vertexCount: int, number of vertices of the mesh
+    :param useScipy: bool, see Adjacency
+    :return: Adjacency, the vertices connected by an edge of the triangles
+    """
+    triangles = numpy.asarray(triangles, dtype=numpy.int64).reshape(-1, 3)
+    starts = triangles.ravel()
+    ends = triangles[:, [1, 2, 0]].ravel()
+    rows = numpy.concatenate([starts, ends])
+    columns = numpy.concatenate([ends, starts])
+    edges = rows != columns
+
+    # vertices that aren't on a triangle point to themselves
+    isolated = numpy.ones(vertexCount, dtype=bool)
+    isolated[rows[edges]] = False
+    isolated = numpy.flatnonzero(isolated)
+
+    # unique (row, column) keys come out sorted by row and then column, which is csr order
+    keys = numpy.unique(numpy.concatenate([rows[edges] * vertexCount + columns[edges],
+                                           isolated * vertexCount + isolated]))
+    indptr = numpy.zeros(vertexCount + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(keys // vertexCount, minlength=vertexCount), out=indptr[1:])
+    return Adjacency(indptr, keys % vertexCount, useScipy)
+
+
+def smoothWeights(weights, adjacency, iterations=DEFAULT_ITERATIONS, strength=DEFAULT_STRENGTH, lockMask=None,
+                  vertexMask=None, threshold=bSkinMath.NORMALIZE_THRESHOLD):
+    """
+    move the weights of each vertex towards the average of its neighbours
+    :param weights: numpy.ndarray, (vertices x influences) weights
+    :param adjacency: Adjacency, of the mesh, see meshAdjacency()
+    :param iterations: int, number of smoothing steps
+    :param strength: float, 0.0 - 1.0, how far each step moves towards the average
+    :param lockMask: list(bool), True for each locked influence, None if nothing is locked
+    :param vertexMask: numpy.ndarray, (vertices) 0.0 - 1.0 scale of the strength per vertex, like soft
+                       selection weights, None smooths all vertices
+    :param threshold: float, see bSkinMath.normalizeWeights()
+    :return: numpy.ndarray, new (vertices x influences) float64 weights
+    """
+    weights = numpy.array(weights, dtype=numpy.float64)
+    if len(weights) != adjacency.vertexCount:
+        raise ValueError('the weights have %d vertices, the mesh %d' % (len(weights), adjacency.vertexCount))
+
+    if lockMask is None:
+        lockMask = numpy.zeros(weights.shape[1], dtype=bool)
+    locked = numpy.asarray(lockMask, dtype=bool)
+
+    step = numpy.full(len(weights), float(strength))
+    if vertexMask is not None:
+        step *= numpy.asarray(vertexMask, dtype=numpy.float64)
+
+    # influences without any weight stay at zero
+    columns = numpy.flatnonzero(~locked & weights.any(axis=0))
+    if adjacency.matrix is not None:
+        weights[:, columns] = _smoothSparse(adjacency, weights[:, columns], step, iterations)
+    else:
+        for column in columns:
+            _smoothColumn(adjacency, weights[:, column], step, iterations)
+
+    if vertexMask is None:
+        return bSkinMath.normalizeWeights(weights, locked, threshold)
+
+    # vertices outside the mask stay exactly as they were
+    rows = numpy.flatnonzero(step > 0)
+    weights[rows] = bSkinMath.normalizeWeights(weights[rows], locked, threshold)
+    return weights
+
+
+def _smoothSparse(adjacency, values, step, iterations):
+    # skin weights are mostly zeros, so the products are sparse x sparse
+    values = csr_matrix(values)
+    step = diags(step)
+    for i in range(iterations):
+        values = values + step.dot(adjacency.matrix.dot(values) - values)
+    return values.toarray()
+
+
+def _smoothColumn(adjacency, values, step, iterations):
+    # one influence in place. Each step spreads it by one ring of neighbours, so only the rows within
+    # iterations rings of where it has weights can change, and only those get averaged
+    reached = values != 0
+    for i in range(iterations):
+        reached[adjacency.neighbours(numpy.flatnonzero(reached))[0]] = True
+    rows = numpy.flatnonzero(reached & (step > 0))
+    if not len(rows):
+        return
+
+    neighbours, counts = adjacency.neighbours(rows)
+    starts = numpy.cumsum(counts) - counts
+    rowStep = step[rows] / counts
+    for i in range(iterations):
+        # average of the neighbours minus the vertex itself, sum(neighbours) / count - value
+        values[rows] += rowStep * numpy.add.reduceat(values[neighbours], starts) - step[rows] * values[rows]
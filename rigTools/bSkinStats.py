@@ -0,0 +1,289 @@
+"""
+=====================================================================
+    Phase timers and counters for bSkinSaver operations
+
+    Each save, load, mirror or smooth call becomes one record with the
+    seconds spent in named phases (parse, findSkinCluster, getWeights,
+    normalize, setWeights, write, ..), counters for objects, vertices,
+    influences and bytes, and whatever the call annotates, like the
+    file. Phases are exclusive: time in a nested phase isn't counted in
+    the outer one, and time outside of all phases is "other".
+
+    Off by default, and then nearly free. Turn it on with a callback
+    that gets each record as a dict, or a path that records get
+    appended to as JSON lines:
+
+        import bSkinStats
+        bSkinStats.enable('/tmp/weights.jsonl')
+        bSkinStats.enable(myDashboard.send)
+
+    or by setting BSKINSAVER_STATS to such a path before the import.
+    Records are only taken on the thread that started the operation.
+    This module doesn't need Maya.
+
+=====================================================================
+"""
+
+import collections
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+
+ENVIRONMENT_VARIABLE = 'BSKINSAVER_STATS'
+PHASE_OTHER = 'other'
+
+# clock for the phases, time.perf_counter isn't there in python 2
+_clock = getattr(time, 'perf_counter', time.time)
+
+_sink = None
+# open operations of the thread that records, innermost last
+_operations = []
+_thread = None
+
+
+class JsonLinesSink(object):
+    """
+    appends each record as one line of json to a file, opened per record so
+    several processes can share a file
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, record):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+class Operation(object):
+    """
+    timings and counters of one bSkinSaver call
+    """
+
+    def __init__(self, name, **fields):
+        """
+        :param name: str, operation name, like save or load
+        :param fields: values that go into the record as they are
+        """
+        self.name = name
+        self.fields = fields
+        self.phases = collections.defaultdict(float)
+        self.counters = collections.defaultdict(int)
+        self.held = False
+        self._start = time.time()
+        self._started = _clock()
+        # [phase, clock when it last started or resumed]
+        self._stack = []
+
+    def enterPhase(self, name):
+        now = _clock()
+        if self._stack:
+            # pause the outer phase
+            outer = self._stack[-1]
+            self.phases[outer[0]] += now - outer[1]
+        self._stack.append([name, now])
+
+    def exitPhase(self):
+        now = _clock()
+        name, started = self._stack.pop()
+        self.phases[name] += now - started
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def addTime(self, name, seconds):
+        """
+        add time that was measured elsewhere, like on a background thread
+        """
+        self.phases[name] += seconds
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def record(self, error=None):
+        """
+        :param error: exception the operation failed with
+        :return: dict, operation, start (epoch seconds), seconds, phases, counters and the fields
+        """
+        seconds = _clock() - self._started
+        phases = dict(self.phases)
+        phases[PHASE_OTHER] = max(seconds - sum(phases.values()), 0.0)
+
+        record = dict(self.fields)
+        record.update({'operation': self.name, 'start': self._start, 'seconds': seconds,
+                       'phases': phases, 'counters': dict(self.counters)})
+        if error is not None:
+            record['error'] = '%s: %s' % (type(error).__name__, error)
+        return record
+
+    def finish(self, error=None):
+        """
+        send the record to the sink
+        :param error: exception the operation failed with
+        """
+        if _sink is None:
+            return
+        try:
+            _sink(self.record(error))
+        except Exception as sinkError:
+            # a broken dashboard mustn't break saving weights
+            sys.stderr.write('bSkinStats: the sink failed: %s\n' % sinkError)
+
+
+class _NullPhase(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class _Phase(object):
+    def __init__(self, operation, name):
+        self.operation = operation
+        self.name = name
+
+    def __enter__(self):
+        self.operation.enterPhase(self.name)
+        return self
+
+    def __exit__(self, *args):
+        self.operation.exitPhase()
+
+
+_nullPhase = _NullPhase()
+
+
+def enable(sink):
+    """
+    :param sink: function that takes each record as a dict, or str, path of a JSON lines file to append to
+    """
+    global _sink
+    _sink = sink if callable(sink) else JsonLinesSink(sink)
+
+
+def disable():
+    global _sink
+    _sink = None
+
+
+def enabled():
+    return _sink is not None
+
+
+def current():
+    """
+    :return: Operation, innermost open operation of this thread, None if there is none or it's off
+    """
+    if _sink is None or not _operations or threading.current_thread() is not _thread:
+        return None
+    return _operations[-1]
+
+
+def recorded(name):
+    """
+    decorator that records each call of a function as an operation. Calls from inside
+    another operation count towards that one
+    :param name: str, operation name
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            global _thread
+            if _sink is None or _operations:
+                return function(*args, **kwargs)
+
+            _thread = threading.current_thread()
+            operation = Operation(name)
+            _operations.append(operation)
+            try:
+                result = function(*args, **kwargs)
+            except BaseException as error:
+                _operations.pop()
+                operation.finish(error)
+                raise
+            _operations.pop()
+            if not operation.held:
+                operation.finish()
+            return result
+        return wrapper
+    return decorator
+
+
+def hold():
+    """
+    keep the current operation open after its function returned, for work it left running
+    :return: Operation, call its finish() when the work is done, None if nothing is recorded
+    """
+    operation = current()
+    if operation is not None:
+        operation.held = True
+    return operation
+
+
+def phase(name):
+    """
+    :param name: str, phase name
+    :return: context manager that times its block as the phase
+    """
+    operation = current()
+    if operation is None:
+        return _nullPhase
+    return _Phase(operation, name)
+
+
+def timed(name):
+    """
+    decorator that times each call of a function as a phase
+    :param name: str, phase name
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timedIter(name, iterable):
+    """
+    :param name: str, phase name
+    :param iterable: iterable, like the chunks of a weight stream
+    :return: generator, the items of iterable, with the time getting each one timed as the phase
+    """
+    iterator = iter(iterable)
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def count(name, value=1):
+    """
+    add to a counter of the current operation
+    :param name: str, counter name, like vertices or bytes
+    :param value: int, amount to add
+    """
+    operation = current()
+    if operation is not None:
+        operation.count(name, value)
+
+
+def annotate(**fields):
+    """
+    add fields to the record of the current operation, like file or backend
+    """
+    operation = current()
+    if operation is not None:
+        operation.fields.update(fields)
+
+
+if os.environ.get(ENVIRONMENT_VARIABLE):
+    enable(os.environ[ENVIRONMENT_VARIABLE])
@@ -0,0 +1,423 @@
+"""
+=====================================================================
+    Weight file toolkit for bSkinSaver files, without Maya
+
+    Library functions and a command line to list, validate, diff,
+    merge, subset, convert, mirror and smooth weight files of any format:
+
+        python bSkinTool.py list character.bweights --influences
+        python bSkinTool.py validate character.weights --tolerance 0.001
+        python bSkinTool.py diff old.bweights new.bweights --json
+        python bSkinTool.py merge body.weights head.weights -o all.bweights --quantize --compression zlib
+        python bSkinTool.py subset all.bweights -o head.weights --objects head eyes
+        python bSkinTool.py convert old.weights -o new.bweights --sparse
+        python bSkinTool.py mirror character.bweights -o mirrored.bweights --axis x
+        python bSkinTool.py smooth character.bweights -o smooth.bweights --iterations 8 --lock root
+
+    Everything but mirror and smooth is streamed in chunks of vertices,
+    so files bigger than memory work too. Mirroring and smoothing need
+    files saved with vertex positions.
+
+=====================================================================
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+
+import numpy
+
+import bSkinFile
+import bSkinMath
+import bSkinMirror
+import bSkinSmooth
+
+
+DEFAULT_TOLERANCE = 0.001
+
+
+def inspectFile(inputFile):
+    """
+    the objects of a weight file, from its index
+    :param inputFile: str, path of the weight file
+    :return: list(dict), name, vertexCount, influences and layout of each object in file order
+    """
+    return [dict(entry) for entry in bSkinFile.readIndex(inputFile)]
+
+
+def validateFile(inputFile, tolerance=DEFAULT_TOLERANCE):
+    """
+    check the weights of each object of a weight file
+    :param inputFile: str, path of the weight file
+    :param tolerance: float, how far the weights of a vertex may sum up from 1
+    :return: list(dict), per object: name, vertexCount, nan (non finite weights), negative (weights
+             below 0), empty (vertices without weights), unnormalized (vertices that don't sum up
+             to 1 within tolerance), maxSumError and valid
+    """
+    results = []
+    for stream in bSkinFile.iterWeightFile(inputFile):
+        result = {'name': stream.name, 'vertexCount': 0, 'nan': 0, 'negative': 0, 'empty': 0,
+                  'unnormalized': 0, 'maxSumError': 0.0}
+        for start, weights in stream.chunks():
+            finite = numpy.isfinite(weights)
+            finiteRows = finite.all(axis=1)
+            rowSums = weights[finiteRows].sum(axis=1)
+            empty = rowSums == 0
+            sumErrors = numpy.abs(rowSums[~empty] - 1.0)
+
+            result['vertexCount'] += len(weights)
+            result['nan'] += int((~finite).sum())
+            result['negative'] += int((weights < 0).sum())
+            result['empty'] += int(empty.sum())
+            result['unnormalized'] += int((sumErrors > tolerance).sum())
+            if len(sumErrors):
+                result['maxSumError'] = max(result['maxSumError'], float(sumErrors.max()))
+
+        result['valid'] = not (result['nan'] or result['negative'] or result['empty'] or result['unnormalized'])
+        results.append(result)
+    return results
+
+
+def diffFiles(fileA, fileB, chunkSize=bSkinFile.DEFAULT_CHUNK_SIZE):
+    """
+    compare the weights of the objects two weight files have in common, influences are
+    matched by name and count as 0 where an object doesn't have them
+    :param fileA: str, path of the first weight file
+    :param fileB: str, path of the second weight file
+    :param chunkSize: int, vertices compared at once
+    :return: dict, onlyA and onlyB (object names in just one of the files) and objects, per common
+             object: name, vertexCountA, vertexCountB, maxDelta, meanDelta, nan (weights that aren't
+             finite in either file, left out of the deltas) and influences, per influence: maxDelta
+             and meanDelta over all vertices. Objects with different vertex counts only have the counts
+    """
+    namesA = [entry['name'] for entry in bSkinFile.readIndex(fileA)]
+    namesB = [entry['name'] for entry in bSkinFile.readIndex(fileB)]
+    setA, setB = set(namesA), set(namesB)
+    common = [name for name in namesA if name in setB]
+
+    result = {'onlyA': [name for name in namesA if name not in setB],
+              'onlyB': [name for name in namesB if name not in setA],
+              'objects': []}
+
+    streamsB = bSkinFile.iterWeightFile(fileB, chunkSize, objectNames=common)
+    for streamA in bSkinFile.iterWeightFile(fileA, chunkSize, objectNames=common):
+        streamB = next(streamsB)
+        objectDiff = _diffStreams(streamA, streamB)
+        objectDiff['name'] = streamA.name
+        result['objects'].append(objectDiff)
+    return result
+
+
+def _diffStreams(streamA, streamB):
+    influencesA = set(streamA.influences)
+    influences = list(streamA.influences) + [name for name in streamB.influences if name not in influencesA]
+    columns = dict((name, i) for i, name in reversed(list(enumerate(influences))))
+    columnsA = [columns[name] for name in streamA.influences]
+    columnsB = [columns[name] for name in streamB.influences]
+
+    maxDelta = numpy.zeros(len(influences))
+    sumDelta = numpy.zeros(len(influences))
+    countA = countB = nanCount = 0
+    chunksB = streamB.chunks()
+    for startA, weightsA in streamA.chunks():
+        countA += len(weightsA)
+        chunkB = next(chunksB, None)
+        if chunkB is None:
+            continue
+        countB += len(chunkB[1])
+        if len(chunkB[1]) != len(weightsA):
+            continue
+
+        delta = numpy.abs(bSkinMath.expandColumns(weightsA, columnsA, len(influences)) -
+                          bSkinMath.expandColumns(chunkB[1], columnsB, len(influences)))
+        finite = numpy.isfinite(delta)
+        if not finite.all():
+            nanCount += int((~finite).sum())
+            delta[~finite] = 0
+
+        numpy.maximum(maxDelta, delta.max(axis=0), out=maxDelta)
+        sumDelta += delta.sum(axis=0)
+    for start, weightsB in chunksB:
+        countB += len(weightsB)
+
+    objectDiff = {'vertexCountA': countA, 'vertexCountB': countB, 'nan': nanCount}
+    if countA != countB:
+        return objectDiff
+
+    meanDelta = sumDelta / max(countA, 1)
+    objectDiff['maxDelta'] = float(maxDelta.max()) if len(influences) else 0.0
+    objectDiff['meanDelta'] = float(meanDelta.mean()) if len(influences) else 0.0
+    objectDiff['influences'] = dict((name, {'maxDelta': float(maxDelta[i]), 'meanDelta': float(meanDelta[i])})
+                                    for i, name in enumerate(influences))
+    return objectDiff
+
+
+def mergeFiles(outputFile, inputFiles, **writerOptions):
+    """
+    write the objects of several weight files into one. Objects that are in more than one
+    file are taken from the last of them, in the position they have in the first
+    :param outputFile: str, weight file to write
+    :param inputFiles: list(str), weight files to merge
+    :param writerOptions: arguments for bSkinFile.openWeightWriter, like fileFormat, dtype, sparse or compression
+    :return: int, number of objects written
+    """
+    sources = {}
+    names = []
+    for inputFile in inputFiles:
+        for entry in bSkinFile.readIndex(inputFile):
+            if entry['name'] not in sources:
+                names.append(entry['name'])
+            sources[entry['name']] = inputFile
+
+    with bSkinFile.openWeightWriter(outputFile, **writerOptions) as writer:
+        for name in names:
+            writer.writeBlock(bSkinFile.readObject(sources[name], name))
+    return len(names)
+
+
+def subsetFile(inputFile, outputFile, objectNames, **writerOptions):
+    """
+    write some objects of a weight file into a new one
+    :param inputFile: str, weight file to read
+    :param outputFile: str, weight file to write
+    :param objectNames: list(str), objects to keep, in this order. Names that aren't in the file are skipped
+    :param writerOptions: arguments for bSkinFile.openWeightWriter
+    :return: int, number of objects written
+    """
+    count = 0
+    with bSkinFile.openWeightWriter(outputFile, **writerOptions) as writer:
+        for stream in bSkinFile.iterWeightFile(inputFile, objectNames=objectNames):
+            writer.writeBlock(stream.toBlock())
+            count += 1
+    return count
+
+
+def mirrorFile(inputFile, outputFile, axis='x', positiveToNegative=True, sidePrefixes=bSkinMirror.SIDE_PREFIXES,
+               tolerance=bSkinMirror.DEFAULT_TOLERANCE, **writerOptions):
+    """
+    mirror the weights of the objects of a weight file that were saved with vertex positions,
+    the other objects are written unchanged
+    :param inputFile: str, weight file to read
+    :param outputFile: str, weight file to write
+    :param axis: str, one of bSkinMirror.MIRROR_AXES
+    :param positiveToNegative: bool, copy from the positive side of the axis to the negative side, or back
+    :param sidePrefixes: list(tuple(str, str)), pairs of influence prefixes that swap
+    :param tolerance: float, how far a mirrored vertex may be off, relative to the size of the mesh
+    :param writerOptions: arguments for bSkinFile.openWeightWriter
+    :return: list(dict), per object: name, mirrored (False if it has no positions), unmatched (vertices
+             without a mirror) and missing (influences without a mirror)
+    """
+    results = []
+    with bSkinFile.openWeightWriter(outputFile, **writerOptions) as writer:
+        for stream in bSkinFile.iterWeightFile(inputFile):
+            block = stream.toBlock()
+            result = {'name': block.name, 'mirrored': block.positions is not None, 'unmatched': 0, 'missing': []}
+            if block.positions is not None:
+                symmetry = bSkinMirror.symmetryMap(block.positions, block.triangles, axis, tolerance)
+                influenceColumns, result['missing'] = bSkinMirror.influenceMirrorMap(block.influences, sidePrefixes)
+                result['unmatched'] = symmetry.vertexCount - int(symmetry.matched.sum())
+                block.weights = bSkinMirror.mirrorWeights(block.weights, symmetry, influenceColumns,
+                                                          positiveToNegative)
+            writer.writeBlock(block)
+            results.append(result)
+    return results
+
+
+def smoothFile(inputFile, outputFile, iterations=bSkinSmooth.DEFAULT_ITERATIONS,
+               strength=bSkinSmooth.DEFAULT_STRENGTH, lockedInfluences=(), **writerOptions):
+    """
+    smooth the weights of the objects of a weight file that were saved with their triangles,
+    the other objects are written unchanged
+    :param inputFile: str, weight file to read
+    :param outputFile: str, weight file to write
+    :param iterations: int, number of smoothing steps
+    :param strength: float, 0.0 - 1.0, how far each step moves towards the average of the neighbours
+    :param lockedInfluences: list(str), influences that keep their weights
+    :param writerOptions: arguments for bSkinFile.openWeightWriter
+    :return: list(dict), per object: name and smoothed (False if it has no triangles)
+    """
+    lockedInfluences = set(lockedInfluences)
+    results = []
+    with bSkinFile.openWeightWriter(outputFile, **writerOptions) as writer:
+        for stream in bSkinFile.iterWeightFile(inputFile):
+            block = stream.toBlock()
+            smoothed = block.triangles is not None
+            if smoothed:
+                adjacency = bSkinSmooth.meshAdjacency(block.triangles, block.vertexCount)
+                lockMask = [influence in lockedInfluences for influence in block.influences]
+                block.weights = bSkinSmooth.smoothWeights(block.weights, adjacency, iterations, strength, lockMask)
+            writer.writeBlock(block)
+            results.append({'name': block.name, 'smoothed': smoothed})
+    return results
+
+
+def _writerOptions(args):
+    options = {'sparse': args.sparse, 'maxInfluences': args.maxInfluences,
+               'compression': args.compression, 'workers': args.workers}
+    if args.quantize:
+        options['dtype'] = bSkinFile.QUANTIZED
+    return options
+
+
+def _addWriterArguments(parser):
+    parser.add_argument('-o', '--output', required=True, help='weight file to write, .bweights for the binary format')
+    parser.add_argument('--sparse', action='store_true', help='store csr arrays (binary only)')
+    parser.add_argument('--quantize', action='store_true', help='store 16 bit fixed point weights (binary only)')
+    parser.add_argument('--compression', choices=bSkinFile.COMPRESSIONS, help='compress blocks (binary only)')
+    parser.add_argument('--max-influences', dest='maxInfluences', type=int,
+                        help='keep only the biggest weights of each vertex')
+    parser.add_argument('--workers', type=int, default=1, help='blocks encoded in parallel')
+
+
+def _printJson(data):
+    print(json.dumps(data, indent=2, sort_keys=True))
+
+
+def _list(args):
+    entries = inspectFile(args.file)
+    if args.json:
+        return _printJson(entries)
+    for entry in entries:
+        print('%s: %d vertices, %d influences, %s' % (entry['name'], entry['vertexCount'],
+                                                     len(entry['influences']), entry['layout']))
+        if args.influences:
+            for influence in entry['influences']:
+                print('    %s' % influence)
+
+
+def _validate(args):
+    results = validateFile(args.file, args.tolerance)
+    if args.json:
+        _printJson(results)
+    else:
+        for result in results:
+            state = 'ok' if result['valid'] else 'INVALID'
+            print('%s: %s, %d vertices, %d nan, %d negative, %d empty, %d unnormalized, max sum error %g' % (
+                result['name'], state, result['vertexCount'], result['nan'], result['negative'],
+                result['empty'], result['unnormalized'], result['maxSumError']))
+    return 0 if all(result['valid'] for result in results) else 1
+
+
+def _diff(args):
+    result = diffFiles(args.fileA, args.fileB)
+    if args.json:
+        return _printJson(result)
+
+    for name in result['onlyA']:
+        print('only in %s: %s' % (args.fileA, name))
+    for name in result['onlyB']:
+        print('only in %s: %s' % (args.fileB, name))
+    for objectDiff in result['objects']:
+        if 'maxDelta' not in objectDiff:
+            print('%s: vertex counts differ, %d and %d' % (objectDiff['name'], objectDiff['vertexCountA'],
+                                                           objectDiff['vertexCountB']))
+            continue
+        print('%s: max delta %g, mean delta %g, %d nan' % (objectDiff['name'], objectDiff['maxDelta'],
+                                                           objectDiff['meanDelta'], objectDiff['nan']))
+        influences = sorted(objectDiff['influences'].items(), key=lambda item: -item[1]['maxDelta'])
+        for influence, delta in influences[:args.top]:
+            if delta['maxDelta'] > 0:
+                print('    %s: max %g, mean %g' % (influence, delta['maxDelta'], delta['meanDelta']))
+
+
+def _merge(args):
+    print('merged %d objects' % mergeFiles(args.output, args.files, **_writerOptions(args)))
+
+
+def _subset(args):
+    print('wrote %d objects' % subsetFile(args.file, args.output, args.objects, **_writerOptions(args)))
+
+
+def _convert(args):
+    print('converted %d objects' % bSkinFile.convertWeightFile(args.file, args.output, **_writerOptions(args)))
+
+
+def _mirror(args):
+    results = mirrorFile(args.file, args.output, args.axis, not args.negativeToPositive,
+                         tolerance=args.tolerance, **_writerOptions(args))
+    for result in results:
+        if not result['mirrored']:
+            print('%s: no vertex positions, written unchanged' % result['name'])
+            continue
+        print('%s: mirrored, %d vertices without a mirror' % (result['name'], result['unmatched']))
+        if result['missing']:
+            print('    no mirrored influence for %s' % ', '.join(result['missing']))
+
+
+def _smooth(args):
+    results = smoothFile(args.file, args.output, args.iterations, args.strength, args.lock, **_writerOptions(args))
+    for result in results:
+        print('%s: %s' % (result['name'], 'smoothed' if result['smoothed'] else 'no triangles, written unchanged'))
+
+
+def main(argv=None):
+    """
+    command line entry point
+    :param argv: list(str), arguments without the program name, None takes sys.argv
+    :return: int, exit code, 1 if validate found invalid weights
+    """
+    parser = argparse.ArgumentParser(description='inspect and edit bSkinSaver weight files')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    command = commands.add_parser('list', help='list objects and influences')
+    command.add_argument('file')
+    command.add_argument('--influences', action='store_true', help='list the influences of each object')
+    command.add_argument('--json', action='store_true')
+    command.set_defaults(function=_list)
+
+    command = commands.add_parser('validate', help='check for nan, negative and unnormalized weights')
+    command.add_argument('file')
+    command.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    command.add_argument('--json', action='store_true')
+    command.set_defaults(function=_validate)
+
+    command = commands.add_parser('diff', help='compare the weights of two files per influence')
+    command.add_argument('fileA')
+    command.add_argument('fileB')
+    command.add_argument('--top', type=int, default=10, help='influences listed per object')
+    command.add_argument('--json', action='store_true')
+    command.set_defaults(function=_diff)
+
+    command = commands.add_parser('merge', help='merge files, later files win')
+    command.add_argument('files', nargs='+')
+    _addWriterArguments(command)
+    command.set_defaults(function=_merge)
+
+    command = commands.add_parser('subset', help='write some objects to a new file')
+    command.add_argument('file')
+    command.add_argument('--objects', nargs='+', required=True)
+    _addWriterArguments(command)
+    command.set_defaults(function=_subset)
+
+    command = commands.add_parser('convert', help='convert between formats and encodings')
+    command.add_argument('file')
+    _addWriterArguments(command)
+    command.set_defaults(function=_convert)
+
+    command = commands.add_parser('mirror', help='mirror the weights of objects saved with positions, l_ <-> r_')
+    command.add_argument('file')
+    command.add_argument('--axis', choices=bSkinMirror.MIRROR_AXES, default='x')
+    command.add_argument('--negative-to-positive', dest='negativeToPositive', action='store_true',
+                         help='copy from the negative side instead of the positive one')
+    command.add_argument('--tolerance', type=float, default=bSkinMirror.DEFAULT_TOLERANCE,
+                         help='how far a mirrored vertex may be off, relative to the size of the mesh')
+    _addWriterArguments(command)
+    command.set_defaults(function=_mirror)
+
+    command = commands.add_parser('smooth', help='smooth the weights of objects saved with positions')
+    command.add_argument('file')
+    command.add_argument('--iterations', type=int, default=bSkinSmooth.DEFAULT_ITERATIONS)
+    command.add_argument('--strength', type=float, default=bSkinSmooth.DEFAULT_STRENGTH)
+    command.add_argument('--lock', nargs='+', default=[], help='influences that keep their weights')
+    _addWriterArguments(command)
+    command.set_defaults(function=_smooth)
+
+    args = parser.parse_args(argv)
+    return args.function(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
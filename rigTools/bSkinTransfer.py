@@ -0,0 +1,265 @@
+"""
+=====================================================================
+    Topology independent weight transfer for bSkinSaver
+
+    Maps weights saved with vertex positions onto another mesh by
+    looking up where each of its vertices lies on the saved mesh,
+    either taking the weights of the closest saved vertex or
+    interpolating the weights of the closest point on the saved
+    triangles.
+
+    Uses scipy's cKDTree when it's there, otherwise a uniform grid.
+    This module doesn't need Maya.
+
+=====================================================================
+"""
+
+import numpy
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+TRANSFER_NEAREST = 'nearest'
+TRANSFER_BARYCENTRIC = 'barycentric'
+TRANSFER_MODES = (TRANSFER_NEAREST, TRANSFER_BARYCENTRIC)
+
+GRID_POINTS_PER_CELL = 4
+GRID_QUERY_BATCH = 16384
+GRID_SEARCH_RADIUS = 3
+
+
+class PointIndex(object):
+    """
+    nearest point lookup on a point cloud
+    """
+
+    def __init__(self, points, useScipy=True):
+        """
+        :param points: numpy.ndarray, (points x 3) positions
+        :param useScipy: bool, use scipy's cKDTree if it's installed, else a uniform grid
+        """
+        self.points = numpy.asarray(points, dtype=numpy.float64)
+        if not len(self.points):
+            raise ValueError('can\'t look up points in an empty point cloud')
+
+        self._tree = None
+        if useScipy and cKDTree is not None:
+            self._tree = cKDTree(self.points)
+        else:
+            self._buildGrid()
+
+    def nearest(self, queries):
+        """
+        :param queries: numpy.ndarray, (queries x 3) positions
+        :return: tuple(numpy.ndarray), distance and index of the nearest point for each query
+        """
+        queries = numpy.asarray(queries, dtype=numpy.float64).reshape(-1, 3)
+        if self._tree is not None:
+            distances, indices = self._tree.query(queries)
+            return distances, indices.astype(numpy.int64)
+
+        distances = numpy.empty(len(queries))
+        indices = numpy.empty(len(queries), dtype=numpy.int64)
+        for start in range(0, len(queries), GRID_QUERY_BATCH):
+            batch = slice(start, start + GRID_QUERY_BATCH)
+            distances[batch], indices[batch] = self._gridNearest(queries[batch])
+        return distances, indices
+
+    def _buildGrid(self):
+        # points sorted by cell, cells sized for a few points each
+        self._min = self.points.min(axis=0)
+        extent = numpy.maximum(self.points.max(axis=0) - self._min, 1e-9)
+        cellCount = max(len(self.points) // GRID_POINTS_PER_CELL, 1)
+        self._cellSize = max(float(numpy.prod(extent) / cellCount) ** (1.0 / 3.0), float(extent.max()) / 1024)
+
+        # vertices lie on surfaces, so most cells sized by volume are empty and the others
+        # crowded. Shrink the cells until the occupied ones hold about the points we want
+        for i in range(4):
+            self._dims = numpy.floor(extent / self._cellSize).astype(numpy.int64) + 1
+            keys = self._cellKeys(self._cells(self.points))
+            pointsPerCell = float(len(self.points)) / len(numpy.unique(keys))
+            if pointsPerCell < GRID_POINTS_PER_CELL * 2 or self._dims.max() >= 1024:
+                break
+            self._cellSize /= (pointsPerCell / GRID_POINTS_PER_CELL) ** 0.5
+
+        self._order = numpy.argsort(keys, kind='mergesort')
+        self._sortedKeys = keys[self._order]
+
+    def _cells(self, points):
+        return numpy.floor((points - self._min) / self._cellSize).astype(numpy.int64)
+
+    def _cellKeys(self, cells):
+        return (cells[:, 0] * self._dims[1] + cells[:, 1]) * self._dims[2] + cells[:, 2]
+
+    def _gridNearest(self, queries):
+        cells = self._cells(queries)
+        bestDistances = numpy.full(len(queries), numpy.inf)
+        bestIndices = numpy.zeros(len(queries), dtype=numpy.int64)
+        todo = numpy.arange(len(queries))
+
+        # search growing cubes of cells. A point outside a cube of radius r is further away
+        # than r cells, so once the best distance is within that the query is done
+        for radius in range(1, GRID_SEARCH_RADIUS + 1):
+            offsets = numpy.arange(-radius, radius + 1)
+            offsets = numpy.stack(numpy.meshgrid(offsets, offsets, offsets, indexing='ij'), axis=-1).reshape(-1, 3)
+            # the inner cells were searched already
+            offsets = offsets[numpy.abs(offsets).max(axis=1) >= radius - (radius == 1)]
+
+            for offset in offsets:
+                self._searchCells(queries, cells, todo, offset, bestDistances, bestIndices)
+
+            todo = todo[bestDistances[todo] > (radius * self._cellSize) ** 2]
+            if not len(todo):
+                break
+
+        # whatever is still far from everything gets compared with all points
+        for start in range(0, len(todo), 64):
+            batch = todo[start:start + 64]
+            distances = ((queries[batch, numpy.newaxis] - self.points[numpy.newaxis]) ** 2).sum(axis=2)
+            bestIndices[batch] = distances.argmin(axis=1)
+            bestDistances[batch] = distances.min(axis=1)
+
+        return numpy.sqrt(bestDistances), bestIndices
+
+    def _searchCells(self, queries, cells, todo, offset, bestDistances, bestIndices):
+        # the points of one neighbour cell of each query, flattened to (query, point) pairs
+        neighbourCells = cells[todo] + offset
+        valid = ((neighbourCells >= 0) & (neighbourCells < self._dims)).all(axis=1)
+        todo = todo[valid]
+        keys = self._cellKeys(neighbourCells[valid])
+
+        starts = numpy.searchsorted(self._sortedKeys, keys, side='left')
+        counts = numpy.searchsorted(self._sortedKeys, keys, side='right') - starts
+        if not counts.sum():
+            return
+
+        pairQueries = numpy.repeat(todo, counts)
+        firstPair = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        pairPoints = self._order[numpy.repeat(starts, counts) + numpy.arange(counts.sum()) - firstPair]
+        distances = ((queries[pairQueries] - self.points[pairPoints]) ** 2).sum(axis=1)
+
+        # the pairs are grouped by query, take the first closest pair of each query
+        # and keep it if it beats what the query had
+        groupStarts = (numpy.cumsum(counts) - counts)[counts > 0]
+        todo = todo[counts > 0]
+        groupMin = numpy.minimum.reduceat(distances, groupStarts)
+        isMin = distances == numpy.repeat(groupMin, counts[counts > 0])
+        best = numpy.minimum.reduceat(numpy.where(isMin, numpy.arange(len(distances)), len(distances)), groupStarts)
+
+        better = groupMin < bestDistances[todo]
+        bestDistances[todo[better]] = groupMin[better]
+        bestIndices[todo[better]] = pairPoints[best[better]]
+
+
+def closestPointBarycentric(points, a, b, c):
+    """
+    barycentric coordinates of the closest point on triangles, one triangle per point
+    :param points: numpy.ndarray, (n x 3) positions
+    :param a: numpy.ndarray, (n x 3) first corner of each triangle
+    :param b: numpy.ndarray, (n x 3) second corners
+    :param c: numpy.ndarray, (n x 3) third corners
+    :return: numpy.ndarray, (n x 3) weights of a, b and c, they sum up to 1
+    """
+    def dot(x, y):
+        return (x * y).sum(axis=1)
+
+    ab = b - a
+    ac = c - a
+    ap = points - a
+    bp = points - b
+    cp = points - c
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    result = numpy.zeros((len(points), 3))
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        # inside the triangle
+        denominator = va + vb + vc
+        v = vb / denominator
+        w = vc / denominator
+        result[:] = numpy.stack([1.0 - v - w, v, w], axis=1)
+
+        # the voronoi regions of the edges and corners, from the last to the first so the first ones win
+        regions = []
+        w = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        regions.append(((va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0), [0 * w, 1.0 - w, w]))
+        w = d2 / (d2 - d6)
+        regions.append(((vb <= 0) & (d2 >= 0) & (d6 <= 0), [1.0 - w, 0 * w, w]))
+        regions.append(((d6 >= 0) & (d5 <= d6), [0.0, 0.0, 1.0]))
+        v = d1 / (d1 - d3)
+        regions.append(((vc <= 0) & (d1 >= 0) & (d3 <= 0), [1.0 - v, v, 0 * v]))
+        regions.append(((d3 >= 0) & (d4 <= d3), [0.0, 1.0, 0.0]))
+        regions.append(((d1 <= 0) & (d2 <= 0), [1.0, 0.0, 0.0]))
+
+        for mask, coordinates in regions:
+            for k in range(3):
+                value = coordinates[k]
+                result[mask, k] = value[mask] if isinstance(value, numpy.ndarray) else value
+
+    # degenerate triangles
+    result[~numpy.isfinite(result).all(axis=1)] = [1.0, 0.0, 0.0]
+    return result
+
+
+def transferWeights(sourcePositions, sourceWeights, targetPositions, sourceTriangles=None,
+                    mode=TRANSFER_BARYCENTRIC, useScipy=True):
+    """
+    weights for new vertices from weights saved with their positions
+    :param sourcePositions: numpy.ndarray, (source vertices x 3) saved positions
+    :param sourceWeights: numpy.ndarray, (source vertices x influences) saved weights
+    :param targetPositions: numpy.ndarray, (target vertices x 3) positions of the vertices to weight
+    :param sourceTriangles: numpy.ndarray, (triangles x 3) vertex ids of the saved mesh, needed for TRANSFER_BARYCENTRIC
+    :param mode: str, TRANSFER_NEAREST takes the weights of the closest saved vertex, TRANSFER_BARYCENTRIC
+                 interpolates them at the closest point on the triangles around it
+    :param useScipy: bool, see PointIndex
+    :return: tuple(numpy.ndarray), (target vertices x influences) weights and the distance of each
+             target vertex to where its weights were taken from
+    """
+    if mode not in TRANSFER_MODES:
+        raise ValueError('unknown transfer mode: %s' % mode)
+
+    sourcePositions = numpy.asarray(sourcePositions, dtype=numpy.float64)
+    targetPositions = numpy.asarray(targetPositions, dtype=numpy.float64)
+    distances, nearest = PointIndex(sourcePositions, useScipy).nearest(targetPositions)
+    weights = numpy.array(sourceWeights[nearest], dtype=numpy.float64)
+
+    if mode == TRANSFER_NEAREST or sourceTriangles is None or not len(sourceTriangles):
+        return weights, distances
+
+    # the triangles around the nearest vertex of each target are the candidates
+    triangles = numpy.asarray(sourceTriangles, dtype=numpy.int64).reshape(-1, 3)
+    corners = triangles.ravel()
+    cornerTriangles = numpy.argsort(corners, kind='mergesort') // 3
+    triangleCounts = numpy.bincount(corners, minlength=len(sourcePositions))
+    triangleStarts = numpy.cumsum(triangleCounts) - triangleCounts
+
+    counts = triangleCounts[nearest]
+    pairTargets = numpy.repeat(numpy.arange(len(targetPositions)), counts)
+    firstPair = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    pairTriangles = triangles[cornerTriangles[numpy.repeat(triangleStarts[nearest], counts) +
+                                              numpy.arange(counts.sum()) - firstPair]]
+
+    points = targetPositions[pairTargets]
+    corners = [sourcePositions[pairTriangles[:, k]] for k in range(3)]
+    barycentric = closestPointBarycentric(points, *corners)
+    closest = sum(barycentric[:, k, numpy.newaxis] * corners[k] for k in range(3))
+    pairDistances = numpy.sqrt(((points - closest) ** 2).sum(axis=1))
+
+    # closest triangle of each target
+    order = numpy.lexsort((pairDistances, pairTargets))
+    first = numpy.ones(len(order), dtype=bool)
+    first[1:] = pairTargets[order][1:] != pairTargets[order][:-1]
+    best = order[first]
+
+    targets = pairTargets[best]
+    weights[targets] = sum(barycentric[best, k, numpy.newaxis] * sourceWeights[pairTriangles[best, k]]
+                           for k in range(3))
+    distances[targets] = pairDistances[best]
+    return weights, distances
@@ -0,0 +1,70 @@
+"""
+=====================================================================
+    Undo for the weights bSkinSaver sets through the API
+
+    MFnSkinCluster.setWeights doesn't go on the undo queue, so after
+    an edit that was already done through the API, push() puts a
+    function that reverts it and one that does it again on the queue
+    as one bSkinSaverUndo command, inside whatever undo chunk is open.
+
+        bSkinUndo.push(restoreOldWeights, setNewWeights)
+
+    The command comes from the plugin bSkinUndoPlugin.py next to this
+    file, which gets loaded on the first push. The functions stay
+    alive as long as the command is in the undo queue.
+
+=====================================================================
+"""
+
+import os
+
+import maya.cmds as cmds
+import maya.OpenMayaMPx as OpenMayaMPx
+
+
+COMMAND_NAME = 'bSkinSaverUndo'
+PLUGIN_NAME = 'bSkinUndoPlugin'
+
+# (undo, redo) of the command that is about to run
+_pending = []
+
+
+class UndoCommand(OpenMayaMPx.MPxCommand):
+    """
+    runs the functions of an edit that was already done, on undo and redo
+    """
+
+    def isUndoable(self):
+        return True
+
+    def doIt(self, args):
+        self._undo, self._redo = _pending.pop()
+
+    def undoIt(self):
+        self._undo()
+
+    def redoIt(self):
+        self._redo()
+
+
+def creator():
+    return OpenMayaMPx.asMPxPtr(UndoCommand())
+
+
+def loadPlugin():
+    if not cmds.pluginInfo(PLUGIN_NAME, query=True, loaded=True):
+        cmds.loadPlugin(os.path.join(os.path.dirname(os.path.abspath(__file__)), PLUGIN_NAME + '.py'), quiet=True)
+
+
+def push(undo, redo):
+    """
+    put an edit that was already done on the undo queue
+    :param undo: function without arguments that reverts the edit
+    :param redo: function without arguments that does it again
+    """
+    loadPlugin()
+    _pending.append((undo, redo))
+    try:
+        getattr(cmds, COMMAND_NAME)()
+    finally:
+        del _pending[:]
@@ -0,0 +1,21 @@
+"""
+=====================================================================
+    Maya plugin with the bSkinSaverUndo command of bSkinUndo
+
+    bSkinUndo loads it on its own. The command lives in bSkinUndo, so
+    it shares its queue no matter how Maya imports this file.
+
+=====================================================================
+"""
+
+import maya.OpenMayaMPx as OpenMayaMPx
+
+import bSkinUndo
+
+
+def initializePlugin(plugin):
+    OpenMayaMPx.MFnPlugin(plugin).registerCommand(bSkinUndo.COMMAND_NAME, bSkinUndo.creator)
+
+
+def uninitializePlugin(plugin):
+    OpenMayaMPx.MFnPlugin(plugin).deregisterCommand(bSkinUndo.COMMAND_NAME)
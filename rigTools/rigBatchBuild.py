@@ -0,0 +1,366 @@
+"""
+=====================================================================
+    Batch builds of humanRig characters
+
+    Builds a list of characters with humanRig.human.build, each one
+    in its own worker process, several at a time. The number of
+    builds at a time is bounded by the cores and by the free memory
+    divided by the memory one build needs. Each character gets a log
+    with everything its worker printed and a json record with its
+    status, seconds, the seconds of each build step, the error and
+    traceback if it failed, and its peak memory. All records go
+    into results.json in the output folder:
+
+        mayapy rigBatchBuild.py human elf troll -o D:/builds/nightly
+        mayapy rigBatchBuild.py @cast.txt -o D:/builds/nightly --save-scenes
+        python rigBatchBuild.py human elf --backend fake --jobs 2
+
+    @cast.txt reads the characters from a file, one per line. The
+    workers run in mayapy with maya.standalone, or in any python with
+    the rigFakeMaya stand-in (--backend fake), which builds synthetic
+    characters and is there to test the runner and the rig code.
+    Use --python to point the workers at mayapy when the runner
+    itself runs in another python.
+    A worker that crashes or runs past --timeout fails its character
+    and the batch goes on.
+
+=====================================================================
+"""
+
+from __future__ import print_function
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.pool import ThreadPool
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+BACKEND_MAYA = 'maya'
+BACKEND_FAKE = 'fake'
+BACKENDS = (BACKEND_MAYA, BACKEND_FAKE)
+
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+
+# memory one build takes, maya standalone with a character scene
+DEFAULT_MEMORY_PER_BUILD_MB = 2048
+
+RESULTS_FILE = 'results.json'
+SCENE_FILE = '%s_rig.mb'
+
+# folder with rigLib and humanRig
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# clock for the builds, time.perf_counter isn't there in python 2
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+def availableMemory():
+    """
+    :return: float, MB of memory that can be used without swapping, None where it can't be read
+    """
+    if psutil is not None:
+        return psutil.virtual_memory().available / (1024.0 * 1024.0)
+
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [('length', ctypes.c_ulong), ('memoryLoad', ctypes.c_ulong),
+                        ('totalPhys', ctypes.c_ulonglong), ('availPhys', ctypes.c_ulonglong),
+                        ('totalPageFile', ctypes.c_ulonglong), ('availPageFile', ctypes.c_ulonglong),
+                        ('totalVirtual', ctypes.c_ulonglong), ('availVirtual', ctypes.c_ulonglong),
+                        ('availExtendedVirtual', ctypes.c_ulonglong)]
+
+        status = MemoryStatus()
+        status.length = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.availPhys / (1024.0 * 1024.0)
+        return None
+
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024.0
+    except (IOError, OSError, ValueError):
+        pass
+    return None
+
+
+def defaultJobs(characterCount, memoryPerBuild=DEFAULT_MEMORY_PER_BUILD_MB):
+    """
+    :param characterCount: int, number of characters to build
+    :param memoryPerBuild: float, MB one build needs
+    :return: int, builds to run at a time, one per core as long as the free memory lasts
+    """
+    jobs = multiprocessing.cpu_count()
+    memory = availableMemory()
+    if memory is not None and memoryPerBuild > 0:
+        jobs = min(jobs, int(memory // memoryPerBuild))
+    return max(1, min(jobs, characterCount))
+
+
+def _peakMemory():
+    # peak resident memory of this process in MB, None where it can't be read
+    if resource is None:
+        return None
+    maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maxRss / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0), 1)
+
+
+def _startBackend(backend, root):
+    # make maya.cmds work in this process and import humanRig
+    if backend == BACKEND_MAYA:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+    else:
+        import rigFakeMaya
+        rigFakeMaya.install()
+
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    import humanRig
+    return humanRig
+
+
+def _stopBackend(backend):
+    if backend == BACKEND_MAYA:
+        import maya.standalone
+        # maya before 2016 has no uninitialize
+        if hasattr(maya.standalone, 'uninitialize'):
+            maya.standalone.uninitialize()
+
+
+def buildCharacter(character, backend=BACKEND_MAYA, projectPath=None, incremental=False, sceneDir=None, root=ROOT):
+    """
+    build one character in this process, what each worker runs
+    :param character: str, character name
+    :param backend: str, one of BACKENDS
+    :param projectPath: str, folder with the character folders, None keeps humanRig.project.project_path
+    :param incremental: bool, see humanRig.human.build()
+    :param sceneDir: str, folder to save the built rig to, None doesn't save it
+    :param root: str, folder with rigLib and humanRig
+    :return: dict, character, status, seconds (build), startupSeconds (starting Maya), steps, nodes,
+             scene, error, traceback and peakMemoryMB
+    """
+    record = {'character': character, 'backend': backend, 'status': STATUS_FAILED, 'seconds': None, 'steps': []}
+
+    start = _clock()
+    try:
+        humanRig = _startBackend(backend, root)
+        if projectPath:
+            humanRig.human.project_path = projectPath
+        if backend == BACKEND_FAKE:
+            import rigFakeMaya
+            rigFakeMaya.registerHumanFiles(character, humanRig.human.project_path)
+        from maya import cmds
+        record['startupSeconds'] = _clock() - start
+
+        start = _clock()
+        try:
+            characterGraph = humanRig.human.build(character, incremental=incremental)
+        finally:
+            record['seconds'] = _clock() - start
+
+        record['steps'] = [{'name': node.name, 'state': node.state, 'seconds': node.seconds, 'reason': node.reason}
+                           for node in characterGraph.nodes if node.state is not None]
+        record['nodes'] = len(cmds.ls())
+
+        if sceneDir:
+            if not os.path.isdir(sceneDir):
+                os.makedirs(sceneDir)
+            record['scene'] = os.path.join(sceneDir, SCENE_FILE % character)
+            cmds.file(rename=record['scene'])
+            cmds.file(save=True, force=True, type='mayaBinary')
+
+        record['status'] = STATUS_OK
+    except Exception as error:
+        record['error'] = '%s: %s' % (type(error).__name__, error)
+        record['traceback'] = traceback.format_exc()
+        sys.stderr.write(record['traceback'])
+
+    try:
+        _stopBackend(backend)
+    except Exception as error:
+        sys.stderr.write('stopping %s failed: %s\n' % (backend, error))
+
+    record['peakMemoryMB'] = _peakMemory()
+    return record
+
+
+def _runWorker(character, outputDir, backend, python, projectPath, incremental, saveScenes, timeout, root):
+    # buildCharacter() in a new process, with its output going to the character's log
+    logPath = os.path.join(outputDir, character + '.log')
+    resultPath = os.path.join(outputDir, character + '.json')
+    if os.path.exists(resultPath):
+        os.remove(resultPath)
+
+    script = os.path.splitext(os.path.abspath(__file__))[0] + '.py'
+    command = [python, script, '--worker', character, '--result', resultPath, '--backend', backend, '--root', root]
+    if projectPath:
+        command += ['--project', projectPath]
+    if incremental:
+        command.append('--incremental')
+    if saveScenes:
+        command.append('--save-scenes')
+        command += ['-o', outputDir]
+
+    timedOut = []
+
+    def kill():
+        timedOut.append(True)
+        process.kill()
+
+    start = _clock()
+    with open(logPath, 'w') as log:
+        process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+        timer = threading.Timer(timeout, kill) if timeout else None
+        if timer is not None:
+            timer.start()
+        try:
+            returnCode = process.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+    wallSeconds = _clock() - start
+
+    record = None
+    if os.path.exists(resultPath):
+        with open(resultPath) as f:
+            record = json.load(f)
+    if record is None:
+        record = {'character': character, 'backend': backend, 'status': STATUS_FAILED, 'seconds': None, 'steps': []}
+        if timedOut:
+            record['error'] = 'timed out after %ss' % timeout
+        else:
+            record['error'] = 'worker exited with code %s before writing its result' % returnCode
+
+    record.update({'log': logPath, 'returnCode': returnCode, 'wallSeconds': wallSeconds})
+    return record
+
+
+def _unique(names):
+    # names in order without repeats
+    seen = set()
+    for name in names:
+        if name not in seen:
+            seen.add(name)
+            yield name
+
+
+def runBatch(characters, outputDir, jobs=None, memoryPerBuild=DEFAULT_MEMORY_PER_BUILD_MB, backend=BACKEND_MAYA,
+             python=None, projectPath=None, incremental=False, saveScenes=False, timeout=None, root=ROOT,
+             log=sys.stderr):
+    """
+    :param characters: list(str), character names
+    :param outputDir: str, folder for the logs, records, results.json and saved scenes
+    :param jobs: int, builds at a time, None takes defaultJobs()
+    :param memoryPerBuild: float, MB one build needs, see defaultJobs()
+    :param backend: str, one of BACKENDS
+    :param python: str, interpreter of the workers, mayapy for maya, None takes the one running this
+    :param projectPath: str, see buildCharacter()
+    :param incremental: bool, see humanRig.human.build()
+    :param saveScenes: bool, save each rig to the output folder
+    :param timeout: float, seconds a build may take before its worker is killed, None waits
+    :param root: str, folder with rigLib and humanRig
+    :param log: file, gets a line per character, None for no output
+    :return: dict, the batch settings, seconds and the record of each character, see buildCharacter()
+    """
+    characters = list(_unique(characters))
+    if not os.path.isdir(outputDir):
+        os.makedirs(outputDir)
+    if jobs is None:
+        jobs = defaultJobs(len(characters), memoryPerBuild)
+
+    if log is not None:
+        log.write('building %d characters, %d at a time\n' % (len(characters), jobs))
+
+    worker = functools.partial(_runWorker, outputDir=outputDir, backend=backend, python=python or sys.executable,
+                               projectPath=projectPath, incremental=incremental, saveScenes=saveScenes,
+                               timeout=timeout, root=root)
+    started = time.time()
+    start = _clock()
+    records = {}
+    pool = ThreadPool(jobs)
+    try:
+        for record in pool.imap_unordered(worker, characters):
+            records[record['character']] = record
+            if log is not None:
+                log.write('%-20s %-6s %8s  %s\n' % (record['character'], record['status'],
+                                                    '%.1fs' % record['wallSeconds'], record.get('error', '')))
+    finally:
+        pool.close()
+        pool.join()
+
+    report = {'started': started, 'seconds': _clock() - start, 'jobs': jobs, 'backend': backend,
+              'cpus': multiprocessing.cpu_count(), 'availableMemoryMB': availableMemory(),
+              'failed': [name for name in characters if records[name]['status'] != STATUS_OK],
+              'characters': [records[name] for name in characters]}
+    with open(os.path.join(outputDir, RESULTS_FILE), 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    return report
+
+
+def main(argv=None):
+    """
+    :param argv: list(str), arguments without the program name, None takes sys.argv
+    """
+    parser = argparse.ArgumentParser(description='build humanRig characters in parallel worker processes',
+                                     fromfile_prefix_chars='@')
+    parser.add_argument('characters', nargs='*', help='character names, @file reads them from a file')
+    parser.add_argument('-o', '--output', default='rigBatchBuild', help='folder for logs, results and scenes')
+    parser.add_argument('--jobs', type=int, help='builds at a time, default one per core as memory allows')
+    parser.add_argument('--memory-per-build', dest='memoryPerBuild', type=float,
+                        default=DEFAULT_MEMORY_PER_BUILD_MB, help='MB one build needs')
+    parser.add_argument('--backend', choices=BACKENDS, default=BACKEND_MAYA)
+    parser.add_argument('--python', help='interpreter for the workers, like mayapy')
+    parser.add_argument('--project', help='folder with the character folders instead of humanRig.project')
+    parser.add_argument('--incremental', action='store_true', help='rebuild from the scene checkpoints')
+    parser.add_argument('--save-scenes', dest='saveScenes', action='store_true', help='save each rig')
+    parser.add_argument('--timeout', type=float, help='seconds before a build is killed')
+    parser.add_argument('--root', default=ROOT, help='folder with rigLib and humanRig')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        record = buildCharacter(args.worker, args.backend, args.project, args.incremental,
+                                args.output if args.saveScenes else None, args.root)
+        with open(args.result, 'w') as f:
+            json.dump(record, f)
+        return 0 if record['status'] == STATUS_OK else 1
+
+    characters = [name.strip() for name in args.characters if name.strip()]
+    if not characters:
+        parser.error('no characters to build')
+
+    report = runBatch(characters, args.output, args.jobs, args.memoryPerBuild, args.backend, args.python, args.project,
+                      args.incremental, args.saveScenes, args.timeout, args.root)
+
+    buildSeconds = sum(record['wallSeconds'] for record in report['characters'])
+    print('%d built, %d failed, %.1fs for %.1fs of builds, %d at a time, results in %s' %
+          (len(report['characters']) - len(report['failed']), len(report['failed']), report['seconds'], buildSeconds,
+           report['jobs'], os.path.join(args.output, RESULTS_FILE)))
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
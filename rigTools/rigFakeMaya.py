@@ -0,0 +1,1661 @@
+"""
+=====================================================================
+    maya.cmds stand-in for building rigs outside of Maya
+
+    An in-memory scene with a DAG of transforms, joints, shapes,
+    constraints and IK handles, a DG of utility nodes and deformers,
+    and attributes with locks and connections, behind the subset of
+    maya.cmds that rigLib and humanRig.human.build use. The commands
+    take the same flags and fail the same way Maya does where the
+    build depends on it: names are made unique, locked or connected
+    attributes can't be set, a plug takes one incoming connection,
+    empty listRelatives give None.
+
+    Transforms have translate, rotate (xyz) and scale, so parenting
+    keeps the world position and constraints snap like in Maya when
+    they are made. Nothing is evaluated after that: constraints, IK
+    and deformers don't move anything, the only computed values are
+    the world matrices and the reverse nodes. skinClusters keep
+    weights, all on the first joint until they are set.
+
+    bSkinFakeMaya puts the Maya API on top of this scene, and install()
+    installs both, so bSkinSaver can save and load the weights of a
+    rig in the same run that built it.
+
+        import rigFakeMaya
+        rigFakeMaya.install()       # before importing rigLib
+        rigFakeMaya.registerHumanFiles('human', 'D:/AutoRig_sagar/assets/')
+
+        import humanRig
+        humanRig.human.build('human')
+
+    cmds.file imports run the python function registered for the
+    path, humanBuilderScene() and humanModelScene() make a biped
+    that matches humanRig. Saving a renamed scene pickles it to the
+    file, and opening the file reads it back. From a shell:
+
+        python rigFakeMaya.py human --repeat 20
+        python rigFakeMaya.py human --trace human_build.json
+
+    This module doesn't need Maya.
+
+=====================================================================
+"""
+
+from __future__ import print_function
+
+import argparse
+import collections
+import fnmatch
+import functools
+import itertools
+import math
+import os
+import re
+import sys
+import time
+
+import numpy
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+_STRING_TYPES = (str, type(u''))
+
+# node type -> the type it's derived from, abstract types can't be created
+_NODE_TYPES = {
+    'dependNode': None,
+    'dagNode': 'dependNode',
+    'transform': 'dagNode',
+    'joint': 'transform',
+    'ikHandle': 'transform',
+    'ikEffector': 'transform',
+    'constraint': 'transform',
+    'pointConstraint': 'constraint',
+    'orientConstraint': 'constraint',
+    'parentConstraint': 'constraint',
+    'scaleConstraint': 'constraint',
+    'poleVectorConstraint': 'pointConstraint',
+    'shape': 'dagNode',
+    'nurbsCurve': 'shape',
+    'locator': 'shape',
+    'mesh': 'shape',
+    'clusterHandle': 'shape',
+    'geometryFilter': 'dependNode',
+    'cluster': 'geometryFilter',
+    'skinCluster': 'geometryFilter',
+    'makeNurbCircle': 'dependNode',
+    'reverse': 'dependNode',
+}
+
+_ABSTRACT_TYPES = ('dependNode', 'dagNode', 'constraint', 'shape', 'geometryFilter')
+
+_IK_SOLVERS = ('ikSCsolver', 'ikRPsolver', 'ikSplineSolver')
+
+# names Maya gives nodes that are created without one
+_DEFAULT_NAMES = {'transform': 'transform1', 'joint': 'joint1', 'reverse': 'reverse1', 'locator': 'locator1',
+                  'nurbsCurve': 'curve1', 'ikHandle': 'ikHandle1', 'cluster': 'cluster1', 'skinCluster': 'skinCluster1'}
+
+_INVALID_CHARACTERS = re.compile(r'[^A-Za-z0-9_]')
+_COMPONENT = re.compile(r'^(?P<node>[^.]+)\.(?P<kind>cv|vtx)\[(?P<start>\*|\d+)(?::(?P<end>\d+))?\]$')
+_INDEX = re.compile(r'\[\d*\]$')
+
+
+def _double3(longName, shortName, default=0.0, keyable=False):
+    # a compound of three doubles and its X, Y, Z children, as attribute table rows
+    children = tuple(longName + axis for axis in 'XYZ')
+    rows = [(longName, shortName, None, False, 'double3', children)]
+    for child, axis in zip(children, 'xyz'):
+        rows.append((child, shortName + axis, default, keyable, 'double', None))
+    return rows
+
+
+# node type -> attribute rows (long name, short name, default, keyable, type, children), the attributes of
+# the derived types are added further down
+_TYPE_ATTRIBUTES = {
+    'dependNode': [('nodeState', 'nds', 0, False, 'enum', None)],
+    'dagNode': [('visibility', 'v', True, True, 'bool', None),
+                ('template', 'tmp', False, False, 'bool', None),
+                ('intermediateObject', 'io', False, False, 'bool', None),
+                ('overrideEnabled', 'ove', False, False, 'bool', None),
+                ('overrideDisplayType', 'ovdt', 0, False, 'enum', None),
+                ('overrideColor', 'ovc', 0, False, 'long', None),
+                ('useObjectColor', 'uoc', 0, False, 'enum', None),
+                ('objectColor', 'oc', 0, False, 'long', None),
+                ('worldMatrix', 'wm', None, False, 'matrix', None)],
+    'transform': (_double3('translate', 't', 0.0, True) + _double3('rotate', 'r', 0.0, True) +
+                  _double3('scale', 's', 1.0, True) +
+                  [('inheritsTransform', 'it', True, False, 'bool', None),
+                   ('displayHandle', 'dh', False, False, 'bool', None)]),
+    'joint': [('radius', 'radi', 1.0, False, 'double', None),
+              ('lockInfluenceWeights', 'liw', False, False, 'bool', None)],
+    'ikHandle': (_double3('poleVector', 'pv', 0.0, True) + _double3('dWorldUpVector', 'dwu', 0.0) +
+                 _double3('dWorldUpVectorEnd', 'dwve', 0.0) +
+                 [('ikBlend', 'ikb', 1.0, True, 'double', None),
+                  ('twist', 'twi', 0.0, True, 'double', None),
+                  ('dTwistControlEnable', 'dtce', False, False, 'bool', None),
+                  ('dWorldUpType', 'dwut', 0, False, 'enum', None),
+                  ('dForwardAxis', 'dfa', 0, False, 'enum', None),
+                  ('dWorldUpAxis', 'dwua', 0, False, 'enum', None),
+                  ('dWorldUpMatrix', 'dwum', None, False, 'matrix', None),
+                  ('dWorldUpMatrixEnd', 'dwue', None, False, 'matrix', None)]),
+    'constraint': (_double3('constraintTranslate', 'ct') + _double3('constraintRotate', 'cr') +
+                   _double3('constraintScale', 'cs', 1.0)),
+    'geometryFilter': [('envelope', 'en', 1.0, True, 'double', None)],
+    'reverse': _double3('input', 'i') + _double3('output', 'o'),
+}
+
+# the attributes that connect a constraint to what it drives
+_CONSTRAINT_CHANNELS = {
+    'pointConstraint': (('constraintTranslate', 'translate'),),
+    'orientConstraint': (('constraintRotate', 'rotate'),),
+    'parentConstraint': (('constraintTranslate', 'translate'), ('constraintRotate', 'rotate')),
+    'scaleConstraint': (('constraintScale', 'scale'),),
+    'poleVectorConstraint': (('constraintTranslate', 'poleVector'),),
+}
+
+
+class _AttributeDefinition(object):
+    __slots__ = ('name', 'shortName', 'default', 'keyable', 'attributeType', 'children', 'parent', 'minimum', 'maximum',
+                 'enumNames')
+
+    def __init__(self, name, shortName, default, keyable, attributeType, children=None, parent=None, minimum=None,
+                 maximum=None, enumNames=None):
+        self.name = name
+        self.shortName = shortName
+        self.default = default
+        self.keyable = keyable
+        self.attributeType = attributeType
+        self.children = children
+        self.parent = parent
+        self.minimum = minimum
+        self.maximum = maximum
+        self.enumNames = enumNames
+
+
+def _typeAttributes():
+    # node type -> long and short names -> _AttributeDefinition, with the attributes of the base types
+    tables = {}
+
+    def table(nodeType):
+        if nodeType in tables:
+            return tables[nodeType]
+        base = _NODE_TYPES[nodeType]
+        result = dict(table(base)) if base else {}
+        for name, shortName, default, keyable, attributeType, children in _TYPE_ATTRIBUTES.get(nodeType, ()):
+            definition = _AttributeDefinition(name, shortName, default, keyable, attributeType, children)
+            result[name] = result[shortName] = definition
+        for definition in list(result.values()):
+            for child in definition.children or ():
+                result[child].parent = definition.name
+        tables[nodeType] = result
+        return result
+
+    for nodeType in _NODE_TYPES:
+        table(nodeType)
+    return tables
+
+
+_ATTRIBUTE_TABLES = _typeAttributes()
+
+
+class _Attribute(object):
+    # the state of one attribute of one node, made when it's first set, locked or connected
+    __slots__ = ('definition', 'value', 'keyable', 'channelBox', 'locked', 'source')
+
+    def __init__(self, definition):
+        self.definition = definition
+        self.value = definition.default
+        self.keyable = definition.keyable
+        self.channelBox = False
+        self.locked = False
+        # (node, attribute name) of the incoming connection
+        self.source = None
+
+
+class _Node(object):
+    def __init__(self, name, nodeType, order):
+        self.name = name
+        self.nodeType = nodeType
+        self.order = order
+        self.alive = True
+        # dag parents, more than one for instanced shapes, the first one is the main one
+        self.parents = []
+        self.children = []
+        self.attributes = {}
+        self.dynamicAttributes = {}
+        # (attribute name, destination node, destination attribute name)
+        self.outputs = []
+
+        # shapes, object space points
+        self.points = None
+        self.triangles = None
+        # shapes, deformers and history nodes on them
+        self.history = []
+        # deformers
+        self.geometry = []
+        # skinClusters, shape -> (vertices x influences) weights
+        self.weights = {}
+        self.components = {}
+        self.influences = []
+        self.handle = None
+        self.ownsHandle = False
+        self.deformer = None
+        # constraints
+        self.targets = []
+        self.constrained = None
+        # (constraint attribute, driven attribute, axes)
+        self.channels = []
+        # ik handles
+        self.startJoint = None
+        self.endEffector = None
+        self.solver = None
+        self.curve = None
+        self.ikHandle = None
+
+    def isType(self, nodeType):
+        return _derivesFrom(self.nodeType, nodeType)
+
+    @property
+    def parent(self):
+        return self.parents[0] if self.parents else None
+
+    def path(self):
+        names = []
+        node = self
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return '|' + '|'.join(reversed(names))
+
+    def definition(self, name):
+        """
+        :param name: str, long or short attribute name
+        :return: _AttributeDefinition, None if the node has no such attribute
+        """
+        definition = self.dynamicAttributes.get(name)
+        if definition is None:
+            definition = _ATTRIBUTE_TABLES[self.nodeType].get(name)
+        return definition
+
+    def attribute(self, name):
+        """
+        :param name: str, long or short attribute name the node has
+        :return: _Attribute, made on first use
+        """
+        definition = self.definition(name)
+        attribute = self.attributes.get(definition.name)
+        if attribute is None:
+            attribute = self.attributes[definition.name] = _Attribute(definition)
+        return attribute
+
+
+class FakeScene(object):
+    """
+    nodes by name in creation order, the selection and the file name. Pickles as a whole for
+    cmds.file(save=True) and cmds.file(path, open=True)
+    """
+
+    def __init__(self):
+        self.nodes = collections.OrderedDict()
+        self.selection = []
+        # selected shape -> (vertex ids, soft selection weights or None), for vertices selected through the API
+        self.selectedComponents = {}
+        self.fileName = ''
+        self._nextNodeId = 0
+
+    def uniqueName(self, name):
+        """
+        :param name: str, wanted name, characters Maya doesn't allow become _
+        :return: str, the name, or with its trailing number counted up until no node has it
+        """
+        name = _INVALID_CHARACTERS.sub('_', name) or '_'
+        if name[0].isdigit():
+            name = '_' + name
+        if name not in self.nodes:
+            return name
+        match = re.match(r'^(.*?)(\d*)$', name)
+        base, number = match.group(1), int(match.group(2) or 0)
+        while True:
+            number += 1
+            candidate = '%s%d' % (base, number)
+            if candidate not in self.nodes:
+                return candidate
+
+    def add(self, name, nodeType, parent=None):
+        """
+        :param name: str, wanted name, see uniqueName()
+        :param nodeType: str, one of the types in _NODE_TYPES that isn't abstract
+        :param parent: _Node, dag parent
+        :return: _Node
+        """
+        if nodeType not in _NODE_TYPES or nodeType in _ABSTRACT_TYPES:
+            raise RuntimeError('Unknown object type: %s' % nodeType)
+        node = _Node(self.uniqueName(name or _DEFAULT_NAMES.get(nodeType, nodeType + '1')), nodeType,
+                     self._nextNodeId)
+        self._nextNodeId += 1
+        self.nodes[node.name] = node
+        if parent is not None:
+            _addChild(parent, node)
+        _notify('nodeAdded', node)
+        return node
+
+    def node(self, name):
+        """
+        :param name: str, node name or dag path, with or without an attribute or component
+        :return: _Node
+        """
+        node = self.nodes.get(_nodeName(name))
+        if node is None:
+            raise ValueError('No object matches name: %s' % name)
+        return node
+
+    def remove(self, node):
+        if not node.alive:
+            return
+        _notify('nodeRemoved', node)
+        node.alive = False
+        for child in list(node.children):
+            if len(child.parents) > 1:
+                # an instance of the child goes away, not the child
+                child.parents.remove(node)
+                node.children.remove(child)
+            else:
+                self.remove(child)
+        for parent in node.parents:
+            parent.children.remove(node)
+        node.parents = []
+
+        _disconnectNode(node)
+        self.selection = [selected for selected in self.selection if selected is not node]
+        self.selectedComponents.pop(node, None)
+        del self.nodes[node.name]
+
+        # nodes that don't work without this one go with it
+        dependents = list(node.history) if node.isType('shape') else []
+        for deformer in node.history:
+            if node in deformer.geometry:
+                deformer.geometry.remove(node)
+                deformer.weights.pop(node, None)
+        for shape in node.geometry:
+            if node in shape.history:
+                shape.history.remove(node)
+        if node.isType('geometryFilter'):
+            if node.ownsHandle and node.handle is not None:
+                dependents.append(node.handle)
+        dependents = [dependent for dependent in dependents if not dependent.isType('geometryFilter')
+                      or not dependent.geometry]
+        if node.deformer is not None:
+            dependents.append(node.deformer)
+        if node.nodeType == 'ikHandle' and node.endEffector is not None:
+            dependents.append(node.endEffector)
+        for dependent in dependents:
+            self.remove(dependent)
+
+
+scene = FakeScene()
+
+# normalized file path -> function that fills the scene like importing the file would
+_files = {}
+
+# functions called with a message and the node, or None, when the scene changes, see addListener()
+_listeners = []
+
+
+def addListener(function):
+    """
+    have a function called when nodes are added or removed and when a scene is made new or opened
+    :param function: function, takes the message (nodeAdded, nodeRemoved, afterNew or afterOpen)
+            and the _Node added or removed, None for the scene messages
+    """
+    if function not in _listeners:
+        _listeners.append(function)
+
+
+def _notify(message, node=None):
+    for function in list(_listeners):
+        function(message, node)
+
+
+def _derivesFrom(nodeType, baseType):
+    while nodeType is not None:
+        if nodeType == baseType:
+            return True
+        nodeType = _NODE_TYPES[nodeType]
+    return False
+
+
+def _nodeName(name):
+    return str(name).split('.')[0].split('|')[-1]
+
+
+def _flag(kwargs, longName, shortName, default=None):
+    if longName in kwargs:
+        return kwargs[longName]
+    return kwargs.get(shortName, default)
+
+
+def _names(*args):
+    # flatten strings and nested lists of strings
+    names = []
+    for arg in args:
+        if arg is None:
+            continue
+        if isinstance(arg, _STRING_TYPES):
+            names.append(arg)
+        else:
+            names.extend(_names(*arg))
+    return names
+
+
+def _addChild(parent, child):
+    if parent.isType('shape'):
+        raise RuntimeError('%s is a shape and can\'t have children' % parent.name)
+    child.parents.append(parent)
+    parent.children.append(child)
+
+
+def _isAncestor(node, other):
+    # True if node is other or one of its dag parents
+    while other is not None:
+        if other is node:
+            return True
+        other = other.parent
+    return False
+
+
+def _shapeName(transformName):
+    # Maya puts Shape before a trailing number, pCube1 -> pCubeShape1
+    match = re.match(r'^(.*?)(\d*)$', transformName)
+    return match.group(1) + 'Shape' + match.group(2)
+
+
+def _shapes(node):
+    if node.isType('shape'):
+        return [node]
+    return [child for child in node.children if child.isType('shape')]
+
+
+def _typeMatches(node, types):
+    return not types or any(node.isType(nodeType) for nodeType in types)
+
+
+def _typeList(value):
+    if value is None:
+        return []
+    return [value] if isinstance(value, _STRING_TYPES) else list(value)
+
+
+# ------------------------------------------------------------------
+# transform math, row vectors like Maya: world = scale * rotate * translate * parent world
+# ------------------------------------------------------------------
+
+def _rotationMatrix(rotate):
+    if not any(rotate):
+        return numpy.identity(3)
+    x, y, z = [math.radians(value) for value in rotate]
+    cx, sx, cy, sy, cz, sz = math.cos(x), math.sin(x), math.cos(y), math.sin(y), math.cos(z), math.sin(z)
+    rx = numpy.array([[1.0, 0.0, 0.0], [0.0, cx, sx], [0.0, -sx, cx]])
+    ry = numpy.array([[cy, 0.0, -sy], [0.0, 1.0, 0.0], [sy, 0.0, cy]])
+    rz = numpy.array([[cz, sz, 0.0], [-sz, cz, 0.0], [0.0, 0.0, 1.0]])
+    return rx.dot(ry).dot(rz)
+
+
+def _eulerXYZ(rotation):
+    # degrees of a 3x3 rotation in xyz order, the inverse of _rotationMatrix
+    sy = -max(-1.0, min(1.0, rotation[0, 2]))
+    y = math.asin(sy)
+    if abs(math.cos(y)) > 1e-9:
+        x = math.atan2(rotation[1, 2], rotation[2, 2])
+        z = math.atan2(rotation[0, 1], rotation[0, 0])
+    else:
+        x = math.atan2(rotation[1, 0] * sy, rotation[1, 1])
+        z = 0.0
+    return [math.degrees(x), math.degrees(y), math.degrees(z)]
+
+
+def _composeMatrix(translate, rotate, scale):
+    matrix = numpy.identity(4)
+    matrix[:3, :3] = numpy.asarray(scale, dtype=numpy.float64)[:, None] * _rotationMatrix(rotate)
+    matrix[3, :3] = translate
+    return matrix
+
+
+def _decomposeMatrix(matrix):
+    """
+    :return: tuple(list(float)), translate, rotate in degrees and scale of a matrix without shear
+    """
+    axes = matrix[:3, :3]
+    scale = numpy.sqrt((axes ** 2).sum(axis=1))
+    rotation = axes / numpy.maximum(scale, 1e-12)[:, None]
+    return matrix[3, :3].tolist(), _eulerXYZ(rotation), scale.tolist()
+
+
+def _channels(node, name):
+    return [_value(node, name + axis) for axis in 'XYZ']
+
+
+def _localMatrix(node):
+    if not node.isType('transform'):
+        return numpy.identity(4)
+    return _composeMatrix(_channels(node, 'translate'), _channels(node, 'rotate'), _channels(node, 'scale'))
+
+
+def _worldMatrix(node):
+    matrix = _localMatrix(node)
+    if node.parent is not None and (not node.isType('transform') or _value(node, 'inheritsTransform')):
+        matrix = matrix.dot(_worldMatrix(node.parent))
+    return matrix
+
+
+def _parentMatrix(node):
+    if node.parent is None or not _value(node, 'inheritsTransform'):
+        return numpy.identity(4)
+    return _worldMatrix(node.parent)
+
+
+def _setChannels(node, name, values, axes='xyz'):
+    for axis, value in zip('XYZ', values):
+        if axis.lower() in axes:
+            node.attribute(name + axis).value = float(value)
+
+
+def _setWorldMatrix(node, matrix, translate='xyz', rotate='xyz', scale=''):
+    """
+    move a transform so it ends up at a world matrix, on the channels of the axes given
+    """
+    local = matrix.dot(numpy.linalg.inv(_parentMatrix(node)))
+    localTranslate, localRotate, localScale = _decomposeMatrix(local)
+    _setChannels(node, 'translate', localTranslate, translate)
+    _setChannels(node, 'rotate', localRotate, rotate)
+    _setChannels(node, 'scale', localScale, scale)
+
+
+def _worldPoints(shape):
+    points = numpy.asarray(shape.points if shape.points is not None else numpy.zeros((0, 3)), dtype=numpy.float64)
+    if shape.parent is None or not len(points):
+        return points.reshape(-1, 3)
+    matrix = _worldMatrix(shape.parent)
+    return points.dot(matrix[:3, :3]) + matrix[3, :3]
+
+
+def _averageRotation(matrices):
+    # the rotation closest to the mean of the rotations
+    rotations = [matrix[:3, :3] / numpy.sqrt((matrix[:3, :3] ** 2).sum(axis=1))[:, None] for matrix in matrices]
+    u, s, vt = numpy.linalg.svd(sum(rotations) / len(rotations))
+    return u.dot(vt)
+
+
+# ------------------------------------------------------------------
+# attributes and connections
+# ------------------------------------------------------------------
+
+def _plug(plug):
+    """
+    :param plug: str, node.attribute, the attribute can be a child path like input.inputX or indexed like worldMatrix[0]
+    :return: tuple, _Node and str, long attribute name
+    """
+    plug = str(plug)
+    if '.' not in plug:
+        raise ValueError('No object matches name: %s' % plug)
+    node = scene.nodes.get(_nodeName(plug))
+    attributeName = _INDEX.sub('', plug.split('.', 1)[1].split('.')[-1])
+    definition = node.definition(attributeName) if node is not None else None
+    if definition is None:
+        raise ValueError('No object matches name: %s' % plug)
+    return node, definition.name
+
+
+def _value(node, name):
+    attribute = node.attributes.get(name)
+    if attribute is not None and attribute.source is not None:
+        return _value(*attribute.source)
+
+    definition = node.definition(name)
+    if definition.children:
+        return tuple(_value(node, child) for child in definition.children)
+    if name == 'worldMatrix':
+        return _worldMatrix(node).ravel().tolist()
+    if node.nodeType == 'reverse' and name.startswith('output'):
+        return 1.0 - _value(node, 'input' + name[len('output'):])
+    return attribute.value if attribute is not None else definition.default
+
+
+def _isConnected(node, name):
+    attribute = node.attributes.get(name)
+    if attribute is not None and attribute.source is not None:
+        return True
+    parent = node.definition(name).parent
+    return parent is not None and _isConnected(node, parent)
+
+
+def _connect(sourceNode, sourceName, destinationNode, destinationName, force=False):
+    destination = destinationNode.attribute(destinationName)
+    if destination.locked:
+        raise RuntimeError('The attribute \'%s.%s\' is locked and can\'t be connected.' %
+                           (destinationNode.name, destinationName))
+    if destination.source is not None:
+        if destination.source == (sourceNode, sourceName):
+            raise RuntimeError('\'%s.%s\' is already connected to \'%s.%s\'.' %
+                               (sourceNode.name, sourceName, destinationNode.name, destinationName))
+        if not force:
+            raise RuntimeError('\'%s.%s\' already has an incoming connection from \'%s.%s\'.' %
+                               (destinationNode.name, destinationName, destination.source[0].name,
+                                destination.source[1]))
+        _disconnect(destinationNode, destinationName)
+    destination.source = (sourceNode, sourceName)
+    sourceNode.outputs.append((sourceName, destinationNode, destinationName))
+
+
+def _disconnect(destinationNode, destinationName):
+    destination = destinationNode.attributes[destinationName]
+    sourceNode, sourceName = destination.source
+    sourceNode.outputs.remove((sourceName, destinationNode, destinationName))
+    destination.source = None
+
+
+def _disconnectNode(node):
+    for sourceName, destinationNode, destinationName in list(node.outputs):
+        _disconnect(destinationNode, destinationName)
+    for name, attribute in list(node.attributes.items()):
+        if attribute.source is not None:
+            _disconnect(node, name)
+
+
+def _setValue(node, name, values, attributeType=None):
+    definition = node.definition(name)
+    names = definition.children or (name,)
+    if len(values) != len(names):
+        raise RuntimeError('setAttr: %s.%s takes %d values, not %d' % (node.name, name, len(names), len(values)))
+    for childName, value in zip(names, values):
+        attribute = node.attribute(childName)
+        if attribute.locked or _isConnected(node, childName) or node.attribute(name).locked:
+            raise RuntimeError('setAttr: The attribute \'%s.%s\' is locked or connected and cannot be modified.' %
+                               (node.name, childName))
+        if attributeType != 'string' and attribute.definition.attributeType != 'string':
+            if attribute.definition.attributeType in ('bool',):
+                value = bool(value)
+            elif attribute.definition.attributeType in ('enum', 'long'):
+                value = int(value)
+            else:
+                value = float(value)
+        attribute.value = value
+
+
+# ------------------------------------------------------------------
+# scene setup, not part of Maya
+# ------------------------------------------------------------------
+
+def newScene():
+    """
+    empty the scene, like cmds.file(new=True, force=True). Registered files stay
+    """
+    global scene
+    scene = FakeScene()
+    _notify('afterNew')
+
+
+def registerFile(path, function):
+    """
+    make cmds.file(path, i=True) call a function instead of reading the file
+    :param path: str, file path as the build passes it
+    :param function: function without arguments that adds the nodes of the file to the scene
+    """
+    _files[_filePath(path)] = function
+
+
+def unregisterFiles():
+    _files.clear()
+
+
+def _filePath(path):
+    # D:\\assets//human/ and D:/assets/human are the same file
+    return re.sub(r'[\\/]+', '/', str(path))
+
+
+def createGroup(name, parent=None):
+    """
+    :param name: str, transform name
+    :param parent: str, parent transform, None for the world
+    :return: str, name the group got
+    """
+    return scene.add(name, 'transform', scene.node(parent) if parent else None).name
+
+
+def createJoint(name, parent=None, position=(0.0, 0.0, 0.0), radius=1.0):
+    """
+    :param name: str, joint name
+    :param parent: str, parent joint or transform, None for a root joint
+    :param position: tuple(float), world position
+    :param radius: float, joint radius
+    :return: str, name the joint got
+    """
+    node = scene.add(name, 'joint', scene.node(parent) if parent else None)
+    node.attribute('radius').value = float(radius)
+    _setWorldMatrix(node, _composeMatrix(position, (0.0, 0.0, 0.0), (1.0, 1.0, 1.0)), rotate='')
+    return node.name
+
+
+def _createShape(name, shapeType, points=None, parent=None):
+    # transform name with its shape nameShape
+    transform = scene.add(name, 'transform', scene.node(parent) if parent else None)
+    shape = scene.add(_shapeName(transform.name), shapeType, transform)
+    if points is not None:
+        shape.points = numpy.array(points, dtype=numpy.float64).reshape(-1, 3)
+    return transform, shape
+
+
+def createLocator(name, position=(0.0, 0.0, 0.0), parent=None):
+    """
+    :param name: str, locator transform name
+    :param position: tuple(float), world position
+    :param parent: str, parent transform
+    :return: str, name the locator got
+    """
+    transform, shape = _createShape(name, 'locator', parent=parent)
+    _setWorldMatrix(transform, _composeMatrix(position, (0.0, 0.0, 0.0), (1.0, 1.0, 1.0)), rotate='')
+    return transform.name
+
+
+def createCurve(name, points, parent=None):
+    """
+    :param name: str, curve transform name
+    :param points: list(tuple(float)), cv positions
+    :param parent: str, parent transform
+    :return: str, name the curve got
+    """
+    return _createShape(name, 'nurbsCurve', points, parent)[0].name
+
+
+def createMesh(name, positions, triangles=None, parent=None):
+    """
+    :param name: str, mesh transform name
+    :param positions: numpy.ndarray, (vertices x 3) positions
+    :param triangles: numpy.ndarray, (triangles x 3) vertex ids
+    :param parent: str, parent transform
+    :return: str, name the mesh got
+    """
+    transform, shape = _createShape(name, 'mesh', positions, parent)
+    shape.triangles = numpy.zeros((0, 3), dtype=numpy.int32) if triangles is None else \
+        numpy.asarray(triangles, dtype=numpy.int32).reshape(-1, 3)
+    return transform.name
+
+
+def _boxMesh(name, center, size, parent=None):
+    # 8 corners and 12 triangles
+    corners = numpy.array(list(itertools.product((-0.5, 0.5), repeat=3))) * size + center
+    triangles = [(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+                 (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)]
+    return createMesh(name, corners, triangles, parent)
+
+
+def _chain(names, parent, start, step):
+    # joints in a straight line, each the child of the one before
+    joints = []
+    for i, name in enumerate(names):
+        position = numpy.asarray(start, dtype=numpy.float64) + numpy.asarray(step, dtype=numpy.float64) * i
+        parent = createJoint(name, parent, position)
+        joints.append(parent)
+    return joints
+
+
+def humanBuilderScene(tail=False):
+    """
+    add the builder scene of a biped that matches humanRig, joints in cm with the root at the hips and
+    the reference locators and curves under builder_group
+    :param tail: bool, add a tail chain and tail_curve, built by humanRig when there is one
+    """
+    createJoint('root', None, (0, 100, 0))
+    createJoint('pelvis', 'root', (0, 100, 0))
+    spine = _chain(['spine%d' % i for i in range(1, 6)], 'pelvis', (0, 105, 0), (0, 10, 0))
+    neck = _chain(['neck1', 'neck2', 'neck3'], spine[-1], (0, 152, 0), (0, 5, 0))
+    createJoint('head', neck[-1], (0, 167, 0))
+    createJoint('jaw', 'head', (0, 165, 4))
+    _chain(['tongue', 'tongue1', 'tongue2', 'tongue3'], 'jaw', (0, 164, 5), (0, 0, 1.5))
+    createJoint('l_eye', 'head', (3, 172, 8))
+    createJoint('r_eye', 'head', (-3, 172, 8))
+
+    for side, sign in (('l', 1), ('r', -1)):
+        # arm, the elbow and knee chains are the references of the twist joints
+        createJoint(side + '_clavicle', spine[-1], (sign * 3, 145, 0))
+        createJoint(side + '_shoulder1', side + '_clavicle', (sign * 15, 145, 0))
+        arm = _chain([side + '_arm', side + '_foreArm', side + '_hand'], side + '_shoulder1', (sign * 18, 145, 0),
+                     (sign * 27, 0, 0))
+        _chain([side + '_elbow', side + '_wrist'], arm[0], (sign * 45, 145, 0), (sign * 27, 0, 0))
+        for i, finger in enumerate(['Thumb', 'Index', 'Middle', 'Ring', 'Pinky']):
+            _chain(['%s_hand%s%d' % (side, finger, j) for j in range(1, 5)], arm[-1],
+                   (sign * 75, 145, 4 - i * 2), (sign * 3, 0, 0))
+
+        leg = _chain([side + '_hip', side + '_leg', side + '_foot'], 'pelvis', (sign * 10, 95, 0), (0, -43, 0))
+        _chain([side + '_knee', side + '_ankle'], leg[0], (sign * 10, 52, 0), (0, -43, 0))
+        createJoint(side + '_toeBase', leg[-1], (sign * 10, 2, 10))
+        for i, toe in enumerate(['Thumb', 'Index', 'Middle', 'Ring', 'Pinky']):
+            _chain(['%s_leg%s%d' % (side, toe, j) for j in range(1, 4)], side + '_toeBase',
+                   (sign * (7 + i * 1.5), 1, 14), (0, 0, 2))
+
+    if tail:
+        _chain(['tail'] + ['tail%d' % i for i in range(1, 6)], 'pelvis', (0, 98, -8), (0, -3, -8))
+
+    builder = createGroup('builder_group')
+    createLocator('spine_locator', (0, 125, 0), builder)
+    createLocator('chest_locator', (0, 145, 0), builder)
+    createLocator('hip_locator', (0, 100, 0), builder)
+    for side, sign in (('l', 1), ('r', -1)):
+        createLocator(side + '_elbow_poleVector', (sign * 45, 145, -30), builder)
+        createLocator(side + '_leg_poleVector', (sign * 10, 52, 30), builder)
+
+    createCurve('spine_curve', [(0, 105 + 10 * i, 0) for i in range(5)], builder)
+    createCurve('neck_curve', [(0, 152 + 3.75 * i, 0) for i in range(5)], builder)
+    createCurve('tongue_curve', [(0, 164, 5 + 1.125 * i) for i in range(5)], builder)
+    if tail:
+        createCurve('tail_curve', [(0, 98 - 3.75 * i, -8 - 10 * i) for i in range(5)], builder)
+
+
+def humanModelScene(characterName):
+    """
+    add the model scene of the biped of humanBuilderScene(), boxes under characterName_model_grp
+    :param characterName: str, character name
+    """
+    group = createGroup('%s_model_grp' % characterName)
+    _boxMesh('Body', (0, 90, 0), (60, 180, 30), group)
+    _boxMesh('l_eyeGeo', (3, 172, 8), (2, 2, 2), group)
+    _boxMesh('r_eyeGeo', (-3, 172, 8), (2, 2, 2), group)
+
+
+def registerHumanFiles(characterName, projectPath, tail=False):
+    """
+    register the builder and model files humanRig.human.build imports for a character
+    :param characterName: str, character name
+    :param projectPath: str, humanRig.project.project_path
+    :param tail: bool, see humanBuilderScene()
+    """
+    registerFile('%s/%s/builder/%s_builder.ma' % (projectPath, characterName, characterName),
+                 functools.partial(humanBuilderScene, tail))
+    registerFile('%s/%s/model/%s_model.ma' % (projectPath, characterName, characterName),
+                 functools.partial(humanModelScene, characterName))
+
+
+# ------------------------------------------------------------------
+# maya.cmds
+# ------------------------------------------------------------------
+
+def _components(name):
+    """
+    :param name: str, like curve.cv[*], curve.cv[2] or mesh.vtx[0:7]
+    :return: tuple, _Node shape, str kind and list(int) indices, None if name isn't a component
+    """
+    match = _COMPONENT.match(str(name))
+    if match is None:
+        return None
+    node = scene.node(match.group('node'))
+    shapes = [shape for shape in _shapes(node) if shape.points is not None]
+    if not shapes:
+        raise ValueError('No object matches name: %s' % name)
+    count = len(shapes[0].points)
+    if match.group('start') == '*':
+        indices = list(range(count))
+    else:
+        start = int(match.group('start'))
+        indices = list(range(start, int(match.group('end') or start) + 1))
+    if indices and (indices[-1] >= count):
+        raise ValueError('No object matches name: %s' % name)
+    return shapes[0], match.group('kind'), indices
+
+
+def objExists(name):
+    if not name:
+        return False
+    name = str(name)
+    if _COMPONENT.match(name):
+        try:
+            return _components(name) is not None
+        except ValueError:
+            return False
+    if '.' in name:
+        try:
+            _plug(name)
+        except ValueError:
+            return False
+        return True
+    return _nodeName(name) in scene.nodes
+
+
+def ls(*args, **kwargs):
+    types = _typeList(_flag(kwargs, 'type', 'typ'))
+    longNames = _flag(kwargs, 'long', 'l')
+    if _flag(kwargs, 'selection', 'sl'):
+        nodes = []
+        for node in scene.selection:
+            if node in scene.selectedComponents:
+                nodes.extend('%s.vtx[%d]' % (node.parent.name, i) for i in scene.selectedComponents[node][0])
+            else:
+                nodes.append(node)
+    elif args:
+        nodes = []
+        for pattern in _names(*args):
+            components = _components(pattern) if _COMPONENT.match(pattern) else None
+            if components is not None:
+                shape, kind, indices = components
+                prefix = pattern.split('.')[0]
+                if _flag(kwargs, 'flatten', 'fl'):
+                    nodes.extend('%s.%s[%d]' % (prefix, kind, i) for i in indices)
+                elif indices:
+                    nodes.append('%s.%s[%d:%d]' % (prefix, kind, indices[0], indices[-1]) if len(indices) > 1 else
+                                 '%s.%s[%d]' % (prefix, kind, indices[0]))
+                continue
+            if '.' in pattern:
+                if objExists(pattern):
+                    nodes.append(pattern)
+                continue
+            if not any(character in pattern for character in '*?['):
+                node = scene.nodes.get(_nodeName(pattern))
+                if node is not None and node not in nodes:
+                    nodes.append(node)
+                continue
+            key = (lambda node: node.path()) if '|' in pattern else (lambda node: node.name)
+            nodes.extend(node for node in scene.nodes.values()
+                         if fnmatch.fnmatchcase(key(node), pattern) and node not in nodes)
+    else:
+        nodes = list(scene.nodes.values())
+
+    result = []
+    for node in nodes:
+        if isinstance(node, _STRING_TYPES):
+            if not types:
+                result.append(node)
+        elif _typeMatches(node, types):
+            result.append(node.path() if longNames else node.name)
+    return result
+
+
+def select(*args, **kwargs):
+    # whole objects, selecting one drops its selected vertices
+    if _flag(kwargs, 'clear', 'cl'):
+        scene.selection = []
+        scene.selectedComponents = {}
+        return
+    nodes = [scene.node(name) for name in _names(*args)]
+    if kwargs.get('add'):
+        scene.selection.extend(node for node in nodes if node not in scene.selection)
+    elif _flag(kwargs, 'deselect', 'd'):
+        scene.selection = [node for node in scene.selection if node not in nodes]
+    else:
+        scene.selection = nodes
+        scene.selectedComponents = {}
+    for node in nodes:
+        scene.selectedComponents.pop(node, None)
+
+
+def _objects(args):
+    # nodes of the arguments, or of the selection without any
+    names = _names(*args)
+    if not names:
+        return list(scene.selection)
+    return [scene.node(name) for name in names]
+
+
+def listRelatives(*args, **kwargs):
+    nodes = _objects(args)
+    types = _typeList(_flag(kwargs, 'type', 'typ'))
+    fullPath = _flag(kwargs, 'fullPath', 'f')
+
+    result = []
+    for node in nodes:
+        if _flag(kwargs, 'parent', 'p'):
+            relatives = node.parents[:1]
+        elif _flag(kwargs, 'allParents', 'ap'):
+            relatives = list(node.parents)
+        elif _flag(kwargs, 'allDescendents', 'ad'):
+            # deepest first like Maya, reversed it's top down
+            relatives = []
+            stack = list(node.children)
+            while stack:
+                child = stack.pop(0)
+                relatives.append(child)
+                stack[:0] = child.children
+            relatives.reverse()
+        elif _flag(kwargs, 'shapes', 's'):
+            relatives = [child for child in node.children if child.isType('shape')]
+        else:
+            relatives = list(node.children)
+        if _flag(kwargs, 'noIntermediate', 'ni'):
+            relatives = [relative for relative in relatives if not _value(relative, 'intermediateObject')]
+        result.extend(relative for relative in relatives if _typeMatches(relative, types) and relative not in result)
+
+    if not result:
+        return None
+    return [node.path() if fullPath else node.name for node in result]
+
+
+def createNode(nodeType, **kwargs):
+    name = _flag(kwargs, 'name', 'n')
+    parent = _flag(kwargs, 'parent', 'p')
+    parent = scene.node(parent) if parent else None
+    if parent is None and nodeType in _NODE_TYPES and _derivesFrom(nodeType, 'shape'):
+        # shapes get a transform
+        parent = scene.add(None, 'transform')
+    return scene.add(name, nodeType, parent).name
+
+
+def group(*args, **kwargs):
+    name = _flag(kwargs, 'name', 'n') or 'null1'
+    parent = _flag(kwargs, 'parent', 'p')
+    node = scene.add(name, 'transform', scene.node(parent) if parent else None)
+    if not _flag(kwargs, 'empty', 'em'):
+        for child in _objects(args):
+            _reparent(child, node)
+    return node.name
+
+
+def _circlePoints(normal, radius, center, sections):
+    normal = numpy.asarray(normal, dtype=numpy.float64)
+    normal /= numpy.linalg.norm(normal)
+    helper = numpy.array([0.0, 0.0, 1.0]) if abs(normal[2]) < 0.9 else numpy.array([1.0, 0.0, 0.0])
+    u = numpy.cross(normal, helper)
+    u /= numpy.linalg.norm(u)
+    v = numpy.cross(normal, u)
+    angles = numpy.arange(sections) * (2 * math.pi / sections)
+    return center + radius * (numpy.cos(angles)[:, None] * u + numpy.sin(angles)[:, None] * v)
+
+
+def circle(*args, **kwargs):
+    points = _circlePoints(_flag(kwargs, 'normal', 'nr', (0, 0, 1)), _flag(kwargs, 'radius', 'r', 1.0),
+                           numpy.asarray(_flag(kwargs, 'center', 'c', (0, 0, 0)), dtype=numpy.float64),
+                           _flag(kwargs, 'sections', 's', 8))
+    transform, shape = _createShape(_flag(kwargs, 'name', 'n') or 'nurbsCircle1', 'nurbsCurve', points)
+    if not _flag(kwargs, 'constructionHistory', 'ch', True):
+        return [transform.name]
+    history = scene.add('makeNurbCircle1', 'makeNurbCircle')
+    shape.history.append(history)
+    return [transform.name, history.name]
+
+
+def curve(*args, **kwargs):
+    points = _flag(kwargs, 'point', 'p')
+    if not points:
+        raise RuntimeError('curve: give the points of the curve with -p')
+    return _createShape(_flag(kwargs, 'name', 'n') or 'curve1', 'nurbsCurve', points)[0].name
+
+
+def spaceLocator(*args, **kwargs):
+    transform, shape = _createShape(_flag(kwargs, 'name', 'n') or 'locator1', 'locator')
+    position = _flag(kwargs, 'position', 'p')
+    if position:
+        _setChannels(transform, 'translate', position)
+    return [transform.name]
+
+
+def _reparent(child, parent, relative=False, add=False):
+    # parent=None moves to the world
+    if parent is not None and _isAncestor(child, parent):
+        raise RuntimeError('Cannot parent %s under itself or one of its children.' % child.name)
+    if parent is child.parent and not add:
+        where = parent.name if parent is not None else 'the world'
+        raise RuntimeError('Object %s is already a child of %s.' % (child.name, where))
+
+    world = _worldMatrix(child) if child.isType('transform') and not relative else None
+    if not add:
+        for oldParent in child.parents:
+            oldParent.children.remove(child)
+        child.parents = []
+    if parent is not None:
+        # with add the new parent is an instance, the main one stays first
+        _addChild(parent, child)
+    if world is not None:
+        _setWorldMatrix(child, world, scale='xyz')
+
+
+def parent(*args, **kwargs):
+    nodes = [scene.node(name) for name in _names(*args)]
+    if _flag(kwargs, 'world', 'w'):
+        children, newParent = nodes, None
+    else:
+        if len(nodes) < 2:
+            raise RuntimeError('parent: give the objects to parent and the new parent')
+        children, newParent = nodes[:-1], nodes[-1]
+
+    for child in children:
+        if child.isType('shape') and not _flag(kwargs, 'shape', 's'):
+            raise RuntimeError('parent: %s is a shape, use the -shape flag' % child.name)
+        _reparent(child, newParent, relative=_flag(kwargs, 'relative', 'r', False),
+                  add=_flag(kwargs, 'addObject', 'add', False))
+    return [child.name for child in children]
+
+
+def delete(*args, **kwargs):
+    nodes = _objects(args)
+    if _flag(kwargs, 'constructionHistory', 'ch'):
+        for node in nodes:
+            for shape in _shapes(node):
+                for history in list(shape.history):
+                    scene.remove(history)
+        return
+    for node in nodes:
+        scene.remove(node)
+
+
+def duplicate(*args, **kwargs):
+    names = []
+    name = _flag(kwargs, 'name', 'n')
+    for node in _objects(args):
+        copy = _copyNode(node, name, node.parent, not _flag(kwargs, 'parentOnly', 'po'))
+        names.append(copy.name)
+    return names
+
+
+def _copyNode(node, name, parent, children):
+    copy = scene.add(name or node.name, node.nodeType, parent)
+    for attributeName, attribute in node.attributes.items():
+        copied = copy.attribute(attributeName)
+        copied.value = attribute.value
+        copied.keyable = attribute.keyable
+        copied.channelBox = attribute.channelBox
+        copied.locked = attribute.locked
+    copy.dynamicAttributes = dict(node.dynamicAttributes)
+    if node.points is not None:
+        copy.points = node.points.copy()
+        copy.triangles = node.triangles
+    if children:
+        for child in node.children:
+            if child.parent is node and not child.isType('constraint') and child.nodeType != 'ikEffector':
+                _copyNode(child, _shapeName(copy.name) if child.isType('shape') else None, copy, True)
+    return copy
+
+
+def hide(*args, **kwargs):
+    for node in _objects(args):
+        _setValue(node, 'visibility', [False])
+
+
+def showHidden(*args, **kwargs):
+    for node in _objects(args):
+        _setValue(node, 'visibility', [True])
+
+
+def color(*args, **kwargs):
+    # user defined colors 1 - 8, none turns the object color off
+    userColor = int(_flag(kwargs, 'userDefined', 'ud') or 0)
+    for node in _objects(args):
+        node.attribute('useObjectColor').value = 1 if userColor else 0
+        node.attribute('objectColor').value = max(userColor - 1, 0)
+
+
+def addAttr(*args, **kwargs):
+    name = _flag(kwargs, 'longName', 'ln')
+    shortName = _flag(kwargs, 'shortName', 'sn') or name
+    dataType = _flag(kwargs, 'dataType', 'dt')
+    attributeType = dataType or _flag(kwargs, 'attributeType', 'at', 'double')
+    default = _flag(kwargs, 'defaultValue', 'dv')
+    if default is None:
+        default = '' if dataType else 0.0
+    for node in _objects(args):
+        if node.definition(name) is not None or node.definition(shortName) is not None:
+            raise RuntimeError('Found an existing attribute named %s on %s.' % (name, node.name))
+        definition = _AttributeDefinition(name, shortName, default, bool(_flag(kwargs, 'keyable', 'k', False)),
+                                          attributeType, minimum=_flag(kwargs, 'minValue', 'min'),
+                                          maximum=_flag(kwargs, 'maxValue', 'max'),
+                                          enumNames=_flag(kwargs, 'enumName', 'en'))
+        node.dynamicAttributes[name] = node.dynamicAttributes[shortName] = definition
+
+
+def getAttr(plug, **kwargs):
+    node, name = _plug(plug)
+    attribute = node.attributes.get(name)
+    if _flag(kwargs, 'lock', 'l'):
+        return bool(attribute and attribute.locked)
+    if _flag(kwargs, 'keyable', 'k'):
+        return attribute.keyable if attribute else node.definition(name).keyable
+    if _flag(kwargs, 'channelBox', 'cb'):
+        return bool(attribute and attribute.channelBox)
+    value = _value(node, name)
+    if isinstance(value, tuple):
+        return [value]
+    return value
+
+
+def setAttr(plug, *values, **kwargs):
+    node, name = _plug(plug)
+    if values:
+        _setValue(node, name, list(values), _flag(kwargs, 'type', 'typ'))
+
+    attribute = node.attribute(name)
+    keyable = _flag(kwargs, 'keyable', 'k')
+    if keyable is not None:
+        attribute.keyable = bool(keyable)
+    channelBox = _flag(kwargs, 'channelBox', 'cb')
+    if channelBox is not None:
+        attribute.channelBox = bool(channelBox)
+    locked = _flag(kwargs, 'lock', 'l')
+    if locked is not None:
+        attribute.locked = bool(locked)
+
+
+def connectAttr(source, destination, **kwargs):
+    sourceNode, sourceName = _plug(source)
+    destinationNode, destinationName = _plug(destination)
+    _connect(sourceNode, sourceName, destinationNode, destinationName, _flag(kwargs, 'force', 'f', False))
+
+
+def disconnectAttr(source, destination, **kwargs):
+    destinationNode, destinationName = _plug(destination)
+    attribute = destinationNode.attributes.get(destinationName)
+    if attribute is None or attribute.source != _plug(source):
+        raise RuntimeError('There is no connection from \'%s\' to \'%s\' to disconnect.' % (source, destination))
+    _disconnect(destinationNode, destinationName)
+
+
+def listConnections(plug, **kwargs):
+    node, name = _plug(plug) if '.' in str(plug) else (scene.node(plug), None)
+    sources = _flag(kwargs, 'source', 's', True)
+    destinations = _flag(kwargs, 'destination', 'd', True)
+    result = []
+    if sources:
+        for attributeName, attribute in node.attributes.items():
+            if attribute.source is not None and name in (None, attributeName):
+                result.append(attribute.source[0].name)
+    if destinations:
+        result.extend(destinationNode.name for attributeName, destinationNode, destinationName in node.outputs
+                      if name in (None, attributeName))
+    return result or None
+
+
+def xform(*args, **kwargs):
+    nodes = _objects(args)
+    worldSpace = _flag(kwargs, 'worldSpace', 'ws', False)
+    if _flag(kwargs, 'query', 'q'):
+        node = nodes[0]
+        matrix = _worldMatrix(node) if worldSpace else _localMatrix(node)
+        if _flag(kwargs, 'matrix', 'm'):
+            return matrix.ravel().tolist()
+        translate, rotate, scale = _decomposeMatrix(matrix)
+        if _flag(kwargs, 'rotation', 'ro'):
+            return rotate
+        if _flag(kwargs, 'scale', 's'):
+            return scale
+        return translate
+
+    for node in nodes:
+        matrix = _worldMatrix(node) if worldSpace else _localMatrix(node)
+        translate, rotate, scale = _decomposeMatrix(matrix)
+        translate = _flag(kwargs, 'translation', 't', translate)
+        rotate = _flag(kwargs, 'rotation', 'ro', rotate)
+        scale = _flag(kwargs, 'scale', 's', scale)
+        if worldSpace:
+            _setWorldMatrix(node, _composeMatrix(translate, rotate, scale), scale='xyz')
+        else:
+            _setChannels(node, 'translate', translate)
+            _setChannels(node, 'rotate', rotate)
+            _setChannels(node, 'scale', scale)
+
+
+def move(*args, **kwargs):
+    values = [float(arg) for arg in args if isinstance(arg, (int, float))]
+    nodes = _objects([arg for arg in args if not isinstance(arg, (int, float))])
+    axes = [axis for axis, flag in enumerate(('moveX', 'moveY', 'moveZ')) if kwargs.get(flag)] or [0, 1, 2]
+    vector = numpy.zeros(3)
+    for axis, value in zip(axes, values):
+        vector[axis] = value
+
+    for node in nodes:
+        for name in ('translateX', 'translateY', 'translateZ'):
+            if node.attributes.get(name) is not None and (node.attributes[name].locked or _isConnected(node, name)):
+                raise RuntimeError('move: The attribute \'%s.%s\' is locked or connected.' % (node.name, name))
+        world = _worldMatrix(node)
+        position = world[3, :3].copy()
+        if _flag(kwargs, 'relative', 'r'):
+            if _flag(kwargs, 'objectSpace', 'os'):
+                rotation = world[:3, :3] / numpy.sqrt((world[:3, :3] ** 2).sum(axis=1))[:, None]
+                position += vector.dot(rotation)
+            else:
+                position += vector
+        else:
+            position[axes] = vector[axes]
+        world[3, :3] = position
+        _setWorldMatrix(node, world, rotate='')
+
+
+def _constrainedChannels(nodeType, kwargs):
+    # (constraint attribute, driven attribute, axes) the constraint drives
+    skip = _typeList(_flag(kwargs, 'skip', 'sk'))
+    skipTranslate = _typeList(_flag(kwargs, 'skipTranslate', 'st'))
+    skipRotate = _typeList(_flag(kwargs, 'skipRotate', 'sr'))
+    channels = []
+    for source, destination in _CONSTRAINT_CHANNELS[nodeType]:
+        skipped = skip
+        if nodeType == 'parentConstraint':
+            skipped = skipTranslate if destination == 'translate' else skipRotate
+        axes = ''.join(axis for axis in 'xyz' if axis not in skipped)
+        channels.append((source, destination, axes))
+    return channels
+
+
+def _constraint(nodeType, args, kwargs):
+    names = _names(*args)
+    if _flag(kwargs, 'query', 'q'):
+        node = scene.node(names[0])
+        if not node.isType(nodeType):
+            node = next((child for child in node.children if child.nodeType == nodeType), None)
+            if node is None:
+                raise RuntimeError('%s has no %s' % (names[0], nodeType))
+        if _flag(kwargs, 'weightAliasList', 'wal'):
+            return ['%sW%d' % (target.name, i) for i, target in enumerate(node.targets)]
+        if _flag(kwargs, 'targetList', 'tl'):
+            return [target.name for target in node.targets]
+        return None
+
+    nodes = [scene.node(name) for name in names] if names else list(scene.selection)
+    if len(nodes) < 2:
+        raise RuntimeError('%s: give the targets and the object to constrain' % nodeType)
+    targets, constrained = nodes[:-1], nodes[-1]
+    if nodeType == 'poleVectorConstraint' and constrained.nodeType != 'ikHandle':
+        raise RuntimeError('poleVectorConstraint: %s is not an ikHandle' % constrained.name)
+    if not constrained.isType('transform'):
+        raise RuntimeError('%s: %s is not a transform' % (nodeType, constrained.name))
+
+    # constraining again adds targets to the constraint it has
+    node = next((child for child in constrained.children if child.nodeType == nodeType), None)
+    if node is None:
+        channels = _constrainedChannels(nodeType, kwargs)
+        for source, destination, axes in channels:
+            for axis in axes:
+                attribute = constrained.attribute(destination + axis.upper())
+                if attribute.locked or attribute.source is not None:
+                    raise RuntimeError('%s: Could not add constraint, \'%s.%s\' is locked or already connected.' %
+                                       (nodeType, constrained.name, attribute.definition.name))
+
+        node = scene.add(_flag(kwargs, 'name', 'n') or '%s_%s1' % (constrained.name, nodeType), nodeType, constrained)
+        node.constrained = constrained
+        node.channels = channels
+        for source, destination, axes in channels:
+            for axis in axes:
+                # the constraint isn't evaluated, it holds the values it took over
+                node.attribute(source + axis.upper()).value = _value(constrained, destination + axis.upper())
+                _connect(node, source + axis.upper(), constrained, destination + axis.upper())
+    for target in targets:
+        if target not in node.targets:
+            weight = '%sW%d' % (target.name, len(node.targets))
+            node.dynamicAttributes[weight] = _AttributeDefinition(weight, weight, _flag(kwargs, 'weight', 'w', 1.0),
+                                                                  True, 'double')
+            node.targets.append(target)
+
+    if not _flag(kwargs, 'maintainOffset', 'mo') and nodeType != 'poleVectorConstraint':
+        _snap(nodeType, node)
+    return [node.name]
+
+
+def _snap(nodeType, node):
+    # move the constrained object onto its targets, once
+    matrices = [_worldMatrix(target) for target in node.targets]
+    world = _worldMatrix(node.constrained)
+    if nodeType in ('pointConstraint', 'parentConstraint'):
+        world[3, :3] = numpy.mean([matrix[3, :3] for matrix in matrices], axis=0)
+    if nodeType in ('orientConstraint', 'parentConstraint'):
+        scale = numpy.sqrt((world[:3, :3] ** 2).sum(axis=1))
+        world[:3, :3] = scale[:, None] * _averageRotation(matrices)
+    if nodeType == 'scaleConstraint':
+        rotation = world[:3, :3] / numpy.sqrt((world[:3, :3] ** 2).sum(axis=1))[:, None]
+        scale = numpy.mean([numpy.sqrt((matrix[:3, :3] ** 2).sum(axis=1)) for matrix in matrices], axis=0)
+        world[:3, :3] = scale[:, None] * rotation
+
+    axes = dict((destination, axes) for source, destination, axes in node.channels)
+    _setWorldMatrix(node.constrained, world, axes.get('translate', ''), axes.get('rotate', ''), axes.get('scale', ''))
+    for source, destination, axes in node.channels:
+        for axis in axes.upper():
+            node.attribute(source + axis).value = node.constrained.attribute(destination + axis).value
+
+
+def pointConstraint(*args, **kwargs):
+    return _constraint('pointConstraint', args, kwargs)
+
+
+def orientConstraint(*args, **kwargs):
+    return _constraint('orientConstraint', args, kwargs)
+
+
+def parentConstraint(*args, **kwargs):
+    return _constraint('parentConstraint', args, kwargs)
+
+
+def scaleConstraint(*args, **kwargs):
+    return _constraint('scaleConstraint', args, kwargs)
+
+
+def poleVectorConstraint(*args, **kwargs):
+    return _constraint('poleVectorConstraint', args, kwargs)
+
+
+def cluster(*args, **kwargs):
+    # what gets deformed, shape -> point indices
+    components = collections.OrderedDict()
+    for name in _names(*args) or [node.name for node in scene.selection]:
+        found = _components(name)
+        if found is not None:
+            shape, kind, indices = found
+            components.setdefault(shape, []).extend(indices)
+            continue
+        for shape in _shapes(scene.node(name)):
+            components.setdefault(shape, []).extend(range(len(shape.points) if shape.points is not None else 0))
+    if not components:
+        raise RuntimeError('cluster: nothing to deform')
+
+    deformer = scene.add(_flag(kwargs, 'name', 'n') or 'cluster1', 'cluster')
+    deformer.components = components
+    for shape in components:
+        deformer.geometry.append(shape)
+        shape.history.append(deformer)
+
+    weightedNode = _flag(kwargs, 'weightedNode', 'wn')
+    if weightedNode:
+        deformer.handle = scene.node(_names(weightedNode)[0])
+    else:
+        handle, handleShape = _createShape(deformer.name + 'Handle', 'clusterHandle')
+        handleShape.deformer = deformer
+        handle.deformer = deformer
+        deformer.handle = handle
+        deformer.ownsHandle = True
+        # the handle sits at the middle of the points, Maya puts its pivot there
+        points = numpy.concatenate([_worldPoints(shape)[indices] for shape, indices in components.items()])
+        _setChannels(handle, 'translate', points.mean(axis=0) if len(points) else (0.0, 0.0, 0.0))
+    return [deformer.name, deformer.handle.name]
+
+
+def ikHandle(*args, **kwargs):
+    startJoint = scene.node(_flag(kwargs, 'startJoint', 'sj'))
+    endJoint = scene.node(_flag(kwargs, 'endEffector', 'ee'))
+    solver = _flag(kwargs, 'solver', 'sol', 'ikRPsolver')
+    if solver not in _IK_SOLVERS:
+        raise RuntimeError('ikHandle: unknown solver %s' % solver)
+    for joint in (startJoint, endJoint):
+        if joint.nodeType != 'joint':
+            raise RuntimeError('ikHandle: %s is not a joint' % joint.name)
+    if endJoint is startJoint or not _isAncestor(startJoint, endJoint):
+        raise RuntimeError('ikHandle: %s is not below %s in the joint chain' % (endJoint.name, startJoint.name))
+
+    curveNode = None
+    if solver == 'ikSplineSolver':
+        curveName = _flag(kwargs, 'curve', 'c')
+        if curveName and not _flag(kwargs, 'createCurve', 'ccv', True):
+            curveNode = scene.node(curveName)
+        else:
+            chain = []
+            joint = endJoint
+            while joint is not startJoint:
+                chain.append(joint)
+                joint = joint.parent
+            chain.append(startJoint)
+            points = [_worldMatrix(joint)[3, :3] for joint in reversed(chain)]
+            curveNode = _createShape('curve1', 'nurbsCurve', points)[0]
+    elif _flag(kwargs, 'curve', 'c'):
+        raise RuntimeError('ikHandle: -curve only works with the ikSplineSolver')
+
+    handle = scene.add(_flag(kwargs, 'name', 'n') or 'ikHandle1', 'ikHandle')
+    _setChannels(handle, 'translate', _worldMatrix(endJoint)[3, :3])
+    effector = scene.add('effector1', 'ikEffector', endJoint.parent)
+    effector.ikHandle = handle
+    handle.startJoint = startJoint
+    handle.endEffector = effector
+    handle.solver = solver
+    handle.curve = curveNode
+
+    result = [handle.name, effector.name]
+    if curveNode is not None and _flag(kwargs, 'createCurve', 'ccv', True):
+        result.append(curveNode.name)
+    return result
+
+
+def skinCluster(*args, **kwargs):
+    if _flag(kwargs, 'edit', 'e'):
+        if _flag(kwargs, 'unbind', 'ub'):
+            deformer = scene.node(_names(*args)[0])
+            if deformer.nodeType != 'skinCluster':
+                raise RuntimeError('skinCluster: %s is not a skinCluster' % deformer.name)
+            scene.remove(deformer)
+            return None
+        raise RuntimeError('skinCluster: only -edit -unbind is supported by the stand-in')
+
+    nodes = _objects(args)
+    joints = [node for node in nodes if node.nodeType == 'joint']
+    geometry = [shape for node in nodes if node.nodeType != 'joint' for shape in _shapes(node)
+                if shape.nodeType == 'mesh' and not _value(shape, 'intermediateObject')]
+    if not joints or not geometry:
+        raise RuntimeError('skinCluster: give the joints and the geometry to bind')
+    for shape in geometry:
+        if any(history.nodeType == 'skinCluster' for history in shape.history):
+            raise RuntimeError('skinCluster: %s is already connected to a skinCluster.' % shape.parent.name)
+
+    deformer = scene.add(_flag(kwargs, 'name', 'n') or 'skinCluster1', 'skinCluster')
+    deformer.influences = joints
+    deformer.geometry = geometry
+    for shape in geometry:
+        shape.history.append(deformer)
+        # nothing computes bind weights, they all go to the first joint
+        weights = numpy.zeros((len(shape.points) if shape.points is not None else 0, len(joints)))
+        weights[:, 0] = 1.0
+        deformer.weights[shape] = weights
+    return [deformer.name]
+
+
+def file(*args, **kwargs):
+    global scene
+    if _flag(kwargs, 'query', 'q'):
+        if _flag(kwargs, 'sceneName', 'sn'):
+            return scene.fileName
+        raise RuntimeError('file: only -query -sceneName is supported by the stand-in')
+    if _flag(kwargs, 'new', 'n'):
+        newScene()
+        return None
+    if _flag(kwargs, 'rename', 'rn'):
+        scene.fileName = _filePath(_flag(kwargs, 'rename', 'rn'))
+        return scene.fileName
+    if _flag(kwargs, 'save', 's'):
+        # the scene pickled, whatever the type flag asks for
+        if not scene.fileName:
+            raise RuntimeError('file: the scene has no name, rename it before saving')
+        with open(scene.fileName, 'wb') as f:
+            pickle.dump(scene, f, pickle.HIGHEST_PROTOCOL)
+        return scene.fileName
+    if _flag(kwargs, 'open', 'o'):
+        path = args[0]
+        if not os.path.isfile(path):
+            raise RuntimeError('File not found: %s' % path)
+        with open(path, 'rb') as f:
+            scene = pickle.load(f)
+        scene.fileName = _filePath(path)
+        _notify('afterOpen')
+        return scene.fileName
+    if _flag(kwargs, 'import', 'i'):
+        path = args[0]
+        function = _files.get(_filePath(path))
+        if function is None:
+            raise RuntimeError('File not found: %s, register it with rigFakeMaya.registerFile()' % path)
+        function()
+        return path
+    raise RuntimeError('file: only -new, -import, -rename, -save and -open are supported by the stand-in')
+
+
+def _melEval(command):
+    raise RuntimeError('MEL isn\'t available outside of Maya: %s' % command)
+
+
+_CMDS = ['objExists', 'ls', 'select', 'listRelatives', 'createNode', 'group', 'circle', 'curve', 'spaceLocator', 'parent',
+         'delete', 'duplicate', 'hide', 'showHidden', 'color', 'addAttr', 'getAttr', 'setAttr', 'connectAttr',
+         'disconnectAttr', 'listConnections', 'xform', 'move', 'pointConstraint', 'orientConstraint',
+         'parentConstraint', 'scaleConstraint', 'poleVectorConstraint', 'cluster', 'ikHandle', 'skinCluster', 'file']
+
+
+def install():
+    """
+    register the stand-ins as maya, maya.cmds, maya.mel and the API modules in sys.modules, so rigLib and
+    humanRig can be imported. They are the modules of bSkinFakeMaya, with the commands of this module
+    """
+    import bSkinFakeMaya
+    bSkinFakeMaya.install()
+
+
+# ------------------------------------------------------------------
+# command line
+# ------------------------------------------------------------------
+
+class _NullWriter(object):
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+def main(argv=None):
+    """
+    build a character with humanRig in the stand-in and print how long it took
+    :param argv: list(str), arguments without the program name, None takes sys.argv
+    """
+    parser = argparse.ArgumentParser(description='build a humanRig character without Maya')
+    parser.add_argument('character', nargs='?', default='human')
+    parser.add_argument('--repeat', type=int, default=1, help='number of builds')
+    parser.add_argument('--tail', action='store_true', help='give the synthetic skeleton a tail')
+    parser.add_argument('--verbose', action='store_true', help='show what the build prints')
+    parser.add_argument('--trace', help='profile the commands and modules of the last build with rigProfiler '
+                                        'and write a Chrome trace to this .json file')
+    parser.add_argument('--root', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help='folder with rigLib and humanRig')
+    args = parser.parse_args(argv)
+
+    install()
+    sys.path.insert(0, args.root)
+    import humanRig
+    registerHumanFiles(args.character, humanRig.project.project_path, args.tail)
+
+    seconds = []
+    profiler = None
+    for i in range(args.repeat):
+        if args.trace and i == args.repeat - 1:
+            import rigProfiler
+            profiler = rigProfiler.Profiler()
+            profiler.install()
+        stdout = sys.stdout
+        if not args.verbose:
+            sys.stdout = _NullWriter()
+        try:
+            start = time.time()
+            humanRig.human.build(args.character, verbose=args.verbose)
+            seconds.append(time.time() - start)
+        finally:
+            sys.stdout = stdout
+            if profiler is not None:
+                profiler.uninstall()
+
+    print('%s: %d nodes, %d builds, %.3fs per build, %.0f builds per hour' %
+          (args.character, len(scene.nodes), len(seconds), min(seconds), 3600.0 / min(seconds)))
+    if profiler is not None:
+        profiler.writeTrace(args.trace)
+        print(profiler.summary(15))
+    return 0
+
+
+if __name__ == '__main__':
+    # bSkinFakeMaya installs the commands of the imported module, the scene has to be its scene too
+    import rigFakeMaya
+    sys.exit(rigFakeMaya.main())
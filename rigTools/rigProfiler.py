@@ -0,0 +1,335 @@
+"""
+=====================================================================
+    maya.cmds profiler for rig builds
+
+    Wraps every command of maya.cmds and the build functions of the
+    rig modules (spine.build, hand.build, leg.build, ..) for as long
+    as it is installed, and keeps for each command and each module
+    the number of calls, the total time and the self time, which
+    leaves out the time of the commands and modules called inside.
+    It also keeps which module each command was called from.
+
+        import rigProfiler
+        with rigProfiler.Profiler() as profiler:
+            humanRig.human.build('human')
+        print(profiler.summary(20))
+        profiler.writeTrace('C:/temp/human_build.json')
+
+    The trace is in the Chrome trace event format, open it in
+    chrome://tracing, ui.perfetto.dev or speedscope.app to see the
+    build as a flame chart. Calls from other threads and calls after
+    uninstall() aren't recorded. Reloading a rig module while the
+    profiler is installed drops its wrapper.
+    This module doesn't need Maya, it wraps whatever maya.cmds is
+    imported, like rigFakeMaya.
+
+=====================================================================
+"""
+
+import functools
+import importlib
+import json
+import os
+import threading
+import time
+
+
+# functions that get timed as rig modules, classes have their __init__ timed
+DEFAULT_SCOPES = (
+    'humanRig.human.build',
+    'humanRig.human.make_control_setup',
+    'humanRig.human_deform.build',
+    'humanRig.human_deform.make_twist_joints',
+    'humanRig.human_deform.apply_skin_cluster',
+    'humanRig.human_deform.load_skin_weights',
+    'rigLib.base.module.Base',
+    'rigLib.base.module.Module',
+    'rigLib.base.control.Control',
+    'rigLib.base.checkpoint.CheckpointStore.save',
+    'rigLib.base.checkpoint.CheckpointStore.load',
+    'rigLib.rig.spine.build',
+    'rigLib.rig.neck.build',
+    'rigLib.rig.ikChain.build',
+    'rigLib.rig.leg.build',
+    'rigLib.rig.hand.build',
+    'rigLib.rig.head_parts.build',
+    'rigLib.utils.joint.list_hierarchy',
+    'rigLib.utils.transform.make_offset_grp',
+)
+
+CATEGORY_COMMAND = 'cmds'
+CATEGORY_SCOPE = 'module'
+
+# calls that go into the trace, the stats keep counting after that
+DEFAULT_MAX_EVENTS = 1000000
+
+# clock for the calls, time.perf_counter isn't there in python 2
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+class Stat(object):
+    """
+    calls and seconds of one command or module
+    """
+
+    __slots__ = ('calls', 'totalTime', 'selfTime', 'active')
+
+    def __init__(self):
+        self.calls = 0
+        # time of the outermost calls, recursive calls aren't counted twice
+        self.totalTime = 0.0
+        self.selfTime = 0.0
+        # calls that haven't returned yet
+        self.active = 0
+
+    def asDict(self):
+        return {'calls': self.calls, 'total': self.totalTime, 'self': self.selfTime}
+
+    def clear(self):
+        self.calls = 0
+        self.totalTime = 0.0
+        self.selfTime = 0.0
+
+
+class Profiler(object):
+    """
+    times maya.cmds and rig module calls while installed
+    """
+
+    def __init__(self, scopes=DEFAULT_SCOPES, maxEvents=DEFAULT_MAX_EVENTS):
+        """
+        :param scopes: list(str), dotted paths of the functions or classes that are timed as modules
+        :param maxEvents: int, number of calls that are kept for the trace
+        """
+        self.scopes = tuple(scopes)
+        self.maxEvents = maxEvents
+        self.commands = {}
+        self.modules = {}
+        # (module, command) -> Stat, commands called directly inside each module
+        self.moduleCommands = {}
+        self.seconds = 0.0
+        self.droppedEvents = 0
+        # (category, name, start, seconds)
+        self._events = []
+        # [start, seconds of the calls inside] of each call that hasn't returned
+        self._stack = []
+        self._moduleStack = []
+        # (owner, attribute, original value)
+        self._patched = []
+        self._thread = None
+        self._started = None
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *args):
+        self.uninstall()
+
+    @property
+    def installed(self):
+        return bool(self._patched)
+
+    def install(self):
+        """
+        wrap the commands of maya.cmds and the scopes, importing their modules
+        """
+        if self.installed:
+            raise RuntimeError('the profiler is already installed')
+
+        from maya import cmds
+
+        # resolve everything before patching anything, so a bad scope leaves nothing behind
+        targets = []
+        for name in dir(cmds):
+            function = getattr(cmds, name)
+            if not name.startswith('_') and callable(function) and not isinstance(function, type):
+                targets.append((cmds, name, function, CATEGORY_COMMAND, name))
+        for path in self.scopes:
+            targets.append(_resolveScope(path) + (CATEGORY_SCOPE, _scopeName(path)))
+
+        self._thread = threading.current_thread()
+        self._started = _clock()
+        for owner, attribute, function, category, name in targets:
+            self._patched.append((owner, attribute, owner.__dict__[attribute]))
+            setattr(owner, attribute, self._wrap(function, category, name))
+
+    def uninstall(self):
+        """
+        put the original commands and functions back
+        """
+        if not self.installed:
+            return
+        for owner, attribute, original in reversed(self._patched):
+            setattr(owner, attribute, original)
+        self._patched = []
+        self.seconds += _clock() - self._started
+        self._thread = None
+
+    def reset(self):
+        """
+        forget everything recorded so far
+        """
+        if self._stack:
+            raise RuntimeError('can\'t reset the profiler inside a profiled call')
+        # the wrappers hold on to their stats
+        for stat in list(self.commands.values()) + list(self.modules.values()):
+            stat.clear()
+        self.moduleCommands.clear()
+        self.seconds = 0.0
+        self.droppedEvents = 0
+        self._events = []
+        if self.installed:
+            self._started = _clock()
+
+    def _wrap(self, function, category, name):
+        stats = self.commands if category == CATEGORY_COMMAND else self.modules
+        stat = stats.setdefault(name, Stat())
+        isScope = category == CATEGORY_SCOPE
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            if threading.current_thread() is not profiler._thread:
+                return function(*args, **kwargs)
+
+            if isScope:
+                profiler._moduleStack.append(name)
+            elif profiler._moduleStack:
+                key = (profiler._moduleStack[-1], name)
+                if key not in profiler.moduleCommands:
+                    profiler.moduleCommands[key] = Stat()
+                profiler.moduleCommands[key].active += 1
+
+            stat.active += 1
+            frame = [_clock(), 0.0]
+            profiler._stack.append(frame)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = _clock() - frame[0]
+                profiler._stack.pop()
+                if profiler._stack:
+                    profiler._stack[-1][1] += seconds
+
+                stat.calls += 1
+                stat.selfTime += seconds - frame[1]
+                stat.active -= 1
+                if not stat.active:
+                    stat.totalTime += seconds
+
+                if isScope:
+                    profiler._moduleStack.pop()
+                elif profiler._moduleStack:
+                    moduleStat = profiler.moduleCommands[(profiler._moduleStack[-1], name)]
+                    moduleStat.calls += 1
+                    moduleStat.selfTime += seconds - frame[1]
+                    moduleStat.active -= 1
+                    if not moduleStat.active:
+                        moduleStat.totalTime += seconds
+
+                if len(profiler._events) < profiler.maxEvents:
+                    profiler._events.append((category, name, frame[0], seconds))
+                else:
+                    profiler.droppedEvents += 1
+
+        try:
+            functools.update_wrapper(wrapper, function)
+        except AttributeError:
+            # some builtins lack a __module__ or __doc__ in python 2
+            wrapper.__name__ = name
+        return wrapper
+
+    def totalSeconds(self):
+        """
+        :return: float, seconds the profiler has been installed
+        """
+        if self.installed:
+            return self.seconds + _clock() - self._started
+        return self.seconds
+
+    def stats(self):
+        """
+        :return: dict, seconds, and calls, total and self seconds of each command, module and
+                 command inside each module ('module/command'), for json
+        """
+        return {
+            'seconds': self.totalSeconds(),
+            'commands': dict((name, stat.asDict()) for name, stat in self.commands.items() if stat.calls),
+            'modules': dict((name, stat.asDict()) for name, stat in self.modules.items() if stat.calls),
+            'moduleCommands': dict(('%s/%s' % key, stat.asDict()) for key, stat in self.moduleCommands.items()),
+        }
+
+    def traceEvents(self):
+        """
+        :return: list(dict), complete events of the Chrome trace format, times in microseconds
+        """
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': 'rig build'}}]
+        for category, name, start, seconds in self._events:
+            events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': 0,
+                           'ts': (start - self._started) * 1e6, 'dur': seconds * 1e6})
+        return events
+
+    def writeTrace(self, path):
+        """
+        :param path: str, .json file to write, for chrome://tracing, Perfetto or speedscope
+        """
+        trace = {'traceEvents': self.traceEvents(), 'displayTimeUnit': 'ms',
+                 'otherData': {'droppedEvents': self.droppedEvents}}
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+
+    def summary(self, top=20):
+        """
+        :param top: int, number of rows of each table
+        :return: str, the slowest commands, modules and commands per module as text tables
+        """
+        seconds = self.totalSeconds()
+        commandSeconds = sum(stat.totalTime for stat in self.commands.values())
+        lines = ['rig build profile: %.3fs, %d cmds calls taking %.3fs' %
+                 (seconds, sum(stat.calls for stat in self.commands.values()), commandSeconds)]
+        if self.droppedEvents:
+            lines.append('%d calls past the first %d are missing from the trace' % (self.droppedEvents, self.maxEvents))
+
+        tables = (('cmds by self time', self.commands.items(), 'command'),
+                  ('modules by self time', self.modules.items(), 'module'),
+                  ('cmds inside modules by self time',
+                   (('%s/%s' % key, stat) for key, stat in self.moduleCommands.items()), 'module/command'))
+        for title, items, column in tables:
+            rows = sorted((item for item in items if item[1].calls), key=lambda item: -item[1].selfTime)[:top]
+            lines += ['', title,
+                      '%10s %10s %8s %9s %12s  %s' % ('self s', 'total s', 'self %', 'calls', 'ms per call', column)]
+            for name, stat in rows:
+                lines.append('%10.3f %10.3f %8.1f %9d %12.3f  %s' %
+                             (stat.selfTime, stat.totalTime, 100.0 * stat.selfTime / max(seconds, 1e-9), stat.calls,
+                              1000.0 * stat.totalTime / stat.calls, name))
+        return '\n'.join(lines)
+
+
+def _resolveScope(path):
+    """
+    :param path: str, dotted path of a function or a class, like rigLib.rig.spine.build
+    :return: tuple, owner, attribute name and function to wrap, the class and its __init__ for classes
+    """
+    parts = path.split('.')
+    for split in range(len(parts) - 1, 0, -1):
+        try:
+            owner = importlib.import_module('.'.join(parts[:split]))
+            break
+        except ImportError:
+            if split == 1:
+                raise
+    for part in parts[split:-1]:
+        owner = getattr(owner, part)
+
+    attribute = parts[-1]
+    function = getattr(owner, attribute)
+    if isinstance(function, type):
+        owner, attribute = function, '__init__'
+        function = owner.__dict__[attribute]
+    return owner, attribute, function
+
+
+def _scopeName(path):
+    # module and function, spine.build, or the class, control.Control
+    return '.'.join(path.split('.')[-2:])
@@ -0,0 +1,183 @@
+"""
+=====================================================================
+    Tests of the weight file formats of bSkinFile
+
+        python -m unittest discover -s rigTools -p "test_*.py"
+
+=====================================================================
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+import bSkinFile
+import bSkinMath
+
+
+INFLUENCES = ['joint0', 'joint1', 'joint2', 'joint3', 'joint4']
+
+
+def sparseWeights(vertexCount, seed=0):
+    """
+    :return: numpy.ndarray, (vertices x influences) normalized weights with two influences per vertex
+    """
+    random = numpy.random.RandomState(seed)
+    weights = numpy.zeros((vertexCount, len(INFLUENCES)))
+    rows = numpy.arange(vertexCount)
+    first = random.randint(len(INFLUENCES), size=vertexCount)
+    weights[rows, first] = random.rand(vertexCount) + 0.1
+    weights[rows, (first + 1) % len(INFLUENCES)] = random.rand(vertexCount) + 0.1
+    return weights / weights.sum(axis=1)[:, numpy.newaxis]
+
+
+class WeightFileTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # a bit more than a chunk, so the files are read in more than one
+        self.blocks = [bSkinFile.WeightBlock('body', INFLUENCES, sparseWeights(bSkinFile.DEFAULT_CHUNK_SIZE + 10)),
+                       bSkinFile.WeightBlock('head', INFLUENCES, sparseWeights(30, seed=1)),
+                       bSkinFile.WeightBlock('empty', INFLUENCES, numpy.zeros((0, len(INFLUENCES))))]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def writeFile(self, extension, **kwargs):
+        path = os.path.join(self.directory, 'skin' + extension)
+        with bSkinFile.openWeightWriter(path, **kwargs) as writer:
+            for block in self.blocks:
+                writer.writeBlock(block)
+        return path
+
+
+class WeightFileTest(WeightFileTestCase):
+
+    def assertRoundTrip(self, path, atol):
+        blocks = list(bSkinFile.readWeightFile(path))
+        self.assertEqual([block.name for block in blocks], [block.name for block in self.blocks])
+        for block, expected in zip(blocks, self.blocks):
+            self.assertEqual(block.influences, INFLUENCES)
+            self.assertEqual(block.weights.shape, expected.weights.shape)
+            numpy.testing.assert_allclose(block.weights, expected.weights, atol=atol)
+        # nothing but the file is left in the folder
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(path)])
+        return blocks
+
+    def testText(self):
+        path = self.writeFile('.weights')
+        self.assertEqual(bSkinFile.detectFormat(path), bSkinFile.FORMAT_TEXT)
+        self.assertRoundTrip(path, 1e-6)
+
+    def testBinary(self):
+        path = self.writeFile(bSkinFile.BINARY_EXTENSION)
+        self.assertEqual(bSkinFile.detectFormat(path), bSkinFile.FORMAT_BINARY)
+        self.assertRoundTrip(path, 1e-7)
+
+    def testSparse(self):
+        path = self.writeFile(bSkinFile.BINARY_EXTENSION, sparse=True)
+        self.assertRoundTrip(path, 1e-7)
+
+        # the file stays open as long as the generator is alive
+        streams = bSkinFile.iterWeightFile(path)
+        stream = next(streams)
+        self.assertEqual(stream.layout, bSkinFile.LAYOUT_CSR)
+        indptr, indices, data = stream.csr()
+        numpy.testing.assert_allclose(bSkinMath.fromCsr(indptr, indices, data, len(INFLUENCES)),
+                                      self.blocks[0].weights, atol=1e-7)
+
+    def testQuantized(self):
+        for sparse in (False, True):
+            path = self.writeFile(bSkinFile.BINARY_EXTENSION, dtype=bSkinFile.QUANTIZED, sparse=sparse)
+            blocks = self.assertRoundTrip(path, 1.0 / bSkinMath.QUANTIZE_SCALE)
+
+            # the fixed point weights of each vertex sum up to exactly 1
+            for block, expected in zip(blocks[:2], self.blocks):
+                quantized = numpy.round(block.weights.astype(numpy.float64) * bSkinMath.QUANTIZE_SCALE)
+                self.assertTrue((quantized.sum(axis=1) == bSkinMath.QUANTIZE_SCALE).all())
+                # zero weights stay zero
+                numpy.testing.assert_array_equal(block.weights == 0, expected.weights == 0)
+
+    def testCompressed(self):
+        for compression in bSkinFile.COMPRESSIONS:
+            for sparse in (False, True):
+                path = self.writeFile(bSkinFile.BINARY_EXTENSION, sparse=sparse, compression=compression)
+                self.assertRoundTrip(path, 1e-7)
+
+    def testMaxInfluences(self):
+        self.blocks[1].weights = numpy.random.RandomState(2).rand(30, len(INFLUENCES))
+        for extension in ('.weights', bSkinFile.BINARY_EXTENSION):
+            path = self.writeFile(extension, maxInfluences=2)
+            block = list(bSkinFile.readWeightFile(path))[1]
+            self.assertTrue(((block.weights != 0).sum(axis=1) <= 2).all())
+            numpy.testing.assert_allclose(block.weights.sum(axis=1), 1.0, atol=1e-5)
+
+    def testTextOnlyFormats(self):
+        path = os.path.join(self.directory, 'skin.weights')
+        for kwargs in ({'sparse': True}, {'compression': bSkinFile.COMPRESSION_ZLIB},
+                       {'dtype': bSkinFile.QUANTIZED}, {'baseline': path}):
+            self.assertRaises(ValueError, bSkinFile.openWeightWriter, path, **kwargs)
+
+
+class WeightFileIndexTest(WeightFileTestCase):
+
+    def assertIndex(self, path):
+        index = bSkinFile.readIndex(path)
+        self.assertEqual([entry['name'] for entry in index], ['body', 'head', 'empty'])
+        self.assertEqual([entry['vertexCount'] for entry in index], [len(block.weights) for block in self.blocks])
+        self.assertEqual([entry['influences'] for entry in index], [INFLUENCES] * 3)
+
+        block = bSkinFile.readObject(path, 'head')
+        numpy.testing.assert_allclose(block.weights, self.blocks[1].weights, atol=1e-6)
+        self.assertIsNone(bSkinFile.readObject(path, 'missing'))
+
+        streams = list(bSkinFile.iterWeightFile(path, objectNames=['head', 'missing', 'body']))
+        self.assertEqual([stream.name for stream in streams], ['head', 'body'])
+
+    def testBinaryIndex(self):
+        path = self.writeFile(bSkinFile.BINARY_EXTENSION, sparse=True)
+        with open(path, 'rb') as f:
+            self.assertIn(bSkinFile.INDEX_MAGIC, f.read())
+        self.assertIndex(path)
+
+    def testTextIndex(self):
+        self.assertIndex(self.writeFile('.weights'))
+
+    def testMapObject(self):
+        path = self.writeFile(bSkinFile.BINARY_EXTENSION)
+        mapped = bSkinFile.mapObject(path, 'head')
+        numpy.testing.assert_allclose(mapped['weights'], self.blocks[1].weights, atol=1e-7)
+
+        self.assertRaises(KeyError, bSkinFile.mapObject, path, 'missing')
+        compressed = self.writeFile(bSkinFile.BINARY_EXTENSION, compression=bSkinFile.COMPRESSION_ZLIB)
+        self.assertRaises(ValueError, bSkinFile.mapObject, compressed, 'head')
+
+
+class VertexFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testRoundTrip(self):
+        block = bSkinFile.WeightBlock('body', INFLUENCES, sparseWeights(4), vertexIds=numpy.array([7, 2, 11, 3]),
+                                      softWeights=numpy.array([1.0, 0.75, 0.5, 0.25]), meshVertexCount=20)
+        for extension in ('.weights', bSkinFile.BINARY_EXTENSION):
+            path = os.path.join(self.directory, 'vertices' + extension)
+            bSkinFile.writeVertexFile(path, block)
+            loaded = bSkinFile.readVertexFile(path)
+
+            self.assertEqual(loaded.influences, INFLUENCES)
+            self.assertEqual(loaded.meshVertexCount, 20)
+            numpy.testing.assert_array_equal(loaded.vertexIds, block.vertexIds)
+            numpy.testing.assert_allclose(loaded.softWeights, block.softWeights, atol=1e-6)
+            numpy.testing.assert_allclose(loaded.weights, block.weights, atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
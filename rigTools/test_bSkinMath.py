@@ -0,0 +1,104 @@
+"""
+=====================================================================
+    Tests of the weight math of bSkinMath
+
+        python -m unittest discover -s rigTools -p "test_*.py"
+
+=====================================================================
+"""
+
+import unittest
+
+import numpy
+
+import bSkinMath
+
+
+def randomWeights(vertexCount, influenceCount, seed=0):
+    return numpy.random.RandomState(seed).rand(vertexCount, influenceCount)
+
+
+class NormalizeWeightsTest(unittest.TestCase):
+
+    def testRowsSumToOne(self):
+        weights = randomWeights(50, 6)
+        expected = weights / weights.sum(axis=1)[:, numpy.newaxis]
+
+        self.assertIs(bSkinMath.normalizeWeights(weights), weights)
+        numpy.testing.assert_allclose(weights, expected)
+
+    def testLockedInfluencesKeepTheirWeights(self):
+        weights = randomWeights(50, 6) * 0.1
+        lockMask = [False, True, False, False, True, False]
+        locked = weights[:, [1, 4]].copy()
+        unlocked = weights[:, [0, 2, 3, 5]].copy()
+
+        bSkinMath.normalizeWeights(weights, lockMask)
+
+        numpy.testing.assert_array_equal(weights[:, [1, 4]], locked)
+        numpy.testing.assert_allclose(weights.sum(axis=1), 1.0)
+        # the unlocked weights keep their ratios
+        ratios = weights[:, [0, 2, 3, 5]] / unlocked
+        numpy.testing.assert_allclose(ratios, ratios[:, :1].repeat(4, axis=1))
+
+    def testVerticesBelowThresholdStayAsTheyAre(self):
+        weights = numpy.array([[0.00001, 0.00002, 0.5],
+                               [0.2, 0.2, 0.2]])
+        bSkinMath.normalizeWeights(weights, [False, False, True])
+
+        numpy.testing.assert_array_equal(weights[0], [0.00001, 0.00002, 0.5])
+        numpy.testing.assert_allclose(weights[1], [0.4, 0.4, 0.2])
+
+
+class MergeWeightsTest(unittest.TestCase):
+
+    def testLockedInfluencesKeepOldWeights(self):
+        fileWeights = randomWeights(20, 4)
+        oldWeights = randomWeights(20, 4, seed=1)
+        oldWeights /= oldWeights.sum(axis=1)[:, numpy.newaxis]
+        lockMask = [False, False, True, False]
+
+        weights = bSkinMath.mergeWeights(fileWeights, oldWeights, lockMask)
+
+        numpy.testing.assert_array_equal(weights[:, 2], oldWeights[:, 2])
+        numpy.testing.assert_allclose(weights.sum(axis=1), 1.0)
+        numpy.testing.assert_allclose(weights[:, 0] / weights[:, 1], fileWeights[:, 0] / fileWeights[:, 1])
+
+    def testSoftSelectionBlendsWithOldWeights(self):
+        fileWeights = numpy.array([[1.0, 0.0], [1.0, 0.0], [1.0, 0.0]])
+        oldWeights = numpy.array([[0.0, 1.0], [0.0, 1.0], [0.0, 1.0]])
+
+        weights = bSkinMath.mergeWeights(fileWeights, oldWeights, [False, False], softWeights=[1.0, 0.25, 0.0])
+
+        numpy.testing.assert_allclose(weights, [[1.0, 0.0], [0.25, 0.75], [0.0, 1.0]])
+
+
+class PruneWeightsTest(unittest.TestCase):
+
+    def testKeepsTheBiggestWeights(self):
+        weights = randomWeights(100, 8)
+        weights /= weights.sum(axis=1)[:, numpy.newaxis]
+
+        pruned = bSkinMath.pruneWeights(weights, 3)
+
+        self.assertTrue(((pruned != 0).sum(axis=1) == 3).all())
+        biggest = numpy.argsort(-weights, axis=1)[:, :3]
+        rows = numpy.arange(len(weights))[:, numpy.newaxis]
+        self.assertTrue((pruned[rows, biggest] > 0).all())
+        numpy.testing.assert_allclose(pruned.sum(axis=1), 1.0)
+        numpy.testing.assert_allclose(pruned[rows, biggest] / pruned[rows, biggest[:, :1]],
+                                      weights[rows, biggest] / weights[rows, biggest[:, :1]])
+
+    def testWithoutNormalizing(self):
+        weights = numpy.array([[0.1, 0.5, 0.4]])
+        numpy.testing.assert_array_equal(bSkinMath.pruneWeights(weights, 2, normalize=False), [[0.0, 0.5, 0.4]])
+
+    def testNothingToPrune(self):
+        weights = randomWeights(10, 4)
+        self.assertIs(bSkinMath.pruneWeights(weights, None), weights)
+        self.assertIs(bSkinMath.pruneWeights(weights, 4), weights)
+        self.assertIs(bSkinMath.pruneWeights(weights, 6), weights)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,508 @@
+"""
+=====================================================================
+    Tests of bSkinSaver against the bSkinFakeMaya stand-in
+
+        python -m unittest discover -s rigTools -p "test_*.py"
+
+=====================================================================
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+import bSkinFakeMaya
+bSkinFakeMaya.install()
+
+import maya.cmds as cmds
+
+import bSkinFile
+import bSkinMath
+import bSkinSaver
+import bSkinStats
+import bSkinTransfer
+
+
+MESH_NAME = 'body'
+INFLUENCES = ['joint0', 'joint1', 'joint2']
+
+
+def randomWeights(vertexCount, influenceCount=len(INFLUENCES), seed=0):
+    weights = numpy.random.RandomState(seed).rand(vertexCount, influenceCount)
+    return weights / weights.sum(axis=1)[:, None]
+
+
+def createSkinnedMesh(vertexCount, weights=None):
+    """
+    new scene with MESH_NAME skinned to INFLUENCES
+    :return: numpy.ndarray, the weights of the skinCluster, not a copy
+    """
+    bSkinFakeMaya.newScene()
+    for influence in INFLUENCES:
+        bSkinFakeMaya.createJoint(influence)
+    bSkinFakeMaya.createMesh(MESH_NAME, vertexCount)
+    bSkinFakeMaya.createSkinCluster(MESH_NAME, INFLUENCES, weights)
+    return bSkinFakeMaya.skinWeights(MESH_NAME)
+
+
+def gridMesh(name, size, spacing=1.0):
+    """
+    mesh of size x size vertices on the xz plane around the origin, two triangles per quad
+    :return: numpy.ndarray, (vertices x 3) positions
+    """
+    x, z = numpy.meshgrid((numpy.arange(size) - (size - 1) / 2.0) * spacing,
+                          (numpy.arange(size) - (size - 1) / 2.0) * spacing)
+    positions = numpy.column_stack([x.ravel(), numpy.zeros(size * size), z.ravel()])
+    quads = [(i * size + j, i * size + j + 1, (i + 1) * size + j + 1, (i + 1) * size + j)
+             for i in range(size - 1) for j in range(size - 1)]
+    triangles = [(a, b, c) for a, b, c, d in quads] + [(a, c, d) for a, b, c, d in quads]
+    bSkinFakeMaya.createMesh(name, positions, triangles)
+    return positions
+
+
+class WeightFileTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        bSkinStats.disable()
+        shutil.rmtree(self.directory)
+
+    def writeTextFile(self, weights, name=MESH_NAME):
+        path = os.path.join(self.directory, 'skin.weights')
+        with bSkinFile.openWeightWriter(path, bSkinFile.FORMAT_TEXT) as writer:
+            writer.writeBlock(bSkinFile.WeightBlock(name, INFLUENCES, weights))
+        return path
+
+
+class LoadSkinValuesTest(WeightFileTestCase):
+
+    def testTextFileWithStats(self):
+        fileWeights = randomWeights(100)
+        path = self.writeTextFile(fileWeights)
+        skinWeights = createSkinnedMesh(100)
+
+        records = []
+        bSkinStats.enable(records.append)
+        bSkinSaver.bLoadSkinValues(False, path)
+
+        self.assertEqual(len(records), 1)
+        self.assertNotIn('error', records[0])
+        self.assertEqual(records[0]['counters']['vertices'], 100)
+        self.assertEqual(records[0]['counters']['objects'], 1)
+        numpy.testing.assert_allclose(skinWeights, fileWeights)
+
+    def testObjectNames(self):
+        path = os.path.join(self.directory, 'skin' + bSkinFile.BINARY_EXTENSION)
+        fileWeights = randomWeights(100)
+        with bSkinFile.openWeightWriter(path) as writer:
+            writer.writeBlock(bSkinFile.WeightBlock('other', INFLUENCES, randomWeights(50, seed=2)))
+            writer.writeBlock(bSkinFile.WeightBlock(MESH_NAME, INFLUENCES, fileWeights))
+        skinWeights = createSkinnedMesh(100, randomWeights(100, seed=1))
+
+        names = []
+        readBlockHeader = bSkinFile._readBlockHeader
+
+        def recordedBlockHeader(f):
+            header = readBlockHeader(f)
+            names.append(header['name'])
+            return header
+
+        bSkinFile._readBlockHeader = recordedBlockHeader
+        try:
+            bSkinSaver.bLoadSkinValues(False, path, objectNames=[MESH_NAME])
+        finally:
+            bSkinFile._readBlockHeader = readBlockHeader
+
+        # the block before it isn't read, the file index points right at it
+        self.assertEqual(names, [MESH_NAME])
+        numpy.testing.assert_allclose(skinWeights, fileWeights, atol=1e-7)
+
+    def testVertexFileWithLockedInfluence(self):
+        path = os.path.join(self.directory, 'vertices' + bSkinFile.BINARY_EXTENSION)
+        fileWeights = randomWeights(20)
+        skinWeights = createSkinnedMesh(20, fileWeights)
+        bSkinFakeMaya.selectVertices(MESH_NAME, range(20))
+        bSkinSaver.bSaveVertexSkinValues(path, False)
+
+        meshWeights = randomWeights(20, seed=1)
+        skinWeights[:] = meshWeights
+        cmds.setAttr('%s.liw' % INFLUENCES[1], True)
+        bSkinFakeMaya.select(MESH_NAME)
+        bSkinSaver.bLoadVertexSkinValues(path, False)
+
+        numpy.testing.assert_array_equal(skinWeights[:, 1], meshWeights[:, 1])
+        numpy.testing.assert_allclose(skinWeights.sum(axis=1), 1.0)
+
+        bSkinFakeMaya.select(MESH_NAME)
+        bSkinSaver.bLoadVertexSkinValues(path, True)
+        numpy.testing.assert_allclose(skinWeights, fileWeights, atol=1e-6)
+
+    def assertTextFileSkipped(self, fileVertexCount, meshVertexCount):
+        path = self.writeTextFile(randomWeights(fileVertexCount))
+        meshWeights = randomWeights(meshVertexCount, seed=1)
+        skinWeights = createSkinnedMesh(meshVertexCount, meshWeights)
+
+        bSkinSaver.bLoadSkinValues(False, path)
+
+        self.assertIs(bSkinFakeMaya.skinWeights(MESH_NAME), skinWeights)
+        numpy.testing.assert_allclose(skinWeights, meshWeights, atol=1e-7)
+        # loading doesn't leave anything next to the file
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(path)])
+
+    def testTextFileWithFewerRows(self):
+        self.assertTextFileSkipped(100, 120)
+
+    def testLongTextFileWithFewerRows(self):
+        # the chunks that were already set get their weights back
+        self.assertTextFileSkipped(2 * bSkinFile.DEFAULT_CHUNK_SIZE, 2 * bSkinFile.DEFAULT_CHUNK_SIZE + 100)
+
+    def testTextFileWithMoreRows(self):
+        # the mesh has room for the first chunk, which mustn't get set before the mismatch shows
+        self.assertTextFileSkipped(2 * bSkinFile.DEFAULT_CHUNK_SIZE, bSkinFile.DEFAULT_CHUNK_SIZE + 100)
+
+    def testUndoRedo(self):
+        fileWeights = randomWeights(100)
+        path = self.writeTextFile(fileWeights)
+        for backend in bSkinSaver.BACKENDS:
+            meshWeights = randomWeights(100, seed=1)
+            skinWeights = createSkinnedMesh(100, meshWeights)
+
+            bSkinSaver.bLoadSkinValues(False, path, backend=backend)
+            numpy.testing.assert_allclose(skinWeights, fileWeights)
+            cmds.undo()
+            # undo keeps the weights as float32
+            numpy.testing.assert_allclose(skinWeights, meshWeights, atol=1e-7)
+            cmds.redo()
+            numpy.testing.assert_allclose(skinWeights, fileWeights, atol=1e-7)
+
+    def testUndoPastTheLimit(self):
+        fileWeights = randomWeights(100)
+        path = self.writeTextFile(fileWeights)
+        skinWeights = createSkinnedMesh(100, randomWeights(100, seed=1))
+
+        undoMaxBytes = bSkinSaver.UNDO_MAX_BYTES
+        bSkinSaver.UNDO_MAX_BYTES = 1000
+        try:
+            bSkinSaver.bLoadSkinValues(False, path)
+        finally:
+            bSkinSaver.UNDO_MAX_BYTES = undoMaxBytes
+
+        cmds.undo()
+        numpy.testing.assert_allclose(skinWeights, fileWeights)
+
+
+class SaveSkinValuesTest(WeightFileTestCase):
+
+    def testSerialByDefault(self):
+        path = os.path.join(self.directory, 'skin' + bSkinFile.BINARY_EXTENSION)
+        skinWeights = createSkinnedMesh(100, randomWeights(100))
+        bSkinFakeMaya.select(MESH_NAME)
+
+        pools = []
+        threadPool = bSkinFile.ThreadPool
+        bSkinFile.ThreadPool = lambda workers: pools.append(workers) or threadPool(workers)
+        try:
+            bSkinSaver.bSaveSkinValues(path)
+            self.assertEqual(pools, [])
+            bSkinSaver.bSaveSkinValues(path, workers=2)
+            self.assertEqual(pools, [2])
+        finally:
+            bSkinFile.ThreadPool = threadPool
+
+        blocks = list(bSkinFile.readWeightFile(path))
+        self.assertEqual(len(blocks), 1)
+        numpy.testing.assert_allclose(blocks[0].weights, skinWeights, atol=1e-7)
+
+    def testQuantizedAndCompressed(self):
+        path = os.path.join(self.directory, 'skin' + bSkinFile.BINARY_EXTENSION)
+        savedWeights = randomWeights(500)
+        savedWeights[savedWeights < 0.2] = 0.0
+        savedWeights /= savedWeights.sum(axis=1)[:, None]
+        for sparse in (False, True):
+            for compression in bSkinFile.COMPRESSIONS:
+                skinWeights = createSkinnedMesh(500, savedWeights)
+                bSkinFakeMaya.select(MESH_NAME)
+                bSkinSaver.bSaveSkinValues(path, sparse=sparse, compression=compression, quantize=True)
+
+                skinWeights[:] = randomWeights(500, seed=1)
+                bSkinSaver.bLoadSkinValues(False, path)
+
+                numpy.testing.assert_allclose(skinWeights, savedWeights, atol=1.0 / bSkinMath.QUANTIZE_SCALE)
+                numpy.testing.assert_array_equal(skinWeights == 0, savedWeights == 0)
+                numpy.testing.assert_allclose(skinWeights.sum(axis=1), 1.0, atol=1e-6)
+
+
+class DeltaSaveTest(WeightFileTestCase):
+
+    def setUp(self):
+        WeightFileTestCase.setUp(self)
+        self.baseline = os.path.join(self.directory, 'baseline' + bSkinFile.BINARY_EXTENSION)
+        self.delta = os.path.join(self.directory, 'delta' + bSkinFile.BINARY_EXTENSION)
+        self.skinWeights = createSkinnedMesh(4096, randomWeights(4096))
+        bSkinFakeMaya.select(MESH_NAME)
+        bSkinSaver.bSaveSkinValues(self.baseline)
+
+        self.skinWeights[300:310] = randomWeights(10, seed=2)
+        self.savedWeights = self.skinWeights.copy()
+        bSkinSaver.bSaveSkinValues(self.delta, baseline=self.baseline)
+        self.skinWeights[:] = randomWeights(4096, seed=3)
+
+    def testLoad(self):
+        # one hash chunk of 16 changed
+        self.assertLess(os.path.getsize(self.delta), os.path.getsize(self.baseline) / 4)
+        bSkinSaver.bLoadSkinValues(False, self.delta)
+        numpy.testing.assert_allclose(self.skinWeights, self.savedWeights, atol=1e-7)
+
+    def testChangedBaseline(self):
+        bSkinSaver.bSaveSkinValues(self.baseline)
+        meshWeights = self.skinWeights.copy()
+
+        self.assertRaises(IOError, bSkinSaver.bLoadSkinValues, False, self.delta)
+        numpy.testing.assert_array_equal(self.skinWeights, meshWeights)
+
+
+class TransferTest(WeightFileTestCase):
+
+    @staticmethod
+    def planeWeights(positions):
+        # weights that are linear in the position, so interpolating them on the triangles is exact
+        weights = numpy.column_stack([(positions[:, 0] + 4) / 16, (positions[:, 2] + 4) / 16, numpy.zeros(len(positions))])
+        weights[:, 2] = 1.0 - weights[:, :2].sum(axis=1)
+        return weights
+
+    def setUp(self):
+        WeightFileTestCase.setUp(self)
+        self.path = os.path.join(self.directory, 'skin' + bSkinFile.BINARY_EXTENSION)
+        bSkinFakeMaya.newScene()
+        for influence in INFLUENCES:
+            bSkinFakeMaya.createJoint(influence)
+        self.sourcePositions = gridMesh(MESH_NAME, 9)
+        bSkinFakeMaya.createSkinCluster(MESH_NAME, INFLUENCES, self.planeWeights(self.sourcePositions))
+        bSkinFakeMaya.select(MESH_NAME)
+        bSkinSaver.bSaveSkinValues(self.path, savePositions=True)
+
+        # the same plane with fewer vertices
+        bSkinFakeMaya.newScene()
+        for influence in INFLUENCES:
+            bSkinFakeMaya.createJoint(influence)
+        self.positions = gridMesh(MESH_NAME, 6, spacing=1.6)
+        bSkinFakeMaya.createSkinCluster(MESH_NAME, INFLUENCES)
+
+    def testBarycentric(self):
+        bSkinSaver.bLoadSkinValues(False, self.path, transferMode=bSkinTransfer.TRANSFER_BARYCENTRIC)
+        numpy.testing.assert_allclose(bSkinFakeMaya.skinWeights(MESH_NAME), self.planeWeights(self.positions),
+                                      atol=1e-6)
+
+    def testNearest(self):
+        distances = ((self.positions[:, numpy.newaxis] - self.sourcePositions[numpy.newaxis]) ** 2).sum(axis=2)
+        expected = self.planeWeights(self.sourcePositions)[distances.argmin(axis=1)]
+
+        kdTree = bSkinTransfer.cKDTree
+        for useScipy in (True, False):
+            if not useScipy:
+                # the grid, as without scipy
+                bSkinTransfer.cKDTree = None
+            try:
+                bSkinFakeMaya.skinWeights(MESH_NAME)[:] = 0.0
+                bSkinSaver.bLoadSkinValues(False, self.path, transferMode=bSkinTransfer.TRANSFER_NEAREST)
+            finally:
+                bSkinTransfer.cKDTree = kdTree
+            numpy.testing.assert_allclose(bSkinFakeMaya.skinWeights(MESH_NAME), expected, atol=1e-6)
+
+
+class MirrorTest(unittest.TestCase):
+
+    size = 7
+    influences = ['l_arm', 'r_arm', 'spine']
+
+    def setUp(self):
+        bSkinFakeMaya.newScene()
+        for influence in self.influences:
+            bSkinFakeMaya.createJoint(influence)
+        self.positions = gridMesh(MESH_NAME, self.size)
+        self.weights = randomWeights(self.size * self.size)
+        bSkinFakeMaya.createSkinCluster(MESH_NAME, self.influences, self.weights)
+
+    def expectedWeights(self, positiveToNegative):
+        # the vertex in the mirrored column of the grid, with the l_ and r_ weights swapped
+        mirrored = self.weights.reshape(self.size, self.size, -1)[:, ::-1].reshape(self.weights.shape)[:, [1, 0, 2]]
+        x = self.positions[:, 0]
+        expected = self.weights.copy()
+        target = x < 0 if positiveToNegative else x > 0
+        expected[target] = mirrored[target]
+        expected[x == 0] = (mirrored[x == 0] + self.weights[x == 0]) * 0.5
+        return expected
+
+    def testPositiveToNegative(self):
+        bSkinSaver.bMirrorSkinValues([MESH_NAME])
+        numpy.testing.assert_allclose(bSkinFakeMaya.skinWeights(MESH_NAME), self.expectedWeights(True), atol=1e-6)
+
+    def testNegativeToPositiveOnSelection(self):
+        bSkinFakeMaya.select(MESH_NAME)
+        bSkinSaver.bMirrorSkinValues(positiveToNegative=False, backend=bSkinSaver.BACKEND_API2)
+        numpy.testing.assert_allclose(bSkinFakeMaya.skinWeights(MESH_NAME), self.expectedWeights(False), atol=1e-6)
+
+
+class SmoothTest(unittest.TestCase):
+
+    size = 5
+    spike = 12
+
+    def setUp(self):
+        bSkinFakeMaya.newScene()
+        for influence in INFLUENCES:
+            bSkinFakeMaya.createJoint(influence)
+        gridMesh(MESH_NAME, self.size)
+        # all weight on joint0, but for the center vertex that has it on joint1
+        self.weights = numpy.zeros((self.size * self.size, len(INFLUENCES)))
+        self.weights[:, 0] = 1.0
+        self.weights[self.spike] = [0.0, 1.0, 0.0]
+        bSkinFakeMaya.createSkinCluster(MESH_NAME, INFLUENCES, self.weights)
+
+    def testSpikeSpreadsToNeighbours(self):
+        bSkinSaver.bSmoothSkinValues([MESH_NAME], iterations=1)
+
+        weights = bSkinFakeMaya.skinWeights(MESH_NAME)
+        numpy.testing.assert_allclose(weights.sum(axis=1), 1.0, atol=1e-6)
+        self.assertLess(weights[self.spike, 1], 1.0)
+        # in one step the vertices around the center pick up joint1, the corners are two edges away
+        for neighbour in (self.spike - 1, self.spike + 1, self.spike - self.size, self.spike + self.size):
+            self.assertGreater(weights[neighbour, 1], 0.0)
+        self.assertEqual(weights[0, 1], 0.0)
+
+    def testLockedInfluenceKeepsItsWeights(self):
+        lockedWeights = numpy.random.RandomState(1).rand(len(self.weights)) * 0.5
+        self.weights[:, :2] *= (1.0 - lockedWeights)[:, None]
+        self.weights[:, 2] = lockedWeights
+        bSkinFakeMaya.skinWeights(MESH_NAME)[:] = self.weights
+        cmds.setAttr('joint2.liw', True)
+
+        bSkinSaver.bSmoothSkinValues([MESH_NAME], backend=bSkinSaver.BACKEND_API2)
+
+        weights = bSkinFakeMaya.skinWeights(MESH_NAME)
+        numpy.testing.assert_array_equal(weights[:, 2], self.weights[:, 2])
+        self.assertLess(weights[self.spike, 1], self.weights[self.spike, 1])
+        numpy.testing.assert_allclose(weights.sum(axis=1), 1.0, atol=1e-6)
+
+        bSkinSaver.bSmoothSkinValues([MESH_NAME], ignoreJointLocks=True)
+        self.assertFalse(numpy.allclose(bSkinFakeMaya.skinWeights(MESH_NAME)[:, 2], self.weights[:, 2]))
+
+    def testSelectedVertices(self):
+        vertexIds = [self.spike, self.spike + 1]
+        bSkinFakeMaya.selectVertices(MESH_NAME, vertexIds, [1.0, 0.5])
+
+        bSkinSaver.bSmoothSkinValues()
+
+        weights = bSkinFakeMaya.skinWeights(MESH_NAME)
+        others = numpy.setdiff1d(numpy.arange(len(weights)), vertexIds)
+        numpy.testing.assert_array_equal(weights[others], self.weights[others])
+        self.assertLess(weights[self.spike, 1], 1.0)
+        self.assertGreater(weights[self.spike + 1, 1], 0.0)
+        numpy.testing.assert_allclose(weights.sum(axis=1), 1.0, atol=1e-6)
+
+
+class SelectedVerticesTest(unittest.TestCase):
+
+    def setUp(self):
+        createSkinnedMesh(20)
+        self.vertexIds = [7, 2, 11, 3]
+        self.softWeights = [1.0, 0.75, 0.5, 0.25]
+        bSkinFakeMaya.selectVertices(MESH_NAME, self.vertexIds, self.softWeights)
+
+    def assertSelectedVertices(self):
+        meshPath, vertexIds, softWeights = bSkinSaver.bSelectedVertices()
+        self.assertEqual(meshPath.partialPathName(), MESH_NAME + 'Shape')
+        numpy.testing.assert_array_equal(vertexIds, self.vertexIds)
+        numpy.testing.assert_array_equal(softWeights, self.softWeights)
+
+        meshPath, vertexIds, softWeights = bSkinSaver.bSelectedVertices(softSelection=False)
+        numpy.testing.assert_array_equal(vertexIds, self.vertexIds)
+        self.assertIsNone(softWeights)
+
+    def testSoftSelection(self):
+        self.assertSelectedVertices()
+
+    def testSoftSelectionWithoutApi2(self):
+        openMaya2 = bSkinSaver.OpenMaya2
+        bSkinSaver.OpenMaya2 = None
+        try:
+            self.assertSelectedVertices()
+        finally:
+            bSkinSaver.OpenMaya2 = openMaya2
+
+    def testNothingSelected(self):
+        bSkinFakeMaya.select(MESH_NAME)
+        self.assertIsNone(bSkinSaver.bSelectedVertices())
+
+
+class GeometryPathTest(unittest.TestCase):
+
+    def setUp(self):
+        bSkinFakeMaya.newScene()
+
+    def testShape(self):
+        bSkinFakeMaya.createMesh(MESH_NAME, 10)
+        self.assertEqual(bSkinSaver.bGeometryPath(MESH_NAME + 'Shape').partialPathName(), MESH_NAME + 'Shape')
+        self.assertEqual(bSkinSaver.bGeometryPath(MESH_NAME).partialPathName(), MESH_NAME + 'Shape')
+
+    def testTransformWithOrigShape(self):
+        bSkinFakeMaya.createMesh(MESH_NAME, 10, origShape=True)
+        self.assertEqual(bSkinSaver.bGeometryPath(MESH_NAME).partialPathName(), MESH_NAME + 'Shape')
+
+
+class MeshPositionsTest(WeightFileTestCase):
+
+    def setUp(self):
+        WeightFileTestCase.setUp(self)
+        self.positions = numpy.random.RandomState(2).rand(20, 3)
+        bSkinFakeMaya.newScene()
+        for influence in INFLUENCES:
+            bSkinFakeMaya.createJoint(influence)
+        bSkinFakeMaya.createMesh(MESH_NAME, self.positions)
+        bSkinFakeMaya.createSkinCluster(MESH_NAME, INFLUENCES, randomWeights(20, seed=1))
+
+    def testMeshPositions(self):
+        meshPath = bSkinSaver.bGeometryPath(MESH_NAME)
+        numpy.testing.assert_array_equal(bSkinSaver.bMeshPositions(meshPath), self.positions)
+
+        openMaya2 = bSkinSaver.OpenMaya2
+        bSkinSaver.OpenMaya2 = None
+        try:
+            numpy.testing.assert_array_equal(bSkinSaver.bMeshPositions(meshPath), self.positions)
+        finally:
+            bSkinSaver.OpenMaya2 = openMaya2
+
+    def testTransferVertexFile(self):
+        path = os.path.join(self.directory, 'vertices' + bSkinFile.BINARY_EXTENSION)
+        savedWeights = bSkinFakeMaya.skinWeights(MESH_NAME).copy()
+        bSkinFakeMaya.selectVertices(MESH_NAME, [4, 9, 13], [1.0, 0.5, 0.25])
+        bSkinSaver.bSaveVertexSkinValues(path, False, savePositions=True)
+
+        skinWeights = bSkinFakeMaya.skinWeights(MESH_NAME)
+        skinWeights[:] = randomWeights(20, seed=3)
+        bSkinFakeMaya.select(MESH_NAME)
+
+        calls = []
+        meshPositions = bSkinSaver.bMeshPositions
+
+        def countedMeshPositions(meshPath):
+            calls.append(meshPath)
+            return meshPositions(meshPath)
+
+        bSkinSaver.bMeshPositions = countedMeshPositions
+        try:
+            bSkinSaver.bLoadVertexSkinValues(path, True, transferMode=bSkinTransfer.TRANSFER_NEAREST)
+        finally:
+            bSkinSaver.bMeshPositions = meshPositions
+
+        self.assertEqual(len(calls), 1)
+        numpy.testing.assert_allclose(skinWeights[4], savedWeights[4], atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+=====================================================================
+    Tests of the bSkinTool command line, on files bSkinSaver saved
+    from the bSkinFakeMaya stand-in
+
+        python -m unittest discover -s rigTools -p "test_*.py"
+
+=====================================================================
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import numpy
+
+import bSkinFakeMaya
+bSkinFakeMaya.install()
+
+import maya.cmds as cmds
+
+import bSkinFile
+import bSkinMath
+import bSkinSaver
+import bSkinTool
+
+
+INFLUENCES = ['l_arm', 'r_arm', 'spine']
+# vertices per side of the grid of each mesh
+MESHES = [('body', 7), ('head', 3)]
+
+
+def gridMesh(name, size):
+    """
+    mesh of size x size vertices on the xz plane around the origin, two triangles per quad
+    """
+    x, z = numpy.meshgrid(numpy.arange(size) - (size - 1) / 2.0, numpy.arange(size) - (size - 1) / 2.0)
+    positions = numpy.column_stack([x.ravel(), numpy.zeros(size * size), z.ravel()])
+    quads = [(i * size + j, i * size + j + 1, (i + 1) * size + j + 1, (i + 1) * size + j)
+             for i in range(size - 1) for j in range(size - 1)]
+    triangles = [(a, b, c) for a, b, c, d in quads] + [(a, c, d) for a, b, c, d in quads]
+    bSkinFakeMaya.createMesh(name, positions, triangles)
+
+
+def runTool(*argv):
+    """
+    :return: tuple(int, str), exit code and what bSkinTool printed
+    """
+    stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        code = bSkinTool.main(list(argv))
+        return code, sys.stdout.getvalue()
+    finally:
+        sys.stdout = stdout
+
+
+class SkinToolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        random = numpy.random.RandomState(0)
+        bSkinFakeMaya.newScene()
+        for influence in INFLUENCES:
+            bSkinFakeMaya.createJoint(influence)
+        self.weights = {}
+        for name, size in MESHES:
+            gridMesh(name, size)
+            weights = random.rand(size * size, len(INFLUENCES))
+            self.weights[name] = weights / weights.sum(axis=1)[:, None]
+            bSkinFakeMaya.createSkinCluster(name, INFLUENCES, self.weights[name])
+        self.path = self.save('skin' + bSkinFile.BINARY_EXTENSION)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def file(self, name):
+        return os.path.join(self.directory, name)
+
+    def save(self, name):
+        path = self.file(name)
+        bSkinFakeMaya.select(*[name for name, size in MESHES])
+        bSkinSaver.bSaveSkinValues(path, savePositions=True)
+        return path
+
+    def readWeights(self, path):
+        return dict((block.name, block.weights) for block in bSkinFile.readWeightFile(path))
+
+    def sceneWeights(self):
+        return dict((name, bSkinFakeMaya.skinWeights(name)) for name, size in MESHES)
+
+    def assertWeights(self, weights, expected, atol=1e-6):
+        self.assertEqual(sorted(weights), sorted(expected))
+        for name in expected:
+            numpy.testing.assert_allclose(weights[name], expected[name], atol=atol)
+
+    def testList(self):
+        code, output = runTool('list', self.path, '--json')
+        self.assertEqual(code, 0)
+        entries = json.loads(output)
+        self.assertEqual([entry['name'] for entry in entries], ['body', 'head'])
+        self.assertEqual([entry['vertexCount'] for entry in entries], [49, 9])
+        self.assertEqual([entry['influences'] for entry in entries], [INFLUENCES] * 2)
+
+        code, output = runTool('list', self.path, '--influences')
+        self.assertEqual(output.splitlines()[1].strip(), INFLUENCES[0])
+
+    def testValidate(self):
+        self.assertEqual(runTool('validate', self.path)[0], 0)
+
+        path = self.file('broken.weights')
+        weights = self.weights['head'].copy()
+        weights[4] *= 2.0
+        with bSkinFile.openWeightWriter(path, bSkinFile.FORMAT_TEXT) as writer:
+            writer.writeBlock(bSkinFile.WeightBlock('head', INFLUENCES, weights))
+        code, output = runTool('validate', path, '--json')
+        self.assertEqual(code, 1)
+        result, = json.loads(output)
+        self.assertEqual(result['unnormalized'], 1)
+        self.assertFalse(result['valid'])
+
+    def testDiff(self):
+        skinWeights = bSkinFakeMaya.skinWeights('body')
+        skinWeights[10] = [0.0, 0.0, 1.0]
+        path = self.save('changed' + bSkinFile.BINARY_EXTENSION)
+
+        code, output = runTool('diff', self.path, path, '--json')
+        result = json.loads(output)
+        self.assertEqual((result['onlyA'], result['onlyB']), ([], []))
+        objects = dict((objectDiff['name'], objectDiff) for objectDiff in result['objects'])
+        self.assertAlmostEqual(objects['body']['maxDelta'], numpy.abs(skinWeights - self.weights['body']).max(),
+                               places=6)
+        self.assertAlmostEqual(objects['body']['influences']['spine']['maxDelta'],
+                               1.0 - self.weights['body'][10, 2], places=6)
+        self.assertAlmostEqual(objects['head']['maxDelta'], 0.0, places=6)
+
+    def testSubsetMergeAndConvert(self):
+        headPath = self.file('head.weights')
+        runTool('subset', self.path, '-o', headPath, '--objects', 'head', 'missing')
+        self.assertWeights(self.readWeights(headPath), {'head': self.weights['head']})
+
+        mergedPath = self.file('merged' + bSkinFile.BINARY_EXTENSION)
+        code, output = runTool('merge', self.path, headPath, '-o', mergedPath, '--quantize', '--compression',
+                               bSkinFile.COMPRESSION_ZLIB)
+        self.assertEqual(output.strip(), 'merged 2 objects')
+        self.assertEqual([entry['name'] for entry in bSkinTool.inspectFile(mergedPath)], ['body', 'head'])
+        self.assertWeights(self.readWeights(mergedPath), self.weights, 1.0 / bSkinMath.QUANTIZE_SCALE)
+
+        convertedPath = self.file('converted.weights')
+        runTool('convert', self.path, '-o', convertedPath, '--max-influences', '2')
+        weights = self.readWeights(convertedPath)
+        self.assertWeights(weights, dict((name, bSkinMath.pruneWeights(self.weights[name], 2)) for name in weights))
+
+    def testMirrorLikeInTheScene(self):
+        path = self.file('mirrored' + bSkinFile.BINARY_EXTENSION)
+        code, output = runTool('mirror', self.path, '-o', path, '--negative-to-positive')
+        self.assertIn('body: mirrored, 0 vertices without a mirror', output)
+
+        bSkinSaver.bMirrorSkinValues([name for name, size in MESHES], positiveToNegative=False)
+        self.assertWeights(self.readWeights(path), self.sceneWeights())
+
+    def testSmoothLikeInTheScene(self):
+        path = self.file('smooth' + bSkinFile.BINARY_EXTENSION)
+        runTool('smooth', self.path, '-o', path, '--iterations', '2', '--lock', 'spine')
+
+        cmds.setAttr('spine.liw', True)
+        bSkinSaver.bSmoothSkinValues([name for name, size in MESHES], iterations=2)
+        weights = self.readWeights(path)
+        self.assertWeights(weights, self.sceneWeights())
+        numpy.testing.assert_allclose(weights['body'][:, 2], self.weights['body'][:, 2], atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+=====================================================================
+    Tests of incremental rig builds, rigLib's build graph with
+    checkpoints saved and opened in the rigFakeMaya stand-in
+
+        python -m unittest discover -s rigTools -p "test_*.py"
+
+=====================================================================
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import rigFakeMaya
+rigFakeMaya.install()
+
+import maya.cmds as cmds
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rigLib.base import build_graph
+from rigLib.base import checkpoint
+
+
+class IncrementalBuildTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.checkpoints = checkpoint.CheckpointStore(self.directory)
+        self.calls = []
+        self.deformSize = 1.0
+        self.spineEnabled = True
+
+    def tearDown(self):
+        rigFakeMaya.newScene()
+        shutil.rmtree(self.directory)
+
+    def step(self, name):
+        def function(results):
+            self.calls.append(name)
+            return rigFakeMaya.createGroup(name + '_grp')
+        return function
+
+    def build(self):
+        """
+        build the steps in a new scene, like a new session would
+        :return: BuildGraph, after the run
+        """
+        graph = build_graph.BuildGraph()
+        graph.add('scene', self.step('scene'), checkpoint=True)
+        graph.add('deform', self.step('deform'), requires=['scene'], inputs=[self.deformSize], checkpoint=True)
+        graph.add('spine', self.step('spine'), requires=['deform'], condition=lambda: self.spineEnabled,
+                  checkpoint=True)
+        graph.add('arm', self.step('arm'), requires=['deform'])
+
+        rigFakeMaya.newScene()
+        self.calls = []
+        graph.run(checkpoints=self.checkpoints)
+        return graph
+
+    def assertStates(self, graph, states):
+        self.assertEqual(dict((node.name, node.state) for node in graph.nodes), states)
+
+    def checkpointSteps(self):
+        return sorted(name.rsplit('_', 1)[0] for name in os.listdir(self.directory) if name.endswith('.checkpoint'))
+
+    def testRestoreFromLastCheckpoint(self):
+        self.build()
+        self.assertEqual(self.calls, ['scene', 'deform', 'spine', 'arm'])
+        self.assertEqual(self.checkpointSteps(), ['deform', 'scene', 'spine'])
+
+        graph = self.build()
+        self.assertEqual(self.calls, ['arm'])
+        self.assertStates(graph, {'scene': build_graph.RESTORED, 'deform': build_graph.RESTORED,
+                                  'spine': build_graph.RESTORED, 'arm': build_graph.BUILT})
+        self.assertEqual(graph.results['spine'], 'spine_grp')
+        self.assertEqual(sorted(cmds.ls('*_grp')), ['arm_grp', 'deform_grp', 'scene_grp', 'spine_grp'])
+
+    def testChangedInputRebuildsFromItsStep(self):
+        self.build()
+        self.deformSize = 2.0
+        graph = self.build()
+
+        self.assertEqual(self.calls, ['deform', 'spine', 'arm'])
+        self.assertStates(graph, {'scene': build_graph.RESTORED, 'deform': build_graph.BUILT,
+                                  'spine': build_graph.BUILT, 'arm': build_graph.BUILT})
+        self.assertEqual(sorted(cmds.ls('*_grp')), ['arm_grp', 'deform_grp', 'scene_grp', 'spine_grp'])
+        # the checkpoints with the old key are gone
+        self.assertEqual(self.checkpointSteps(), ['deform', 'scene', 'spine'])
+
+    def testSkippedStepHasNoCheckpoint(self):
+        self.spineEnabled = False
+        self.build()
+        self.assertEqual(self.calls, ['scene', 'deform', 'arm'])
+        self.assertEqual(self.checkpointSteps(), ['deform', 'scene'])
+
+        graph = self.build()
+        self.assertEqual(self.calls, ['arm'])
+        self.assertStates(graph, {'scene': build_graph.RESTORED, 'deform': build_graph.RESTORED,
+                                  'spine': build_graph.SKIPPED, 'arm': build_graph.BUILT})
+
+
+if __name__ == '__main__':
+    unittest.main()
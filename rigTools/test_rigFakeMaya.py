@@ -0,0 +1,82 @@
+"""
+=====================================================================
+    Tests of the rigFakeMaya stand-in, with bSkinSaver on a rig
+    that humanRig built in the same run
+
+        python -m unittest discover -s rigTools -p "test_*.py"
+
+=====================================================================
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy
+
+import rigFakeMaya
+rigFakeMaya.install()
+
+import maya.cmds as cmds
+
+import bSkinFakeMaya
+import bSkinFile
+import bSkinSaver
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import humanRig
+
+
+CHARACTER_NAME = 'human'
+GEOMETRY = ['Body', 'l_eyeGeo', 'r_eyeGeo']
+
+
+def buildHuman():
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        rigFakeMaya.registerHumanFiles(CHARACTER_NAME, humanRig.project.project_path)
+        humanRig.human.build(CHARACTER_NAME)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+class RigSkinWeightsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        buildHuman()
+
+    def tearDown(self):
+        rigFakeMaya.unregisterFiles()
+        shutil.rmtree(self.directory)
+
+    def testSaveAndLoad(self):
+        random = numpy.random.RandomState(0)
+        savedWeights = {}
+        for geometry in GEOMETRY:
+            skinWeights = bSkinFakeMaya.skinWeights(geometry)
+            skinWeights[:] = random.rand(*skinWeights.shape)
+            skinWeights /= skinWeights.sum(axis=1)[:, None]
+            savedWeights[geometry] = skinWeights.copy()
+
+        path = os.path.join(self.directory, CHARACTER_NAME + bSkinFile.BINARY_EXTENSION)
+        cmds.select(GEOMETRY)
+        bSkinSaver.bSaveSkinValues(path)
+
+        # a new skinCluster for the body, with the weights of the bind
+        cmds.skinCluster(bSkinFakeMaya.MFnDependencyNode(bSkinSaver.bFindSkinCluster('Body')).name(),
+                         edit=True, unbind=True)
+        for geometry in GEOMETRY[1:]:
+            bSkinFakeMaya.skinWeights(geometry)[:] = 0.0
+        bSkinSaver.bLoadSkinValues(False, path)
+
+        for geometry in GEOMETRY:
+            numpy.testing.assert_allclose(bSkinFakeMaya.skinWeights(geometry), savedWeights[geometry], atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()